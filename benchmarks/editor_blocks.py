@@ -0,0 +1,122 @@
+"""Замер стоимости преобразования сгенерированных статей в блоки редактора vc.ru/dtf.ru.
+
+Корпус по умолчанию — статьи из benchmarks/corpus в разметке, которую выдают промты бота. Вместо него
+можно указать html-файлы и папки или взять статьи из баз бота (articles.db и базы заданий):
+
+    python -m benchmarks.editor_blocks
+    python -m benchmarks.editor_blocks path/to/articles/ article.html --repeat 5
+    python -m benchmarks.editor_blocks --db
+"""
+
+import argparse
+import glob
+import importlib.util
+import os
+import sqlite3
+import statistics
+import time
+
+from bot.config import DB_ARTICLES_DIRECTORY, DB_DIRECTORY
+from bot.handlers.commands.api import editor_blocks
+from bot.handlers.commands.api.editor_blocks import compile_article
+
+# Постоянный корпус статей: замеры сравнимы между запусками и не зависят от баз бота
+CORPUS_DIRECTORY = os.path.join(os.path.dirname(__file__), 'corpus')
+
+
+def load_db_corpus() -> list:
+    """Тексты статей из articles.db и баз заданий"""
+
+    corpus = []
+
+    for db_path in [DB_ARTICLES_DIRECTORY, *sorted(glob.glob(DB_DIRECTORY + '*.db'))]:
+        if not os.path.exists(db_path):
+            continue
+
+        connection = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+
+        try:
+            corpus += [row[0] for row in connection.execute("SELECT article_text FROM Articles") if row[0]]
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            connection.close()
+
+    return corpus
+
+def load_file_corpus(paths: list) -> list:
+    """Тексты html-файлов (папки просматриваются рекурсивно)"""
+
+    files = []
+
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, '**', '*.html'), recursive=True))
+        else:
+            files.append(path)
+
+    corpus = []
+
+    for file in files:
+        with open(file, encoding='utf-8') as f:
+            corpus.append(f.read())
+
+    return corpus
+
+def measure(corpus: list, parser: str, repeat: int) -> list:
+    """Время преобразования каждой статьи (секунды), лучшее из repeat запусков"""
+
+    editor_blocks.PARSER = parser
+    timings = []
+
+    for text in corpus:
+        best = None
+
+        for _ in range(repeat):
+            started = time.perf_counter()
+            compile_article(text)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        timings.append(best)
+
+    return timings
+
+def available_parsers() -> list:
+    parsers = ['html.parser']
+
+    if importlib.util.find_spec('lxml') is not None:
+        parsers.insert(0, 'lxml')
+
+    return parsers
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер преобразования статей в блоки редактора")
+    parser.add_argument('paths', nargs='*', help="html-файлы или папки с ними (по умолчанию — benchmarks/corpus)")
+    parser.add_argument('--db', action='store_true', help="статьи из баз бота вместо файлов")
+    parser.add_argument('--repeat', type=int, default=3, help="количество запусков на статью")
+    args = parser.parse_args()
+
+    if args.db:
+        corpus = load_db_corpus()
+    else:
+        corpus = load_file_corpus(args.paths or [CORPUS_DIRECTORY])
+
+    if not corpus:
+        print("Корпус пуст: укажите html-файлы или запустите из папки бота с заполненными базами")
+        return
+
+    total_size = sum(len(text) for text in corpus)
+    print(f"Статей: {len(corpus)}, средний размер: {total_size / len(corpus):.0f} символов")
+
+    for backend in available_parsers():
+        timings = measure(corpus, backend, args.repeat)
+        timings_ms = sorted(elapsed * 1000 for elapsed in timings)
+        p95 = timings_ms[min(len(timings_ms) - 1, int(len(timings_ms) * 0.95))]
+
+        print(f"{backend:12} среднее {statistics.mean(timings_ms):7.2f} мс, медиана {statistics.median(timings_ms):7.2f} мс, "
+              f"p95 {p95:7.2f} мс, {len(timings) / sum(timings):8.0f} статей/с")
+
+
+if __name__ == '__main__':
+    main()
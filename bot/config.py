@@ -12,13 +12,110 @@ DB_XLSX_DIRECTORY = 'bot/databases/db/xlsx.db'
 DB_MAIN_ACCOUNTS_DIRECTORY = 'bot/databases/db/general_accounts.db'
 DB_MULTI_ACCOUNTS_DIRECTORY = 'bot/databases/db/multi_accounts.db'
 DB_OPENAI_API_KEY_DIRECTORY = 'bot/databases/db/openai_api_key.db'
+DB_TOKENS_DIRECTORY = 'bot/databases/db/tokens.db'
+DB_UPLOADS_DIRECTORY = 'bot/databases/db/uploads.db'
+DB_INDEXING_DIRECTORY = 'bot/databases/db/indexing.db'
 
 # Тайм-аут баз данных
 TIMEOUT_DELAY = 500
 
+# Количество потоков чтения шлюза баз данных (запись всегда в одном потоке)
+DB_READ_WORKERS = 4
+
 # Администраторы
 ADMINS = [
     217459567,
     496998608,
     956967272
-]
\ No newline at end of file
+]
+
+# Количество статей, генерируемых заранее, пока идёт публикация
+PIPELINE_PREFETCH = 3
+
+# Одновременная генерация текста и изображения статьи
+CONCURRENT_GENERATION = True
+
+# Тайм-ауты HTTP-сессий площадок (секунды)
+HTTP_TIMEOUT_TOTAL = 120
+HTTP_TIMEOUT_CONNECT = 30
+HTTP_KEEPALIVE_TIMEOUT = 60
+
+# Максимум одновременных соединений сессии аккаунта
+HTTP_CONNECTIONS_PER_ACCOUNT = 4
+
+# Загрузка изображений OpenAI: количество попыток, размер блока записи (байты)
+IMAGE_DOWNLOAD_ATTEMPTS = 3
+IMAGE_CHUNK_SIZE = 64 * 1024
+
+# Перекодирование изображений в WebP: потоки, максимальная ширина (пиксели), качество
+IMAGE_WORKERS = 2
+IMAGE_MAX_WIDTH = 1280
+IMAGE_WEBP_QUALITY = 85
+
+# Адрес API OpenAI (None — официальный API; можно указать локальный mock-сервер)
+OPENAI_BASE_URL = None
+
+# Интервал опроса статуса пакетной генерации OpenAI Batch API (секунды)
+BATCH_POLL_INTERVAL = 60
+
+# Планировщик запросов OpenAI: лимиты ключа до получения заголовков ответа (в минуту),
+# максимум одновременных запросов на ключ, повторы при ошибке 429, оценка токенов ответа
+OPENAI_DEFAULT_RPM = 500
+OPENAI_DEFAULT_TPM = 30000
+OPENAI_MAX_CONCURRENT = 8
+OPENAI_MAX_RETRIES = 5
+OPENAI_COMPLETION_TOKENS = 2000
+
+# Токены доступа площадок: срок жизни, если его нельзя определить из токена, запас до истечения
+# для обновления и интервал проверки фонового обновления (секунды)
+TOKEN_DEFAULT_TTL = 6 * 60 * 60
+TOKEN_REFRESH_MARGIN = 10 * 60
+TOKEN_REFRESH_INTERVAL = 60
+
+# Обновление токена по refresh-токену (POST /v3.4/auth/refresh). Адрес, тело запроса и формат ответа
+# не подтверждены документацией площадок, поэтому обновление выключено: истекающий токен заменяется
+# повторной авторизацией. Включить после проверки запроса на реальном аккаунте vc.ru и dtf.ru
+TOKEN_REFRESH_ENABLED = False
+
+# Интервал записи статусов заданий из памяти в tasks.db (секунды)
+TASK_STATUS_FLUSH_INTERVAL = 2
+
+# Уведомления в Telegram: минимальный интервал между сообщениями в один чат, окно накопления сводок
+# (секунды), число попыток отправки и максимальная длина сообщения
+NOTIFY_CHAT_INTERVAL = 1
+NOTIFY_DIGEST_WINDOW = 30
+NOTIFY_MAX_RETRIES = 5
+NOTIFY_MESSAGE_LIMIT = 4096
+
+# Срок, в течение которого загруженное на площадку изображение используется повторно (секунды)
+UPLOAD_CACHE_TTL = 30 * 24 * 60 * 60
+
+# Кэш лент статей авторов для перелинковки: срок до сверки с площадкой (секунды),
+# максимум статей в кэше одной ленты, пауза между страницами ленты (секунды)
+TIMELINE_CACHE_TTL = 30 * 60
+TIMELINE_CACHE_SIZE = 100
+TIMELINE_PAGE_DELAY = 1
+
+# Очередь индексации ссылок: интервал отправки (секунды), ссылок в одном запросе,
+# число попыток, задержка перед первой повторной попыткой (удваивается с каждой попыткой, секунды)
+# и таймаут запроса к сервису индексации (секунды; таймаут считается неудачной попыткой).
+# Ссылки, не отправленные за все попытки, хранятся INDEXING_FAILED_RETENTION секунд и затем удаляются.
+# По одной ссылке в запросе, пока формат ответа сервиса для нескольких ссылок не сверен: из пачки удаляются
+# только ссылки, приём которых подтверждён ответом (link_indexing_api.confirmed_links)
+INDEXING_POLL_INTERVAL = 30
+INDEXING_BATCH_SIZE = 1
+INDEXING_MAX_ATTEMPTS = 6
+INDEXING_RETRY_DELAY = 60
+INDEXING_REQUEST_TIMEOUT = 30
+INDEXING_FAILED_RETENTION = 7 * 24 * 60 * 60
+
+# Параллельная публикация: у каждого аккаунта свой конвейер и своя задержка между статьями.
+# Выключена по умолчанию: каждый аккаунт публикует со своей задержкой, поэтому общий объём публикаций
+# вырастает до MAX_PARALLEL_ACCOUNTS раз. MAX_PARALLEL_ACCOUNTS — общий для всех заданий лимит
+# одновременно работающих аккаунтов
+PARALLEL_ACCOUNTS = False
+MAX_PARALLEL_ACCOUNTS = 10
+
+# Через сколько секунд повторить пару (промт, аккаунт) после ошибки генерации, которую можно повторить
+# (нарушение политики OpenAI, баланс API-ключа). Пара переносится на ту же позицию следующего цикла смещения
+WORK_RETRY_DELAY = 10 * 60
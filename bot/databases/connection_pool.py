@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import threading
+
+from bot.config import TIMEOUT_DELAY
+
+# Долгоживущие соединения: {(id потока, путь к базе): sqlite3.Connection}
+connections = {}
+connections_lock = threading.Lock()
+
+# Настройки, применяемые к каждому новому соединению
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+)
+
+
+def get_connection(db_path: str) -> sqlite3.Connection:
+    """Получение долгоживущего соединения с базой данных (одно на файл в каждом потоке)"""
+
+    key = (threading.get_ident(), os.path.normpath(db_path))
+    connection = connections.get(key)
+
+    if connection is None:
+        connection = sqlite3.connect(db_path, timeout=TIMEOUT_DELAY, check_same_thread=False)
+
+        for pragma in PRAGMAS:
+            connection.execute(pragma)
+
+        with connections_lock:
+            connections[key] = connection
+
+    return connection
+
+def close_connection(db_path: str) -> None:
+    """Закрытие соединения с базой данных в текущем потоке.
+
+    Соединения других потоков не трогаются: они могут выполнять запрос. Соединения потоков шлюза
+    закрывает db_gateway.close_database
+    """
+
+    with connections_lock:
+        connection = connections.pop((threading.get_ident(), os.path.normpath(db_path)), None)
+
+    if connection is not None:
+        connection.close()
+
+def close_connections() -> None:
+    """Закрытие всех соединений"""
+
+    with connections_lock:
+        for connection in connections.values():
+            connection.close()
+        connections.clear()
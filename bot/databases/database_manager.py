@@ -1,8 +1,9 @@
-from bot.config import DB_DIRECTORY, TIMEOUT_DELAY, DB_TASK_DIRECTORY, DB_PATTERNS_DIRECTORY, \
+from bot.config import DB_DIRECTORY, DB_TASK_DIRECTORY, DB_PATTERNS_DIRECTORY, \
     DB_MAIN_ACCOUNTS_DIRECTORY, DB_MULTI_ACCOUNTS_DIRECTORY, DB_OPENAI_API_KEY_DIRECTORY, DB_LINKS_DIRECTORY, \
-    DB_ARTICLES_DIRECTORY, DB_IMAGES_DIRECTORY, DB_XLSX_DIRECTORY
+    DB_ARTICLES_DIRECTORY, DB_IMAGES_DIRECTORY, DB_XLSX_DIRECTORY, DB_TOKENS_DIRECTORY, \
+    DB_UPLOADS_DIRECTORY, DB_INDEXING_DIRECTORY
+from bot.databases.connection_pool import get_connection
 
-import sqlite3
 
 class DatabaseManager:
 
@@ -10,7 +11,7 @@ class DatabaseManager:
     def create_db_main(task: str) -> None:
         """Создание базы данных для Основных аккаунтов"""
 
-        connection = sqlite3.connect(DB_DIRECTORY + task + '.db', timeout=TIMEOUT_DELAY)
+        connection = get_connection(DB_DIRECTORY + task + '.db')
         cursor = connection.cursor()
         # Создание таблицы Prompts (Промты), если она ещё не создана
         cursor.execute(
@@ -29,7 +30,8 @@ class DatabaseManager:
             "article_image TEXT NOT NULL, "
             "marks TEXT, "
             "status TEXT, "
-            "xlsx_id TEXT) "
+            "xlsx_id TEXT, "
+            "prompt_id INTEGER) "
         )
 
         cursor.execute(
@@ -72,13 +74,16 @@ class DatabaseManager:
                            ('-', '-'))
 
         connection.commit()
-        connection.close()
+
+        # Индексы и таблицы, добавленные миграциями, и запись версии схемы
+        from bot.databases.migrations import upgrade_database
+        upgrade_database(connection, DB_DIRECTORY + task + '.db', force=True)
 
     @staticmethod
     def create_db_multi(task: str) -> None:
         """Создание базы данных для Мультиаккаунтов"""
 
-        connection = sqlite3.connect(DB_DIRECTORY + task + '.db', timeout=TIMEOUT_DELAY)
+        connection = get_connection(DB_DIRECTORY + task + '.db')
         cursor = connection.cursor()
         # Создание таблицы Prompts (Промты), если она ещё не создана
         cursor.execute(
@@ -99,7 +104,8 @@ class DatabaseManager:
             "marks TEXT, "
             "status TEXT, "
             "article_url TEXT, "
-            "xlsx_id TEXT) "
+            "xlsx_id TEXT, "
+            "prompt_id INTEGER) "
         )
 
         cursor.execute(
@@ -134,13 +140,16 @@ class DatabaseManager:
                            ('-', '-'))
 
         connection.commit()
-        connection.close()
+
+        # Индексы и таблицы, добавленные миграциями, и запись версии схемы
+        from bot.databases.migrations import upgrade_database
+        upgrade_database(connection, DB_DIRECTORY + task + '.db', force=True)
 
     @staticmethod
     def create_task_db():
         """Создание базы данных заданий"""
 
-        with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+        with get_connection(DB_TASK_DIRECTORY) as connection:
             cursor = connection.cursor()
 
             # Создание таблицы Tasks (Задания), если она ещё не создана
@@ -193,13 +202,25 @@ class DatabaseManager:
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
                                ('4' ,'None', 'None', 'True', '-', '-', '-', '-', '-', '-', '-', '-', '3600', '180', 'True', '15', 'True'))
 
+            # Контрольные точки запущенных процессов для возобновления после перезапуска бота
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS Checkpoints ("
+                "process_name TEXT PRIMARY KEY, "
+                "func TEXT NOT NULL, "
+                "priority INTEGER NOT NULL, "
+                "accounts TEXT NOT NULL, "
+                "args TEXT NOT NULL, "
+                "progress TEXT NOT NULL DEFAULT '{}', "
+                "updated_at REAL NOT NULL)"
+            )
+
             connection.commit()
 
     @staticmethod
     def create_patterns_db():
         """Создание базы данных шаблонов"""
 
-        with sqlite3.connect(DB_PATTERNS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+        with get_connection(DB_PATTERNS_DIRECTORY) as connection:
             cursor = connection.cursor()
 
             # Создание таблицы Patterns (Шаблоны), если она ещё не создана
@@ -216,7 +237,7 @@ class DatabaseManager:
     def create_links_db():
         """Создание базы данных ссылок"""
 
-        with sqlite3.connect(DB_LINKS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+        with get_connection(DB_LINKS_DIRECTORY) as connection:
             cursor = connection.cursor()
 
             # Создание таблицы Links (Ссылки), если она ещё не создана
@@ -233,7 +254,7 @@ class DatabaseManager:
     def create_main_accounts_db():
         """Создание базы данных аккаунтов для Основного режима"""
 
-        with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+        with get_connection(DB_MAIN_ACCOUNTS_DIRECTORY) as connection:
             cursor = connection.cursor()
 
             # Создание таблицы Accounts (Аккаунты), если она ещё не создана
@@ -257,7 +278,7 @@ class DatabaseManager:
     def create_multi_accounts_db():
         """Создание базы данных аккаунтов для Мульти режима"""
 
-        with sqlite3.connect(DB_MULTI_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+        with get_connection(DB_MULTI_ACCOUNTS_DIRECTORY) as connection:
             cursor = connection.cursor()
 
             # Создание таблицы Accounts (Аккаунты), если она ещё не создана
@@ -282,7 +303,7 @@ class DatabaseManager:
     def create_api_key_db():
         """Создание базы данных API-ключ OpenAI"""
 
-        with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+        with get_connection(DB_OPENAI_API_KEY_DIRECTORY) as connection:
             cursor = connection.cursor()
 
             cursor.execute(
@@ -328,7 +349,7 @@ class DatabaseManager:
     def create_db_articles() -> None:
         """Создание базы данных для Статей"""
 
-        connection = sqlite3.connect(DB_ARTICLES_DIRECTORY, timeout=TIMEOUT_DELAY)
+        connection = get_connection(DB_ARTICLES_DIRECTORY)
         cursor = connection.cursor()
 
         # Создание таблицы Articles (Статьи), если она ещё не создана
@@ -352,13 +373,12 @@ class DatabaseManager:
             cursor.execute("""INSERT INTO ArticlesStatus (status) VALUES (?)""", ('-',))
 
         connection.commit()
-        connection.close()
 
     @staticmethod
     def create_db_images() -> None:
         """Создание базы данных для Изображений"""
 
-        connection = sqlite3.connect(DB_IMAGES_DIRECTORY, timeout=TIMEOUT_DELAY)
+        connection = get_connection(DB_IMAGES_DIRECTORY)
         cursor = connection.cursor()
 
         cursor.execute(
@@ -368,13 +388,12 @@ class DatabaseManager:
             "image_path TEXT NOT NULL) "
         )
         connection.commit()
-        connection.close()
 
     @staticmethod
     def create_db_xlsx() -> None:
         """Создание базы данных для keys+urls+accounts"""
 
-        connection = sqlite3.connect(DB_XLSX_DIRECTORY, timeout=TIMEOUT_DELAY)
+        connection = get_connection(DB_XLSX_DIRECTORY)
         cursor = connection.cursor()
 
         cursor.execute(
@@ -384,4 +403,61 @@ class DatabaseManager:
             "urls_accounts TEXT) "
         )
         connection.commit()
-        connection.close()
\ No newline at end of file
+
+    @staticmethod
+    def create_tokens_db() -> None:
+        """Создание базы данных токенов доступа аккаунтов"""
+
+        connection = get_connection(DB_TOKENS_DIRECTORY)
+        cursor = connection.cursor()
+
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS Tokens ("
+            "account_key TEXT PRIMARY KEY, "
+            "access_token TEXT NOT NULL, "
+            "refresh_token TEXT, "
+            "expires_at REAL NOT NULL, "
+            "user_id INTEGER) "
+        )
+        connection.commit()
+
+    @staticmethod
+    def create_uploads_db() -> None:
+        """Создание базы данных изображений, загруженных на площадки"""
+
+        connection = get_connection(DB_UPLOADS_DIRECTORY)
+        cursor = connection.cursor()
+
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS Uploads ("
+            "account_key TEXT NOT NULL, "
+            "sha256 TEXT NOT NULL, "
+            "image TEXT NOT NULL, "
+            "uploaded_at REAL NOT NULL, "
+            "PRIMARY KEY (account_key, sha256)) "
+        )
+        connection.commit()
+
+    @staticmethod
+    def create_indexing_db() -> None:
+        """Создание базы данных очереди ссылок на индексацию"""
+
+        connection = get_connection(DB_INDEXING_DIRECTORY)
+        cursor = connection.cursor()
+
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS IndexingOutbox ("
+            "id INTEGER PRIMARY KEY, "
+            "task TEXT NOT NULL, "
+            "chat_id INTEGER NOT NULL, "
+            "api_key TEXT NOT NULL, "
+            "user_id TEXT NOT NULL, "
+            "se_type TEXT NOT NULL, "
+            "searchengine TEXT NOT NULL, "
+            "link TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'pending', "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt REAL NOT NULL, "
+            "last_error TEXT) "
+        )
+        connection.commit()
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from bot.config import DB_READ_WORKERS
+from bot.databases.connection_pool import get_connection, close_connection
+
+# Чтение выполняется в пуле потоков, запись — строго по очереди в одном потоке
+read_executor = ThreadPoolExecutor(max_workers=DB_READ_WORKERS, thread_name_prefix='db-read')
+write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-write')
+
+# Метрики шлюза. Обновляются только из потока событийного цикла
+metrics = {
+    'read': {'pending': 0, 'completed': 0, 'failed': 0, 'wait_total': 0.0, 'wait_max': 0.0},
+    'write': {'pending': 0, 'completed': 0, 'failed': 0, 'wait_total': 0.0, 'wait_max': 0.0},
+}
+
+
+async def submit(kind: str, executor: ThreadPoolExecutor, func, *args):
+    """Постановка задания в очередь потока базы данных с учётом времени ожидания"""
+
+    stats = metrics[kind]
+    queued_at = time.perf_counter()
+
+    def job():
+        return time.perf_counter() - queued_at, func(*args)
+
+    stats['pending'] += 1
+
+    try:
+        wait, result = await asyncio.get_running_loop().run_in_executor(executor, job)
+    except Exception:
+        stats['failed'] += 1
+        raise
+    finally:
+        stats['pending'] -= 1
+
+    stats['completed'] += 1
+    stats['wait_total'] += wait
+    stats['wait_max'] = max(stats['wait_max'], wait)
+
+    return result
+
+async def run_read(db_path: str, func):
+    """Выполнение func(connection) в потоке чтения"""
+
+    return await submit('read', read_executor, lambda: func(get_connection(db_path)))
+
+async def run_write(db_path: str, func):
+    """Выполнение func(connection) в потоке записи внутри одной транзакции"""
+
+    def job():
+        connection = get_connection(db_path)
+        with connection:
+            return func(connection)
+
+    return await submit('write', write_executor, job)
+
+async def fetchone(db_path: str, query: str, params: tuple = ()) -> tuple | None:
+    """Получение одной строки запроса"""
+
+    return await run_read(db_path, lambda connection: connection.execute(query, params).fetchone())
+
+async def fetchall(db_path: str, query: str, params: tuple = ()) -> list:
+    """Получение всех строк запроса"""
+
+    return await run_read(db_path, lambda connection: connection.execute(query, params).fetchall())
+
+async def execute(db_path: str, query: str, params: tuple = ()) -> int:
+    """Выполнение изменяющего запроса. Возвращает id последней вставленной строки"""
+
+    return await run_write(db_path, lambda connection: connection.execute(query, params).lastrowid)
+
+async def executemany(db_path: str, query: str, params_seq) -> int:
+    """Пакетное выполнение запроса в одной транзакции. Возвращает количество затронутых строк"""
+
+    return await run_write(db_path, lambda connection: connection.executemany(query, params_seq).rowcount)
+
+async def close_database(db_path: str) -> None:
+    """Закрытие соединений с базой во всех потоках шлюза и в потоке цикла (перед удалением файла базы).
+
+    Каждый поток закрывает своё соединение заданием из своей очереди, то есть между запросами
+    """
+
+    # Задания ждут друг друга, поэтому каждое из них занимает отдельный поток чтения
+    barrier = threading.Barrier(DB_READ_WORKERS)
+
+    def close_read():
+        barrier.wait()
+        close_connection(db_path)
+
+    await asyncio.gather(
+        submit('write', write_executor, close_connection, db_path),
+        *(submit('read', read_executor, close_read) for _ in range(DB_READ_WORKERS)),
+    )
+
+    close_connection(db_path)
+
+def get_metrics() -> dict:
+    """Текущие метрики шлюза: глубина очередей и время ожидания (секунды)"""
+
+    result = {}
+
+    for kind, stats in metrics.items():
+        done = stats['completed']
+        result[kind] = {
+            'pending': stats['pending'],
+            'completed': done,
+            'failed': stats['failed'],
+            'wait_avg': stats['wait_total'] / done if done else 0.0,
+            'wait_max': stats['wait_max'],
+        }
+
+    return result
+
+def shutdown_gateway() -> None:
+    """Остановка потоков шлюза с завершением поставленных заданий"""
+
+    write_executor.shutdown(wait=True)
+    read_executor.shutdown(wait=True)
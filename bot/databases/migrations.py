@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import threading
+
+from bot.config import DB_DIRECTORY, DB_TASK_DIRECTORY, DB_PATTERNS_DIRECTORY, \
+    DB_MAIN_ACCOUNTS_DIRECTORY, DB_MULTI_ACCOUNTS_DIRECTORY, DB_OPENAI_API_KEY_DIRECTORY, DB_LINKS_DIRECTORY, \
+    DB_ARTICLES_DIRECTORY, DB_IMAGES_DIRECTORY, DB_XLSX_DIRECTORY, DB_TOKENS_DIRECTORY, \
+    DB_UPLOADS_DIRECTORY, DB_INDEXING_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.database_manager import DatabaseManager
+from bot.handlers.commands.logging import log
+
+# Схема базы хранится в PRAGMA user_version: номер последней применённой миграции.
+# Миграция — функция от соединения; миграции применяются по порядку и должны быть идемпотентными,
+# так как версия записывается после каждой из них (при сбое миграция повторится при следующем запуске).
+
+
+def add_column(connection: sqlite3.Connection, table: str, column: str, definition: str) -> None:
+    """Добавление столбца в таблицу, если его ещё нет"""
+
+    columns = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+
+    if column not in columns:
+        connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+def create_indexes(*statements: str):
+    """Миграция, создающая индексы"""
+
+    def migration(connection: sqlite3.Connection) -> None:
+        for statement in statements:
+            connection.execute(statement)
+
+    return migration
+
+def task_articles_prompt_id(connection: sqlite3.Connection) -> None:
+    """Столбец prompt_id для пакетной генерации (базы, созданные до её появления)"""
+
+    add_column(connection, 'Articles', 'prompt_id', 'INTEGER')
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_articles_prompt_status ON Articles (prompt_id, status)")
+
+def task_work_items(connection: sqlite3.Connection) -> None:
+    """Таблица пар (промт, аккаунт) для выбора следующей публикации одним запросом"""
+
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS WorkItems ("
+        "id INTEGER PRIMARY KEY, "
+        "prompt_id INTEGER NOT NULL, "
+        "account_id INTEGER NOT NULL, "
+        "status TEXT NOT NULL, "
+        "priority INTEGER NOT NULL DEFAULT 0, "
+        "round INTEGER NOT NULL DEFAULT 0, "
+        "next_eligible REAL NOT NULL DEFAULT 0, "
+        "attempts INTEGER NOT NULL DEFAULT 0, "
+        "article_id INTEGER, "
+        "UNIQUE (prompt_id, account_id))"
+    )
+    # Выбор следующей пары: статус → серия → время, с которого пару можно брать в работу
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_work_items_queue ON WorkItems (status, round, next_eligible)")
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_work_items_account ON WorkItems (account_id, status, round)")
+
+
+# Миграции баз заданий (DB_DIRECTORY + task + '.db'). Таблицы создаёт DatabaseManager.create_db_main/multi
+TASK_MIGRATIONS = [
+    task_articles_prompt_id,
+    task_work_items,
+    create_indexes("CREATE INDEX IF NOT EXISTS idx_articles_marks ON Articles (marks)"),
+]
+
+# Миграции общих баз. Первая миграция каждой базы — исходное создание таблиц и начальных данных
+GLOBAL_MIGRATIONS = {
+    DB_TASK_DIRECTORY: [
+        lambda connection: DatabaseManager.create_task_db(),
+        create_indexes("CREATE INDEX IF NOT EXISTS idx_tasks_name ON Tasks (task_name)"),
+    ],
+    DB_PATTERNS_DIRECTORY: [lambda connection: DatabaseManager.create_patterns_db()],
+    DB_ARTICLES_DIRECTORY: [
+        lambda connection: DatabaseManager.create_db_articles(),
+        create_indexes("CREATE INDEX IF NOT EXISTS idx_articles_marks ON Articles (marks)"),
+    ],
+    DB_IMAGES_DIRECTORY: [lambda connection: DatabaseManager.create_db_images()],
+    DB_LINKS_DIRECTORY: [lambda connection: DatabaseManager.create_links_db()],
+    DB_MAIN_ACCOUNTS_DIRECTORY: [
+        lambda connection: DatabaseManager.create_main_accounts_db(),
+        create_indexes("CREATE INDEX IF NOT EXISTS idx_accounts_email ON Accounts (account_email, account_password)"),
+    ],
+    DB_MULTI_ACCOUNTS_DIRECTORY: [
+        lambda connection: DatabaseManager.create_multi_accounts_db(),
+        create_indexes("CREATE INDEX IF NOT EXISTS idx_accounts_email ON Accounts (account_email, account_password)"),
+    ],
+    DB_OPENAI_API_KEY_DIRECTORY: [lambda connection: DatabaseManager.create_api_key_db()],
+    DB_XLSX_DIRECTORY: [
+        lambda connection: DatabaseManager.create_db_xlsx(),
+        create_indexes("CREATE INDEX IF NOT EXISTS idx_xlsx_keys ON Xlsx (keys)"),
+    ],
+    DB_TOKENS_DIRECTORY: [lambda connection: DatabaseManager.create_tokens_db()],
+    DB_UPLOADS_DIRECTORY: [lambda connection: DatabaseManager.create_uploads_db()],
+    DB_INDEXING_DIRECTORY: [
+        lambda connection: DatabaseManager.create_indexing_db(),
+        create_indexes("CREATE INDEX IF NOT EXISTS idx_indexing_due ON IndexingOutbox (status, next_attempt)"),
+    ],
+}
+
+global_migrations = {os.path.normpath(path): migrations for path, migrations in GLOBAL_MIGRATIONS.items()}
+
+# Базы, схема которых уже проверена в этом запуске бота
+checked_databases = set()
+migrations_lock = threading.RLock()
+
+
+def get_migrations(db_path: str) -> list | None:
+    """Список миграций базы (None — база без схемы в реестре)"""
+
+    if db_path in global_migrations:
+        return global_migrations[db_path]
+
+    if os.path.dirname(db_path) == os.path.normpath(DB_DIRECTORY) and db_path.endswith('.db'):
+        return TASK_MIGRATIONS
+
+    return None
+
+def apply_migrations(connection: sqlite3.Connection, db_path: str, migrations: list, version: int) -> None:
+    """Применение миграций, которых ещё нет в базе (version — текущая версия схемы базы)"""
+
+    for number, migration in enumerate(migrations[version:], start=version + 1):
+        migration(connection)
+        connection.execute(f"PRAGMA user_version = {number}")
+        connection.commit()
+
+        log.debug(f"База {db_path}: применена миграция {number}")
+
+def upgrade_database(connection: sqlite3.Connection, db_path: str, force: bool = False) -> None:
+    """Обновление схемы базы. Вызывается только при запуске бота (migrate_databases) и при создании базы задания,
+    поэтому потоки чтения шлюза схему не меняют.
+
+    Если база в актуальном состоянии, проверка стоит одного чтения PRAGMA user_version.
+    force — проверка заново (база задания только что создана или пересоздана).
+    """
+
+    db_path = os.path.normpath(db_path)
+
+    if db_path in checked_databases and not force:
+        return
+
+    migrations = get_migrations(db_path)
+
+    if migrations is None:
+        return
+
+    with migrations_lock:
+        if db_path in checked_databases and not force:
+            return
+
+        version = connection.execute("PRAGMA user_version").fetchone()[0]
+
+        if version < len(migrations):
+            if migrations is TASK_MIGRATIONS and not connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Articles'").fetchone():
+                # Новая база задания: таблицы ещё не созданы, миграции применит create_db_main/multi
+                return
+
+            apply_migrations(connection, db_path, migrations, version)
+
+        checked_databases.add(db_path)
+
+def migrate_databases() -> None:
+    """Создание и обновление общих баз и баз заданий при запуске бота, до первого запроса к ним"""
+
+    task_names = sorted(os.listdir(DB_DIRECTORY)) if os.path.isdir(DB_DIRECTORY) else []
+    task_paths = [DB_DIRECTORY + name for name in task_names if name.endswith('.db')]
+
+    for db_path in list(GLOBAL_MIGRATIONS) + task_paths:
+        upgrade_database(get_connection(db_path), db_path)
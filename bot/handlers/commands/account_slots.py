@@ -0,0 +1,89 @@
+import asyncio
+import heapq
+import itertools
+
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+# Процесс TaskManager, в котором выполняется код: (имя процесса, приоритет).
+# Задаётся в TaskManager.add_task и наследуется всеми дочерними asyncio-задачами процесса
+current_process: ContextVar = ContextVar('current_process', default=('-', 0))
+
+
+class AccountSlot:
+    """Слот аккаунта: текущий владелец и очередь ожидающих по приоритету"""
+
+    __slots__ = ('holder', 'waiters')
+
+    def __init__(self) -> None:
+        self.holder: str | None = None
+        self.waiters: list = []  # куча [(-приоритет, порядковый номер, future, имя процесса)]
+
+
+class AccountSlots:
+    """Планировщик аккаунтов.
+
+    Аккаунт одновременно выполняет одну операцию публикации. Операция берёт аренду слота аккаунта,
+    при освобождении слот передаётся ожидающему с наибольшим приоритетом (при равенстве — первому
+    в очереди). Процессы с высоким приоритетом получают аккаунт между публикациями, не останавливая
+    процесс целиком: остальные его аккаунты продолжают работу.
+    """
+
+    def __init__(self) -> None:
+        self.slots: dict = {}
+        self.counter = itertools.count()
+
+    async def acquire(self, account: str, name: str, priority: int) -> None:
+        slot = self.slots.setdefault(account, AccountSlot())
+
+        if slot.holder is None and not slot.waiters:
+            slot.holder = name
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(slot.waiters, (-priority, next(self.counter), future, name))
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Слот уже передан, но вызывающий отменён — передаём его дальше
+            if future.done() and not future.cancelled():
+                self.release(account)
+            raise
+
+    def release(self, account: str) -> None:
+        """Передача слота следующему ожидающему (будится только он)"""
+
+        slot = self.slots[account]
+
+        while slot.waiters:
+            _, _, future, name = heapq.heappop(slot.waiters)
+
+            if not future.done():
+                slot.holder = name
+                future.set_result(None)
+                return
+
+        del self.slots[account]
+
+    def holder(self, account: str) -> str | None:
+        """Процесс, который сейчас публикует с аккаунта"""
+
+        slot = self.slots.get(account)
+        return slot.holder if slot else None
+
+
+account_slots = AccountSlots()
+
+
+@asynccontextmanager
+async def account_lease(account_mark: str):
+    """Аренда аккаунта на одну операцию публикации с приоритетом текущего процесса"""
+
+    name, priority = current_process.get()
+    await account_slots.acquire(account_mark, name, priority)
+
+    try:
+        yield
+    finally:
+        account_slots.release(account_mark)
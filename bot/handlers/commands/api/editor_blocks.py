@@ -0,0 +1,245 @@
+from bs4 import BeautifulSoup, Tag
+
+from bot.handlers.commands.image_index import find_image
+
+# Разбор статей встроенным html.parser, как до выделения компилятора. lxml быстрее, но иначе исправляет
+# неверную вложенность (<ul> или <p> внутри <p>) и меняет набор публикуемых блоков
+PARSER = 'html.parser'
+
+IGNORED_TAGS = {"html", "head", "meta", "title", "script", "style", "link"}
+ALLOWED_TAGS = {"ul", "ol", "h1", "h2", "h3"}
+FIXED_TAGS = {"b", "a", "i"}
+
+TAG_REPLACEMENTS = {
+    "em": "i",
+    "strong": "b",
+    "u": "i",
+    "h4": "h3",
+    "h5": "h3",
+    "h6": "h3",
+    "span": "p"
+}
+
+# Максимальная длина подписи цитаты
+SUBLINE_LIMIT = 80
+
+
+def block(block_type: str, data: dict, anchor=None, hidden=None) -> dict:
+    """Блок редактора vc.ru/dtf.ru"""
+
+    return {
+        "type": block_type,
+        "data": data,
+        "cover": False,
+        "hidden": hidden == "true",
+        "anchor": f"{anchor}" if anchor else ""
+    }
+
+def pop_position(el: Tag) -> tuple:
+    """Атрибуты anchor и hidden элемента (удаляются из разметки)"""
+
+    return el.attrs.pop("anchor", None), el.attrs.pop("hidden", None)
+
+def is_delimiter(el: Tag) -> bool:
+    return el.name == 'div' and not el.contents and el.attrs == {'class': ['block-delimiter'], 'data': '[object Object]'}
+
+def is_empty_marker(el: Tag, marker_type: str) -> bool:
+    """Пустой <div type="image"> или <div type="links"> без других атрибутов"""
+
+    return el.name == 'div' and el.attrs == {'type': marker_type}
+
+def top_elements(text: str) -> list:
+    """Верхнеуровневые элементы статьи: (тег, обёрнут ли тег в <p>)"""
+
+    soup = BeautifulSoup(text, PARSER)
+
+    parent = soup.html if soup.html else soup
+    parent = parent.body if parent.body else parent
+
+    # Замена синонимичных тегов за один обход дерева
+    for tag in parent.find_all(list(TAG_REPLACEMENTS)):
+        tag.name = TAG_REPLACEMENTS[tag.name]
+
+    elements = []
+
+    for tag in parent.find_all(recursive=False):
+        if tag.name in IGNORED_TAGS:
+            continue
+
+        if tag.name in FIXED_TAGS:
+            elements.append((tag, True))
+            continue
+
+        # Элемент заменяется последним вложенным разрешённым тегом (например, <ul> внутри <p>)
+        for child in tag.contents:
+            if child.name in ALLOWED_TAGS:
+                tag = child
+
+        elements.append((tag, False))
+
+    return [(el, wrapped) for el, wrapped in elements
+            if el.get_text().strip() or is_delimiter(el) or is_empty_marker(el, 'image') or is_empty_marker(el, 'links')]
+
+def trim_subline(el: Tag) -> str:
+    """Подпись цитаты, обрезанная до SUBLINE_LIMIT символов текста"""
+
+    current_length = 0
+    trimmed_html = ""
+
+    for obj in el.contents:
+        obj_text = obj.get_text()
+
+        if current_length + len(obj_text) <= SUBLINE_LIMIT:
+            trimmed_html += str(obj)
+            current_length += len(obj_text)
+        else:
+            trimmed_html += str(obj)[:SUBLINE_LIMIT - current_length]
+            break
+
+    return trimmed_html
+
+def quote_block(el: Tag, anchor, hidden) -> dict | None:
+    text_content = None
+    subline = None
+
+    for child in el.contents:
+        if child.name == 'p' and child.get('style') == 'q-text':
+            child.attrs.pop("style", None)
+            text_content = str(child)
+
+        elif child.name == 'p' and child.get('style') == 'podp-do-80':
+            child.attrs.pop("style", None)
+            subline = trim_subline(child)
+
+    if not text_content:
+        return None
+
+    return block("quote", {
+        "text": text_content,
+        "subline1": subline if subline else "",
+        "subline2": "",
+        "type": "",
+        "text_size": "",
+        "image": None
+    }, anchor, hidden)
+
+def compile_article(text: str) -> tuple:
+    """Разбор HTML статьи за один проход: (заголовок, блоки).
+
+    Блоки <div type="links"> и <div type="image"> возвращаются заготовками {"type": "links"/"image", ...} —
+    их заполняет resolve_blocks. Если статья не начинается с <h1>, заголовок равен None.
+    """
+
+    elements = top_elements(text)
+
+    if not elements or elements[0][0].name != 'h1':
+        return None, []
+
+    title = None
+    blocks = []
+
+    for el, wrapped in elements:
+        if wrapped:
+            blocks.append(block("text", {"text": f"<p>{el}</p>"}))
+
+        elif el.name == 'h1':
+            if title is None:
+                title = el.get_text(strip=True)
+            else:
+                blocks.append(el.get_text(strip=True))
+
+        elif el.name == 'h2' or el.name == 'h3':
+            anchor, hidden = pop_position(el)
+            blocks.append(block("header", {"text": el.get_text(), "style": el.name}, anchor, hidden))
+
+        elif el.name == 'p':
+            anchor, hidden = pop_position(el)
+            blocks.append(block("text", {"text": str(el)}, anchor, hidden))
+
+        elif is_delimiter(el):
+            blocks.append(block("delimiter", {"type": "default"}))
+
+        elif el.name == 'div' and el.get('type') == 'links':
+            blocks.append({"type": "links", "anchor": el.get('anchor')})
+
+        elif el.name == 'div' and el.get('type') == 'image':
+            anchor, hidden = pop_position(el)
+            name = el.get_text(strip=True)
+
+            if name:
+                blocks.append({"type": "image", "name": name, "anchor": anchor, "hidden": hidden})
+
+        elif el.name == 'ul' or el.name == 'ol':
+            anchor, hidden = pop_position(el)
+            content = [child.decode_contents() for child in el.contents if child.name == 'li']
+
+            if content:
+                blocks.append(block("list", {"items": content, "type": el.name.upper()}, anchor, hidden))
+
+        elif el.name == 'div' and el.get('type') == 'quote':
+            quote = quote_block(el, el.get('anchor'), el.get('hidden'))
+
+            if quote:
+                blocks.append(quote)
+
+    return title, blocks
+
+def drop_links_header(blocks: list) -> None:
+    """Удаление подзаголовка блока ссылок, если ссылки не добавлены"""
+
+    if blocks and isinstance(blocks[-1], dict) and blocks[-1]["type"] == "header" and blocks[-1]["data"]["style"] == "h3":
+        blocks.pop(-1)
+
+async def resolve_blocks(platform, blocks: list, site: str) -> list:
+    """Заполнение заготовок: ссылки на статьи автора и загрузка изображений продуктов на площадку"""
+
+    result = []
+
+    for item in blocks:
+        if not isinstance(item, dict) or item["type"] not in ("links", "image"):
+            result.append(item)
+
+        elif item["type"] == "links":
+            if platform.task_type == 'Основной' and platform.posts_amount is not None:
+                platform.task_log.debug(f"{site} Получение ссылок на статьи в количестве: {platform.posts_amount} шт.")
+
+                data = await platform.fetch_user_posts(posts_amount=platform.posts_amount)
+
+                if data:
+                    platform.task_log.debug(f"{site} Ссылки получены: {data} шт.")
+                    for link, theme in data:
+                        result.append(block("text", {"text": f'<p>📌 <a href="{link}">{theme}</a></p>'}, item["anchor"]))
+                else:
+                    platform.task_log.debug(f"{site} Не удалось получить ссылки.")
+                    drop_links_header(result)
+            else:
+                drop_links_header(result)
+
+        else:
+            image_path = await find_image(item["name"])
+
+            if image_path:
+                flag, image = await platform.platform_images_upload(image_path)
+
+                if flag:
+                    result.append(block("media", {"items": [{"title": "", "image": image}]}, item["anchor"], item["hidden"]))
+
+    return result
+
+def build_article(user_id, title: str, blocks: list, cover: dict, is_published: bool) -> dict:
+    """Статья для /editor: обложка вставляется после первого блока"""
+
+    return {
+        "user_id": user_id,
+        "type": 1,
+        "subsite_id": user_id,
+        "title": title,
+        "entry": {
+            "blocks": [
+                *blocks[:1],
+                block("media", {"items": [{"title": "", "image": cover}]}),
+                *blocks[1:]
+            ]
+        },
+        "is_published": is_published
+    }
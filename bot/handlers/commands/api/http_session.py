@@ -0,0 +1,53 @@
+import asyncio
+
+from urllib.parse import urlsplit
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector, ClientProxyConnectionError
+
+from bot.config import HTTP_TIMEOUT_TOTAL, HTTP_TIMEOUT_CONNECT, HTTP_KEEPALIVE_TIMEOUT, HTTP_CONNECTIONS_PER_ACCOUNT
+
+# Исключения сетевого слоя площадок
+ProxyError = ClientProxyConnectionError
+ConnectTimeout = asyncio.TimeoutError
+
+# Сессии аккаунтов: {ключ аккаунта: ClientSession}
+sessions = {}
+
+
+async def get_session(session_key: str) -> ClientSession:
+    """Получение keep-alive сессии аккаунта (создаётся при первом обращении)"""
+
+    session = sessions.get(session_key)
+
+    if session is None or session.closed:
+        session = ClientSession(
+            connector=TCPConnector(limit=HTTP_CONNECTIONS_PER_ACCOUNT, keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT),
+            timeout=ClientTimeout(total=HTTP_TIMEOUT_TOTAL, connect=HTTP_TIMEOUT_CONNECT)
+        )
+        sessions[session_key] = session
+
+    return session
+
+async def platform_request(session_key: str, method: str, url: str, proxies: dict = None,
+                           params: dict = None, **kwargs) -> str:
+    """Запрос к площадке через сессию аккаунта. Возвращает текст ответа"""
+
+    # Прокси выбирается по схеме адреса, как это делает requests
+    proxy = proxies.get(urlsplit(url).scheme) if proxies else None
+
+    if params:
+        params = {key: value for key, value in params.items() if value is not None}
+
+    session = await get_session(session_key)
+
+    async with session.request(method, url, proxy=proxy, params=params, **kwargs) as response:
+        return await response.text()
+
+async def close_sessions() -> None:
+    """Закрытие всех сессий аккаунтов"""
+
+    for session in sessions.values():
+        if not session.closed:
+            await session.close()
+
+    sessions.clear()
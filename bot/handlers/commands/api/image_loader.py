@@ -0,0 +1,68 @@
+import asyncio
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from bot.config import IMAGE_DOWNLOAD_ATTEMPTS, IMAGE_CHUNK_SIZE, IMAGE_WORKERS, IMAGE_MAX_WIDTH, IMAGE_WEBP_QUALITY
+from bot.handlers.commands.api.http_session import get_session
+
+# Потоки перекодирования изображений (Pillow освобождает GIL при кодировании)
+image_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix='image')
+
+
+async def download_file(url: str, path: str, attempts: int = IMAGE_DOWNLOAD_ATTEMPTS) -> None:
+    """Потоковая загрузка файла на диск блоками с повторными попытками"""
+
+    part_path = path + '.part'
+
+    for attempt in range(1, attempts + 1):
+        try:
+            session = await get_session('openai-images')
+
+            async with session.get(url, raise_for_status=True) as response:
+                with open(part_path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(IMAGE_CHUNK_SIZE):
+                        f.write(chunk)
+
+            os.replace(part_path, path)
+            return
+        except Exception:
+            if attempt == attempts:
+                raise
+
+            await asyncio.sleep(5 * attempt)
+        finally:
+            # Недокачанный файл удаляется и при отмене загрузки (CancelledError не наследует Exception)
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+def convert_to_webp(source_path: str, target_path: str) -> None:
+    """Перекодирование изображения в WebP с уменьшением до IMAGE_MAX_WIDTH"""
+
+    with Image.open(source_path) as image:
+        if image.width > IMAGE_MAX_WIDTH:
+            height = round(image.height * IMAGE_MAX_WIDTH / image.width)
+            image = image.resize((IMAGE_MAX_WIDTH, height), Image.LANCZOS)
+
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGB')
+
+        image.save(target_path, 'WEBP', quality=IMAGE_WEBP_QUALITY, method=4)
+
+async def download_image(url: str, image_path: str) -> None:
+    """Загрузка изображения и сохранение в формате WebP по пути image_path"""
+
+    source_path = image_path + '.src'
+
+    try:
+        await download_file(url, source_path)
+        await asyncio.get_running_loop().run_in_executor(image_executor, convert_to_webp, source_path, image_path)
+    except BaseException:
+        if os.path.exists(image_path):
+            os.remove(image_path)
+        raise
+    finally:
+        if os.path.exists(source_path):
+            os.remove(source_path)
@@ -1,7 +1,31 @@
+import json
+
 import requests
 
+from bot.config import INDEXING_REQUEST_TIMEOUT
 from bot.handlers.commands.logging import get_task_logger, log
 
+def confirmed_links(links: list, response_text: str) -> list:
+    """Ссылки, приём которых подтверждён успешным ответом сервиса.
+
+    Одна ссылка подтверждается самим успешным ответом. Формат ответа на запрос с несколькими ссылками
+    с сервисом не сверен: из них подтверждёнными считаются только перечисленные в поле links ответа,
+    остальные отправляются повторно.
+    """
+
+    if len(links) == 1:
+        return links
+
+    try:
+        listed = json.loads(response_text).get('links')
+    except (ValueError, AttributeError):
+        return []
+
+    if not isinstance(listed, list):
+        return []
+
+    return [link for link in links if link in listed]
+
 class LinkIndexing:
 
     def __init__(self,
@@ -17,6 +41,7 @@ class LinkIndexing:
         self.task_log = get_task_logger(task) if task != '-' else log
 
     def link_indexing(self, link, searchengine):
+        """Отправка ссылок (по одной на строку). Возвращает (успех, ответ при ошибке, подтверждённые ссылки)"""
 
         data = {
             "api_key": self.api_key,
@@ -29,13 +54,14 @@ class LinkIndexing:
         response = requests.post(
             url='https://link-indexing-bot.ru/api/tasks/new',
             data=data,
+            timeout=INDEXING_REQUEST_TIMEOUT,
         )
 
         self.task_log.debug(f'Ответ индексации ссылки: {response.text}')
 
         if response.status_code == 200 or response.status_code == 201:
             self.task_log.debug(f'Ссылка успешно отправлена на индексацию')
-            return True, '-'
+            return True, '-', confirmed_links(link.split('\n'), response.text)
 
         self.task_log.debug(f'Ссылка не отправлена на индексацию')
-        return False, response.text
\ No newline at end of file
+        return False, response.text, []
\ No newline at end of file
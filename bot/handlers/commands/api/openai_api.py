@@ -1,44 +1,99 @@
 import asyncio
 import os
-import sqlite3
+from random import randint
 from uuid import uuid4
 
-import requests
 from openai import AsyncOpenAI
 
-from bot.config import TIMEOUT_DELAY, DB_OPENAI_API_KEY_DIRECTORY, DB_DIRECTORY
+from bot.config import DB_OPENAI_API_KEY_DIRECTORY, DB_DIRECTORY, CONCURRENT_GENERATION, \
+    OPENAI_BASE_URL
+from bot.handlers.commands.api.image_loader import download_image
+from bot.handlers.commands.api.openai_scheduler import openai_request, estimate_tokens
 from bot.handlers.commands.logging import get_task_logger
+from bot.handlers.commands.tasks_settings import read_cached, invalidate_cached
 
+# Клиенты OpenAI: {api_key: AsyncOpenAI}. Один клиент (и пул HTTP-соединений) на ключ
+clients = {}
 
-async def send_prompt_to_chatgpt_text(prompt, task_name):
-    """Отправка промта в ChatGPT-o1 для получения текста"""
-    task_log = get_task_logger(task_name)
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("SELECT model_text FROM ModelAI WHERE id = 1")
-    model_text = cursor.fetchone()[0]
-    connection.close()
+def get_client(api_key: str) -> AsyncOpenAI:
+    """Получение клиента OpenAI для API-ключа (повторы при ошибках 429 выполняет планировщик)"""
+
+    client = clients.get(api_key)
+
+    if client is None:
+        client = clients[api_key] = AsyncOpenAI(api_key=api_key, base_url=OPENAI_BASE_URL, max_retries=0)
+
+    return client
+
+def read_global_settings(connection) -> dict:
+    api_key = connection.execute("SELECT api_key FROM ApiKey WHERE id = 1").fetchone()[0]
+    model_text, model_image = connection.execute("SELECT model_text, model_image FROM ModelAI WHERE id = 1").fetchone()
+    prompt_image = connection.execute("SELECT prompt_text FROM PromptImage WHERE id = 1").fetchone()[0]
+
+    return {
+        'api_key': api_key,
+        'model_text': model_text,
+        'model_image': model_image,
+        'prompt_image': prompt_image,
+    }
+
+def read_task_models(connection) -> dict:
+    model_text, model_image = connection.execute("SELECT model_text, model_image FROM ModelAI WHERE id = 1").fetchone()
+
+    return {'model_text': model_text, 'model_image': model_image}
+
+async def get_global_settings() -> dict:
+    """Общие настройки OpenAI: API-ключ, модели по умолчанию и промт изображения"""
 
-    with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT api_key FROM ApiKey WHERE id = 1")
-        api_key = cursor.fetchone()[0]
+    return await read_cached(('ModelAI', None), DB_OPENAI_API_KEY_DIRECTORY, read_global_settings)
 
-        if model_text == '-':
-            cursor.execute("SELECT model_text FROM ModelAI WHERE id = 1")
-            model_text = cursor.fetchone()[0]
+async def get_task_settings(task_name: str) -> dict:
+    """Настройки OpenAI для задания (модель '-' заменяется моделью по умолчанию)"""
 
-    client = AsyncOpenAI(api_key=api_key)
+    settings = dict(await get_global_settings())
+    task_models = await read_cached(('ModelAI', task_name), DB_DIRECTORY + task_name + '.db', read_task_models)
+
+    for name, model in task_models.items():
+        if model != '-':
+            settings[name] = model
+
+    return settings
+
+def invalidate_settings(task_name: str = None) -> None:
+    """Сброс кэша после изменения моделей задания (или общих настроек OpenAI, если задание не указано)"""
+
+    invalidate_cached(('ModelAI', task_name))
+
+async def close_clients() -> None:
+    """Закрытие клиентов OpenAI"""
+
+    for client in clients.values():
+        await client.close()
+
+    clients.clear()
+
+
+async def send_prompt_to_chatgpt_text(prompt, task_name):
+    """Отправка промта в ChatGPT-o1 для получения текста"""
+    task_log = get_task_logger(task_name)
+
+    settings = await get_task_settings(task_name)
+    client = get_client(settings['api_key'])
     try:
-        chat_completion = await client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model=model_text,
+        chat_completion = await openai_request(
+            settings['api_key'],
+            task_name,
+            estimate_tokens(prompt),
+            lambda: client.chat.completions.with_raw_response.create(
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt,
+                    }
+                ],
+                model=settings['model_text'],
+            )
         )
         chat_response = chat_completion.choices[0].message.content
 
@@ -61,53 +116,27 @@ async def send_prompt_to_chatgpt_image(prompt, task_name) -> tuple:
     """Отправка промта в ChatGPT-4o для получения изображения"""
     task_log = get_task_logger(task_name)
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("SELECT model_image FROM ModelAI WHERE id = 1")
-    model_image = cursor.fetchone()[0]
-    connection.close()
-
-    with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT api_key FROM ApiKey WHERE id = 1")
-        api_key = cursor.fetchone()[0]
-
-        if model_image == '-':
-            cursor.execute("SELECT model_image FROM ModelAI WHERE id = 1")
-            model_image = cursor.fetchone()[0]
-
-        cursor.execute("SELECT prompt_text FROM PromptImage WHERE id = 1")
-        prompt_text = cursor.fetchone()[0]
-
-    client = AsyncOpenAI(api_key=api_key)
+    settings = await get_task_settings(task_name)
+    client = get_client(settings['api_key'])
     try:
-        chat_completion = await client.images.generate(
-                model=model_image,
-                prompt=prompt_text.replace('%NAME%', prompt),
+        chat_completion = await openai_request(
+            settings['api_key'],
+            task_name,
+            0,
+            lambda: client.images.with_raw_response.generate(
+                model=settings['model_image'],
+                prompt=settings['prompt_image'].replace('%NAME%', prompt),
                 size="1792x1024",
                 quality="standard",
                 n=1,
+            )
         )
         image_url = chat_completion.data[0].url
         image_path = os.path.join('bot/assets/images/', f"{uuid4()}.webp")
         try:
-            with requests.get(image_url, stream=True) as r:
-                try:
-                    with open(image_path, 'wb') as f:
-                        f.write(r.content)
-                    task_log.debug(f'Изображение успешно скачано: {image_url}')
-                    return image_url, image_path
-                except Exception as e:
-                    task_log.debug(f'Ошибка: {str(e)}! Не удалось скачать изображение. Вторая попытка.')
-                    await asyncio.sleep(5)
-                    try:
-                        with open(image_path, 'wb') as f:
-                            f.write(r.content)
-                        task_log.debug(f'Изображение успешно скачано: {image_url}')
-                        return image_url, image_path
-                    except Exception as e:
-                        task_log.debug(f'Ошибка: {str(e)}! Не удалось скачать изображение.')
-                        return False, str(e)
+            await download_image(image_url, image_path)
+            task_log.debug(f'Изображение успешно скачано: {image_url}')
+            return image_url, image_path
         except Exception as e:
             task_log.debug(f'Ошибка: {str(e)}! Не удалось скачать изображение: {image_url}')
             return False, str(e)
@@ -116,4 +145,46 @@ async def send_prompt_to_chatgpt_image(prompt, task_name) -> tuple:
             task_log.debug(f'Ошибка: {str(e)}! Тема промта нарушает политику об отношении контента OpenAI.')
             return False, 'content_policy_violation_image'
         task_log.debug(f'Ошибка: {str(e)}! Не удалось получить изображение от DALL-E-3.')
-        return False, str(e)
\ No newline at end of file
+        return False, str(e)
+
+async def send_prompt_to_chatgpt_article(prompt, prompt_theme, task_name) -> tuple:
+    """Генерация текста и изображения статьи.
+
+    При CONCURRENT_GENERATION запросы выполняются одновременно, а если текст не получен,
+    генерация изображения отменяется (уже скачанное изображение удаляется).
+    """
+
+    if not CONCURRENT_GENERATION:
+        result_text, result_text_info = await send_prompt_to_chatgpt_text(prompt, task_name)
+        await asyncio.sleep(randint(1, 3))
+
+        if result_text:
+            result_image, result_image_path = await send_prompt_to_chatgpt_image(prompt_theme, task_name)
+        else:
+            result_image, result_image_path = False, '-'
+
+        return result_text, result_text_info, result_image, result_image_path
+
+    image_task = asyncio.create_task(send_prompt_to_chatgpt_image(prompt_theme, task_name))
+
+    try:
+        result_text, result_text_info = await send_prompt_to_chatgpt_text(prompt, task_name)
+    except BaseException:
+        image_task.cancel()
+        raise
+
+    if not result_text:
+        if image_task.done() and not image_task.cancelled() and image_task.exception() is None:
+            result_image, result_image_path = image_task.result()
+
+            if result_image and os.path.exists(result_image_path):
+                os.remove(result_image_path)
+        else:
+            image_task.cancel()
+
+        get_task_logger(task_name).debug('Текст не получен, генерация изображения отменена.')
+        return result_text, result_text_info, False, '-'
+
+    result_image, result_image_path = await image_task
+
+    return result_text, result_text_info, result_image, result_image_path
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import time
+
+from bot.config import DB_DIRECTORY, BATCH_POLL_INTERVAL
+from bot.databases.db_gateway import fetchall, execute, executemany, run_write
+from bot.handlers.commands.api.openai_api import get_client, get_task_settings
+from bot.handlers.commands.logging import get_task_logger
+
+# Статус статьи, текст которой получен пакетной генерацией и ещё не закреплён за аккаунтом
+PREGENERATED_STATUS = 'Предгенерация'
+
+# Конечные статусы пакетного задания OpenAI
+BATCH_FINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+async def get_unused_prompts(task_name: str) -> list:
+    """Промты, которые ещё не отработаны ни одним аккаунтом и не имеют готового текста"""
+
+    return await fetchall(
+        DB_DIRECTORY + task_name + '.db',
+        """SELECT id, prompt, xlsx_id FROM Prompts
+        WHERE (marks IS NULL OR marks = '')
+        AND id NOT IN (SELECT prompt_id FROM Articles WHERE status = ? AND prompt_id IS NOT NULL)""",
+        (PREGENERATED_STATUS,)
+    )
+
+def build_batch_file(prompts: list, model_text: str) -> bytes:
+    """Формирование JSONL-файла запросов пакетного задания"""
+
+    lines = []
+
+    for prompt_id, prompt, xlsx_id in prompts:
+        lines.append(json.dumps({
+            'custom_id': f'prompt-{prompt_id}',
+            'method': 'POST',
+            'url': '/v1/chat/completions',
+            'body': {
+                'model': model_text,
+                'messages': [{'role': 'user', 'content': prompt}],
+            },
+        }, ensure_ascii=False))
+
+    return '\n'.join(lines).encode('utf-8')
+
+def parse_batch_output(output: str) -> tuple:
+    """Разбор JSONL-файла результатов. Возвращает ({id промта: текст}, количество ошибок)"""
+
+    results, errors = {}, 0
+
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+
+        row = json.loads(line)
+        response = row.get('response') or {}
+
+        try:
+            prompt_id = int(row['custom_id'].removeprefix('prompt-'))
+            text = response['body']['choices'][0]['message']['content']
+        except (KeyError, IndexError, TypeError, ValueError):
+            errors += 1
+            continue
+
+        # Короткий ответ считается отказом модели, как и при обычной генерации
+        if response.get('status_code') != 200 or not text or len(text) <= 100:
+            errors += 1
+            continue
+
+        results[prompt_id] = text
+
+    return results, errors
+
+async def batch_generate_articles(task_name: str) -> tuple:
+    """Пакетная генерация текстов для всех неотработанных промтов задания через OpenAI Batch API.
+
+    Тексты сохраняются в таблицу Articles задания со статусом PREGENERATED_STATUS и используются
+    при публикации вместо генерации текста в реальном времени.
+    """
+
+    task_log = get_task_logger(task_name)
+    db_path = DB_DIRECTORY + task_name + '.db'
+
+    prompts = await get_unused_prompts(task_name)
+
+    if not prompts:
+        return False, 'Нет промтов для пакетной генерации.'
+
+    settings = await get_task_settings(task_name)
+    client = get_client(settings['api_key'])
+    started_at = time.monotonic()
+
+    try:
+        batch_file = await client.files.create(
+            file=(f'batch_{task_name}.jsonl', build_batch_file(prompts, settings['model_text'])),
+            purpose='batch'
+        )
+        batch = await client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h'
+        )
+        task_log.debug(f'Пакетная генерация запущена: {batch.id}, промтов: {len(prompts)}')
+
+        while batch.status not in BATCH_FINAL_STATUSES:
+            await asyncio.sleep(BATCH_POLL_INTERVAL)
+            batch = await client.batches.retrieve(batch.id)
+
+            if batch.request_counts:
+                task_log.debug(f'Пакетная генерация {batch.id}: {batch.status}, '
+                               f'выполнено {batch.request_counts.completed} из {batch.request_counts.total}')
+
+        if batch.status != 'completed' or not batch.output_file_id:
+            task_log.debug(f'Пакетная генерация {batch.id} завершилась со статусом {batch.status}')
+            return False, f'Пакетное задание завершилось со статусом {batch.status}.'
+
+        output = await client.files.content(batch.output_file_id)
+    except Exception as e:
+        task_log.debug(f'Ошибка: {str(e)}! Не удалось выполнить пакетную генерацию.')
+        return False, str(e)
+
+    results, errors = parse_batch_output(output.text)
+    xlsx_ids = {prompt_id: xlsx_id for prompt_id, prompt, xlsx_id in prompts}
+
+    saved = await executemany(
+        db_path,
+        "INSERT INTO Articles (article_text, article_image, status, xlsx_id, prompt_id) VALUES (?, ?, ?, ?, ?)",
+        [(text, '-', PREGENERATED_STATUS, str(xlsx_ids.get(prompt_id)), prompt_id)
+         for prompt_id, text in results.items() if prompt_id in xlsx_ids]
+    )
+
+    elapsed = time.monotonic() - started_at
+    info = (f'Сгенерировано текстов: {saved} из {len(prompts)}, ошибок: {errors}. '
+            f'Время: {elapsed / 60:.1f} мин.')
+    task_log.debug(f'Пакетная генерация {batch.id} завершена. {info}')
+
+    return True, info
+
+async def claim_pregenerated_text(task_name: str, prompt_id: int) -> str | None:
+    """Получение готового текста промта (строка удаляется, чтобы текст не использовался повторно)"""
+
+    def claim(connection):
+        row = connection.execute(
+            "SELECT id, article_text FROM Articles WHERE prompt_id = ? AND status = ? LIMIT 1",
+            (prompt_id, PREGENERATED_STATUS)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        connection.execute("DELETE FROM Articles WHERE id = ?", (row[0],))
+        return row[1]
+
+    return await run_write(DB_DIRECTORY + task_name + '.db', claim)
+
+async def release_pregenerated_text(task_name: str, prompt_id: int, text: str, xlsx_id) -> None:
+    """Возврат неиспользованного текста (например, если не удалось получить изображение)"""
+
+    await execute(
+        DB_DIRECTORY + task_name + '.db',
+        "INSERT INTO Articles (article_text, article_image, status, xlsx_id, prompt_id) VALUES (?, ?, ?, ?, ?)",
+        (text, '-', PREGENERATED_STATUS, str(xlsx_id), prompt_id)
+    )
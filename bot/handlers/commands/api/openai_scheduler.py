@@ -0,0 +1,202 @@
+import asyncio
+import time
+
+from collections import OrderedDict, deque
+from contextlib import suppress
+from random import random
+
+from openai import RateLimitError
+
+from bot.config import OPENAI_DEFAULT_RPM, OPENAI_DEFAULT_TPM, OPENAI_MAX_CONCURRENT, OPENAI_MAX_RETRIES, \
+    OPENAI_COMPLETION_TOKENS
+
+
+class TokenBucket:
+    """Корзина токенов с пополнением limit единиц в минуту"""
+
+    def __init__(self, limit: int) -> None:
+        self.limit: int = limit
+        self.level: float = limit
+        self.updated: float = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.limit, self.level + (now - self.updated) * self.limit / 60)
+        self.updated = now
+
+    def delay(self, amount: int) -> float:
+        """Сколько секунд ждать, пока в корзине наберётся amount единиц"""
+
+        self.refill()
+        amount = min(amount, self.limit)
+
+        return 0.0 if self.level >= amount else (amount - self.level) * 60 / self.limit
+
+    def take(self, amount: int) -> None:
+        self.refill()
+        self.level -= amount
+
+    def update(self, limit: int | None, remaining: int | None) -> None:
+        """Синхронизация с лимитами из заголовков ответа OpenAI"""
+
+        self.refill()
+
+        if limit:
+            self.limit = limit
+        if remaining is not None:
+            self.level = min(self.level, remaining)
+
+
+class KeyLimiter:
+    """Очередь запросов одного API-ключа.
+
+    Вызывающие ставятся в очередь своего задания, задания обслуживаются по кругу,
+    поэтому одно задание с длинной очередью не блокирует остальные.
+    """
+
+    def __init__(self) -> None:
+        self.requests = TokenBucket(OPENAI_DEFAULT_RPM)
+        self.tokens = TokenBucket(OPENAI_DEFAULT_TPM)
+        self.queues: OrderedDict = OrderedDict()
+        self.in_flight: int = 0
+        self.paused_until: float = 0.0
+        self.wakeup = asyncio.Event()
+        self.dispatcher: asyncio.Task | None = None
+
+    def wake(self) -> None:
+        self.wakeup.set()
+
+        if self.dispatcher is None or self.dispatcher.done():
+            self.dispatcher = asyncio.create_task(self.dispatch())
+
+    async def acquire(self, task_name: str, tokens: int) -> None:
+        """Ожидание разрешения на запрос"""
+
+        future = asyncio.get_running_loop().create_future()
+        self.queues.setdefault(task_name, deque()).append((future, tokens))
+        self.wake()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Завершение запроса"""
+
+        self.in_flight -= 1
+        self.wake()
+
+    def pause(self, delay: float) -> None:
+        """Приостановка выдачи разрешений после ошибки 429"""
+
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    async def dispatch(self) -> None:
+        while self.queues:
+            task_name, queue = next(iter(self.queues.items()))
+
+            if not queue or queue[0][0].done():
+                if queue:
+                    queue.popleft()
+                if not queue:
+                    del self.queues[task_name]
+                continue
+
+            tokens = queue[0][1]
+
+            if self.in_flight >= OPENAI_MAX_CONCURRENT:
+                delay = None
+            else:
+                delay = max(self.paused_until - time.monotonic(), self.requests.delay(1), self.tokens.delay(tokens))
+
+            if delay is None or delay > 0:
+                self.wakeup.clear()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                continue
+
+            future, tokens = queue.popleft()
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            future.set_result(None)
+
+            # Следующее разрешение получит другое задание
+            if queue:
+                self.queues.move_to_end(task_name)
+            else:
+                del self.queues[task_name]
+
+    def update(self, headers) -> None:
+        """Обновление лимитов по заголовкам x-ratelimit-* ответа"""
+
+        self.requests.update(header_int(headers, 'x-ratelimit-limit-requests'),
+                             header_int(headers, 'x-ratelimit-remaining-requests'))
+        self.tokens.update(header_int(headers, 'x-ratelimit-limit-tokens'),
+                           header_int(headers, 'x-ratelimit-remaining-tokens'))
+
+
+# Очереди API-ключей: {api_key: KeyLimiter}
+limiters = {}
+
+
+def header_int(headers, name: str) -> int | None:
+    with suppress(TypeError, ValueError):
+        return int(headers.get(name))
+    return None
+
+def retry_delay(error: RateLimitError, attempt: int) -> float:
+    """Задержка перед повтором: из заголовка retry-after или экспоненциальная с разбросом"""
+
+    headers = error.response.headers if error.response is not None else {}
+
+    with suppress(TypeError, ValueError):
+        return float(headers.get('retry-after-ms')) / 1000
+    with suppress(TypeError, ValueError):
+        return float(headers.get('retry-after'))
+
+    return min(60, 2 ** attempt) + random()
+
+def estimate_tokens(text: str) -> int:
+    """Оценка токенов запроса текста: промт и ожидаемый ответ"""
+
+    return len(text) // 2 + OPENAI_COMPLETION_TOKENS
+
+async def openai_request(api_key: str, task_name: str, tokens: int, request):
+    """Выполнение запроса OpenAI через общий планировщик.
+
+    request — функция без аргументов, возвращающая корутину запроса with_raw_response.
+    Ошибки 429 из-за превышения лимитов повторяются с паузой, ошибка баланса (quota) передаётся вызывающему.
+    """
+
+    limiter = limiters.get(api_key)
+
+    if limiter is None:
+        limiter = limiters[api_key] = KeyLimiter()
+
+    for attempt in range(OPENAI_MAX_RETRIES + 1):
+        await limiter.acquire(task_name, tokens)
+
+        try:
+            raw_response = await request()
+        except RateLimitError as e:
+            if 'quota' in str(e) or attempt == OPENAI_MAX_RETRIES:
+                raise
+
+            limiter.pause(retry_delay(e, attempt))
+            continue
+        finally:
+            limiter.release()
+
+        limiter.update(raw_response.headers)
+        result = raw_response.parse()
+
+        # Поправка оценки на фактический расход токенов
+        usage = getattr(result, 'usage', None)
+        if tokens and usage and getattr(usage, 'total_tokens', None):
+            limiter.tokens.take(usage.total_tokens - tokens)
+
+        return result
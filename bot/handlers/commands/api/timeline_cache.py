@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+
+from bot.config import TIMELINE_CACHE_TTL, TIMELINE_CACHE_SIZE, TIMELINE_PAGE_DELAY
+from bot.handlers.commands.api.http_session import platform_request
+
+# Ленты статей авторов: {(площадка, ID пользователя): {
+#     'posts': [(ссылка, заголовок)] от новых к старым,
+#     'cursor': (lastId, lastSortingValue) следующей страницы или None (с начала ленты),
+#     'complete': лента прочитана до конца,
+#     'updated_at': время последней сверки с площадкой (time.monotonic())
+# }}
+timelines = {}
+
+# Блокировки лент, чтобы одну ленту не запрашивали одновременно: {(площадка, ID пользователя): asyncio.Lock}
+timeline_locks = {}
+
+
+def new_timeline() -> dict:
+    return {'posts': [], 'cursor': None, 'complete': False, 'updated_at': None}
+
+async def fetch_page(platform, site: str, cursor: tuple = None) -> tuple:
+    """Страница ленты автора: ([(ссылка, заголовок)], курсор следующей страницы)"""
+
+    params = {'markdown': 'false', 'sorting': 'new', 'subsitesIds': platform.user_id}
+
+    if cursor:
+        params['lastId'], params['lastSortingValue'] = cursor
+
+    response = await platform_request(
+        platform.session_key,
+        'GET',
+        url=f'https://api.{site}/v2.8/timeline',
+        params=params,
+        proxies=platform.proxies,
+        raise_for_status=True
+    )
+
+    result = json.loads(response).get('result', {})
+    posts = [(item['data']['url'], item['data']['title']) for item in result.get('items', [])]
+
+    return posts, (result.get('lastId'), result.get('lastSortingValue'))
+
+async def refresh_head(platform, site: str, timeline: dict, posts_amount: int) -> None:
+    """Загрузка статей новее первой статьи в кэше (обычно достаточно одной страницы)"""
+
+    known = {url for url, title in timeline['posts']}
+    new_posts = []
+    cursor = None
+
+    while True:
+        posts, next_cursor = await fetch_page(platform, site, cursor)
+
+        for post in posts:
+            if post[0] in known:
+                timeline['posts'][:0] = new_posts
+                return
+
+            new_posts.append(post)
+
+        if not posts:
+            timeline['posts'][:0] = new_posts
+            return
+
+        if len(new_posts) >= posts_amount:
+            # Новых статей больше, чем нужно: старая часть кэша не понадобится
+            timeline.update(posts=new_posts, cursor=next_cursor, complete=False)
+            return
+
+        cursor = next_cursor
+        await asyncio.sleep(TIMELINE_PAGE_DELAY)
+
+async def extend_tail(platform, site: str, timeline: dict, posts_amount: int) -> None:
+    """Дочитывание ленты, пока в кэше меньше posts_amount статей"""
+
+    known = {url for url, title in timeline['posts']}
+
+    while len(timeline['posts']) < posts_amount and not timeline['complete']:
+        if timeline['cursor'] is not None:
+            await asyncio.sleep(TIMELINE_PAGE_DELAY)
+
+        posts, timeline['cursor'] = await fetch_page(platform, site, timeline['cursor'])
+
+        if not posts:
+            timeline['complete'] = True
+
+        for post in posts:
+            if post[0] not in known:
+                known.add(post[0])
+                timeline['posts'].append(post)
+
+async def user_posts(platform, site: str, posts_amount: int) -> list | bool:
+    """Последние статьи автора для перелинковки. Лента сверяется с площадкой не чаще раза в TIMELINE_CACHE_TTL
+    секунд и только по статьям новее кэша. False — если ленту не удалось получить"""
+
+    key = (site, platform.user_id)
+
+    async with timeline_locks.setdefault(key, asyncio.Lock()):
+        timeline = timelines.setdefault(key, new_timeline())
+
+        try:
+            if timeline['updated_at'] is not None and time.monotonic() - timeline['updated_at'] > TIMELINE_CACHE_TTL:
+                await refresh_head(platform, site, timeline, posts_amount)
+
+            await extend_tail(platform, site, timeline, posts_amount)
+            timeline['updated_at'] = time.monotonic()
+        except Exception:
+            return False
+
+        return timeline['posts'][:posts_amount]
+
+def remember_post(site: str, user_id, url: str, title: str) -> None:
+    """Добавление опубликованной статьи в начало кэшированной ленты автора (без запроса к площадке)"""
+
+    timeline = timelines.get((site, user_id))
+
+    if timeline is None or any(post[0] == url for post in timeline['posts']):
+        return
+
+    timeline['posts'].insert(0, (url, title))
+
+    if len(timeline['posts']) > TIMELINE_CACHE_SIZE:
+        # Хвост ленты будет дочитан заново с начала (повторы отбрасываются)
+        del timeline['posts'][TIMELINE_CACHE_SIZE:]
+        timeline.update(cursor=None, complete=False)
@@ -0,0 +1,166 @@
+import asyncio
+import base64
+import json
+import time
+
+from bot.config import DB_TOKENS_DIRECTORY, DB_MAIN_ACCOUNTS_DIRECTORY, DB_MULTI_ACCOUNTS_DIRECTORY, \
+    TOKEN_DEFAULT_TTL, TOKEN_REFRESH_MARGIN, TOKEN_REFRESH_INTERVAL, TOKEN_REFRESH_ENABLED
+from bot.databases.connection_pool import get_connection
+from bot.databases.db_gateway import execute
+from bot.handlers.commands.logging import log
+
+# Токены аккаунтов: {ключ сессии аккаунта: {'access_token', 'refresh_token', 'expires_at', 'user_id'}}
+tokens = {}
+
+# Последний объект площадки аккаунта (прокси и сессия для фонового обновления): {ключ сессии: VcApi | DtfApi}
+platforms = {}
+
+# Аккаунты, токен которых обновляется прямо сейчас: {ключ сессии: asyncio.Lock}
+refresh_locks = {}
+
+
+def load_tokens() -> None:
+    """Загрузка сохранённых токенов при запуске бота"""
+
+    cursor = get_connection(DB_TOKENS_DIRECTORY).cursor()
+    cursor.execute("SELECT account_key, access_token, refresh_token, expires_at, user_id FROM Tokens")
+
+    for account_key, access_token, refresh_token, expires_at, user_id in cursor.fetchall():
+        tokens[account_key] = {
+            'access_token': access_token,
+            'refresh_token': refresh_token,
+            'expires_at': expires_at,
+            'user_id': user_id,
+        }
+
+def token_expiry(access_token: str) -> float:
+    """Время истечения токена из поля exp JWT (или TOKEN_DEFAULT_TTL, если токен не JWT)"""
+
+    try:
+        payload = access_token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except Exception:
+        return time.time() + TOKEN_DEFAULT_TTL
+
+def is_fresh(entry: dict) -> bool:
+    return entry['expires_at'] - time.time() > TOKEN_REFRESH_MARGIN
+
+async def remember_token(platform) -> None:
+    """Сохранение токена и ID пользователя после успешной авторизации или публикации"""
+
+    if not platform.accessToken or platform.accessToken == '-':
+        return
+
+    entry = tokens.get(platform.session_key)
+
+    if entry and entry['access_token'] == platform.accessToken and entry['user_id'] == platform.user_id:
+        platforms[platform.session_key] = platform
+        return
+
+    entry = tokens[platform.session_key] = {
+        'access_token': platform.accessToken,
+        'refresh_token': platform.refreshToken or (entry['refresh_token'] if entry else None),
+        'expires_at': token_expiry(platform.accessToken),
+        'user_id': platform.user_id,
+    }
+    platforms[platform.session_key] = platform
+
+    await execute(
+        DB_TOKENS_DIRECTORY,
+        "INSERT OR REPLACE INTO Tokens (account_key, access_token, refresh_token, expires_at, user_id) "
+        "VALUES (?, ?, ?, ?, ?)",
+        (platform.session_key, entry['access_token'], entry['refresh_token'], entry['expires_at'], entry['user_id'])
+    )
+
+async def forget_token(platform) -> None:
+    """Удаление недействительного токена (например, после ответа 401)"""
+
+    tokens.pop(platform.session_key, None)
+    await execute(DB_TOKENS_DIRECTORY, "DELETE FROM Tokens WHERE account_key = ?", (platform.session_key,))
+
+async def save_account_token(platform) -> None:
+    """Запись обновлённого токена в строки аккаунта в базах Основного и Мульти режимов"""
+
+    # Площадка аккаунта определяется по account_url так же, как при выборе VcApi или DtfApi
+    is_vc = int(platform.session_key.startswith('vc.ru-'))
+
+    for db_path in (DB_MAIN_ACCOUNTS_DIRECTORY, DB_MULTI_ACCOUNTS_DIRECTORY):
+        await execute(
+            db_path,
+            "UPDATE Accounts SET accessToken = ? WHERE account_email = ? AND (instr(account_url, 'vc') > 0) = ?",
+            (platform.accessToken, platform.email, is_vc)
+        )
+
+async def refresh_token(platform, force: bool = False) -> bool:
+    """Обновление токена аккаунта по refresh-токену (force — даже если срок действия не истекает)"""
+
+    if not TOKEN_REFRESH_ENABLED:
+        return False
+
+    lock = refresh_locks.setdefault(platform.session_key, asyncio.Lock())
+
+    async with lock:
+        entry = tokens.get(platform.session_key)
+
+        if entry is None or not entry['refresh_token']:
+            return False
+
+        # Пока ждали блокировку, токен мог обновить другой вызов
+        if not force and is_fresh(entry):
+            return True
+
+        platform.refreshToken = entry['refresh_token']
+        platform.user_id = entry['user_id']
+        refreshed, info = await platform.platform_refresh_token()
+
+        if not refreshed:
+            await forget_token(platform)
+            return False
+
+        await remember_token(platform)
+        await save_account_token(platform)
+        return True
+
+async def restore_token(platform) -> bool:
+    """Подстановка сохранённого токена в объект площадки.
+
+    Возвращает True, если токен действителен и ID пользователя известен, —
+    тогда авторизацию и запрос данных пользователя (subsite/me) можно пропустить.
+    """
+
+    entry = tokens.get(platform.session_key)
+
+    if entry is None or not entry['user_id']:
+        return False
+
+    if not is_fresh(entry) and not await refresh_token(platform):
+        return False
+
+    entry = tokens[platform.session_key]
+    platform.accessToken = entry['access_token']
+    platform.refreshToken = entry['refresh_token']
+    platform.user_id = entry['user_id']
+    platforms[platform.session_key] = platform
+
+    return True
+
+async def token_refresher() -> None:
+    """Фоновое обновление токенов, срок действия которых подходит к концу"""
+
+    while True:
+        await asyncio.sleep(TOKEN_REFRESH_INTERVAL)
+
+        if not TOKEN_REFRESH_ENABLED:
+            continue
+
+        for account_key, entry in list(tokens.items()):
+            platform = platforms.get(account_key)
+
+            if platform is None or not entry['refresh_token'] or is_fresh(entry):
+                continue
+
+            try:
+                await refresh_token(platform)
+            except Exception as e:
+                log.debug(f'Ошибка: {str(e)}! Не удалось обновить токен {account_key}')
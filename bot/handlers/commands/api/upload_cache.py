@@ -0,0 +1,73 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+from bot.config import DB_UPLOADS_DIRECTORY, UPLOAD_CACHE_TTL
+from bot.databases.connection_pool import get_connection
+from bot.databases.db_gateway import execute
+
+# Изображения, уже загруженные на площадки:
+# {(ключ сессии аккаунта — площадка и почта, sha256 файла): (описание изображения в JSON, время загрузки)}
+uploads = {}
+
+# Хэши файлов, чтобы не читать повторно одно и то же изображение: {путь: (mtime_ns, размер, sha256)}
+file_hashes = {}
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def load_uploads() -> None:
+    """Загрузка сохранённых описаний изображений при запуске бота"""
+
+    cursor = get_connection(DB_UPLOADS_DIRECTORY).cursor()
+    cursor.execute("SELECT account_key, sha256, image, uploaded_at FROM Uploads WHERE uploaded_at > ?",
+                   (time.time() - UPLOAD_CACHE_TTL,))
+
+    for account_key, sha256, image, uploaded_at in cursor.fetchall():
+        uploads[(account_key, sha256)] = (image, uploaded_at)
+
+def hash_file(image_path: str) -> str:
+    digest = hashlib.sha256()
+
+    with open(image_path, 'rb') as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+async def file_digest(image_path: str) -> str:
+    """SHA-256 файла (пересчитывается только при изменении файла)"""
+
+    stat = os.stat(image_path)
+    cached = file_hashes.get(image_path)
+
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    digest = await asyncio.to_thread(hash_file, image_path)
+    file_hashes[image_path] = (stat.st_mtime_ns, stat.st_size, digest)
+
+    return digest
+
+def get_upload(account_key: str, digest: str) -> dict | None:
+    """Описание изображения, уже загруженного аккаунтом (копия — его можно изменять)"""
+
+    entry = uploads.get((account_key, digest))
+
+    if entry is None or time.time() - entry[1] > UPLOAD_CACHE_TTL:
+        return None
+
+    return json.loads(entry[0])
+
+async def remember_upload(account_key: str, digest: str, image: dict) -> None:
+    """Сохранение описания изображения после успешной загрузки"""
+
+    entry = uploads[(account_key, digest)] = (json.dumps(image, ensure_ascii=False), time.time())
+
+    await execute(
+        DB_UPLOADS_DIRECTORY,
+        "INSERT OR REPLACE INTO Uploads (account_key, sha256, image, uploaded_at) VALUES (?, ?, ?, ?)",
+        (account_key, digest, *entry)
+    )
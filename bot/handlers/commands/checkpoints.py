@@ -0,0 +1,66 @@
+import json
+import time
+
+from bot.config import DB_TASK_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.db_gateway import execute, fetchone, run_write
+from bot.handlers.commands.account_slots import current_process
+
+
+async def save_checkpoint(name: str, func, priority: int, accounts, args: tuple) -> None:
+    """Запись процесса при запуске: чем и с какими аргументами его запустить заново.
+
+    Прогресс, сохранённый прежним запуском процесса, не сбрасывается.
+    """
+
+    await execute(
+        DB_TASK_DIRECTORY,
+        "INSERT INTO Checkpoints (process_name, func, priority, accounts, args, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (process_name) DO UPDATE SET "
+        "func = excluded.func, priority = excluded.priority, accounts = excluded.accounts, args = excluded.args",
+        (name, func.__name__, priority, json.dumps(sorted(accounts)), json.dumps(args, ensure_ascii=False), time.time())
+    )
+
+async def remove_checkpoint(name: str) -> None:
+    """Удаление контрольной точки завершённого или остановленного процесса"""
+
+    await execute(DB_TASK_DIRECTORY, "DELETE FROM Checkpoints WHERE process_name = ?", (name,))
+
+def load_checkpoints() -> list:
+    """Процессы, не завершённые до остановки бота: [(имя, функция, приоритет, аккаунты, аргументы)]"""
+
+    cursor = get_connection(DB_TASK_DIRECTORY).cursor()
+    cursor.execute("SELECT process_name, func, priority, accounts, args FROM Checkpoints ORDER BY updated_at")
+
+    return [(name, func, priority, json.loads(accounts), json.loads(args))
+            for name, func, priority, accounts, args in cursor.fetchall()]
+
+async def load_progress(name: str = None) -> dict:
+    """Прогресс процесса (по умолчанию — текущего), сохранённый до перезапуска бота"""
+
+    row = await fetchone(
+        DB_TASK_DIRECTORY, "SELECT progress FROM Checkpoints WHERE process_name = ?", (name or current_process.get()[0],)
+    )
+
+    return json.loads(row[0]) if row else {}
+
+async def save_progress(name: str = None, **values) -> None:
+    """Сохранение прогресса процесса (по умолчанию — текущего). Значения дополняют сохранённые ранее"""
+
+    name = name or current_process.get()[0]
+
+    def update(connection):
+        row = connection.execute("SELECT progress FROM Checkpoints WHERE process_name = ?", (name,)).fetchone()
+
+        if row is None:
+            return
+
+        progress = json.loads(row[0])
+        progress.update(values)
+        connection.execute(
+            "UPDATE Checkpoints SET progress = ?, updated_at = ? WHERE process_name = ?",
+            (json.dumps(progress, ensure_ascii=False), time.time(), name)
+        )
+
+    await run_write(DB_TASK_DIRECTORY, update)
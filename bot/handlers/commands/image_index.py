@@ -0,0 +1,70 @@
+import asyncio
+import os
+
+from bot.config import DB_IMAGES_DIRECTORY
+from bot.databases.db_gateway import run_read
+
+# Индекс изображений продуктов из таблицы Images: {название или префикс имени файла: путь к файлу}.
+# None — индекс не построен (строится при первом поиске после сброса); пустой словарь — изображений нет
+image_index = None
+
+# Номер сброса индекса: индекс, построенный до сброса, не сохраняется
+image_index_version = 0
+
+image_index_lock = asyncio.Lock()
+
+
+def build_image_index(connection) -> dict:
+    """Индекс по файлам всех папок изображений: точные названия (имя без расширения) и префиксы имён файлов"""
+
+    names = {}
+    prefixes = {}
+
+    for (image_paths,) in connection.execute("SELECT image_path FROM Images ORDER BY id").fetchall():
+        for image_path in image_paths.split('\n'):
+            if not os.path.isfile(image_path):
+                continue
+
+            file = os.path.basename(image_path)
+            names.setdefault(os.path.splitext(file)[0], image_path)
+
+            # Как при поиске по startswith: название может совпадать с началом имени файла
+            for length in range(1, len(file) + 1):
+                prefixes.setdefault(file[:length], image_path)
+
+    # Точное совпадение названия важнее совпадения префикса
+    prefixes.update(names)
+
+    return prefixes
+
+async def load_image_index() -> dict:
+    """Построение индекса в потоке чтения (запрос к базе и проверка файлов не блокируют цикл событий)"""
+
+    global image_index
+
+    async with image_index_lock:
+        if image_index is not None:
+            return image_index
+
+        version = image_index_version
+        index = await run_read(DB_IMAGES_DIRECTORY, build_image_index)
+
+        if version == image_index_version:
+            image_index = index
+
+        return index
+
+async def find_image(name: str) -> str | None:
+    """Путь к изображению продукта по названию из <div type="image"> (None, если изображения нет)"""
+
+    index = image_index if image_index is not None else await load_image_index()
+
+    return index.get(name)
+
+def invalidate_image_index() -> None:
+    """Сброс индекса после загрузки, замены или удаления папки изображений"""
+
+    global image_index, image_index_version
+
+    image_index = None
+    image_index_version += 1
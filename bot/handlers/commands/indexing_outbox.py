@@ -0,0 +1,137 @@
+import asyncio
+import time
+
+import requests
+
+from bot.config import DB_INDEXING_DIRECTORY, INDEXING_POLL_INTERVAL, INDEXING_BATCH_SIZE, \
+    INDEXING_MAX_ATTEMPTS, INDEXING_RETRY_DELAY, INDEXING_REQUEST_TIMEOUT, INDEXING_FAILED_RETENTION
+from bot.databases.db_gateway import fetchall, execute, executemany, run_write
+from bot.handlers.commands.api.link_indexing_api import LinkIndexing
+from bot.handlers.commands.logging import get_task_logger, log
+from bot.handlers.commands.notifications import notify
+
+# Ссылки на индексацию хранятся в IndexingOutbox до успешной отправки, поэтому переживают перезапуск бота.
+# Фоновая задача отправляет их пачками: одна пачка — один запрос tasks/new с одинаковыми
+# API-ключом, пользователем, способом индексации и поисковиком. Ссылки, приём которых подтвердил сервис,
+# удаляются сразу, неподтверждённые отправляются повторно, а неотправленные за все попытки удаляются
+# через INDEXING_FAILED_RETENTION секунд (next_attempt хранит время отказа).
+
+
+async def enqueue_indexing(indexing_obj: LinkIndexing, searchengine: str, link: str, chat_id: int) -> None:
+    """Постановка опубликованной ссылки в очередь на индексацию во всех поисковиках настройки"""
+
+    now = time.time()
+
+    await executemany(
+        DB_INDEXING_DIRECTORY,
+        "INSERT INTO IndexingOutbox (task, chat_id, api_key, user_id, se_type, searchengine, link, next_attempt) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [(indexing_obj.task, chat_id, indexing_obj.api_key, indexing_obj.user_id, indexing_obj.se_type,
+          search, link, now) for search in searchengine.split('+')]
+    )
+
+def failure_text(task: str, link: str, searchengine: str, info: str) -> str:
+    text = (f'<a href="{link}">Ссылка</a> не отправлена на индексацию.\n\n'
+            f'<b>Поисковик:</b> {searchengine}\n'
+            f'<b>Причина:</b> {info}')
+
+    return text if task == '-' else f'(<b>{task}</b>) ' + text
+
+async def send_batch(key: tuple, rows: list) -> None:
+    """Отправка пачки ссылок одним запросом и обновление очереди по результату"""
+
+    task, api_key, user_id, se_type, searchengine = key
+    indexing_obj = LinkIndexing(api_key=api_key, user_id=user_id, se_type=se_type, task=task)
+    links = [row[2] for row in rows]
+
+    try:
+        indexing_post, indexing_info, confirmed = await asyncio.to_thread(
+            indexing_obj.link_indexing, '\n'.join(links), searchengine
+        )
+    except requests.Timeout:
+        indexing_post, indexing_info, confirmed = False, f'Сервис индексации не ответил за {INDEXING_REQUEST_TIMEOUT} с', []
+    except Exception as e:
+        indexing_post, indexing_info, confirmed = False, f'Ошибка запроса: {str(e)}', []
+
+    if indexing_post:
+        await executemany(DB_INDEXING_DIRECTORY, "DELETE FROM IndexingOutbox WHERE id = ?",
+                          [(row[0],) for row in rows if row[2] in confirmed])
+
+        rows = [row for row in rows if row[2] not in confirmed]
+
+        if not rows:
+            return
+
+        indexing_info = 'Сервис индексации не подтвердил приём ссылки'
+
+    now = time.time()
+    task_log = get_task_logger(task) if task != '-' else log
+    retries = []
+    failed = []
+
+    for row_id, chat_id, link, attempts in rows:
+        attempts += 1
+
+        if attempts >= INDEXING_MAX_ATTEMPTS:
+            failed.append((attempts, now, indexing_info, row_id))
+
+            text = failure_text(task, link, searchengine, indexing_info)
+            task_log.debug(text)
+            notify(chat_id, text, digest='indexing')
+        else:
+            retries.append((attempts, now + INDEXING_RETRY_DELAY * 2 ** (attempts - 1), indexing_info, row_id))
+
+    def save(connection):
+        connection.executemany(
+            "UPDATE IndexingOutbox SET attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?", retries
+        )
+        connection.executemany(
+            "UPDATE IndexingOutbox SET attempts = ?, status = 'failed', next_attempt = ?, last_error = ? WHERE id = ?",
+            failed
+        )
+
+    await run_write(DB_INDEXING_DIRECTORY, save)
+
+async def prune_outbox() -> None:
+    """Удаление ссылок, отправка которых не удалась, по истечении срока хранения"""
+
+    await execute(
+        DB_INDEXING_DIRECTORY,
+        "DELETE FROM IndexingOutbox WHERE status = 'failed' AND next_attempt <= ?",
+        (time.time() - INDEXING_FAILED_RETENTION,)
+    )
+
+async def drain_outbox() -> None:
+    """Отправка всех ссылок, время повторной попытки которых наступило"""
+
+    await prune_outbox()
+
+    rows = await fetchall(
+        DB_INDEXING_DIRECTORY,
+        "SELECT id, task, chat_id, api_key, user_id, se_type, searchengine, link, attempts FROM IndexingOutbox "
+        "WHERE status = 'pending' AND next_attempt <= ? ORDER BY id",
+        (time.time(),)
+    )
+
+    batches = {}
+
+    for row_id, task, chat_id, api_key, user_id, se_type, searchengine, link, attempts in rows:
+        batches.setdefault((task, api_key, user_id, se_type, searchengine), []).append((row_id, chat_id, link, attempts))
+
+    async def send_batches(key, batch_rows):
+        for start in range(0, len(batch_rows), INDEXING_BATCH_SIZE):
+            await send_batch(key, batch_rows[start:start + INDEXING_BATCH_SIZE])
+
+    # Пачки разных ключей отправляются параллельно: медленный ответ по одному ключу не задерживает остальные
+    await asyncio.gather(*(send_batches(key, batch_rows) for key, batch_rows in batches.items()))
+
+async def indexing_worker() -> None:
+    """Фоновая отправка ссылок на индексацию раз в INDEXING_POLL_INTERVAL секунд"""
+
+    while True:
+        await asyncio.sleep(INDEXING_POLL_INTERVAL)
+
+        try:
+            await drain_outbox()
+        except Exception as e:
+            log.debug(f"Произошла ошибка при отправке ссылок на индексацию: {str(e)}")
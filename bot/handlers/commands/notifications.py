@@ -0,0 +1,127 @@
+import asyncio
+
+from aiogram.exceptions import TelegramRetryAfter, TelegramBadRequest, TelegramForbiddenError
+
+from bot.app import bot
+from bot.config import NOTIFY_CHAT_INTERVAL, NOTIFY_DIGEST_WINDOW, NOTIFY_MAX_RETRIES, NOTIFY_MESSAGE_LIMIT
+from bot.handlers.commands.logging import log
+
+# Заголовки сводок: однотипные уведомления за NOTIFY_DIGEST_WINDOW секунд отправляются одним сообщением
+DIGEST_TITLES = {
+    'indexing': 'Ссылки не отправлены на индексацию',
+}
+
+# Очереди и обработчики отправки по чатам: {chat_id: asyncio.Queue}, {chat_id: asyncio.Task}
+chat_queues = {}
+chat_workers = {}
+
+# Накапливаемые сводки: {(chat_id, вид сводки): [тексты уведомлений]}
+digests = {}
+
+
+def notify(chat_id: int, text: str, digest: str = None) -> None:
+    """Постановка уведомления в очередь чата (не ждёт отправки).
+    Уведомления с указанным видом сводки объединяются в одно сообщение"""
+
+    if digest is None:
+        enqueue(chat_id, text)
+        return
+
+    items = digests.get((chat_id, digest))
+
+    if items is None:
+        digests[(chat_id, digest)] = [text]
+        asyncio.get_running_loop().call_later(NOTIFY_DIGEST_WINDOW, release_digest, chat_id, digest)
+    else:
+        items.append(text)
+
+def digest_messages(title: str, items: list) -> list:
+    """Разбиение сводки на сообщения не длиннее NOTIFY_MESSAGE_LIMIT (уведомления не разрываются)"""
+
+    messages = []
+    header = f"<b>{title}:</b> {len(items)}\n\n"
+    current = header
+
+    for item in items:
+        if current != header and len(current) + len(item) + 2 > NOTIFY_MESSAGE_LIMIT:
+            messages.append(current.rstrip())
+            current = header
+
+        current += item + '\n\n'
+
+    messages.append(current.rstrip())
+
+    return messages
+
+def release_digest(chat_id: int, digest: str) -> None:
+    """Отправка накопленной сводки в очередь чата"""
+
+    items = digests.pop((chat_id, digest), None)
+
+    if not items:
+        return
+
+    if len(items) == 1:
+        enqueue(chat_id, items[0])
+        return
+
+    for message in digest_messages(DIGEST_TITLES.get(digest, digest), items):
+        enqueue(chat_id, message)
+
+def enqueue(chat_id: int, text: str) -> None:
+    """Добавление сообщения в очередь чата и запуск обработчика очереди, если он не работает"""
+
+    queue = chat_queues.get(chat_id)
+
+    if queue is None:
+        queue = chat_queues[chat_id] = asyncio.Queue()
+
+    worker = chat_workers.get(chat_id)
+
+    if worker is None or worker.done():
+        chat_workers[chat_id] = asyncio.create_task(chat_sender(chat_id, queue))
+
+    queue.put_nowait(text)
+
+async def send(chat_id: int, text: str) -> None:
+    """Отправка сообщения с ожиданием retry_after при флуд-контроле и повторами при сетевых ошибках"""
+
+    for attempt in range(NOTIFY_MAX_RETRIES):
+        try:
+            await bot.send_message(chat_id=chat_id, text=text)
+            return
+        except TelegramRetryAfter as e:
+            await asyncio.sleep(e.retry_after)
+        except (TelegramBadRequest, TelegramForbiddenError) as e:
+            # Повтор не поможет: некорректный текст или бот заблокирован
+            log.debug(f"Уведомление в чат {chat_id} не отправлено: {str(e)}")
+            return
+        except Exception as e:
+            log.debug(f"Ошибка отправки уведомления в чат {chat_id}: {str(e)}")
+            await asyncio.sleep(2 ** attempt)
+
+    log.debug(f"Уведомление в чат {chat_id} не отправлено после {NOTIFY_MAX_RETRIES} попыток")
+
+async def chat_sender(chat_id: int, queue: asyncio.Queue) -> None:
+    """Последовательная отправка сообщений чата не чаще одного раза в NOTIFY_CHAT_INTERVAL секунд"""
+
+    while True:
+        text = await queue.get()
+
+        try:
+            await send(chat_id, text)
+        finally:
+            queue.task_done()
+
+        await asyncio.sleep(NOTIFY_CHAT_INTERVAL)
+
+async def flush_notifications(timeout: float = 10) -> None:
+    """Отправка накопленных сводок и ожидание опустошения очередей (при остановке бота)"""
+
+    for chat_id, digest in list(digests):
+        release_digest(chat_id, digest)
+
+    try:
+        await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in chat_queues.values())), timeout)
+    except asyncio.TimeoutError:
+        log.debug("Не все уведомления отправлены до остановки бота")
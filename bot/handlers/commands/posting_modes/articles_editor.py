@@ -1,24 +1,23 @@
 import asyncio
 import os
 import re
-import sqlite3
 
-from bot.config import DB_TASK_DIRECTORY, TIMEOUT_DELAY
+from bot.handlers.commands.account_slots import account_lease
 from bot.handlers.commands.api.dtf_api import DtfApi
 from bot.handlers.commands.api.vc_api import VcApi
+from bot.handlers.commands.checkpoints import load_progress, save_progress
 from bot.handlers.commands.logging import log
 from bot.handlers.commands.posting_modes.common import posting_article_v2, bot_message
 from bot.handlers.commands.posting_modes.server_posting import data_upload
+from bot.handlers.commands.tasks_settings import get_settings
 
 
 async def articles_editor_run(event, account_mark, urls_path, chat_id) -> None:
 
     await event.wait()
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT currents_replace, new_replace FROM TasksSettings WHERE id = 1")
-        currents_replace, new_replace = cursor.fetchone()
+    settings = await get_settings()
+    currents_replace, new_replace = settings['currents_replace'], settings['new_replace']
 
     await event.wait()
 
@@ -28,16 +27,23 @@ async def articles_editor_run(event, account_mark, urls_path, chat_id) -> None:
 
     await event.wait()
 
-    article_ids = []
+    # После перезапуска бота редактируются только статьи, оставшиеся до остановки
+    progress = await load_progress()
+    article_ids = progress.get('remaining')
 
-    with open(urls_path, "r", encoding="utf-8") as file:
-        for url in file:
-            url = url.strip()
-            match = re.search(r'/(\d+)-[^/]+$', url)
-            if match:
-                article_id = match.group(1)
-                article_ids.append(article_id)
-    os.remove(urls_path)
+    if article_ids is None:
+        article_ids = []
+
+        with open(urls_path, "r", encoding="utf-8") as file:
+            for url in file:
+                url = url.strip()
+                match = re.search(r'/(\d+)-[^/]+$', url)
+                if match:
+                    article_id = match.group(1)
+                    article_ids.append(article_id)
+        os.remove(urls_path)
+
+        await save_progress(remaining=article_ids)
 
     if len(article_ids) == 0:
         log.debug('ArticlesEditor: ошибка! Посты не найдены.')
@@ -64,11 +70,12 @@ async def articles_editor_run(event, account_mark, urls_path, chat_id) -> None:
         proxy_login=proxy_login,
         proxy_pass=proxy_password,
         proxy_ip=proxy_ip,
-        proxy_port=proxy_port
+        proxy_port=proxy_port,
+        posts_amount=None
     )
     platform.is_published = True
 
-    goods = 0
+    goods = progress.get('goods', 0)
 
     remaining_articles = set(article_ids)
     error_count = 0
@@ -78,9 +85,10 @@ async def articles_editor_run(event, account_mark, urls_path, chat_id) -> None:
 
         for article_id in list(remaining_articles):
             await event.wait()
-            auth, article_get, publishing, platform_accessToken = posting_article_v2(
-                platform, account_id, article_id, accessToken, currents_replace, new_replace
-            )
+            async with account_lease(account_mark):
+                auth, article_get, publishing, platform_accessToken = await posting_article_v2(
+                    platform, account_id, article_id, accessToken, currents_replace, new_replace
+                )
             await event.wait()
 
             accessToken = platform_accessToken
@@ -88,6 +96,8 @@ async def articles_editor_run(event, account_mark, urls_path, chat_id) -> None:
             if auth and article_get and publishing:
                 remaining_articles.remove(article_id)
                 goods += 1
+
+                await save_progress(remaining=list(remaining_articles), goods=goods)
             else:
                 error_count += 1
                 log.debug(f"ArticlesEditor: ошибка при редактировании статьи {article_id}")
@@ -1,13 +1,20 @@
 import asyncio
 import re
-import sqlite3
 from random import randint
 
-from bot.app import bot
-from bot.config import TIMEOUT_DELAY, DB_MAIN_ACCOUNTS_DIRECTORY, DB_DIRECTORY, DB_ARTICLES_DIRECTORY, \
-    DB_TASK_DIRECTORY, DB_XLSX_DIRECTORY
+from bot.config import DB_MAIN_ACCOUNTS_DIRECTORY, DB_DIRECTORY, DB_ARTICLES_DIRECTORY, DB_XLSX_DIRECTORY
+from bot.databases.db_gateway import fetchall, execute, run_write, fetchone
 from bot.handlers.commands.api.link_indexing_api import LinkIndexing
+from bot.handlers.commands.api.token_manager import restore_token, remember_token, forget_token, refresh_token
 from bot.handlers.commands.logging import log
+from bot.handlers.commands.notifications import notify
+from bot.handlers.commands.posting_modes.work_queue import mark_work_done
+from bot.handlers.commands.tasks_settings import get_settings
+
+async def save_access_token(db_path, account_id, access_token):
+    """Сохранение токена доступа аккаунта в базе данных"""
+
+    await execute(db_path, "UPDATE Accounts SET accessToken = ? WHERE id = ?", (access_token, account_id))
 
 async def posting_article(platform,
                          account_id,
@@ -16,79 +23,76 @@ async def posting_article(platform,
                          result_text,
                          result_image_path
                          ):
-    if accessToken == '-':
-        auth, account_info, platform_accessToken = platform.platform_authorization()
-
-        with sqlite3.connect(DB_ACCOUNTS, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Accounts SET "
-                "accessToken = ?"
-                "WHERE id = ?",
-                (platform_accessToken, account_id)
-            )
-            connection.commit()
+    token_cached = await restore_token(platform)
+
+    if token_cached:
+        # Действующий токен и ID пользователя уже известны, запрос subsite/me не нужен
+        auth, account_info = True, ''
+        user_data, user_info = True, '-'
     else:
-        auth = True
-        account_info = ''
-        platform.accessToken = accessToken
+        if accessToken == '-':
+            auth, account_info, platform_accessToken = await platform.platform_authorization()
 
-    await asyncio.sleep(randint(1, 3))
+            await save_access_token(DB_ACCOUNTS, account_id, platform_accessToken)
+        else:
+            auth = True
+            account_info = ''
+            platform.accessToken = accessToken
 
-    user_data, user_info = platform.platform_get_user_data()
+        await asyncio.sleep(randint(1, 3))
 
-    if not user_data:
-        await asyncio.sleep(randint(2, 3))
+        user_data, user_info = await platform.platform_get_user_data()
 
-        auth, account_info, platform_accessToken = platform.platform_authorization()
+        if not user_data:
+            await asyncio.sleep(randint(2, 3))
 
-        with sqlite3.connect(DB_ACCOUNTS, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Accounts SET "
-                "accessToken = ?"
-                "WHERE id = ?",
-                (platform_accessToken, account_id)
-            )
-            connection.commit()
+            auth, account_info, platform_accessToken = await platform.platform_authorization()
 
-        if auth:
-            await asyncio.sleep(randint(2, 3))
-            user_data, user_info = platform.platform_get_user_data()
+            await save_access_token(DB_ACCOUNTS, account_id, platform_accessToken)
+
+            if auth:
+                await asyncio.sleep(randint(2, 3))
+                user_data, user_info = await platform.platform_get_user_data()
+
+    if user_data:
+        await remember_token(platform)
 
     await asyncio.sleep(randint(1, 3))
 
-    image_upload, image_info = platform.platform_image_upload(result_image_path)
+    image_upload, image_info = await platform.platform_image_upload(result_image_path)
 
     if not image_upload:
         await asyncio.sleep(randint(1, 3))
-        image_upload, image_info = platform.platform_image_upload(result_image_path)
+        image_upload, image_info = await platform.platform_image_upload(result_image_path)
 
     await asyncio.sleep(randint(1, 3))
 
     publishing, article_url, publishing_info = await platform.platform_publishing(result_text)
 
+    if (not publishing) and ('401' in str(publishing_info)) and await refresh_token(platform, force=True):
+        # Токен отклонён площадкой: сначала пробуем обновить его без повторной авторизации
+        publishing, article_url, publishing_info = await platform.platform_publishing(result_text)
+
     if (not publishing) and ('401' in str(publishing_info)):
+        await forget_token(platform)
         await asyncio.sleep(60)
 
-        auth, account_info, platform_accessToken = platform.platform_authorization()
+        auth, account_info, platform_accessToken = await platform.platform_authorization()
 
         if not user_data:
             await asyncio.sleep(randint(2, 3))
-            user_data, user_info = platform.platform_get_user_data()
-
-        with sqlite3.connect(DB_ACCOUNTS, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Accounts SET "
-                "accessToken = ?"
-                "WHERE id = ?",
-                (platform_accessToken, account_id)
-            )
-            connection.commit()
+            user_data, user_info = await platform.platform_get_user_data()
+
+        await save_access_token(DB_ACCOUNTS, account_id, platform_accessToken)
 
         publishing, article_url, publishing_info = await platform.platform_publishing(result_text)
 
+    if publishing:
+        await remember_token(platform)
+    elif token_cached and '401' not in str(publishing_info):
+        # Данные пользователя не запрашивались: проверяем, не заблокирован ли аккаунт
+        user_data, user_info = await platform.platform_get_user_data()
+
     return (auth,
             account_info,
             user_data,
@@ -106,79 +110,76 @@ async def posting_article_db(platform,
                          result_text,
                          result_image_path
                          ):
-    if accessToken == '-':
-        auth, account_info, platform_accessToken = platform.platform_authorization_v2()
-
-        with sqlite3.connect(DB_ACCOUNTS, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Accounts SET "
-                "accessToken = ?"
-                "WHERE id = ?",
-                (platform_accessToken, account_id)
-            )
-            connection.commit()
+    token_cached = await restore_token(platform)
+
+    if token_cached:
+        # Действующий токен и ID пользователя уже известны, запрос subsite/me не нужен
+        auth, account_info = True, ''
+        user_data, user_info = True, '-'
     else:
-        auth = True
-        account_info = ''
-        platform.accessToken = accessToken
+        if accessToken == '-':
+            auth, account_info, platform_accessToken = await platform.platform_authorization_v2()
 
-    await asyncio.sleep(randint(1, 3))
+            await save_access_token(DB_ACCOUNTS, account_id, platform_accessToken)
+        else:
+            auth = True
+            account_info = ''
+            platform.accessToken = accessToken
 
-    user_data, user_info = platform.platform_get_user_data()
+        await asyncio.sleep(randint(1, 3))
 
-    if not user_data:
-        await asyncio.sleep(randint(2, 3))
+        user_data, user_info = await platform.platform_get_user_data()
 
-        auth, account_info, platform_accessToken = platform.platform_authorization_v2()
+        if not user_data:
+            await asyncio.sleep(randint(2, 3))
 
-        with sqlite3.connect(DB_ACCOUNTS, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Accounts SET "
-                "accessToken = ?"
-                "WHERE id = ?",
-                (platform_accessToken, account_id)
-            )
-            connection.commit()
+            auth, account_info, platform_accessToken = await platform.platform_authorization_v2()
 
-        if auth:
-            await asyncio.sleep(randint(2, 3))
-            user_data, user_info = platform.platform_get_user_data()
+            await save_access_token(DB_ACCOUNTS, account_id, platform_accessToken)
+
+            if auth:
+                await asyncio.sleep(randint(2, 3))
+                user_data, user_info = await platform.platform_get_user_data()
+
+    if user_data:
+        await remember_token(platform)
 
     await asyncio.sleep(randint(1, 3))
 
-    image_upload, image_info = platform.platform_image_upload(result_image_path)
+    image_upload, image_info = await platform.platform_image_upload(result_image_path)
 
     if not image_upload:
         await asyncio.sleep(randint(1, 3))
-        image_upload, image_info = platform.platform_image_upload(result_image_path)
+        image_upload, image_info = await platform.platform_image_upload(result_image_path)
 
     await asyncio.sleep(randint(1, 3))
 
     publishing, article_url, publishing_info = await platform.platform_publishing(result_text)
 
+    if (not publishing) and ('401' in str(publishing_info)) and await refresh_token(platform, force=True):
+        # Токен отклонён площадкой: сначала пробуем обновить его без повторной авторизации
+        publishing, article_url, publishing_info = await platform.platform_publishing(result_text)
+
     if (not publishing) and ('401' in str(publishing_info)):
+        await forget_token(platform)
         await asyncio.sleep(60)
 
-        auth, account_info, platform_accessToken = platform.platform_authorization_v2()
+        auth, account_info, platform_accessToken = await platform.platform_authorization_v2()
 
         if not user_data:
             await asyncio.sleep(randint(2, 3))
-            user_data, user_info = platform.platform_get_user_data()
-
-        with sqlite3.connect(DB_ACCOUNTS, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Accounts SET "
-                "accessToken = ?"
-                "WHERE id = ?",
-                (platform_accessToken, account_id)
-            )
-            connection.commit()
+            user_data, user_info = await platform.platform_get_user_data()
+
+        await save_access_token(DB_ACCOUNTS, account_id, platform_accessToken)
 
         publishing, article_url, publishing_info = await platform.platform_publishing(result_text)
 
+    if publishing:
+        await remember_token(platform)
+    elif token_cached and '401' not in str(publishing_info):
+        # Данные пользователя не запрашивались: проверяем, не заблокирован ли аккаунт
+        user_data, user_info = await platform.platform_get_user_data()
+
     return (auth,
             account_info,
             user_data,
@@ -199,18 +200,14 @@ async def posting_article_v2(platform,
 
     platform_accessToken = accessToken
 
-    if accessToken == '-':
+    if await restore_token(platform):
+        auth = True
+        account_info = ''
+        platform_accessToken = platform.accessToken
+    elif accessToken == '-':
         auth, account_info, platform_accessToken = await platform.platform_authorization_v2()
 
-        with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Accounts SET "
-                "accessToken = ?"
-                "WHERE id = ?",
-                (platform_accessToken, account_id)
-            )
-            connection.commit()
+        await save_access_token(DB_MAIN_ACCOUNTS_DIRECTORY, account_id, platform_accessToken)
     else:
         auth = True
         account_info = ''
@@ -218,47 +215,31 @@ async def posting_article_v2(platform,
 
     await asyncio.sleep(randint(1, 3))
 
-    article_get, article_data, article_info = platform.platform_get_exist_article(article_id)
+    article_get, article_data, article_info = await platform.platform_get_exist_article(article_id)
 
     if not article_get:
         await asyncio.sleep(randint(2, 3))
         auth, account_info, platform_accessToken = await platform.platform_authorization_v2()
 
-        with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Accounts SET "
-                "accessToken = ?"
-                "WHERE id = ?",
-                (platform_accessToken, account_id)
-            )
-            connection.commit()
+        await save_access_token(DB_MAIN_ACCOUNTS_DIRECTORY, account_id, platform_accessToken)
 
         if auth:
             await asyncio.sleep(randint(2, 3))
-            article_get, article_data, article_info = platform.platform_get_exist_article(article_id)
+            article_get, article_data, article_info = await platform.platform_get_exist_article(article_id)
         else:
             return False, None, None, None
 
     await asyncio.sleep(randint(1, 3))
 
-    publishing, article_url, publishing_info = platform.platform_article_edit(article_data, currents_replace, new_replace)
+    publishing, article_url, publishing_info = await platform.platform_article_edit(article_data, currents_replace, new_replace)
 
     if (not publishing) and ('401' in str(publishing_info)):
         await asyncio.sleep(60)
 
         auth, account_info, platform_accessToken = await platform.platform_authorization_v2()
-        with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Accounts SET "
-                "accessToken = ?"
-                "WHERE id = ?",
-                (platform_accessToken, account_id)
-            )
-            connection.commit()
+        await save_access_token(DB_MAIN_ACCOUNTS_DIRECTORY, account_id, platform_accessToken)
         await asyncio.sleep(randint(1, 3))
-        publishing, article_url, publishing_info = platform.platform_article_edit(article_data, currents_replace, new_replace)
+        publishing, article_url, publishing_info = await platform.platform_article_edit(article_data, currents_replace, new_replace)
 
     if not publishing:
         return False, None, None, None
@@ -275,14 +256,9 @@ async def get_account_by_mark(account_mark) -> list:
    match_re = re.search(r'\d+', account_mark)
    account_id = int(match_re.group())
 
-   with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as conn:
-      cursor = conn.cursor()
-      cursor.execute("""SELECT id, account_email, account_password, account_login,
+   return await fetchone(DB_MAIN_ACCOUNTS_DIRECTORY, """SELECT id, account_email, account_password, account_login,
       proxy_ip, proxy_port, proxy_login, proxy_password,
       accessToken, account_url FROM Accounts WHERE id = ?""", (account_id, ))
-      account = cursor.fetchone()
-
-   return account
 
 async def get_account_by_mark_v2(account_mark) -> list:
    """Получение данных аккаунта по ID из базы данных"""
@@ -290,156 +266,118 @@ async def get_account_by_mark_v2(account_mark) -> list:
    match_re = re.search(r'\d+', account_mark)
    account_id = int(match_re.group())
 
-   with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as conn:
-      cursor = conn.cursor()
-      cursor.execute("""SELECT id, account_email, account_password, account_login,
+   return await fetchall(DB_MAIN_ACCOUNTS_DIRECTORY, """SELECT id, account_email, account_password, account_login,
       proxy_ip, proxy_port, proxy_login, proxy_password,
       accessToken, account_url FROM Accounts WHERE id = ?""", (account_id, ))
-      account = cursor.fetchall()
-
-   return account
 
 async def get_articles_by_ids(task_name, account_mark):
    """Получение ранее сгенерированных статей аккаунта по ID"""
 
-   conn = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-   cursor = conn.cursor()
-   cursor.execute("""SELECT id, article_text, article_image, xlsx_id FROM Articles WHERE marks = ?""", (account_mark,))
-   articles = cursor.fetchall()
-   conn.close()
-
-   return articles
+   return await fetchall(
+      DB_DIRECTORY + task_name + '.db',
+      """SELECT id, article_text, article_image, xlsx_id FROM Articles WHERE marks = ?""", (account_mark,)
+   )
 
 async def get_all_prompts(task_name):
    """Получение промтов"""
 
-   conn = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-   cursor = conn.cursor()
-   cursor.execute("""SELECT id, prompt, prompt_theme, marks, xlsx_id FROM Prompts""")
-   prompts = cursor.fetchall()
-   conn.close()
-
-   return prompts
+   return await fetchall(DB_DIRECTORY + task_name + '.db', """SELECT id, prompt, prompt_theme, marks, xlsx_id FROM Prompts""")
 
 async def mark_prompt_as_used(task_name, prompt_id, account_id, account_url):
    """Отметка аккаунта у промта с префиксом в зависимости от account_url"""
 
    mark = f"{"vc" if "vc" in account_url.lower() else "dtf"}-{account_id}"
 
-   connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-   cursor = connection.cursor()
-   cursor.execute("SELECT marks FROM Prompts WHERE id = ?", (prompt_id,))
-   current_marks = cursor.fetchone()[0]
+   def append_mark(connection):
+      current_marks = connection.execute("SELECT marks FROM Prompts WHERE id = ?", (prompt_id,)).fetchone()[0]
 
-   if current_marks:
-      marks_set = list(current_marks.splitlines())
-   else:
-      marks_set = list()
+      if current_marks:
+         marks_set = list(current_marks.splitlines())
+      else:
+         marks_set = list()
 
-   marks_set.append(mark)
+      marks_set.append(mark)
 
-   updated_marks = "\n".join(marks_set)
-   cursor.execute(
-      "UPDATE Prompts SET marks = ? WHERE id = ?",
-      (updated_marks, prompt_id)
-   )
-   connection.commit()
-   connection.close()
+      updated_marks = "\n".join(marks_set)
+      connection.execute("UPDATE Prompts SET marks = ? WHERE id = ?", (updated_marks, prompt_id))
+
+   await run_write(DB_DIRECTORY + task_name + '.db', append_mark)
+
+   # Пара (промт, аккаунт) отработана и в очереди основного постинга
+   await mark_work_done(DB_DIRECTORY + task_name + '.db', prompt_id, account_id)
 
 async def save_article_to_db(task_name, text, image, account_id, account_url):
    """Сохранение статьи в базу данных."""
 
    mark = f"{"vc" if "vc" in account_url.lower() else "dtf"}-{account_id}"
 
-   connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-   cursor = connection.cursor()
-   cursor.execute(
+   return await execute(
+      DB_DIRECTORY + task_name + '.db',
       """
       INSERT INTO Articles (article_text, article_image, marks)
       VALUES (?, ?, ?)
       """,
       (text, image, mark),
    )
-   article_id = cursor.lastrowid
-   connection.commit()
-   connection.close()
-
-   return article_id
-
-async def bot_message(chat_id: int, text: str):
-   try:
-      await bot.send_message(chat_id=chat_id, text=text)
-   except Exception as e:
-      await asyncio.sleep(10)
-      try:
-         await bot.send_message(chat_id=chat_id, text=text)
-      except Exception as e:
-         pass
+
+async def bot_message(chat_id: int, text: str, digest: str = None):
+   """Уведомление в Telegram через фоновую очередь (см. notifications.notify)"""
+
+   notify(chat_id, text, digest)
 
 async def get_accounts(db_path: str) -> list:
     """Получение всех аккаунтов из базы данных"""
 
-    with sqlite3.connect(db_path, timeout=TIMEOUT_DELAY) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, account_email, account_password, account_login,"
-                       " proxy_ip, proxy_port, proxy_login, proxy_password, accessToken, account_url FROM Accounts")
-        accounts = cursor.fetchall()
-
-    return accounts
+    return await fetchall(db_path, "SELECT id, account_email, account_password, account_login,"
+                                   " proxy_ip, proxy_port, proxy_login, proxy_password, accessToken, account_url FROM Accounts")
 
 async def get_priority_prompts(task_name, db_path):
     """Получение приоритетных промтов"""
 
-    with sqlite3.connect(db_path, timeout=TIMEOUT_DELAY) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT priority_prompts FROM Tasks WHERE task_name = ?", (task_name,))
-        priority_prompts = cursor.fetchone()
+    priority_prompts = await fetchone(db_path, "SELECT priority_prompts FROM Tasks WHERE task_name = ?",
+                                      (task_name,))
 
-        if priority_prompts:
-            priority_prompts = priority_prompts[0]
+    if priority_prompts:
+        priority_prompts = priority_prompts[0]
 
-            if priority_prompts == "-":
-                return []
-            else:
-                start, end = map(int, priority_prompts.split('-'))
-                return list(range(start, end + 1))
+        if priority_prompts == "-":
+            return []
+        else:
+            start, end = map(int, priority_prompts.split('-'))
+            return list(range(start, end + 1))
 
-        return []
+    return []
 
 async def get_prompts(db_path, priority_prompt_ids=None) -> list:
     """Получение промтов из базы данных"""
 
-    conn = sqlite3.connect(db_path, timeout=TIMEOUT_DELAY)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, prompt, prompt_theme, xlsx_id FROM Prompts")
-    prompts = cursor.fetchall()
+    prompts = await fetchall(db_path, "SELECT id, prompt, prompt_theme, xlsx_id FROM Prompts")
 
     if priority_prompt_ids:
         prompts = sorted(prompts, key=lambda x: (x[0] not in priority_prompt_ids, x[0]))
 
-    conn.close()
-
     return prompts
 
 async def update_keys_data(xlsx_id, article_url, account_login):
 
-    try:
-        with sqlite3.connect(DB_XLSX_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
+    def append_url(connection):
+        cursor = connection.cursor()
 
-            cursor.execute("SELECT urls_accounts FROM Xlsx WHERE id = ?", (int(xlsx_id),))
-            row = cursor.fetchone()
+        cursor.execute("SELECT urls_accounts FROM Xlsx WHERE id = ?", (int(xlsx_id),))
+        row = cursor.fetchone()
 
-            new_entry = f"{article_url} {account_login}"
+        new_entry = f"{article_url} {account_login}"
+
+        if row and row[0]:
+            updated_value = f"{row[0]} | {new_entry}"
+        else:
+            updated_value = new_entry
 
-            if row and row[0]:
-                updated_value = f"{row[0]} | {new_entry}"
-            else:
-                updated_value = new_entry
+        # Обновляем поле
+        cursor.execute("UPDATE Xlsx SET urls_accounts = ? WHERE id = ?", (updated_value, int(xlsx_id)))
 
-            # Обновляем поле
-            cursor.execute("UPDATE Xlsx SET urls_accounts = ? WHERE id = ?", (updated_value, int(xlsx_id)))
-            connection.commit()
+    try:
+        await run_write(DB_XLSX_DIRECTORY, append_url)
     except Exception as e:
         log.debug(f"Произошла ошибка при обновлении данных ключа в базе данных: {str(e)}")
 
@@ -447,13 +385,7 @@ async def update_status_db(status: str):
     """Обновление статуса в базе данных"""
 
     try:
-        with sqlite3.connect(DB_ARTICLES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE ArticlesStatus SET status = ? WHERE id = 1",
-                (status,)
-            )
-            connection.commit()
+        await execute(DB_ARTICLES_DIRECTORY, "UPDATE ArticlesStatus SET status = ? WHERE id = 1", (status,))
     except Exception as e:
         log.debug(f"Произошла ошибка при обновлении статуса в базе данных: {str(e)}")
 
@@ -462,23 +394,17 @@ async def get_generated_articles(account_mark, blacklist_articles):
 
     blacklist_ids = [int(id_) for id_ in blacklist_articles.splitlines() if id_.strip().isdigit()]
 
-    with sqlite3.connect(DB_ARTICLES_DIRECTORY, timeout=TIMEOUT_DELAY) as conn:
-        cursor = conn.cursor()
-
-        query = """SELECT id, article_text, article_image 
-                   FROM Articles 
-                   WHERE marks = ?"""
-        params = [account_mark]
+    query = """SELECT id, article_text, article_image 
+               FROM Articles 
+               WHERE marks = ?"""
+    params = [account_mark]
 
-        if blacklist_ids:
-            placeholders = ",".join("?" * len(blacklist_ids))
-            query += f" AND id NOT IN ({placeholders})"
-            params.extend(blacklist_ids)
+    if blacklist_ids:
+        placeholders = ",".join("?" * len(blacklist_ids))
+        query += f" AND id NOT IN ({placeholders})"
+        params.extend(blacklist_ids)
 
-        cursor.execute(query, params)
-        articles = cursor.fetchall()
-
-    return articles
+    return await fetchall(DB_ARTICLES_DIRECTORY, query, params)
 
 async def data_upload_v1(task_name, account_mark, list_articles):
    """Загрузка необходимых данных"""
@@ -487,66 +413,25 @@ async def data_upload_v1(task_name, account_mark, list_articles):
    articles = await get_articles_by_ids(task_name, account_mark)
    white_list_articles = list(map(int, list_articles.strip().split("\n")))
 
-   connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-   cursor = connection.cursor()
-   cursor.execute("SELECT timeout_posting_articles, flag_posting_db FROM TasksSettings WHERE id = 1")
-   timeout_articles, flag = cursor.fetchone()
-   connection.close()
-
-   if timeout_articles == '-':
-       with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-          cursor = connection.cursor()
-          cursor.execute("SELECT timeout_posting_articles FROM TasksSettings WHERE id = 1")
-          timeout_articles = cursor.fetchone()[0]
+   settings = await get_settings(task_name)
 
-   if flag == '-':
-      with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-         cursor = connection.cursor()
-         cursor.execute("SELECT flag_posting_db FROM TasksSettings WHERE id = 1")
-         flag = cursor.fetchone()[0]
-
-   return account, articles, white_list_articles, timeout_articles, flag
+   return account, articles, white_list_articles, settings['timeout_posting_articles'], settings['flag_posting_db']
 
 async def data_upload_v2(task_name, account_mark, list_skip_prompts):
    account = await get_account_by_mark(account_mark)
    prompts = await get_all_prompts(task_name)
    white_list_skip_prompts = list(map(int, list_skip_prompts.strip().split("\n")))
 
-   connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-   cursor = connection.cursor()
-   cursor.execute("SELECT timeout_posting_articles FROM TasksSettings WHERE id = 1")
-   timeout_articles = cursor.fetchone()[0]
-   connection.close()
-
-   with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-      cursor = connection.cursor()
-      if timeout_articles == '-':
-         cursor.execute("SELECT timeout_posting_articles FROM TasksSettings WHERE id = 1")
-         timeout_articles = cursor.fetchone()[0]
+   settings = await get_settings(task_name)
 
-   connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-   cursor = connection.cursor()
-   cursor.execute("SELECT flag_posting_db FROM TasksSettings WHERE id = 1")
-   flag = cursor.fetchone()[0]
-   connection.close()
-
-   if flag == '-':
-      with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-         cursor = connection.cursor()
-         cursor.execute("SELECT flag_posting_db FROM TasksSettings WHERE id = 1")
-         flag = cursor.fetchone()[0]
-
-   return account, prompts, white_list_skip_prompts, timeout_articles, flag
+   return account, prompts, white_list_skip_prompts, settings['timeout_posting_articles'], settings['flag_posting_db']
 
 async def data_upload_v3(account_mark, source_mark, blacklist_articles):
     """Получение необходимых ресурсов"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT timeout_posting_articles FROM TasksSettings WHERE id = 1")
-        timeout_articles = int(cursor.fetchone()[0])
-        cursor.execute("SELECT flag_posting_db FROM TasksSettings WHERE id = 1")
-        flag = cursor.fetchone()[0]
+    settings = await get_settings()
+    timeout_articles = settings['timeout_posting_articles']
+    flag = settings['flag_posting_db']
 
     account = await get_account_by_mark(account_mark)
     articles = await get_generated_articles(source_mark, blacklist_articles)
@@ -560,71 +445,68 @@ async def posting_article_server(platform,
                                  currents_replace,
                                  new_replace
                                 ):
-    if accessToken == '-':
-        auth, account_info, platform_accessToken = platform.platform_authorization_v2()
-
-        with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Accounts SET "
-                "accessToken = ?"
-                "WHERE id = ?",
-                (platform_accessToken, account_id)
-            )
-            connection.commit()
+    token_cached = await restore_token(platform)
+
+    if token_cached:
+        # Действующий токен и ID пользователя уже известны, запрос subsite/me не нужен
+        auth, account_info = True, ''
+        user_data, user_info = True, '-'
     else:
-        auth = True
-        account_info = ''
-        platform.accessToken = accessToken
+        if accessToken == '-':
+            auth, account_info, platform_accessToken = await platform.platform_authorization_v2()
 
-    await asyncio.sleep(randint(1, 3))
+            await save_access_token(DB_MAIN_ACCOUNTS_DIRECTORY, account_id, platform_accessToken)
+        else:
+            auth = True
+            account_info = ''
+            platform.accessToken = accessToken
 
-    user_data, user_info = platform.platform_get_user_data()
+        await asyncio.sleep(randint(1, 3))
 
-    if not user_data:
-        await asyncio.sleep(randint(2, 3))
+        user_data, user_info = await platform.platform_get_user_data()
 
-        auth, account_info, platform_accessToken = platform.platform_authorization_v2()
+        if not user_data:
+            await asyncio.sleep(randint(2, 3))
 
-        with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Accounts SET "
-                "accessToken = ?"
-                "WHERE id = ?",
-                (platform_accessToken, account_id)
-            )
-            connection.commit()
+            auth, account_info, platform_accessToken = await platform.platform_authorization_v2()
 
-        if auth:
-            await asyncio.sleep(randint(2, 3))
-            user_data, user_info = platform.platform_get_user_data()
+            await save_access_token(DB_MAIN_ACCOUNTS_DIRECTORY, account_id, platform_accessToken)
+
+            if auth:
+                await asyncio.sleep(randint(2, 3))
+                user_data, user_info = await platform.platform_get_user_data()
+
+    if user_data:
+        await remember_token(platform)
 
     await asyncio.sleep(randint(1, 3))
 
     publishing, article_url, publishing_info = await platform.platform_publishing_server(article_path, currents_replace, new_replace)
 
+    if (not publishing) and ('401' in str(publishing_info)) and await refresh_token(platform, force=True):
+        # Токен отклонён площадкой: сначала пробуем обновить его без повторной авторизации
+        publishing, article_url, publishing_info = await platform.platform_publishing_server(article_path, currents_replace, new_replace)
+
     if (not publishing) and ('401' in str(publishing_info)):
+        await forget_token(platform)
         await asyncio.sleep(60)
 
-        auth, account_info, platform_accessToken = platform.platform_authorization_v2()
+        auth, account_info, platform_accessToken = await platform.platform_authorization_v2()
 
         if not user_data:
             await asyncio.sleep(randint(2, 3))
-            user_data, user_info = platform.platform_get_user_data()
-
-        with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Accounts SET "
-                "accessToken = ?"
-                "WHERE id = ?",
-                (platform_accessToken, account_id)
-            )
-            connection.commit()
+            user_data, user_info = await platform.platform_get_user_data()
+
+        await save_access_token(DB_MAIN_ACCOUNTS_DIRECTORY, account_id, platform_accessToken)
 
         publishing, article_url, publishing_info = await platform.platform_publishing_server(article_path, currents_replace, new_replace)
 
+    if publishing:
+        await remember_token(platform)
+    elif token_cached and '401' not in str(publishing_info):
+        # Данные пользователя не запрашивались: проверяем, не заблокирован ли аккаунт
+        user_data, user_info = await platform.platform_get_user_data()
+
     return (auth,
             account_info,
             user_data,
@@ -636,52 +518,17 @@ async def posting_article_server(platform,
 async def init_link_indexing_param_v1(task_name):
     """Инициализация параметров индексации"""
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("SELECT indexing FROM TasksSettings WHERE id = 1")
-    indexing = cursor.fetchone()[0]
-    connection.close()
-
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-
-        if indexing == '-':
-            cursor.execute("SELECT indexing FROM TasksSettings WHERE id = 1")
-            indexing = cursor.fetchone()[0]
+    settings = await get_settings(task_name)
 
-    indexing = True if indexing == 'True' else False
+    indexing = settings['indexing']
     indexing_obj = None
     searchengine = None
 
     if indexing:
-        connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-        cursor = connection.cursor()
-        cursor.execute("SELECT user_id, api_key, searchengine, se_type FROM TasksSettings WHERE id = 1")
-        user_id, api_key, searchengine, se_type = cursor.fetchone()
-        connection.close()
-
-        with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-
-            if user_id == '-':
-                cursor.execute("SELECT user_id FROM TasksSettings WHERE id = 1")
-                user_id = cursor.fetchone()[0]
-
-            if api_key == '-':
-                cursor.execute("SELECT api_key FROM TasksSettings WHERE id = 1")
-                api_key = cursor.fetchone()[0]
-
-            if searchengine == '-':
-                cursor.execute("SELECT searchengine FROM TasksSettings WHERE id = 1")
-                searchengine = cursor.fetchone()[0]
-
-            if se_type == '-':
-                cursor.execute("SELECT se_type FROM TasksSettings WHERE id = 1")
-                se_type = cursor.fetchone()[0]
-
-        indexing_obj = LinkIndexing(api_key=api_key,
-                                    user_id=user_id,
-                                    se_type=se_type,
+        searchengine = settings['searchengine']
+        indexing_obj = LinkIndexing(api_key=settings['api_key'],
+                                    user_id=settings['user_id'],
+                                    se_type=settings['se_type'],
                                     task=task_name)
 
     return indexing, indexing_obj, searchengine
@@ -689,24 +536,17 @@ async def init_link_indexing_param_v1(task_name):
 async def init_link_indexing_param_v2():
     """Инициализация параметров индексации"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT indexing FROM TasksSettings WHERE id = 1")
-        indexing = cursor.fetchone()[0]
+    settings = await get_settings()
 
-    indexing = True if indexing == 'True' else False
+    indexing = settings['indexing']
     indexing_obj = None
     searchengine = None
 
     if indexing:
-        with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute("SELECT user_id, api_key, searchengine, se_type FROM TasksSettings WHERE id = 1")
-            user_id, api_key, searchengine, se_type = cursor.fetchone()
-
-        indexing_obj = LinkIndexing(api_key=api_key,
-                                    user_id=user_id,
-                                    se_type=se_type,
+        searchengine = settings['searchengine']
+        indexing_obj = LinkIndexing(api_key=settings['api_key'],
+                                    user_id=settings['user_id'],
+                                    se_type=settings['se_type'],
                                     task='-')
 
-    return indexing, indexing_obj, searchengine
\ No newline at end of file
+    return indexing, indexing_obj, searchengine
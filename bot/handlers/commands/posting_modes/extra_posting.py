@@ -1,17 +1,20 @@
 import asyncio
-import sqlite3
-from random import randint
 
-from bot.config import TIMEOUT_DELAY, DB_MAIN_ACCOUNTS_DIRECTORY, DB_DIRECTORY, DB_OPENAI_API_KEY_DIRECTORY, \
-   DB_ARTICLES_DIRECTORY, DB_TASK_DIRECTORY
+from bot.config import DB_MAIN_ACCOUNTS_DIRECTORY, DB_DIRECTORY, DB_OPENAI_API_KEY_DIRECTORY, \
+   DB_ARTICLES_DIRECTORY
+from bot.databases.db_gateway import fetchone, execute
+from bot.handlers.commands.account_slots import account_lease
 from bot.handlers.commands.api.dtf_api import DtfApi
-from bot.handlers.commands.api.openai_api import send_prompt_to_chatgpt_text, send_prompt_to_chatgpt_image
+from bot.handlers.commands.api.openai_api import send_prompt_to_chatgpt_article
 from bot.handlers.commands.api.vc_api import VcApi
+from bot.handlers.commands.checkpoints import load_progress, save_progress
+from bot.handlers.commands.indexing_outbox import enqueue_indexing
 from bot.handlers.commands.logging import get_task_logger
 from bot.handlers.commands.posting_modes.common import (bot_message, mark_prompt_as_used,
                                                         save_article_to_db, posting_article,
                                                         data_upload_v2, data_upload_v1, init_link_indexing_param_v1,
-                                                        update_keys_data)
+                                                        update_keys_data, save_access_token)
+from bot.handlers.commands.tasks_settings import get_setting
 
 
 async def additional_public_db(event, task_name, account_mark, list_articles, chat_id):
@@ -26,10 +29,7 @@ async def additional_public_db(event, task_name, account_mark, list_articles, ch
                                                                                          list_articles)
    await event.wait()
 
-   with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-      cursor = connection.cursor()
-      cursor.execute("SELECT articles_links_count FROM TasksSettings WHERE id = 1")
-      posts_amount = int(cursor.fetchone()[0])
+   posts_amount = await get_setting('articles_links_count')
 
    await event.wait()
 
@@ -41,7 +41,8 @@ async def additional_public_db(event, task_name, account_mark, list_articles, ch
                                                    f'Информация будет приходить в виде сообщений.')
    await event.wait()
 
-   articles_publishing = 0
+   progress = await load_progress()
+   articles_publishing = progress.get('published', 0)
 
    account_id, account_email, account_password, account_login,\
    proxy_ip, proxy_port, proxy_login, proxy_password,\
@@ -59,7 +60,10 @@ async def additional_public_db(event, task_name, account_mark, list_articles, ch
       posts_amount=posts_amount
    )
 
-   platform.is_published = True if flag == 'True' else False
+   platform.is_published = flag
+
+   # Статьи, отработанные до перезапуска бота
+   processed_articles = set(progress.get('processed', []))
 
    # Публикация ранее сгенерированных статей на изменённый аккаунт по ID
    for article in articles:
@@ -67,17 +71,18 @@ async def additional_public_db(event, task_name, account_mark, list_articles, ch
       try:
          article_id, article_text, article_image, xlsx_id = article
 
-         if not int(article_id) in white_list_articles:
+         if not int(article_id) in white_list_articles or int(article_id) in processed_articles:
             continue
 
-         auth, account_info, user_data, user_info, image_upload, image_info, publishing, \
-            article_url, publishing_info = await posting_article(platform,
-                                                                 account_id,
-                                                                 accessToken,
-                                                                 DB_MAIN_ACCOUNTS_DIRECTORY,
-                                                                 article_text,
-                                                                 article_image
-                                                                 )
+         async with account_lease(account_mark):
+            auth, account_info, user_data, user_info, image_upload, image_info, publishing, \
+               article_url, publishing_info = await posting_article(platform,
+                                                                    account_id,
+                                                                    accessToken,
+                                                                    DB_MAIN_ACCOUNTS_DIRECTORY,
+                                                                    article_text,
+                                                                    article_image
+                                                                    )
          await event.wait()
 
          if auth and user_data and publishing and image_upload:
@@ -85,17 +90,7 @@ async def additional_public_db(event, task_name, account_mark, list_articles, ch
             await update_keys_data(xlsx_id, article_url, account_login)
             await event.wait()
             if indexing:
-               for search in searchengine.split('+'):
-                  await event.wait()
-                  indexing_post, indexing_info = indexing_obj.link_indexing(article_url, search)
-                  if not indexing_post:
-                     text = (f'<a href="{article_url}">Ссылка</a> не отправлена на индексацию.\n\n'
-                             f'<b>Поисковик:</b> {search}\n'
-                             f'<b>Причина:</b> {indexing_info}')
-                     await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) ' + text)
-                     task_log.debug(text)
-                  await asyncio.sleep(2)
-                  await event.wait()
+               await enqueue_indexing(indexing_obj, searchengine, article_url, chat_id)
             task_log.debug(f"Статья (ID) {article_id} опубликована на {account_email} в режиме постинга из БД.")
             articles_publishing += 1
          else:
@@ -109,16 +104,13 @@ async def additional_public_db(event, task_name, account_mark, list_articles, ch
                     f"Статья (ID): {article_id}\n\n"
                     f"Информация:\n" + info)
 
-            connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-            cursor = connection.cursor()
-            cursor.execute(
+            await execute(
+               DB_DIRECTORY + task_name + '.db',
                "UPDATE Articles SET "
                "status = ?"
                "WHERE id = ?",
                (text, article_id)
             )
-            connection.commit()
-            connection.close()
 
             await event.wait()
 
@@ -127,19 +119,11 @@ async def additional_public_db(event, task_name, account_mark, list_articles, ch
             await event.wait()
 
             if user_info == 'Аккаунт заблокирован':
-               with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                  cursor = connection.cursor()
-                  cursor.execute(
-                     "UPDATE Accounts SET "
-                     "accessToken = ?"
-                     "WHERE id = ?",
-                     ('-', account_id)
-                  )
-                  connection.commit()
-                  await bot_message(chat_id=chat_id,
-                                    text='Процесс публикации статей из базы данных завершён из-за критической ошибки: '
-                                         'аккаунт заблокирован.')
-                  return
+               await save_access_token(DB_MAIN_ACCOUNTS_DIRECTORY, account_id, '-')
+               await bot_message(chat_id=chat_id,
+                                 text='Процесс публикации статей из базы данных завершён из-за критической ошибки: '
+                                      'аккаунт заблокирован.')
+               return
 
       except Exception as e:
          text = f"Ошибка публикации статьи (ID) {article_id} для аккаунта (ID) {account_id} в режиме постинга из БД: {e}"
@@ -147,6 +131,9 @@ async def additional_public_db(event, task_name, account_mark, list_articles, ch
          await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) '+text)
          await event.wait()
 
+      processed_articles.add(int(article_id))
+      await save_progress(processed=list(processed_articles), published=articles_publishing)
+
       await event.wait()
       await asyncio.sleep(int(timeout_articles))
       await event.wait()
@@ -168,10 +155,7 @@ async def additional_public_prompts_skip(event, task_name, list_skip_prompts, ac
    indexing, indexing_obj, searchengine = await init_link_indexing_param_v1(task_name)
    await event.wait()
 
-   with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-      cursor = connection.cursor()
-      cursor.execute("SELECT articles_links_count FROM TasksSettings WHERE id = 1")
-      posts_amount = int(cursor.fetchone()[0])
+   posts_amount = await get_setting('articles_links_count')
    await event.wait()
 
 
@@ -181,7 +165,12 @@ async def additional_public_prompts_skip(event, task_name, list_skip_prompts, ac
                                                    f'Информация будет приходить в виде сообщений.')
    await event.wait()
 
-   articles_publishing = 0
+   # Промты, отработанные до перезапуска бота, и статьи, сгенерированные, но ещё не опубликованные
+   progress = await load_progress()
+   processed_prompts = set(progress.get('processed', []))
+   generated_articles = progress.get('generated', {})
+
+   articles_publishing = progress.get('published', 0)
 
    account_id, account_email, account_password, account_login,\
    proxy_ip, proxy_port, proxy_login, proxy_password,\
@@ -199,30 +188,34 @@ async def additional_public_prompts_skip(event, task_name, list_skip_prompts, ac
       posts_amount=posts_amount
    )
 
-   platform.is_published = True if flag == 'True' else False
+   platform.is_published = flag
 
    for prompt in prompts:
       await event.wait()
       prompt_id, prompt_text, prompt_theme, prompt_marks, xlsx_id = prompt
 
-      if not int(prompt_id) in white_list_skip_prompts:
+      if not int(prompt_id) in white_list_skip_prompts or int(prompt_id) in processed_prompts:
          continue
 
-      if prompt_marks is None or account_mark not in prompt_marks:
-         try:
-            # Генерация текста
-            result_text, result_text_info = await send_prompt_to_chatgpt_text(prompt_text, task_name)
-            await event.wait()
-            await asyncio.sleep(randint(1, 3))
+      generated_article = None
 
-            if result_text:
-               # Генерация изображения
-               result_image, result_image_path = await send_prompt_to_chatgpt_image(prompt_theme, task_name)
-               await event.wait()
+      if str(prompt_id) in generated_articles:
+         generated_article = await fetchone(DB_DIRECTORY + task_name + '.db',
+                                            "SELECT id, article_text, article_image FROM Articles WHERE id = ?",
+                                            (generated_articles[str(prompt_id)],))
+
+      if generated_article or prompt_marks is None or account_mark not in prompt_marks:
+         try:
+            if generated_article:
+               article_id, result_text, result_image_path = generated_article
+               result_text_info, result_image = '-', True
             else:
-               result_image, result_image_path = False, '-'
+               # Генерация текста и изображения
+               result_text, result_text_info, result_image, result_image_path = \
+                  await send_prompt_to_chatgpt_article(prompt_text, prompt_theme, task_name)
+            await event.wait()
 
-            if result_text and result_image:
+            if result_text and result_image and not generated_article:
                await mark_prompt_as_used(task_name, prompt_id, account_id, account_url)
                await event.wait()
 
@@ -238,22 +231,28 @@ async def additional_public_prompts_skip(event, task_name, list_skip_prompts, ac
 
                acc_mark = f"{"vc" if "vc" in account_url.lower() else "dtf"}-{account_id}"
 
-               with sqlite3.connect(DB_ARTICLES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                  cursor = connection.cursor()
-                  cursor.execute("INSERT INTO Articles (article_text, article_image, marks) VALUES (?, ?, ?)",
-                                 (result_text, result_image_path, acc_mark))
-                  connection.commit()
+               await execute(
+                  DB_ARTICLES_DIRECTORY,
+                  "INSERT INTO Articles (article_text, article_image, marks) VALUES (?, ?, ?)",
+                  (result_text, result_image_path, acc_mark)
+               )
+
+               # После перезапуска бота статья будет опубликована без повторной генерации
+               generated_articles[str(prompt_id)] = article_id
+               await save_progress(generated=generated_articles)
 
                await event.wait()
 
-               auth, account_info, user_data, user_info, image_upload, image_info, publishing, \
-                  article_url, publishing_info = await posting_article(platform,
-                                                                       account_id,
-                                                                       accessToken,
-                                                                       DB_MAIN_ACCOUNTS_DIRECTORY,
-                                                                       result_text,
-                                                                       result_image_path
-                                                                       )
+            if result_text and result_image:
+               async with account_lease(account_mark):
+                  auth, account_info, user_data, user_info, image_upload, image_info, publishing, \
+                     article_url, publishing_info = await posting_article(platform,
+                                                                          account_id,
+                                                                          accessToken,
+                                                                          DB_MAIN_ACCOUNTS_DIRECTORY,
+                                                                          result_text,
+                                                                          result_image_path
+                                                                          )
                await event.wait()
 
                if auth and user_data and publishing and image_upload:
@@ -262,16 +261,7 @@ async def additional_public_prompts_skip(event, task_name, list_skip_prompts, ac
                   await event.wait()
 
                   if indexing:
-                     for search in searchengine.split('+'):
-                        indexing_post, indexing_info = indexing_obj.link_indexing(article_url, search)
-                        if not indexing_post:
-                           text = (f'<a href="{article_url}">Ссылка</a> не отправлена на индексацию.\n\n'
-                                   f'<b>Поисковик:</b> {search}\n'
-                                   f'<b>Причина:</b> {indexing_info}')
-                           await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) ' + text)
-                           task_log.debug(text)
-                        await asyncio.sleep(2)
-                        await event.wait()
+                     await enqueue_indexing(indexing_obj, searchengine, article_url, chat_id)
                   task_log.debug(f"Статья (ID) {article_id} опубликована на {account_email} в режиме генерации пропусков.")
                   articles_publishing += 1
                else:
@@ -285,16 +275,13 @@ async def additional_public_prompts_skip(event, task_name, list_skip_prompts, ac
                           f"Аккаунт (ID): {account_id}. Статья (ID): {article_id}\n\n"
                           f"Информация:\n" + info)
 
-                  connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-                  cursor = connection.cursor()
-                  cursor.execute(
+                  await execute(
+                     DB_DIRECTORY + task_name + '.db',
                      "UPDATE Articles SET "
                      "status = ?"
                      "WHERE id = ?",
                      (text, article_id)
                   )
-                  connection.commit()
-                  connection.close()
                   await event.wait()
 
                   await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) '+text)
@@ -302,30 +289,19 @@ async def additional_public_prompts_skip(event, task_name, list_skip_prompts, ac
                   await event.wait()
 
                   if user_info == 'Аккаунт заблокирован':
-                     with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                        cursor = connection.cursor()
-                        cursor.execute(
-                           "UPDATE Accounts SET "
-                           "accessToken = ?"
-                           "WHERE id = ?",
-                           ('-', account_id)
-                        )
-                        connection.commit()
-                        await bot_message(chat_id=chat_id,
-                                          text='Процесс генерации пропусков завершён из-за критической ошибки: '
-                                               'аккаунт заблокирован.')
-                        return
-
-               connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-               cursor = connection.cursor()
-               cursor.execute(
+                     await save_access_token(DB_MAIN_ACCOUNTS_DIRECTORY, account_id, '-')
+                     await bot_message(chat_id=chat_id,
+                                       text='Процесс генерации пропусков завершён из-за критической ошибки: '
+                                            'аккаунт заблокирован.')
+                     return
+
+               await execute(
+                  DB_DIRECTORY + task_name + '.db',
                   "UPDATE Articles SET "
                   "xlsx_id = ?"
                   "WHERE id = ?",
                   (str(xlsx_id), article_id)
                )
-               connection.commit()
-               connection.close()
 
             else:
                if result_text_info == 'content_policy_violation':
@@ -342,24 +318,13 @@ async def additional_public_prompts_skip(event, task_name, list_skip_prompts, ac
                   await bot_message(chat_id=chat_id, text=text+f' (<b>{task_name}</b>)')
                   await event.wait()
 
-                  with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                     cursor = connection.cursor()
-                     cursor.execute(
-                        "SELECT api_key FROM ApiKey WHERE id = 1"
-                     )
-                     last_api_key = cursor.fetchone()[0]
-                     api_key = last_api_key
+                  last_api_key = (await fetchone(DB_OPENAI_API_KEY_DIRECTORY, "SELECT api_key FROM ApiKey WHERE id = 1"))[0]
+                  api_key = last_api_key
                   await event.wait()
 
                   while last_api_key == api_key:
-
-                     with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                        cursor = connection.cursor()
-                        cursor.execute(
-                           "SELECT api_key FROM ApiKey WHERE id = 1"
-                        )
-                        api_key = cursor.fetchone()[0]
-                        await asyncio.sleep(5)
+                     api_key = (await fetchone(DB_OPENAI_API_KEY_DIRECTORY, "SELECT api_key FROM ApiKey WHERE id = 1"))[0]
+                     await asyncio.sleep(5)
                      await event.wait()
                else:
                   if result_image_path == 'content_policy_violation_image':
@@ -384,6 +349,11 @@ async def additional_public_prompts_skip(event, task_name, list_skip_prompts, ac
             task_log.debug(text)
             await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) '+text)
 
+      processed_prompts.add(int(prompt_id))
+      generated_articles.pop(str(prompt_id), None)
+      await save_progress(processed=list(processed_prompts), generated=generated_articles,
+                          published=articles_publishing)
+
       text = f"Задержка {int(timeout_articles) / 60} мин. перед следующим аккаунтом. Режим генерации пропусков."
       task_log.debug(text)
       await event.wait()
@@ -1,20 +1,30 @@
 import asyncio
 import os
-import sqlite3
 import logging
-
-from random import randint
-
-from bot.config import DB_TASK_DIRECTORY, TIMEOUT_DELAY, DB_DIRECTORY, DB_MAIN_ACCOUNTS_DIRECTORY, \
-    DB_MULTI_ACCOUNTS_DIRECTORY, DB_PATTERNS_DIRECTORY, DB_OPENAI_API_KEY_DIRECTORY, DB_ARTICLES_DIRECTORY
+import time
+
+from bot.config import DB_TASK_DIRECTORY, DB_DIRECTORY, DB_MAIN_ACCOUNTS_DIRECTORY, \
+    DB_MULTI_ACCOUNTS_DIRECTORY, DB_PATTERNS_DIRECTORY, DB_OPENAI_API_KEY_DIRECTORY, DB_ARTICLES_DIRECTORY, PIPELINE_PREFETCH, \
+    PARALLEL_ACCOUNTS, WORK_RETRY_DELAY
+from bot.databases.db_gateway import execute, fetchone
+from bot.handlers.commands.account_slots import account_lease
+from bot.handlers.commands.checkpoints import load_progress, save_progress
+from bot.handlers.commands.indexing_outbox import enqueue_indexing
 from bot.handlers.commands.api.dtf_api import DtfApi
-from bot.handlers.commands.api.openai_api import send_prompt_to_chatgpt_text, send_prompt_to_chatgpt_image
+from bot.handlers.commands.api.openai_api import send_prompt_to_chatgpt_article, send_prompt_to_chatgpt_image
+from bot.handlers.commands.api.openai_batch import claim_pregenerated_text, release_pregenerated_text
 from bot.handlers.commands.api.vc_api import VcApi
 from bot.handlers.commands.logging import get_task_logger
+from bot.handlers.commands.tasks_settings import get_settings
+from bot.handlers.commands.task_status import get_task_status
 from bot.handlers.commands.commands_manager import CommandsManager
 from bot.handlers.commands.posting_modes.common import mark_prompt_as_used, save_article_to_db, posting_article, \
-    bot_message, get_priority_prompts, get_prompts, get_accounts, init_link_indexing_param_v1, get_account_by_mark_v2, \
+    bot_message, get_priority_prompts, get_accounts, init_link_indexing_param_v1, get_account_by_mark_v2, \
     update_keys_data
+from bot.handlers.commands.posting_modes.pipeline import AccountRateLimiter, run_pipeline, run_account_workers
+from bot.handlers.commands.posting_modes.work_queue import WORK_DONE, WORK_FAILED, WORK_SKIPPED, \
+    reset_work_items, sync_work_items, next_work_round, next_eligible_time, round_accounts, claim_work_item, \
+    complete_work_item, attach_work_article, retry_work_item, skip_account_work, count_work_items
 
 task_pause_events = {}
 
@@ -48,33 +58,25 @@ async def toggle_pause(task_name):
         task_pause_events[task_name].set()  # Снять паузу
         task_log.debug(f"{task_name} возобновлено.")
 
+    # После перезапуска бота задание возобновится в том же состоянии
+    await save_progress(task_name, paused=not task_pause_events[task_name].is_set())
+
 async def is_delete(task_name: str) -> bool:
     """Проверка на существование задания"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT 1 FROM Tasks WHERE task_name = ?", (task_name,))
-        task_exists = cursor.fetchone()
-
-        if not task_exists:
-            return True
-
-    return False
+    return get_task_status(task_name) is None
 
 async def update_article_mark_multi(db_path, article_id, account_login, article_url):
     """Обновление отметки статьи в базе данных после успешной публикации (Мульти-режим)"""
 
-    connection = sqlite3.connect(db_path, timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute(
+    await execute(
+        db_path,
         "UPDATE Articles SET "
         "account_login = ?, "
         "article_url = ?"
         "WHERE id = ?",
         (account_login, article_url, article_id)
     )
-    connection.commit()
-    connection.close()
 
 async def check_load_all_data(task_name, DB_ACCOUNTS, task_type):
     """Проверка загрузки всех необходимых ресурсов"""
@@ -82,35 +84,18 @@ async def check_load_all_data(task_name, DB_ACCOUNTS, task_type):
     all_resources_reload = False
 
     while not all_resources_reload:
-        with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as conn_api:
-            cursor_api = conn_api.cursor()
-            cursor_api.execute("SELECT api_key FROM ApiKey WHERE id = 1")
-            api_key = cursor_api.fetchone()[0]
-
-        with sqlite3.connect(DB_ACCOUNTS, timeout=TIMEOUT_DELAY) as conn_accounts:
-            cursor_accounts = conn_accounts.cursor()
-            cursor_accounts.execute("SELECT COUNT(*) FROM Accounts")
-            accounts_count = cursor_accounts.fetchone()[0]
-
-        with sqlite3.connect(DB_PATTERNS_DIRECTORY, timeout=TIMEOUT_DELAY) as conn_templates:
-            cursor_templates = conn_templates.cursor()
-            cursor_templates.execute("SELECT COUNT(*) FROM Patterns")
-            patterns_count = cursor_templates.fetchone()[0]
-
-        connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-        cursor = connection.cursor()
-        cursor.execute("SELECT COUNT(*) FROM Prompts")
-        prompts_count = cursor.fetchone()[0]
-        connection.commit()
-        connection.close()
+        api_key = (await fetchone(DB_OPENAI_API_KEY_DIRECTORY, "SELECT api_key FROM ApiKey WHERE id = 1"))[0]
+
+        accounts_count = (await fetchone(DB_ACCOUNTS, "SELECT COUNT(*) FROM Accounts"))[0]
+
+        patterns_count = (await fetchone(DB_PATTERNS_DIRECTORY, "SELECT COUNT(*) FROM Patterns"))[0]
+
+        prompts_count = (await fetchone(DB_DIRECTORY + task_name + '.db', "SELECT COUNT(*) FROM Prompts"))[0]
 
         await pause_handler(task_name)
 
         if task_type != 'Основной':
-            with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                cursor = connection.cursor()
-                cursor.execute("SELECT delay, posts_count FROM Tasks WHERE task_name = ?", (task_name,))
-                delay, posts_count = cursor.fetchone()
+            delay, posts_count = await fetchone(DB_TASK_DIRECTORY, "SELECT delay, posts_count FROM Tasks WHERE task_name = ?", (task_name,))
 
         if accounts_count == 0 or patterns_count == 0 or prompts_count == 0 or api_key == '-':
             await asyncio.sleep(5)
@@ -130,7 +115,14 @@ async def run_task_script(event, task_name, task_type, chat_id, choice_account)
     task_log = get_task_logger(task_name)
     DB_ACCOUNTS = DB_MAIN_ACCOUNTS_DIRECTORY if task_type == 'Основной' else DB_MULTI_ACCOUNTS_DIRECTORY
 
-    await toggle_pause(task_name)
+    # Прогресс, сохранённый до перезапуска бота (пусто — задание запускается впервые)
+    progress = await load_progress(task_name)
+    resumed = bool(progress)
+
+    # Новое задание запускается на паузе, возобновлённое — в состоянии до перезапуска
+    if progress.get('paused', True):
+        await toggle_pause(task_name)
+
     await pause_handler(task_name)
 
     try:
@@ -143,50 +135,18 @@ async def run_task_script(event, task_name, task_type, chat_id, choice_account)
         await pause_handler(task_name)
 
         if task_type == 'Основной':
-            with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                cursor = connection.cursor()
-                cursor.execute("SELECT articles_links_count FROM TasksSettings WHERE id = 1")
-                posts_amount = int(cursor.fetchone()[0])
-
-            await pause_handler(task_name)
-
-            connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-            cursor = connection.cursor()
-            cursor.execute("SELECT timeout_task_cycle, timeout_posting_articles FROM TasksSettings WHERE id = 1")
-            timeout_cycle, timeout_articles = cursor.fetchone()
-            connection.close()
-
-            await pause_handler(task_name)
-
-            with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                cursor = connection.cursor()
-                if timeout_cycle == '-':
-                    cursor.execute("SELECT timeout_task_cycle FROM TasksSettings WHERE id = 1")
-                    timeout_cycle = cursor.fetchone()[0]
-                if timeout_articles == '-':
-                    cursor.execute("SELECT timeout_posting_articles FROM TasksSettings WHERE id = 1")
-                    timeout_articles = cursor.fetchone()[0]
-
-            await pause_handler(task_name)
-
-            connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-            cursor = connection.cursor()
-            cursor.execute("SELECT flag_posting_for_main FROM TasksSettings WHERE id = 1")
-            flag_posting_for_main = cursor.fetchone()[0]
-            connection.close()
-
-            if flag_posting_for_main == '-':
-                with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                    cursor = connection.cursor()
-                    cursor.execute("SELECT flag_posting_for_main FROM TasksSettings WHERE id = 1")
-                    flag_posting_for_main = cursor.fetchone()[0]
+            # Все настройки задания читаются одним обращением (с подстановкой общих значений)
+            settings = await get_settings(task_name)
+            posts_amount = settings['articles_links_count']
+            timeout_cycle = settings['timeout_task_cycle']
+            timeout_articles = settings['timeout_posting_articles']
+            flag_posting_for_main = settings['flag_posting_for_main']
         else:
-            with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                cursor = connection.cursor()
-                cursor.execute("SELECT delay, posts_count FROM Tasks WHERE task_name = ?", (task_name,))
-                delay, posts_count = cursor.fetchone()
+            delay, posts_count = await fetchone(DB_TASK_DIRECTORY, "SELECT delay, posts_count FROM Tasks WHERE task_name = ?", (task_name,))
+
+            posts_amount = None
 
-        prompts = await get_prompts(DB_DIRECTORY + task_name + '.db', priority_prompt_ids)
+        db_path = DB_DIRECTORY + task_name + '.db'
 
         await pause_handler(task_name)
 
@@ -195,371 +155,403 @@ async def run_task_script(event, task_name, task_type, chat_id, choice_account)
         else:
             accounts = await get_accounts(DB_ACCOUNTS)
 
-        total_prompts = len(prompts)  # Всего промтов
-        total_accounts = len(accounts) # Всего аккаунтов
+        # Пары (промт, аккаунт) хранятся в таблице WorkItems базы задания, поэтому прогресс
+        # сохраняется между запусками, а следующая пара выбирается одним запросом по индексу
+        await reset_work_items(db_path, priority_prompt_ids, reopen_skipped=not resumed)
 
-        articles_publishing = 0  # Количество опубликованных статей
-        published_combinations = set()  # Отслеживание опубликованных комбинаций
-        banned_list = set() # Множество заблокированных аккаунтов
-        max_combinations = total_prompts * total_accounts # Максимальное количество комбинаций/статей
-        shift = 0  # Для циклического смещения
+        current_round = await next_work_round(db_path) or 0  # Текущая серия циклического смещения
 
-        # unmarked_articles = [] # Список для статей без отметки
+        accounts_by_id = {}
+        total_prompts = 0  # Всего промтов
+        total_accounts = 0  # Всего аккаунтов
+        processed_items = 0  # Количество отработанных пар
+        max_items = 0  # Количество пар, которые нужно отработать
+        articles_publishing = 0  # Количество опубликованных статей
+        banned_list = set(progress.get('banned', [])) # Множество заблокированных аккаунтов
 
         if task_type != 'Основной':
             published_articles_per_account = {account[0]: 0 for account in accounts}
+            published_articles_per_account.update(
+                {int(account_id): count for account_id, count in progress.get('published', {}).items()}
+            )
+            reserved_per_account = {}  # Пары, взятые в работу, но ещё не опубликованные (Мульти-режим)
+            timeout_post = int(delay)
+        else:
+            timeout_post = int(timeout_articles)
 
-        await CommandsManager.update_task_status_db(
-            task=task_name,
-            status=(
-                f"Подготовка.\n\n"
+        # Параллельная публикация: каждый аккаунт работает в своём конвейере
+        parallel = PARALLEL_ACCOUNTS and len(accounts) > 1
+
+        # Задержка между публикациями одного аккаунта. В последовательном основном режиме с несколькими
+        # аккаунтами статьи публикуются без задержки, пауза выдерживается только между сериями (timeout_cycle)
+        limiter = AccountRateLimiter(
+            timeout_post if parallel or len(accounts) == 1 or task_type != 'Основной' else 0
+        )
+
+        def task_status(stage: str, details: str = '') -> str:
+            """Текст статуса задания"""
+
+            return (
+                f"{stage}\n\n"
                 f"<b>Информация:</b>\n"
                 f"Общее количество промтов: {total_prompts}\n"
                 f"Общее количество аккаунтов: {total_accounts}\n"
-                f"Отработанных статей: {len(published_combinations)} из"
-                        f" {max_combinations if task_type == 'Основной' else max_combinations - int(posts_count)*total_accounts}\n"
+                f"Отработанных статей: {processed_items if task_type == 'Основной'
+                else sum(published_articles_per_account.values())} из {max_items}\n"
                 f"Общее количество опубликованных статей: {articles_publishing}"
-            ),
-        )
+                + (f"\n\n<b>Текущие данные:</b>\n{details}" if details else '')
+            )
 
-        await pause_handler(task_name)
+        async def finish_item(work_id: int, status: str, article_id: int = None) -> None:
+            """Завершение пары с учётом в счётчике отработанных"""
+
+            nonlocal processed_items
 
-        while len(published_combinations) < max_combinations:
-            all_accounts_reached_limit = True
+            await complete_work_item(db_path, work_id, status, article_id)
+            processed_items += 1
 
-            for prompt_idx in range(total_prompts):
-                account_idx = (prompt_idx + shift) % total_accounts
-                account_id = accounts[account_idx][0]
+        async def skip_account(account_id: int) -> None:
+            """Пропуск оставшихся пар аккаунта (аккаунт заблокирован или достиг лимита публикаций)"""
 
-                if account_id in banned_list:
-                    if task_type != 'Основной':
-                        published_articles_per_account[account_id] += 1
-                    published_combinations.add((prompt_idx, account_idx))
-                    continue
+            nonlocal processed_items
+
+            processed_items += await skip_account_work(db_path, account_id)
+
+        def release_reservation(account_id: int) -> None:
+            if task_type != 'Основной':
+                reserved_per_account[account_id] -= 1
+
+        async def claim_items(round_no: int, account_id: int = None):
+            """Пары серии, по одной взятые из очереди задания"""
+
+            while True:
+                await pause_handler(task_name)
+
+                item = await claim_work_item(db_path, round_no, account_id)
+
+                if item is None:
+                    return
+
+                work_id, prompt_id, item_account_id, _, _ = item
 
                 if task_type != 'Основной':
-                    if published_articles_per_account[account_id] >= int(posts_count):
-                        published_combinations.add((prompt_idx, account_idx))
+                    published = published_articles_per_account.setdefault(item_account_id, 0)
+
+                    if published + reserved_per_account.get(item_account_id, 0) >= int(posts_count):
+                        await finish_item(work_id, WORK_SKIPPED)
+                        await skip_account(item_account_id)
                         continue
-                    else:
-                        all_accounts_reached_limit = False
 
-                prompt_id, prompt, prompt_theme, xlsx_id = prompts[prompt_idx]  # Текущий промт
+                    reserved_per_account[item_account_id] = reserved_per_account.get(item_account_id, 0) + 1
 
-                account_id, account_email, account_password, account_login, \
-                    proxy_ip, proxy_port, proxy_login, proxy_password, accessToken, \
-                    account_url = accounts[account_idx]  # Текущий аккаунт
+                yield item
 
-                if task_type == 'Основной':
-                    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-                    cursor = connection.cursor()
-                    cursor.execute("SELECT marks FROM Prompts WHERE id = ?", (prompt_id,))
-                    current_marks = cursor.fetchone()[0]
-                    connection.close()
-                    account_mark = f"{"vc" if "vc" in account_url.lower() else "dtf"}-{account_id}"
-
-                    if (current_marks is not None and account_mark in current_marks and
-                            not((prompt_idx, account_idx) in published_combinations)):
-                        articles_publishing += 1
-                        published_combinations.add((prompt_idx, account_idx))
-
-                # Проверяем, если комбинация уже была опубликована
-                if (prompt_idx, account_idx) in published_combinations:
-                    continue
+        async def generate_article(item):
+            """Стадия генерации: текст, изображение и сохранение статьи"""
 
-                await CommandsManager.update_task_status_db(
-                    task=task_name,
-                    status=(
-                        f"Генерация текста и изображения.\n\n"
-                        f"<b>Информация:</b>\n"
-                        f"Общее количество промтов: {total_prompts}\n"
-                        f"Общее количество аккаунтов: {total_accounts}\n"
-                        f"Отработанных статей: {len(published_combinations)} из"
-                        f" {max_combinations if task_type == 'Основной' 
-                        else max_combinations - int(posts_count)*total_accounts}\n"
-                        f"Общее количество опубликованных статей: {articles_publishing}\n\n"
-                        f"<b>Текущие данные:</b>\n"
-                        f"Промт (ID): {prompt_id}\n"
-                        f"Аккаунт: {account_email}"
-                    ),
+            work_id, prompt_id, account_id, round_no, article_id = item
+
+            account_id, account_email, account_password, account_login, \
+                proxy_ip, proxy_port, proxy_login, proxy_password, accessToken, \
+                account_url = accounts_by_id[account_id]  # Текущий аккаунт
+
+            if account_id in banned_list:
+                release_reservation(account_id)
+                await finish_item(work_id, WORK_SKIPPED)
+                return None
+
+            prompt_row = await fetchone(db_path, "SELECT prompt, prompt_theme, xlsx_id FROM Prompts WHERE id = ?",
+                                        (prompt_id,))
+
+            # Промт удалён во время работы задания
+            if prompt_row is None:
+                release_reservation(account_id)
+                await finish_item(work_id, WORK_SKIPPED)
+                return None
+
+            prompt, prompt_theme, xlsx_id = prompt_row  # Текущий промт
+
+            # Статья сгенерирована до перезапуска бота, но не опубликована
+            if article_id is not None:
+                article = await fetchone(db_path, "SELECT article_text, article_image FROM Articles WHERE id = ?",
+                                         (article_id,))
+
+                if article is not None and os.path.exists(article[1]):
+                    return item, xlsx_id, article_id, article[0], article[1]
+
+            await CommandsManager.update_task_status_db(
+                task=task_name,
+                status=task_status("Генерация текста и изображения.",
+                                   f"Промт (ID): {prompt_id}\nАккаунт: {account_email}"),
+            )
+
+            await pause_handler(task_name)
+
+            # Текст, заранее полученный пакетной генерацией, используется вместо нового запроса
+            pregenerated_text = await claim_pregenerated_text(task_name, prompt_id)
+
+            if pregenerated_text:
+                result_text, result_text_info = pregenerated_text, '-'
+                result_image, result_image_path = await send_prompt_to_chatgpt_image(prompt_theme, task_name)
+
+                if not result_image:
+                    await release_pregenerated_text(task_name, prompt_id, pregenerated_text, xlsx_id)
+            else:
+                # Генерация текста и изображения
+                result_text, result_text_info, result_image, result_image_path = await send_prompt_to_chatgpt_article(
+                    prompt, prompt_theme, task_name
                 )
 
-                await pause_handler(task_name)
+            await pause_handler(task_name)
 
-                # Генерация текста
-                result_text, result_text_info = await send_prompt_to_chatgpt_text(prompt, task_name)
+            if result_text and result_image:
+                await mark_prompt_as_used(task_name, prompt_id, account_id, account_url)
 
                 await pause_handler(task_name)
 
-                await asyncio.sleep(randint(1, 3))
+                # Сохранение статьи
+                article_id = await save_article_to_db(
+                    task_name,
+                    result_text,
+                    result_image_path,
+                    account_id,
+                    account_url
+                )
+
+                await execute(db_path, "UPDATE Articles SET xlsx_id = ? WHERE id = ?", (str(xlsx_id), article_id))
+                await attach_work_article(db_path, work_id, article_id)
 
-                if result_text:
-                    # Генерация изображения
-                    result_image, result_image_path = await send_prompt_to_chatgpt_image(prompt_theme, task_name)
-                else:
-                    result_image, result_image_path = False, '-'
+                if task_type == 'Основной':
+                    acc_mark = f"{"vc" if "vc" in account_url.lower() else "dtf"}-{account_id}"
+
+                    await execute(DB_ARTICLES_DIRECTORY,
+                                  "INSERT INTO Articles (article_text, article_image, marks) VALUES (?, ?, ?)",
+                                  (result_text, result_image_path, acc_mark))
+
+                return item, xlsx_id, article_id, result_text, result_image_path
+
+            release_reservation(account_id)
+
+            if result_text_info == 'content_policy_violation':
+                text = (f"Ошибка генерации текста статьи для аккаунта {account_email} (ID): {account_id}.\n\n"
+                        f"Промт (ID) {prompt_id} нарушает политику об отношении контента OpenAI.")
+                task_log.debug(text)
+                await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) '+text)
+
+            elif result_text_info == 'quota':
+                text = "Ошибка генерации текста и изображения. Проверьте баланс API-ключа OpenAI."
+                task_log.debug(text)
+                await CommandsManager.update_task_status_db(task=task_name, status=text)
+                await bot_message(chat_id=chat_id, text=text+f' (<b>{task_name}</b>)')
+
+                last_api_key = (await fetchone(DB_OPENAI_API_KEY_DIRECTORY, "SELECT api_key FROM ApiKey WHERE id = 1"))[0]
+                api_key = last_api_key
 
                 await pause_handler(task_name)
 
-                if result_text and result_image:
-                    await mark_prompt_as_used(task_name, prompt_id, account_id, account_url)
+                while last_api_key == api_key:
+                    api_key = (await fetchone(DB_OPENAI_API_KEY_DIRECTORY, "SELECT api_key FROM ApiKey WHERE id = 1"))[0]
+                    await asyncio.sleep(5)
 
                     await pause_handler(task_name)
+            else:
+                if result_image_path == 'content_policy_violation_image':
+                    text = (
+                        f"Ошибка генерации изображения статьи для аккаунта {account_email} (ID): {account_id}.\n\n"
+                        f"Тема промта (ID) {prompt_id} нарушает политику об отношении контента OpenAI.")
+                    task_log.debug(text)
+                    await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) '+text)
+                else:
+                    text = (f"Ошибка генерации текста и изображения. "
+                            f"Промт не будет отработан для аккаунта {account_email}.\n\n"
+                            f"Ответ запроса генерации текста: {result_text_info}\n"
+                            f"Ответ запроса генерации изображения: {result_image_path}")
+                    task_log.debug(text)
+                    await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) '+text)
+                    await finish_item(work_id, WORK_FAILED)
+                    return None
 
-                    # Сохранение статьи
-                    article_id = await save_article_to_db(
-                        task_name,
-                        result_text,
-                        result_image_path,
-                        account_id,
-                        account_url
-                    )
+            # Пара повторяется, когда промт в следующий раз попадёт на этот аккаунт при циклическом смещении
+            await retry_work_item(db_path, work_id, round_no + total_accounts, WORK_RETRY_DELAY)
 
-                    if task_type == 'Основной':
-                        acc_mark = f"{"vc" if "vc" in account_url.lower() else "dtf"}-{account_id}"
+            return None
 
-                        with sqlite3.connect(DB_ARTICLES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                            cursor = connection.cursor()
-                            cursor.execute("INSERT INTO Articles (article_text, article_image, marks) VALUES (?, ?, ?)",
-                                           (result_text, result_image_path, acc_mark))
-                            connection.commit()
+        async def publish_article(article):
+            """Стадия публикации с ограничением частоты для каждого аккаунта"""
 
-                    # Платформа для публикации
-                    platform = (VcApi if 'vc' in account_url else DtfApi)(
-                        email=account_email,
-                        password=account_password,
-                        task=task_name,
-                        task_type=task_type,
-                        proxy_login=proxy_login,
-                        proxy_pass=proxy_password,
-                        proxy_ip=proxy_ip,
-                        proxy_port=proxy_port,
-                        posts_amount=posts_amount
-                    )
+            nonlocal articles_publishing
 
-                    if task_type != 'Основной':
-                        platform.posts_amount = None
+            item, xlsx_id, article_id, result_text, result_image_path = article
+            work_id, prompt_id, account_id, round_no, _ = item
 
-                    if task_type == 'Основной':
-                        platform.is_published = True if flag_posting_for_main == 'True' else False
+            account_id, account_email, account_password, account_login, \
+                proxy_ip, proxy_port, proxy_login, proxy_password, accessToken, \
+                account_url = accounts_by_id[account_id]
 
-                    await CommandsManager.update_task_status_db(
-                        task=task_name,
-                        status=(
-                            f"Публикация статьи.\n\n"
-                            f"<b>Информация:</b>\n"
-                            f"Общее количество промтов: {total_prompts}\n"
-                            f"Общее количество аккаунтов: {total_accounts}\n"
-                            f"Отработанных статей: {len(published_combinations)} из"
-                            f" {max_combinations if task_type == 'Основной' 
-                            else max_combinations - int(posts_count)*total_accounts}\n"
-                            f"Общее количество опубликованных статей: {articles_publishing}\n\n"
-                            f"<b>Текущие данные:</b>\n"
-                            f"Статья (ID): {article_id}\n"
-                            f"Аккаунт: {account_email}"
-                        ),
+            if account_id in banned_list:
+                release_reservation(account_id)
+                await finish_item(work_id, WORK_SKIPPED)
+                return
+
+            timeout_left = limiter.delay(account_id)
+
+            if timeout_left > 0:
+                await CommandsManager.update_task_status_db(
+                    task=task_name,
+                    status=task_status(f"Тайм-аут {int(timeout_left / 60)} мин."),
+                )
+
+            await limiter.wait(account_id)
+            await pause_handler(task_name)
+
+            # Токен мог обновиться при предыдущих публикациях аккаунта
+            accessToken = (await fetchone(DB_ACCOUNTS, "SELECT accessToken FROM Accounts WHERE id = ?", (account_id,)))[0]
+
+            # Платформа для публикации
+            platform = (VcApi if 'vc' in account_url else DtfApi)(
+                email=account_email,
+                password=account_password,
+                task=task_name,
+                task_type=task_type,
+                proxy_login=proxy_login,
+                proxy_pass=proxy_password,
+                proxy_ip=proxy_ip,
+                proxy_port=proxy_port,
+                posts_amount=posts_amount
+            )
+
+            if task_type != 'Основной':
+                platform.posts_amount = None
+
+            if task_type == 'Основной':
+                platform.is_published = flag_posting_for_main
+
+            await CommandsManager.update_task_status_db(
+                task=task_name,
+                status=task_status("Публикация статьи.", f"Статья (ID): {article_id}\nАккаунт: {account_email}"),
+            )
+
+            await pause_handler(task_name)
+
+            # Аккаунт могут арендовать процессы с более высоким приоритетом (например, постинг из БД)
+            account_mark = f"{"vc" if "vc" in account_url.lower() else "dtf"}-{account_id}"
+
+            async with account_lease(account_mark):
+                auth, account_info, user_data, user_info, image_upload, image_info, publishing,\
+                article_url, publishing_info = await posting_article(platform,
+                                                                     account_id,
+                                                                     accessToken,
+                                                                     DB_ACCOUNTS,
+                                                                     result_text,
+                                                                     result_image_path
+                                                                    )
+            limiter.mark(account_id)
+
+            if task_type != 'Основной':
+                release_reservation(account_id)
+                published_articles_per_account[account_id] += 1
+
+            if auth and user_data and image_upload and publishing:
+                await pause_handler(task_name)
+                await update_keys_data(xlsx_id, article_url, account_login)
+                await pause_handler(task_name)
+
+                if task_type != 'Основной':
+                    await update_article_mark_multi(
+                        db_path,
+                        article_id,
+                        account_login,
+                        article_url
                     )
 
                     await pause_handler(task_name)
 
-                    auth, account_info, user_data, user_info, image_upload, image_info, publishing,\
-                    article_url, publishing_info = await posting_article(platform,
-                                                                         account_id,
-                                                                         accessToken,
-                                                                         DB_ACCOUNTS,
-                                                                         result_text,
-                                                                         result_image_path
-                                                                        )
-
-                    if auth and user_data and image_upload and publishing:
-                        await pause_handler(task_name)
-                        await update_keys_data(xlsx_id, article_url, account_login)
-                        await pause_handler(task_name)
-
-                        if task_type != 'Основной':
-                            await update_article_mark_multi(
-                                DB_DIRECTORY + task_name + ".db",
-                                article_id,
-                                account_login,
-                                article_url
-                            )
-
-                            published_articles_per_account[account_id] += 1
-                            await pause_handler(task_name)
-
-                        if indexing:
-                            for search in searchengine.split('+'):
-                                indexing_post, indexing_info = indexing_obj.link_indexing(article_url, search)
-                                if not indexing_post:
-                                    text = (f'<a href="{article_url}">Ссылка</a> не отправлена на индексацию.\n\n'
-                                            f'<b>Поисковик:</b> {search}\n'
-                                            f'<b>Причина:</b> {indexing_info}')
-                                    await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) ' + text)
-                                    task_log.debug(text)
-                                await asyncio.sleep(2)
-
-                        task_log.debug(f"Статья (ID) {article_id} опубликована на {account_email}.")
-                        articles_publishing += 1
-                    else:
-                        info = user_info if user_info == 'Аккаунт заблокирован'\
-                            else (f"Результат авторизации: {account_info}\n"
-                                  f"Результат получения данных пользователя: {user_info}\n"
-                                  f"Результат загрузки изображения: {image_info}\n"
-                                  f"Результат публикации статьи: {publishing_info}")
-
-                        text = (f"Ошибка публикации для аккаунта {account_email}. ID Аккаунта: {account_id}. "
-                                f"Статья (ID): {article_id}\n\n"
-                                f"Информация:\n" + info)
-
-                        connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-                        cursor = connection.cursor()
-                        cursor.execute(
-                            "UPDATE Articles SET "
-                            "status = ?"
-                            "WHERE id = ?",
-                            (text, article_id)
-                        )
-                        connection.commit()
-                        connection.close()
-
-                        await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) '+text)
-                        task_log.debug(text)
-
-                        if user_info == 'Аккаунт заблокирован':
-                            banned_list.add(account_id)
-
-                            with sqlite3.connect(DB_ACCOUNTS, timeout=TIMEOUT_DELAY) as connection:
-                                cursor = connection.cursor()
-                                cursor.execute(
-                                    "UPDATE Accounts SET "
-                                    "accessToken = ?"
-                                    "WHERE id = ?",
-                                    ('-', account_id)
-                                )
-                                connection.commit()
-
-                        if task_type != 'Основной':
-                            published_articles_per_account[account_id] += 1
-
-                    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-                    cursor = connection.cursor()
-                    cursor.execute(
-                        "UPDATE Articles SET "
-                        "xlsx_id = ?"
-                        "WHERE id = ?",
-                        (str(xlsx_id), article_id)
-                    )
-                    connection.commit()
-                    connection.close()
+                if indexing:
+                    await enqueue_indexing(indexing_obj, searchengine, article_url, chat_id)
 
-                    published_combinations.add((prompt_idx, account_idx))
+                task_log.debug(f"Статья (ID) {article_id} опубликована на {account_email}.")
+                articles_publishing += 1
+                await finish_item(work_id, WORK_DONE, article_id)
+            else:
+                info = user_info if user_info == 'Аккаунт заблокирован'\
+                    else (f"Результат авторизации: {account_info}\n"
+                          f"Результат получения данных пользователя: {user_info}\n"
+                          f"Результат загрузки изображения: {image_info}\n"
+                          f"Результат публикации статьи: {publishing_info}")
 
-                else:
-                    if result_text_info == 'content_policy_violation':
-                        text = (f"Ошибка генерации текста статьи для аккаунта {account_email} (ID): {account_id}.\n\n"
-                                f"Промт (ID) {prompt_id} нарушает политику об отношении контента OpenAI.")
-                        task_log.debug(text)
-                        await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) '+text)
-
-                    elif result_text_info == 'quota':
-                        text = "Ошибка генерации текста и изображения. Проверьте баланс API-ключа OpenAI."
-                        task_log.debug(text)
-                        await CommandsManager.update_task_status_db(task=task_name, status=text)
-                        await bot_message(chat_id=chat_id, text=text+f' (<b>{task_name}</b>)')
-
-                        with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                            cursor = connection.cursor()
-                            cursor.execute(
-                                "SELECT api_key FROM ApiKey WHERE id = 1"
-                            )
-                            last_api_key = cursor.fetchone()[0]
-                            api_key = last_api_key
-
-                        await pause_handler(task_name)
-
-                        while last_api_key == api_key:
-
-                            with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                                cursor = connection.cursor()
-                                cursor.execute(
-                                    "SELECT api_key FROM ApiKey WHERE id = 1"
-                                )
-                                api_key = cursor.fetchone()[0]
-                                await asyncio.sleep(5)
-
-                            await pause_handler(task_name)
-                    else:
-                        if result_image_path == 'content_policy_violation_image':
-                            text = (
-                                f"Ошибка генерации изображения статьи для аккаунта {account_email} (ID): {account_id}.\n\n"
-                                f"Тема промта (ID) {prompt_id} нарушает политику об отношении контента OpenAI.")
-                            task_log.debug(text)
-                            await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) '+text)
-                        else:
-                            text = (f"Ошибка генерации текста и изображения. "
-                                    f"Промт не будет отработан для аккаунта {account_email}.\n\n"
-                                    f"Ответ запроса генерации текста: {result_text_info}\n"
-                                    f"Ответ запроса генерации изображения: {result_image_path}")
-                            task_log.debug(text)
-                            await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) '+text)
-                            published_combinations.add((prompt_idx, account_idx))
-
-                # Задержка перед следующей публикацией
-                if task_type != 'Основной':
-                    timeout_post = int(delay)
-                else:
-                    timeout_post = int(timeout_articles)
+                text = (f"Ошибка публикации для аккаунта {account_email}. ID Аккаунта: {account_id}. "
+                        f"Статья (ID): {article_id}\n\n"
+                        f"Информация:\n" + info)
 
-                if (total_accounts == 1 and task_type == 'Основной') or (task_type != 'Основной'):
-                    await CommandsManager.update_task_status_db(
-                        task=task_name,
-                        status=(
-                            f"Тайм-аут {int(timeout_post / 60)} мин.\n\n"
-                            f"<b>Информация:</b>\n"
-                            f"Общее количество промтов: {total_prompts}\n"
-                            f"Общее количество аккаунтов: {total_accounts}\n"
-                            f"Отработанных статей: {len(published_combinations)} из"
-                            f" {max_combinations if task_type == 'Основной' 
-                            else max_combinations - int(posts_count)*total_accounts}\n"
-                            f"Общее количество опубликованных статей: {articles_publishing}"
-                        ),
-                    )
+                await execute(db_path, "UPDATE Articles SET status = ? WHERE id = ?", (text, article_id))
 
-                prompts = await get_prompts(DB_DIRECTORY + task_name + '.db', priority_prompt_ids)
+                await bot_message(chat_id=chat_id, text=f'(<b>{task_name}</b>) '+text)
+                task_log.debug(text)
 
-                if task_type != 'Основной':
-                    await asyncio.sleep(timeout_post)
-                else:
-                    if total_accounts == 1:
-                        await asyncio.sleep(timeout_post)
+                await finish_item(work_id, WORK_FAILED, article_id)
 
-                    if choice_account:
-                        accounts = await get_account_by_mark_v2(choice_account)
-                    else:
-                        accounts = await get_accounts(DB_ACCOUNTS)
+                if user_info == 'Аккаунт заблокирован':
+                    banned_list.add(account_id)
 
-                await pause_handler(task_name)
+                    await execute(DB_ACCOUNTS, "UPDATE Accounts SET accessToken = ? WHERE id = ?", ('-', account_id))
+                    await skip_account(account_id)
+
+            # Блокировки и счётчики публикаций аккаунтов сохраняются на случай перезапуска бота
+            await save_progress(task_name,
+                                banned=list(banned_list),
+                                published=published_articles_per_account if task_type != 'Основной' else {})
 
-            shift += 1
+        await CommandsManager.update_task_status_db(task=task_name, status=task_status("Подготовка."))
 
-            if task_type != 'Основной' and all_accounts_reached_limit:
-                task_log.info("Все доступные аккаунты достигли лимита публикаций.")
+        await pause_handler(task_name)
+
+        while True:
+            # Промты и аккаунты могли измениться с прошлой серии: добавляются пары только для новых
+            accounts_by_id = {account[0]: account for account in accounts}
+            total_accounts = len(accounts)
+
+            await sync_work_items(db_path, accounts, priority_prompt_ids, current_round)
+
+            total_prompts = (await fetchone(db_path, "SELECT COUNT(*) FROM Prompts"))[0]
+            processed_items, max_items, articles_publishing = await count_work_items(db_path, list(accounts_by_id))
+
+            if task_type != 'Основной':
+                max_items = min(total_prompts, int(posts_count)) * total_accounts
+
+            round_no = await next_work_round(db_path)
+
+            if round_no is None:
                 break
 
+            current_round = round_no
+            wait = (await next_eligible_time(db_path, round_no)) - time.time()
+
+            # Все пары серии отложены после ошибок генерации
+            if wait > 0:
+                await CommandsManager.update_task_status_db(
+                    task=task_name,
+                    status=task_status(f"Тайм-аут {int(wait / 60)} мин."),
+                )
+                await asyncio.sleep(wait)
+                await pause_handler(task_name)
+                continue
+
+            if parallel:
+                await run_account_workers({account_id: claim_items(round_no, account_id)
+                                           for account_id in await round_accounts(db_path, round_no)},
+                                          generate_article, publish_article, limiter)
+            else:
+                await run_pipeline(claim_items(round_no), generate_article, publish_article, PIPELINE_PREFETCH)
+
+            await pause_handler(task_name)
+
             if task_type == 'Основной':
 
-                if len(published_combinations) < max_combinations:
+                if await next_work_round(db_path) is not None:
 
                     await CommandsManager.update_task_status_db(
                         task=task_name,
-                        status=(
-                            f"Тайм-аут {int(int(timeout_cycle) / 60)} мин.\n\n"
-                            f"<b>Информация:</b>\n"
-                            f"Общее количество промтов: {total_prompts}\n"
-                            f"Общее количество аккаунтов: {total_accounts}\n"
-                            f"Отработанных статей: {len(published_combinations)} из {max_combinations}\n"
-                            f"Общее количество опубликованных статей: {articles_publishing}"
-                        ),
+                        status=task_status(f"Тайм-аут {int(int(timeout_cycle) / 60)} мин."),
                     )
 
                     task_log.debug(f"Задержка {int(int(timeout_cycle) / 60)} мин. перед следующей серией публикаций.")
@@ -567,19 +559,18 @@ async def run_task_script(event, task_name, task_type, chat_id, choice_account)
 
                     await pause_handler(task_name)
 
+                if choice_account:
+                    accounts = await get_account_by_mark_v2(choice_account)
+                else:
+                    accounts = await get_accounts(DB_ACCOUNTS)
+
+        if task_type != 'Основной' and all(count >= int(posts_count) for count in published_articles_per_account.values()):
+            task_log.info("Все доступные аккаунты достигли лимита публикаций.")
+
         await CommandsManager.update_task_status_db(
             task=task_name,
-            status=(
-                f"Задание завершено.\n\n"
-                f"<b>Информация:</b>\n"
-                f"Общее количество промтов: {total_prompts}\n"
-                f"Общее количество аккаунтов: {total_accounts}\n"
-                f"Отработанных статей: {len(published_combinations) if task_type == 'Основной' 
-                else len(published_combinations) - int(posts_count)*total_accounts} из"
-                f" {max_combinations if task_type == 'Основной' 
-                else max_combinations - int(posts_count)*total_accounts}\n"
-                f"Общее количество опубликованных статей: {articles_publishing}"
-            ),
+            status=task_status("Задание завершено."),
+            flush=True,
         )
 
         await bot_message(chat_id=chat_id, text=f'<b>{task_name}</b> завершено.')
@@ -589,5 +580,5 @@ async def run_task_script(event, task_name, task_type, chat_id, choice_account)
         error_message = f"Произошла ошибка при выполнении скрипта задания: {e}"
         await bot_message(chat_id=chat_id, text=error_message)
         task_log.debug(error_message)
-        await CommandsManager.update_task_status_db(task=task_name, status=error_message)
+        await CommandsManager.update_task_status_db(task=task_name, status=error_message, flush=True)
         return
\ No newline at end of file
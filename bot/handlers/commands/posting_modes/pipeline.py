@@ -0,0 +1,112 @@
+import asyncio
+
+from bot.config import MAX_PARALLEL_ACCOUNTS
+
+# Общий для всех заданий лимит одновременно работающих аккаунтов (создаётся в событийном цикле)
+account_slots = None
+
+
+class AccountRateLimiter:
+    """Ограничение частоты публикаций: не чаще одной статьи в interval секунд на аккаунт"""
+
+    def __init__(self, interval: float) -> None:
+        self.interval: float = interval
+        self.next_allowed: dict = {}
+
+    def delay(self, account_id) -> float:
+        """Сколько секунд осталось до следующей разрешённой публикации аккаунта"""
+
+        return max(0.0, self.next_allowed.get(account_id, 0.0) - asyncio.get_running_loop().time())
+
+    async def wait(self, account_id) -> None:
+        """Ожидание очереди аккаунта"""
+
+        delay = self.delay(account_id)
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def mark(self, account_id) -> None:
+        """Отметка публикации аккаунта"""
+
+        self.next_allowed[account_id] = asyncio.get_running_loop().time() + self.interval
+
+
+async def run_pipeline(items, generate, publish, prefetch: int) -> None:
+    """Конвейер «генерация → публикация».
+
+    items — обычный или асинхронный итератор (например, пары, взятые из очереди задания по одной).
+    generate(item) готовит статью заранее (или возвращает None, если статью подготовить не удалось),
+    publish(article) публикует. Между стадиями — ограниченная очередь размером prefetch,
+    поэтому генерация опережает публикацию не более чем на prefetch статей.
+    """
+
+    queue = asyncio.Queue(maxsize=prefetch)
+
+    async def stage(item):
+        article = await generate(item)
+
+        if article is not None:
+            await queue.put(article)
+
+    async def producer():
+        try:
+            if hasattr(items, '__aiter__'):
+                async for item in items:
+                    await stage(item)
+            else:
+                for item in items:
+                    await stage(item)
+        except Exception:
+            await queue.put(None)
+            raise
+
+        await queue.put(None)
+
+    producer_task = asyncio.create_task(producer())
+
+    try:
+        while (article := await queue.get()) is not None:
+            await publish(article)
+    except BaseException:
+        producer_task.cancel()
+        raise
+
+    await producer_task
+
+def get_account_slots() -> asyncio.Semaphore:
+    """Семафор одновременно работающих аккаунтов"""
+
+    global account_slots
+
+    if account_slots is None:
+        account_slots = asyncio.Semaphore(MAX_PARALLEL_ACCOUNTS)
+
+    return account_slots
+
+async def run_account_workers(groups: dict, generate, publish, limiter: AccountRateLimiter) -> None:
+    """Параллельная публикация по аккаунтам.
+
+    groups — {ID аккаунта: элементы аккаунта}, для каждого аккаунта запускается свой конвейер
+    с опережением в одну статью. Ожидание задержки аккаунта не занимает слот, генерация
+    и публикация выполняются не более чем для MAX_PARALLEL_ACCOUNTS аккаунтов одновременно.
+    """
+
+    slots = get_account_slots()
+
+    async def limited_generate(item):
+        async with slots:
+            return await generate(item)
+
+    def worker(account_id, account_items):
+        async def limited_publish(article):
+            await limiter.wait(account_id)
+
+            async with slots:
+                await publish(article)
+
+        return run_pipeline(account_items, limited_generate, limited_publish, 1)
+
+    async with asyncio.TaskGroup() as group:
+        for account_id, account_items in groups.items():
+            group.create_task(worker(account_id, account_items))
@@ -1,12 +1,15 @@
 import asyncio
-import sqlite3
 
-from bot.config import TIMEOUT_DELAY, DB_MAIN_ACCOUNTS_DIRECTORY, DB_TASK_DIRECTORY
+from bot.config import DB_MAIN_ACCOUNTS_DIRECTORY
+from bot.handlers.commands.account_slots import account_lease
 from bot.handlers.commands.api.dtf_api import DtfApi
 from bot.handlers.commands.api.vc_api import VcApi
+from bot.handlers.commands.checkpoints import load_progress, save_progress
+from bot.handlers.commands.indexing_outbox import enqueue_indexing
 from bot.handlers.commands.logging import log
 from bot.handlers.commands.posting_modes.common import update_status_db, bot_message, data_upload_v3, \
-    init_link_indexing_param_v2, posting_article_db
+    init_link_indexing_param_v2, posting_article_db, save_access_token
+from bot.handlers.commands.tasks_settings import get_setting
 
 
 async def publishing_db(event, account_mark, source_mark, blacklist_articles, chat_id: int):
@@ -22,10 +25,7 @@ async def publishing_db(event, account_mark, source_mark, blacklist_articles, ch
 
     await event.wait()
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT articles_links_count FROM TasksSettings WHERE id = 1")
-        posts_amount = int(cursor.fetchone()[0])
+    posts_amount = await get_setting('articles_links_count')
 
     await event.wait()
 
@@ -45,9 +45,17 @@ async def publishing_db(event, account_mark, source_mark, blacklist_articles, ch
         posts_amount=posts_amount
     )
 
-    platform.is_published = True if flag == 'True' else False
+    platform.is_published = flag
+
+    # Статьи, отработанные до перезапуска бота
+    processed_articles = set((await load_progress()).get('processed', []))
 
     for article in articles:
+        article_id, article_text, article_image = article
+
+        if article_id in processed_articles:
+            continue
+
         text = f"Статья (ID) {article_id} публикуется на {account_email}. Аккаунт (ID): {account_id}."
 
         log.debug(text)
@@ -55,33 +63,21 @@ async def publishing_db(event, account_mark, source_mark, blacklist_articles, ch
 
         await event.wait()
 
-        article_id, article_text, article_image = article
-
-        auth, account_info, user_data, user_info, image_upload, image_info, publishing, \
-            article_url, publishing_info = await posting_article_db(platform,
-                                                                 account_id,
-                                                                 accessToken,
-                                                                 DB_MAIN_ACCOUNTS_DIRECTORY,
-                                                                 article_text,
-                                                                 article_image
-                                                                 )
+        async with account_lease(account_mark):
+            auth, account_info, user_data, user_info, image_upload, image_info, publishing, \
+                article_url, publishing_info = await posting_article_db(platform,
+                                                                     account_id,
+                                                                     accessToken,
+                                                                     DB_MAIN_ACCOUNTS_DIRECTORY,
+                                                                     article_text,
+                                                                     article_image
+                                                                     )
 
         await event.wait()
 
         if auth and user_data and publishing and image_upload:
             if indexing:
-                for search in searchengine.split('+'):
-                    await event.wait()
-
-                    indexing_post, indexing_info = indexing_obj.link_indexing(article_url, search)
-                    if not indexing_post:
-                        text = (f'<a href="{article_url}">Ссылка</a> не отправлена на индексацию.\n\n'
-                                f'<b>Поисковик:</b> {search}\n'
-                                f'<b>Причина:</b> {indexing_info}')
-                        await bot_message(chat_id=chat_id, text=text)
-                        log.debug(text)
-                    await asyncio.sleep(2)
-                    await event.wait()
+                await enqueue_indexing(indexing_obj, searchengine, article_url, chat_id)
             text = f"Статья (ID) {article_id} опубликована на {account_email}. Аккаунт (ID): {account_id}."
             log.debug(text)
             await update_status_db(text)
@@ -102,20 +98,15 @@ async def publishing_db(event, account_mark, source_mark, blacklist_articles, ch
             await event.wait()
 
             if user_info == 'Аккаунт заблокирован':
-                with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                    cursor = connection.cursor()
-                    cursor.execute(
-                        "UPDATE Accounts SET "
-                        "accessToken = ?"
-                        "WHERE id = ?",
-                        ('-', account_id)
-                    )
-                    connection.commit()
+                await save_access_token(DB_MAIN_ACCOUNTS_DIRECTORY, account_id, '-')
                 await bot_message(chat_id=chat_id,
                                   text='Процесс публикации статей из базы данных завершён из-за критической ошибки: '
                                        'аккаунт заблокирован.')
                 return
 
+        processed_articles.add(article_id)
+        await save_progress(processed=list(processed_articles))
+
         await event.wait()
         await asyncio.sleep(int(timeout_articles))
         await event.wait()
@@ -1,27 +1,27 @@
 import asyncio
 import os
 import re
-import sqlite3
 from uuid import uuid4
 
 from aiogram.types import FSInputFile
 
 from bot.app import bot
-from bot.config import TIMEOUT_DELAY, DB_MAIN_ACCOUNTS_DIRECTORY, DB_TASK_DIRECTORY
+from bot.config import DB_MAIN_ACCOUNTS_DIRECTORY
+from bot.handlers.commands.account_slots import account_lease
 from bot.handlers.commands.api.dtf_api import DtfApi
 from bot.handlers.commands.api.vc_api import VcApi
+from bot.handlers.commands.checkpoints import load_progress, save_progress
+from bot.handlers.commands.indexing_outbox import enqueue_indexing
 from bot.handlers.commands.logging import log
 from bot.handlers.commands.posting_modes.common import bot_message, get_account_by_mark, posting_article_server, \
-   init_link_indexing_param_v2
+   init_link_indexing_param_v2, save_access_token
+from bot.handlers.commands.tasks_settings import get_settings
 
 async def data_upload(account_mark):
    """Загрузка необходимых данных"""
    account = await get_account_by_mark(account_mark)
-   with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-      cursor = connection.cursor()
-      cursor.execute("SELECT timeout_posting_articles, flag_posting_for_main FROM TasksSettings WHERE id = 1")
-      timeout_articles, flag = cursor.fetchone()
-   return account, timeout_articles, flag
+   settings = await get_settings()
+   return account, settings['timeout_posting_articles'], settings['flag_posting_for_main']
 
 async def send_articles_list(chat_id: int, unpublished_articles: list[str]):
    """Отправка неопубликованных статей в txt-файле"""
@@ -39,15 +39,10 @@ async def server_articles_publishing(event, account_mark, articles_path, chat_id
    indexing, indexing_obj, searchengine = await init_link_indexing_param_v2()
    await event.wait()
 
-   with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-      cursor = connection.cursor()
-      cursor.execute("SELECT currents_replace, new_replace FROM TasksSettings WHERE id = 1")
-      currents_replace, new_replace = cursor.fetchone()
+   settings = await get_settings()
+   currents_replace, new_replace = settings['currents_replace'], settings['new_replace']
    await event.wait()
-   with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-      cursor = connection.cursor()
-      cursor.execute("SELECT articles_links_count FROM TasksSettings WHERE id = 1")
-      posts_amount = int(cursor.fetchone()[0])
+   posts_amount = settings['articles_links_count']
 
    await event.wait()
 
@@ -60,8 +55,12 @@ async def server_articles_publishing(event, account_mark, articles_path, chat_id
                                            f'Информация будет приходить в виде сообщений.')
    await event.wait()
 
-   articles_publishing = 0
-   unpublished_articles = []
+   # Статьи, отработанные до перезапуска бота
+   progress = await load_progress()
+   processed_articles = set(progress.get('processed', []))
+
+   articles_publishing = progress.get('published', 0)
+   unpublished_articles = progress.get('unpublished', [])
 
    account_id, account_email, account_password, account_login,\
    proxy_ip, proxy_port, proxy_login, proxy_password,\
@@ -79,36 +78,30 @@ async def server_articles_publishing(event, account_mark, articles_path, chat_id
       posts_amount=posts_amount
    )
 
-   platform.is_published = True if flag == 'True' else False
+   platform.is_published = flag
 
    for article_path in articles_path:
+      if article_path in processed_articles:
+         continue
+
       await event.wait()
 
       try:
 
-         auth, account_info, user_data, user_info, publishing, article_url, publishing_info = \
-            await posting_article_server(platform,
-                                         account_id,
-                                         accessToken,
-                                         article_path,
-                                         currents_replace,
-                                         new_replace
-                                         )
+         async with account_lease(account_mark):
+            auth, account_info, user_data, user_info, publishing, article_url, publishing_info = \
+               await posting_article_server(platform,
+                                            account_id,
+                                            accessToken,
+                                            article_path,
+                                            currents_replace,
+                                            new_replace
+                                            )
          await event.wait()
 
          if auth and user_data and publishing:
             if indexing:
-               for search in searchengine.split('+'):
-                  await event.wait()
-                  indexing_post, indexing_info = indexing_obj.link_indexing(article_url, search)
-                  if not indexing_post:
-                     text = (f'<a href="{article_url}">Ссылка</a> не отправлена на индексацию.\n\n'
-                             f'<b>Поисковик:</b> {search}\n'
-                             f'<b>Причина:</b> {indexing_info}')
-                     await bot_message(chat_id=chat_id, text=text)
-                     log.debug(text)
-                  await asyncio.sleep(2)
-                  await event.wait()
+               await enqueue_indexing(indexing_obj, searchengine, article_url, chat_id)
             log.debug(f"Статья (Path) {article_path} опубликована на {account_email} в режиме публикации статей с внешнего сервера.")
             articles_publishing += 1
          else:
@@ -130,19 +123,11 @@ async def server_articles_publishing(event, account_mark, articles_path, chat_id
             await event.wait()
 
             if user_info == 'Аккаунт заблокирован':
-               with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                  cursor = connection.cursor()
-                  cursor.execute(
-                     "UPDATE Accounts SET "
-                     "accessToken = ?"
-                     "WHERE id = ?",
-                     ('-', account_id)
-                  )
-                  connection.commit()
-                  await bot_message(chat_id=chat_id,
-                                    text='Процесс публикации статей с внешнего сервера завершён из-за критической ошибки: '
-                                         'аккаунт заблокирован.')
-                  return
+               await save_access_token(DB_MAIN_ACCOUNTS_DIRECTORY, account_id, '-')
+               await bot_message(chat_id=chat_id,
+                                 text='Процесс публикации статей с внешнего сервера завершён из-за критической ошибки: '
+                                      'аккаунт заблокирован.')
+               return
 
       except Exception as e:
          match = re.search(r"/([^/]+)\.json$", article_path)
@@ -154,6 +139,11 @@ async def server_articles_publishing(event, account_mark, articles_path, chat_id
          await event.wait()
 
       os.remove(article_path)
+
+      processed_articles.add(article_path)
+      await save_progress(processed=list(processed_articles), published=articles_publishing,
+                          unpublished=unpublished_articles)
+
       await event.wait()
       await asyncio.sleep(int(timeout_articles))
       await event.wait()
@@ -0,0 +1,199 @@
+import time
+
+from bot.databases.db_gateway import fetchone, fetchall, execute, run_write
+
+# Статусы пары (промт, аккаунт)
+WORK_PENDING = 'pending'    # ожидает обработки
+WORK_RUNNING = 'running'    # генерируется или публикуется
+WORK_DONE = 'done'          # опубликована (или промт уже отмечен для аккаунта)
+WORK_FAILED = 'failed'      # не будет отработана
+WORK_SKIPPED = 'skipped'    # пропущена: аккаунт заблокирован, удалён или достиг лимита публикаций
+
+
+def work_round(prompt_idx: int, account_idx: int, total_accounts: int, current_round: int) -> int:
+    """Серия, в которой промт попадает на аккаунт при циклическом смещении (не раньше текущей серии)"""
+
+    return current_round + (account_idx - prompt_idx - current_round) % total_accounts
+
+async def reset_work_items(db_path: str, priority_prompt_ids: list, reopen_skipped: bool = True) -> None:
+    """Подготовка пар к запуску задания.
+
+    Пары, прерванные остановкой задания, возвращаются в очередь (статья, сгенерированная для пары
+    до остановки, остаётся за ней). Пропущенные пары возвращаются, если задание запускается заново,
+    а не возобновляется после перезапуска бота. Приоритет пар пересчитывается по текущему диапазону
+    приоритетных промтов.
+    """
+
+    first, last = (min(priority_prompt_ids), max(priority_prompt_ids)) if priority_prompt_ids else (1, 0)
+    statuses = (WORK_RUNNING, WORK_SKIPPED) if reopen_skipped else (WORK_RUNNING,)
+
+    def reset(connection):
+        connection.execute(
+            f"UPDATE WorkItems SET status = ? WHERE status IN ({', '.join('?' * len(statuses))})",
+            (WORK_PENDING, *statuses)
+        )
+        connection.execute("UPDATE WorkItems SET priority = prompt_id BETWEEN ? AND ?", (first, last))
+
+    await run_write(db_path, reset)
+
+async def sync_work_items(db_path: str, accounts: list, priority_prompt_ids: list, current_round: int) -> int:
+    """Сверка пар с промтами и аккаунтами задания.
+
+    Пары удалённых промтов удаляются, пары аккаунтов, которых нет в задании, пропускаются.
+    Для новых промтов и новых аккаунтов добавляются пары; если у промта уже стоит отметка аккаунта,
+    пара сразу считается отработанной. Возвращает количество добавленных пар.
+    """
+
+    account_ids = [account[0] for account in accounts]
+    placeholders = ', '.join('?' * len(account_ids))
+
+    def sync(connection):
+        connection.execute("DELETE FROM WorkItems WHERE prompt_id NOT IN (SELECT id FROM Prompts)")
+        connection.execute(
+            f"UPDATE WorkItems SET status = ? WHERE status = ? AND account_id NOT IN ({placeholders})",
+            (WORK_SKIPPED, WORK_PENDING, *account_ids)
+        )
+
+        known_accounts = {row[0] for row in connection.execute("SELECT DISTINCT account_id FROM WorkItems")}
+        new_accounts = set(account_ids) - known_accounts
+        new_prompts = {row[0] for row in connection.execute(
+            "SELECT id FROM Prompts WHERE id NOT IN (SELECT prompt_id FROM WorkItems)"
+        )}
+
+        if not new_accounts and not new_prompts:
+            return 0
+
+        prompts = connection.execute("SELECT id, marks FROM Prompts").fetchall()
+        prompts.sort(key=lambda prompt: (prompt[0] not in priority_prompt_ids, prompt[0]))
+        rows = []
+
+        for prompt_idx, (prompt_id, marks) in enumerate(prompts):
+            prompt_marks = set((marks or '').splitlines())
+            priority = 1 if prompt_id in priority_prompt_ids else 0
+
+            for account_idx, account in enumerate(accounts):
+                account_id, account_url = account[0], account[9]
+
+                if prompt_id not in new_prompts and account_id not in new_accounts:
+                    continue
+
+                mark = f"{"vc" if "vc" in account_url.lower() else "dtf"}-{account_id}"
+                rows.append((
+                    prompt_id,
+                    account_id,
+                    WORK_DONE if mark in prompt_marks else WORK_PENDING,
+                    priority,
+                    work_round(prompt_idx, account_idx, len(accounts), current_round)
+                ))
+
+        return connection.executemany(
+            "INSERT OR IGNORE INTO WorkItems (prompt_id, account_id, status, priority, round) VALUES (?, ?, ?, ?, ?)",
+            rows
+        ).rowcount
+
+    return await run_write(db_path, sync)
+
+async def next_work_round(db_path: str) -> int | None:
+    """Ближайшая серия с неотработанными парами (None — все пары отработаны)"""
+
+    return (await fetchone(db_path, "SELECT MIN(round) FROM WorkItems WHERE status = ?", (WORK_PENDING,)))[0]
+
+async def next_eligible_time(db_path: str, round_no: int) -> float | None:
+    """Время, с которого в серии появится пара, доступная для работы"""
+
+    return (await fetchone(
+        db_path,
+        "SELECT MIN(next_eligible) FROM WorkItems WHERE status = ? AND round = ?",
+        (WORK_PENDING, round_no)
+    ))[0]
+
+async def round_accounts(db_path: str, round_no: int) -> list:
+    """Аккаунты, у которых есть пары в серии"""
+
+    rows = await fetchall(
+        db_path, "SELECT DISTINCT account_id FROM WorkItems WHERE status = ? AND round = ?", (WORK_PENDING, round_no)
+    )
+    return [row[0] for row in rows]
+
+async def claim_work_item(db_path: str, round_no: int, account_id: int = None) -> tuple | None:
+    """Взятие в работу следующей пары серии (приоритетные промты — первыми).
+
+    Возвращает (id, prompt_id, account_id, round, article_id) или None, если доступных пар в серии нет.
+    article_id — статья, сгенерированная для пары до остановки бота, но не опубликованная.
+    """
+
+    query = ("SELECT id, prompt_id, account_id, round, article_id FROM WorkItems "
+             "WHERE status = ? AND round = ? AND next_eligible <= ?")
+    params = [WORK_PENDING, round_no, time.time()]
+
+    if account_id is not None:
+        query += " AND account_id = ?"
+        params.append(account_id)
+
+    query += " ORDER BY priority DESC, prompt_id LIMIT 1"
+
+    def claim(connection):
+        row = connection.execute(query, params).fetchone()
+
+        if row is not None:
+            connection.execute(
+                "UPDATE WorkItems SET status = ?, attempts = attempts + 1 WHERE id = ?", (WORK_RUNNING, row[0])
+            )
+
+        return row
+
+    return await run_write(db_path, claim)
+
+async def complete_work_item(db_path: str, work_id: int, status: str, article_id: int = None) -> None:
+    """Завершение пары с итоговым статусом"""
+
+    await execute(
+        db_path,
+        "UPDATE WorkItems SET status = ?, article_id = COALESCE(?, article_id) WHERE id = ?",
+        (status, article_id, work_id)
+    )
+
+async def attach_work_article(db_path: str, work_id: int, article_id: int) -> None:
+    """Привязка сгенерированной статьи к паре: после перезапуска бота статья публикуется без повторной генерации"""
+
+    await execute(db_path, "UPDATE WorkItems SET article_id = ? WHERE id = ?", (article_id, work_id))
+
+async def retry_work_item(db_path: str, work_id: int, round_no: int, delay: float) -> None:
+    """Возврат пары в очередь: в серию round_no, но не раньше чем через delay секунд"""
+
+    await execute(
+        db_path,
+        "UPDATE WorkItems SET status = ?, round = ?, next_eligible = ?, article_id = NULL WHERE id = ?",
+        (WORK_PENDING, round_no, time.time() + delay, work_id)
+    )
+
+async def skip_account_work(db_path: str, account_id: int) -> int:
+    """Пропуск всех оставшихся пар аккаунта. Возвращает количество пропущенных пар"""
+
+    return await run_write(db_path, lambda connection: connection.execute(
+        "UPDATE WorkItems SET status = ? WHERE account_id = ? AND status = ?",
+        (WORK_SKIPPED, account_id, WORK_PENDING)
+    ).rowcount)
+
+async def mark_work_done(db_path: str, prompt_id: int, account_id: int) -> None:
+    """Отметка ожидающей пары отработанной (промт отработан для аккаунта вне основного цикла)"""
+
+    await execute(
+        db_path,
+        "UPDATE WorkItems SET status = ? WHERE prompt_id = ? AND account_id = ? AND status = ?",
+        (WORK_DONE, prompt_id, account_id, WORK_PENDING)
+    )
+
+async def count_work_items(db_path: str, account_ids: list) -> tuple:
+    """Количество (отработанных, всех, опубликованных) пар аккаунтов задания"""
+
+    placeholders = ', '.join('?' * len(account_ids))
+
+    processed, total, published = await fetchone(
+        db_path,
+        f"SELECT SUM(status NOT IN (?, ?)), COUNT(*), SUM(status = ?) FROM WorkItems "
+        f"WHERE account_id IN ({placeholders})",
+        (WORK_PENDING, WORK_RUNNING, WORK_DONE, *account_ids)
+    )
+
+    return processed or 0, total, published or 0
@@ -0,0 +1,122 @@
+import asyncio
+
+from bot.config import DB_TASK_DIRECTORY, TASK_STATUS_FLUSH_INTERVAL
+from bot.databases.connection_pool import get_connection
+from bot.databases.db_gateway import executemany
+from bot.handlers.commands.logging import log
+
+# Статусы заданий в памяти: {имя задания: {'task_type', 'status', 'last_status'}} (в порядке id в Tasks)
+task_statuses = {}
+
+# Задания, изменённые статусы которых ещё не записаны в tasks.db
+dirty_tasks = set()
+
+# Сигнал фоновой записи о смене состояния задания (пауза, продолжение, завершение)
+flush_event = asyncio.Event()
+
+loaded = False
+
+
+def load_task_statuses() -> None:
+    """Загрузка статусов всех заданий из tasks.db (один раз за запуск бота)"""
+
+    global loaded
+
+    cursor = get_connection(DB_TASK_DIRECTORY).cursor()
+    cursor.execute("SELECT task_name, task_type, status, last_status FROM Tasks ORDER BY id")
+
+    for task_name, task_type, status, last_status in cursor.fetchall():
+        task_statuses.setdefault(task_name, {'task_type': task_type, 'status': status, 'last_status': last_status})
+
+    loaded = True
+
+def get_task_status(task_name: str) -> dict | None:
+    """Статус задания из памяти (None, если задание не найдено)"""
+
+    entry = task_statuses.get(task_name)
+
+    if entry is None and not loaded:
+        load_task_statuses()
+        entry = task_statuses.get(task_name)
+
+    if entry is None:
+        # Задание могло быть добавлено в tasks.db в обход реестра
+        cursor = get_connection(DB_TASK_DIRECTORY).cursor()
+        cursor.execute("SELECT task_type, status, last_status FROM Tasks WHERE task_name = ?", (task_name,))
+        row = cursor.fetchone()
+
+        if row is not None:
+            entry = task_statuses[task_name] = {'task_type': row[0], 'status': row[1], 'last_status': row[2]}
+
+    return entry
+
+def task_names() -> list:
+    """Имена всех заданий в порядке создания"""
+
+    if not loaded:
+        load_task_statuses()
+
+    return list(task_statuses)
+
+def register_task_status(task_name: str, task_type: str, status: str) -> None:
+    """Добавление в реестр задания, только что записанного в Tasks"""
+
+    task_statuses[task_name] = {'task_type': task_type, 'status': status, 'last_status': '-'}
+
+def remove_task_status(task_name: str) -> None:
+    """Удаление задания из реестра (строка Tasks удаляется отдельно)"""
+
+    task_statuses.pop(task_name, None)
+    dirty_tasks.discard(task_name)
+
+def set_task_status(task_name: str, status: str = None, *, last_status: str = None, flush: bool = False) -> None:
+    """Изменение статуса задания в памяти. Запись в tasks.db выполняет фоновая задача:
+    раз в TASK_STATUS_FLUSH_INTERVAL секунд или сразу, если flush=True (смена состояния задания)
+    """
+
+    entry = get_task_status(task_name)
+
+    if entry is None:
+        return
+
+    if status is not None:
+        entry['status'] = status
+
+    if last_status is not None:
+        entry['last_status'] = last_status
+
+    dirty_tasks.add(task_name)
+
+    if flush:
+        flush_event.set()
+
+async def flush_task_statuses() -> None:
+    """Запись изменённых статусов в tasks.db одной транзакцией"""
+
+    if not dirty_tasks:
+        return
+
+    changed = list(dirty_tasks)
+    dirty_tasks.clear()
+
+    rows = [(task_statuses[task_name]['status'], task_statuses[task_name]['last_status'], task_name)
+            for task_name in changed if task_name in task_statuses]
+
+    try:
+        await executemany(DB_TASK_DIRECTORY, "UPDATE Tasks SET status = ?, last_status = ? WHERE task_name = ?", rows)
+    except Exception as e:
+        # Статусы будут записаны при следующей попытке
+        dirty_tasks.update(task_name for task_name in changed if task_name in task_statuses)
+        log.debug(f"Произошла ошибка при записи статусов заданий в базу данных: {str(e)}")
+
+async def status_flusher() -> None:
+    """Фоновая запись статусов заданий: по интервалу или по сигналу смены состояния"""
+
+    while True:
+        try:
+            await asyncio.wait_for(flush_event.wait(), TASK_STATUS_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+        flush_event.clear()
+        await flush_task_statuses()
@@ -0,0 +1,122 @@
+from bot.config import DB_DIRECTORY, DB_TASK_DIRECTORY
+from bot.databases.db_gateway import run_read
+
+# Значения по умолчанию (как при создании tasks.db) — если настройка не задана ни в задании, ни в общих настройках
+DEFAULT_SETTINGS = {
+    'articles_links_count': '4',
+    'currents_replace': 'None',
+    'new_replace': 'None',
+    'indexing': 'True',
+    'user_id': '-',
+    'api_key': '-',
+    'searchengine': '-',
+    'se_type': '-',
+    'host': '-',
+    'port': '-',
+    'username': '-',
+    'password': '-',
+    'timeout_task_cycle': '3600',
+    'timeout_posting_articles': '180',
+    'flag_posting_db': 'True',
+    'flag_posting_for_main': 'True',
+    'count_key_words': '15',
+}
+
+# Типы настроек, которые хранятся строками: числа и флаги 'True'/'False'
+SETTINGS_TYPES = {
+    'articles_links_count': int,
+    'timeout_task_cycle': int,
+    'timeout_posting_articles': int,
+    'count_key_words': int,
+    'indexing': bool,
+    'flag_posting_db': bool,
+    'flag_posting_for_main': bool,
+}
+
+# Прочитанные строки настроек: {(таблица, имя задания или None для общих настроек): {столбец: значение}}
+settings_cache = {}
+
+# Счётчик сбросов кэша: строка, чтение которой началось до сброса, в кэш не записывается
+cache_generation = 0
+
+
+async def read_cached(key: tuple, db_path: str, read) -> dict:
+    """Строка настроек из кэша. При промахе read(connection) выполняется в потоке чтения шлюза"""
+
+    settings = settings_cache.get(key)
+
+    if settings is None:
+        generation = cache_generation
+        settings = await run_read(db_path, read)
+
+        if generation == cache_generation:
+            settings_cache[key] = settings
+
+    return settings
+
+def invalidate_cached(key: tuple) -> None:
+    """Сброс строки настроек в кэше"""
+
+    global cache_generation
+
+    cache_generation += 1
+    settings_cache.pop(key, None)
+
+def read_row(connection) -> dict:
+    cursor = connection.execute("SELECT * FROM TasksSettings WHERE id = 1")
+    row = cursor.fetchone() or ()
+
+    return {column[0]: value for column, value in zip(cursor.description, row) if column[0] != 'id'}
+
+async def read_settings(task_name: str = None) -> dict:
+    """Строка TasksSettings задания (или общих настроек) без подстановок. Читается один раз до сброса кэша"""
+
+    db_path = DB_TASK_DIRECTORY if task_name is None else DB_DIRECTORY + task_name + '.db'
+
+    return await read_cached(('TasksSettings', task_name), db_path, read_row)
+
+async def resolve_settings(task_name: str = None) -> dict:
+    """Настройки строками: значение задания → общее значение → значение по умолчанию ('-' — не задано)"""
+
+    task_settings = await read_settings(task_name) if task_name else {}
+    global_settings = await read_settings()
+
+    resolved = {}
+
+    for name, default in DEFAULT_SETTINGS.items():
+        value = task_settings.get(name, '-')
+
+        if value in (None, '-'):
+            value = global_settings.get(name, '-')
+
+        resolved[name] = default if value in (None, '-') else value
+
+    return resolved
+
+def convert_setting(name: str, value: str):
+    """Приведение строкового значения настройки к её типу"""
+
+    setting_type = SETTINGS_TYPES.get(name)
+
+    if setting_type is bool:
+        return value == 'True'
+
+    if setting_type is int:
+        return int(value)
+
+    return value
+
+async def get_settings(task_name: str = None) -> dict:
+    """Все настройки задания (или общие настройки) с приведёнными типами"""
+
+    return {name: convert_setting(name, value) for name, value in (await resolve_settings(task_name)).items()}
+
+async def get_setting(name: str, task_name: str = None):
+    """Одна настройка задания (или общая настройка) с приведённым типом"""
+
+    return convert_setting(name, (await resolve_settings(task_name))[name])
+
+def invalidate_tasks_settings(task_name: str = None) -> None:
+    """Сброс кэша после записи в TasksSettings задания (или общих настроек, если задание не указано)"""
+
+    invalidate_cached(('TasksSettings', task_name))
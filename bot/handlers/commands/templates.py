@@ -0,0 +1,94 @@
+import re
+
+from bot.config import DB_PATTERNS_DIRECTORY, DB_LINKS_DIRECTORY, DB_IMAGES_DIRECTORY
+from bot.databases.db_gateway import fetchall
+
+# Подстановки шаблона промта
+PLACEHOLDER_REGEX = re.compile(r'(%LINKS%|%IMAGES%|%NAME%|%KEYS%)')
+
+# Кэш: {'patterns': {название: скомпилированный шаблон}, 'links': {название: ссылки},
+#       'images': {название папки: текст подстановки %IMAGES%}}
+templates_cache = {}
+
+# Номер сброса кэша по видам: результат загрузки, начатой до сброса, в кэш не попадает
+templates_versions = {}
+
+
+def compile_template(pattern: str) -> tuple:
+    """Разбор шаблона на части: чётные — текст, нечётные — названия подстановок"""
+
+    return tuple(PLACEHOLDER_REGEX.split(pattern))
+
+def render_template(template: tuple, values: dict) -> str:
+    """Сборка текста из скомпилированного шаблона (отсутствующие подстановки заменяются пустой строкой)"""
+
+    return ''.join(values.get(part, '') if index % 2 else part for index, part in enumerate(template))
+
+def images_instruction(image_path: str) -> str:
+    """Текст подстановки %IMAGES% для папки изображений"""
+
+    matches = re.findall(r'/([^/]+)\.[a-zA-Z0-9]+', image_path)
+
+    return (f'В соответствующем названию подзаголовке добавь <div type="image">Name</div>, '
+            f'где Name соответствует названию продукта. Названия картинок:\n'
+            f'{'\n'.join(matches)}')
+
+async def load_patterns() -> dict:
+    """Скомпилированные шаблоны по названиям"""
+
+    patterns = {}
+
+    # При совпадающих названиях используется первая запись
+    for name, pattern in await fetchall(DB_PATTERNS_DIRECTORY, "SELECT pattern_name, pattern FROM Patterns ORDER BY id"):
+        patterns.setdefault(str(name), compile_template(pattern))
+
+    return patterns
+
+async def load_links() -> dict:
+    """Содержимое ссылок по названиям"""
+
+    links = {}
+
+    for name, source in await fetchall(DB_LINKS_DIRECTORY, "SELECT link_name, link_source FROM Links ORDER BY id"):
+        links.setdefault(name, source)
+
+    return links
+
+async def load_images() -> dict:
+    """Готовые подстановки %IMAGES% по названиям папок изображений"""
+
+    images = {}
+
+    for name, path in await fetchall(DB_IMAGES_DIRECTORY, "SELECT image_name, image_path FROM Images ORDER BY id"):
+        if name not in images:
+            images[name] = images_instruction(path)
+
+    return images
+
+LOADERS = {'patterns': load_patterns, 'links': load_links, 'images': load_images}
+
+
+async def get_templates() -> dict:
+    """Скомпилированные шаблоны и подстановки ссылок и изображений (читаются из баз только после сброса кэша)"""
+
+    templates = {}
+
+    for kind, loader in LOADERS.items():
+        if kind in templates_cache:
+            templates[kind] = templates_cache[kind]
+            continue
+
+        version = templates_versions.get(kind, 0)
+        templates[kind] = await loader()
+
+        if version == templates_versions.get(kind, 0):
+            templates_cache[kind] = templates[kind]
+
+    return templates
+
+def invalidate_templates(kind: str = None) -> None:
+    """Сброс кэша после изменения шаблонов ('patterns'), ссылок ('links') или изображений ('images')"""
+
+    for name in (LOADERS if kind is None else (kind,)):
+        templates_cache.pop(name, None)
+        templates_versions[name] = templates_versions.get(name, 0) + 1
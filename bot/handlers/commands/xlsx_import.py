@@ -0,0 +1,181 @@
+import asyncio
+import time
+
+import openpyxl
+
+from bot.config import DB_DIRECTORY, DB_XLSX_DIRECTORY
+from bot.databases.db_gateway import run_write, executemany
+from bot.handlers.commands.logging import get_task_logger
+from bot.handlers.commands.tasks_settings import get_setting
+from bot.handlers.commands.templates import get_templates, render_template
+
+# Цвет фона ячейки без заливки: строки с другим фоном ключа начинают новую тему
+NO_FILL = '00000000'
+
+# Количество значений в одном запросе с IN (...), чтобы не превысить лимит параметров SQLite
+IN_CHUNK_SIZE = 500
+
+
+def cell_value(row: tuple, index: int):
+    """Значение ячейки строки (None, если в строке нет такого столбца)"""
+
+    return row[index].value if index < len(row) else None
+
+def read_themes(file_path: str) -> tuple:
+    """Разбор xlsx-файла на темы: ([(тема, шаблон, ссылки, изображения, ключи)], количество тем).
+
+    Тема начинается со строки, ключ которой выделен фоном; следующие строки без фона добавляют ключи.
+    Если задана опциональная тема, ключ строки заголовка попадает в ключи, а тема — нет.
+    """
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+
+    themes = []
+    theme = None
+    header_key = None  # Ключ заголовка, если опциональная тема не задана
+    is_optional = False
+
+    def close_theme():
+        topic, pattern_name, link_name, image_name, keys = theme
+
+        if not keys and header_key is not None:
+            keys.append(header_key)
+
+        if not is_optional and topic not in keys:
+            keys.insert(0, topic)
+
+        themes.append(theme)
+
+    try:
+        for row in workbook.active.iter_rows(min_row=2):
+            key_cell = row[0]
+            fill = key_cell.fill
+
+            if fill is not None and fill.start_color.index != NO_FILL:
+                if theme is not None:
+                    close_theme()
+
+                option_topic = cell_value(row, 3)
+
+                if option_topic:
+                    topic, keys, header_key, is_optional = option_topic, [key_cell.value], None, True
+                else:
+                    topic, keys, header_key, is_optional = key_cell.value, [], key_cell.value, False
+
+                theme = (topic, cell_value(row, 1), cell_value(row, 2), cell_value(row, 4), keys)
+            elif theme is not None and key_cell.value is not None and str(key_cell.value).strip() != "":
+                theme[4].append(key_cell.value)
+
+        if theme is not None:
+            close_theme()
+    finally:
+        workbook.close()
+
+    return themes, len(themes)
+
+async def load_import_context(task: str) -> dict:
+    """Шаблоны, ссылки, изображения и настройки, которые нужны для сборки промтов (читаются один раз)"""
+
+    context = dict(await get_templates())
+    context['count'] = await get_setting('count_key_words', task)
+
+    return context
+
+def build_prompt(topic, pattern_name, link_name, image_name, keys: list, context: dict) -> str | None:
+    """Сборка текста промта по скомпилированному шаблону темы (None, если шаблон не найден)"""
+
+    template = context['patterns'].get(str(pattern_name))
+
+    if template is None:
+        return None
+
+    return render_template(template, {
+        '%LINKS%': context['links'].get(link_name, '') if link_name else '',
+        '%IMAGES%': context['images'].get(image_name, '') if image_name else '',
+        '%NAME%': str(topic),
+        '%KEYS%': "\n".join(str(key) for key in keys[:context['count']] if key),
+    })
+
+async def save_keys(keys_list: list) -> tuple:
+    """Запись наборов ключей в Xlsx одной транзакцией. Возвращает ({ключи: id}, id созданных наборов);
+    существующие наборы не дублируются"""
+
+    unique_keys = list(dict.fromkeys(keys_list))
+
+    def select_ids(connection, ids):
+        for start in range(0, len(unique_keys), IN_CHUNK_SIZE):
+            chunk = unique_keys[start:start + IN_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+
+            for key_id, keys in connection.execute(
+                    f"SELECT id, keys FROM Xlsx WHERE keys IN ({placeholders}) ORDER BY id DESC", chunk):
+                ids[keys] = key_id  # при дублях остаётся запись с наименьшим id
+
+    def save(connection):
+        ids = {}
+        select_ids(connection, ids)
+
+        new_keys = [(keys,) for keys in unique_keys if keys not in ids]
+
+        if new_keys:
+            connection.executemany("INSERT INTO Xlsx (keys) VALUES (?)", new_keys)
+            select_ids(connection, ids)
+
+        return ids, [ids[keys] for (keys,) in new_keys]
+
+    return await run_write(DB_XLSX_DIRECTORY, save)
+
+async def drop_keys(key_ids: list) -> None:
+    """Удаление наборов ключей, созданных импортом, промты которого не записались"""
+
+    if key_ids:
+        await executemany(DB_XLSX_DIRECTORY, "DELETE FROM Xlsx WHERE id = ?", [(key_id,) for key_id in key_ids])
+
+async def import_prompts_from_xlsx(task: str, file_path: str) -> tuple:
+    """Импорт промтов задания из xlsx-файла: разбор, сборка в памяти и пакетная запись.
+
+    Возвращает (флаг, количество промтов, количество тем, информация).
+    """
+
+    task_log = get_task_logger(task)
+    started = time.monotonic()
+
+    try:
+        (themes, theme_count), context = await asyncio.gather(
+            asyncio.to_thread(read_themes, file_path), load_import_context(task)
+        )
+        parsed = time.monotonic()
+
+        keys_list = ['\n'.join(map(str, keys)) for topic, pattern_name, link_name, image_name, keys in themes]
+        keys_ids, created_ids = await save_keys(keys_list)
+
+        prompts = []
+
+        for (topic, pattern_name, link_name, image_name, keys), keys_str in zip(themes, keys_list):
+            prompt = build_prompt(topic, pattern_name, link_name, image_name, keys, context)
+
+            if prompt is None:
+                task_log.debug(f"Шаблон отсутствует для темы '{topic}' с pattern_name - '{pattern_name}'")
+                continue
+
+            prompts.append((prompt, topic, str(keys_ids[keys_str])))
+
+        try:
+            await run_write(DB_DIRECTORY + task + '.db', lambda connection: connection.executemany(
+                "INSERT INTO Prompts (prompt, prompt_theme, xlsx_id) VALUES (?, ?, ?)", prompts
+            ))
+        except Exception:
+            # Xlsx и база задания — разные файлы: без промтов новые наборы ключей никому не нужны
+            await drop_keys(created_ids)
+            raise
+    except Exception as e:
+        info = f"Произошла ошибка при импорте промтов из xlsx-файла: {str(e)}"
+        task_log.debug(info)
+        return False, 0, None, info
+
+    elapsed = time.monotonic() - started
+    info = (f"Импорт xlsx: тем {theme_count}, промтов {len(prompts)} за {elapsed:.2f} с "
+            f"(разбор файла {parsed - started:.2f} с, {theme_count / max(elapsed, 1e-6):.0f} тем/с)")
+    task_log.debug(info)
+
+    return True, len(prompts), theme_count, info
@@ -1,6 +1,5 @@
 import os
 import re
-import sqlite3
 
 import openpyxl
 from aiogram import Router
@@ -8,7 +7,9 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import CallbackQuery, FSInputFile, InlineKeyboardMarkup, InlineKeyboardButton, Message
 
-from bot.config import TIMEOUT_DELAY, DB_MAIN_ACCOUNTS_DIRECTORY, DB_MULTI_ACCOUNTS_DIRECTORY
+from bot.config import DB_MAIN_ACCOUNTS_DIRECTORY, DB_MULTI_ACCOUNTS_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.db_gateway import run_write
 from bot.handlers.commands.admins_filter import AdminFilter
 from bot.handlers.commands.commands_manager import CommandsManager
 from bot.handlers.routers.control_panel import BACK_TO_TASKS
@@ -60,7 +61,7 @@ async def data_accounts_handler(message: Message, state: FSMContext):
     accounts_data = await state.get_data()
     task_type = accounts_data.get('task_type')
 
-    with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY if task_type == 'Основной'\
+    with get_connection(DB_MAIN_ACCOUNTS_DIRECTORY if task_type == 'Основной'\
                          else DB_MULTI_ACCOUNTS_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute(
@@ -113,8 +114,7 @@ async def edit_accounts_handler(message: Message, state: FSMContext):
             updated_data.append((new_value, field))
 
     if updated_data:
-        with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY if task_type == 'Основной'
-                             else DB_MULTI_ACCOUNTS_DIRECTORY) as connection:
+        def update_account(connection):
             cursor = connection.cursor()
             for new_value, field in updated_data:
                 cursor.execute(
@@ -133,7 +133,9 @@ async def edit_accounts_handler(message: Message, state: FSMContext):
                 """,
                 ('-', account_id)
             )
-            connection.commit()
+
+        await run_write(DB_MAIN_ACCOUNTS_DIRECTORY if task_type == 'Основной' else DB_MULTI_ACCOUNTS_DIRECTORY,
+                        update_account)
 
         await message.answer("✅ Данные аккаунта успешно обновлены!")
     else:
@@ -200,7 +202,7 @@ async def upload_xlsx_handler(message: Message, state: FSMContext):
 async def download_accounts_callback_query(call: CallbackQuery):
     task_type = call.data[18:]
     if task_type == 'Основной':
-        with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+        with get_connection(DB_MAIN_ACCOUNTS_DIRECTORY) as connection:
             cursor = connection.cursor()
             cursor.execute("SELECT * FROM Accounts")
             articles_data = cursor.fetchall()
@@ -213,7 +215,7 @@ async def download_accounts_callback_query(call: CallbackQuery):
             file_path = f"bot/assets/xlsx/accounts_{task_type}.xlsx"
             wb.save(file_path)
     else:
-        with sqlite3.connect(DB_MULTI_ACCOUNTS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+        with get_connection(DB_MULTI_ACCOUNTS_DIRECTORY) as connection:
             cursor = connection.cursor()
             cursor.execute("SELECT * FROM Accounts")
             articles_data = cursor.fetchall()
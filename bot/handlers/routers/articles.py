@@ -1,6 +1,5 @@
 import os
 import re
-import sqlite3
 import uuid
 
 import openpyxl
@@ -9,8 +8,11 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import CallbackQuery, FSInputFile, Message
 
-from bot.config import TIMEOUT_DELAY, DB_TASK_DIRECTORY, DB_DIRECTORY
+from bot.config import DB_TASK_DIRECTORY, DB_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.db_gateway import execute
 from bot.handlers.commands.admins_filter import AdminFilter
+from bot.handlers.commands.api.openai_batch import PREGENERATED_STATUS
 from bot.handlers.routers.control_panel import BACK_TO_TASKS
 from bot.keyboards.keyboards import task_articles
 
@@ -30,19 +32,20 @@ async def task_articles_callback_query(call: CallbackQuery):
 async def download_articles_callback_query(call: CallbackQuery):
     task_name = call.data[18:]
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT task_type FROM Tasks WHERE task_name = ?", (task_name,))
         task_type = cursor.fetchone()[0]
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
+    connection = get_connection(DB_DIRECTORY + task_name + '.db')
     cursor = connection.cursor()
     if task_type == 'Основной':
-        cursor.execute("SELECT id, article_text, article_image, marks, status FROM Articles")
+        cursor.execute("SELECT id, article_text, article_image, marks, status FROM Articles WHERE status IS NOT ?",
+                       (PREGENERATED_STATUS,))
     else:
-        cursor.execute("SELECT id, article_text, article_image, account_login, marks, status, article_url FROM Articles")
+        cursor.execute("SELECT id, article_text, article_image, account_login, marks, status, article_url FROM Articles "
+                       "WHERE status IS NOT ?", (PREGENERATED_STATUS,))
     articles_data = cursor.fetchall()
-    connection.close()
 
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -81,11 +84,10 @@ async def get_id_edit_articles_handler(message: Message, state: FSMContext):
 
     article_id = int(message.text.strip())
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
+    connection = get_connection(DB_DIRECTORY + task_name + '.db')
     cursor = connection.cursor()
-    cursor.execute("SELECT id FROM Articles WHERE id = ?", (article_id,))
+    cursor.execute("SELECT id FROM Articles WHERE id = ? AND status IS NOT ?", (article_id, PREGENERATED_STATUS))
     result = cursor.fetchone()
-    connection.close()
 
     if not result:
         await message.answer("❌ Статья с указанным ID не найдена. Убедитесь, что ID указан верно.", reply_markup=BACK_TO_TASKS)
@@ -114,14 +116,11 @@ async def edit_articles_handler(message: Message, state: FSMContext):
         new_article_text = f.read()
     os.remove(file_path)
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute(
+    await execute(
+        DB_DIRECTORY + task_name + '.db',
         "UPDATE Articles SET article_text = ? WHERE id = ?",
         (new_article_text, article_id)
     )
-    connection.commit()
-    connection.close()
 
     await message.answer("✅ Текст статьи успешно обновлён!")
 
@@ -1,7 +1,6 @@
 import asyncio
 import os
 import re
-import sqlite3
 import uuid
 from itertools import count
 
@@ -14,23 +13,27 @@ from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, FSInputFile
 from aiogram.filters import CommandStart
 from aiogram import Router
-from openai import AsyncOpenAI
 from openpyxl.reader.excel import load_workbook
 
 from openpyxl.styles import PatternFill
 
-from bot.config import DB_TASK_DIRECTORY, TIMEOUT_DELAY, DB_OPENAI_API_KEY_DIRECTORY, DB_ARTICLES_DIRECTORY, \
+from bot.config import DB_TASK_DIRECTORY, DB_OPENAI_API_KEY_DIRECTORY, DB_ARTICLES_DIRECTORY, \
     DB_MAIN_ACCOUNTS_DIRECTORY, DB_MULTI_ACCOUNTS_DIRECTORY, DB_XLSX_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.db_gateway import execute, run_write
 from bot.databases.database_manager import DatabaseManager
 from bot.handlers.commands.admins_filter import AdminFilter
+from bot.handlers.commands.api.openai_api import get_client, get_global_settings, invalidate_settings
+from bot.handlers.commands.api.openai_scheduler import openai_request, estimate_tokens
 from bot.handlers.commands.logging import get_task_logger, log
-from bot.handlers.commands.commands_manager import CommandsManager
 from bot.handlers.commands.posting_modes.articles_editor import articles_editor_run
 from bot.handlers.commands.posting_modes.common import get_accounts
 from bot.handlers.commands.posting_modes.main_posting import run_task_script
 from bot.handlers.commands.posting_modes.posting_from_db import publishing_db
 from bot.handlers.commands.posting_modes.server_posting import server_articles_publishing
 from bot.handlers.commands.task_manager import manager
+from bot.handlers.commands.task_status import register_task_status, set_task_status
+from bot.handlers.commands.tasks_settings import invalidate_tasks_settings
 from bot.keyboards.keyboards import tasks_list, get_accounts_from_db, generate_pagination_keyboard
 
 router_tasks_list = Router(name=__name__)
@@ -146,13 +149,8 @@ async def get_api_key_callback_query(call: CallbackQuery, state: FSMContext):
 async def upload_api_key_handler(message: Message, state: FSMContext):
     """Загрузка API-ключа OpenAI"""
 
-    with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE ApiKey SET api_key = ? WHERE id = 1",
-            (message.text, )
-        )
-        connection.commit()
+    await execute(DB_OPENAI_API_KEY_DIRECTORY, "UPDATE ApiKey SET api_key = ? WHERE id = 1", (message.text, ))
+    invalidate_settings()
     await message.answer("✅ API-ключ успешно загружен.")
 
     keyboard = await tasks_list()
@@ -165,7 +163,7 @@ async def upload_api_key_handler(message: Message, state: FSMContext):
 async def get_server_param_callback_query(call: CallbackQuery, state: FSMContext):
     """Ожидание настройки подключения к внешнему серверу"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT host, port, username, password FROM TasksSettings WHERE id = 1")
         host, port, username, password = cursor.fetchone()
@@ -194,13 +192,13 @@ async def upload_server_param_handler(message: Message, state: FSMContext):
         await message.answer("❌ Пожалуйста, введите параметры в корректном формате.", reply_markup=BACK_TO_TASKS)
         return
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE TasksSettings SET host = ?, port = ?, username = ?, password = ? WHERE id = 1",
-            (host, port, username, password)
-        )
-        connection.commit()
+    await execute(
+        DB_TASK_DIRECTORY,
+        "UPDATE TasksSettings SET host = ?, port = ?, username = ?, password = ? WHERE id = 1",
+        (host, port, username, password)
+    )
+
+    invalidate_tasks_settings()
 
     await message.answer("✅ Настройки подключения к внешнему серверу успешно обновлены.")
     keyboard = await tasks_list()
@@ -280,26 +278,18 @@ async def pagination_select_account_task_callback(call: CallbackQuery, state: FS
     task_type = 'Основной'
 
     status = 'Ожидание загрузки необходимых ресурсов'
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            'INSERT INTO Tasks (task_name, task_type, status) VALUES (?, ?, ?)',
-            (task, task_type, status)
-        )
-        connection.commit()
+    await execute(
+        DB_TASK_DIRECTORY,
+        'INSERT INTO Tasks (task_name, task_type, status) VALUES (?, ?, ?)',
+        (task, task_type, status)
+    )
+
+    register_task_status(task, task_type, status)
 
     task_log = get_task_logger(task)
     task_log.debug(f"{task} запущено")
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE Tasks SET last_status = ? WHERE task_name = ?",
-            (status, task)
-        )
-        connection.commit()
-
-    await CommandsManager.update_task_status_db(task=task, status='Приостановлено')
+    set_task_status(task, 'Приостановлено', last_status=status, flush=True)
 
     keyboard = await tasks_list()
     await call.message.edit_text("Выберите задание или добавьте новое:", reply_markup=keyboard)
@@ -354,13 +344,13 @@ async def task_with_type_create_callback_query(call: CallbackQuery):
         task_type = 'Мультиаккаунты'
 
     status = 'Ожидание загрузки необходимых ресурсов'
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            'INSERT INTO Tasks (task_name, task_type, status) VALUES (?, ?, ?)',
-            (task, task_type, status)
-        )
-        connection.commit()
+    await execute(
+        DB_TASK_DIRECTORY,
+        'INSERT INTO Tasks (task_name, task_type, status) VALUES (?, ?, ?)',
+        (task, task_type, status)
+    )
+
+    register_task_status(task, task_type, status)
 
     task_log = get_task_logger(task)
     task_log.debug(f"{task} запущено")
@@ -368,15 +358,7 @@ async def task_with_type_create_callback_query(call: CallbackQuery):
     keyboard = await tasks_list()
     await call.message.edit_text("Выберите задание или добавьте новое:", reply_markup=keyboard)
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE Tasks SET last_status = ? WHERE task_name = ?",
-            (status, task)
-        )
-        connection.commit()
-
-    await CommandsManager.update_task_status_db(task=task, status='Приостановлено')
+    set_task_status(task, 'Приостановлено', last_status=status, flush=True)
     
     start_task = asyncio.create_task(manager.add_task(1,
                                                       run_task_script,
@@ -393,7 +375,7 @@ async def task_with_type_create_callback_query(call: CallbackQuery):
 async def test_prompt_callback_query(call: CallbackQuery, state: FSMContext):
     """Ожидание промта"""
 
-    with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as conn_api:
+    with get_connection(DB_OPENAI_API_KEY_DIRECTORY) as conn_api:
         cursor_api = conn_api.cursor()
         cursor_api.execute("SELECT api_key FROM ApiKey WHERE id = 1")
         api_key = cursor_api.fetchone()[0]
@@ -424,21 +406,23 @@ async def test_prompt_handler(message: Message, state: FSMContext):
         prompt_text = f.read()
     os.remove(file_path)
 
-    with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT model_text FROM ModelAI WHERE id = 1")
-        model_text = cursor.fetchone()
+    model_text = (await get_global_settings())['model_text']
 
-    client = AsyncOpenAI(api_key=api_key)
+    client = get_client(api_key)
     try:
-        chat_completion = await client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt_text,
-                }
-            ],
-            model=model_text,
+        chat_completion = await openai_request(
+            api_key,
+            'Тест промта',
+            estimate_tokens(prompt_text),
+            lambda: client.chat.completions.with_raw_response.create(
+                messages=[
+                    {
+                        "role": "user",
+                        "content": prompt_text,
+                    }
+                ],
+                model=model_text,
+            )
         )
         chat_response = chat_completion.choices[0].message.content
 
@@ -470,7 +454,7 @@ async def get_api_models_callback_query(call: CallbackQuery):
         [InlineKeyboardButton(text='⬅️ Назад к заданиям', callback_data=f'back-to-tasks')]
     ])
 
-    with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_OPENAI_API_KEY_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT model_text, model_image FROM ModelAI WHERE id = 1")
         model_text, model_image = cursor.fetchone()
@@ -498,21 +482,15 @@ async def upload_model_handler(message: Message, state: FSMContext):
     model_data = await state.get_data()
     model_type = model_data['model_type']
 
-    with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        if model_type == 'text-model':
-            cursor.execute(
-                "UPDATE ModelAI SET model_text = ? WHERE id = 1",
-                (message.text, )
-            )
-            await message.answer("✅ Модель текста по умолчанию успешно изменена.")
-        else:
-            cursor.execute(
-                "UPDATE ModelAI SET model_image = ? WHERE id = 1",
-                (message.text, )
-            )
-            await message.answer("✅ Модель изображения по умолчанию успешно изменена.")
-        connection.commit()
+    if model_type == 'text-model':
+        await execute(DB_OPENAI_API_KEY_DIRECTORY, "UPDATE ModelAI SET model_text = ? WHERE id = 1", (message.text, ))
+        text = "✅ Модель текста по умолчанию успешно изменена."
+    else:
+        await execute(DB_OPENAI_API_KEY_DIRECTORY, "UPDATE ModelAI SET model_image = ? WHERE id = 1", (message.text, ))
+        text = "✅ Модель изображения по умолчанию успешно изменена."
+    invalidate_settings()
+
+    await message.answer(text)
 
     keyboard = await tasks_list()
     await message.answer("Выберите задание или добавьте новое:", reply_markup=keyboard)
@@ -524,7 +502,7 @@ async def upload_model_handler(message: Message, state: FSMContext):
 async def get_prompt_image_callback_query(call: CallbackQuery, state: FSMContext):
     """Изменение промта изображения OpenAI"""
 
-    with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_OPENAI_API_KEY_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT prompt_text FROM PromptImage WHERE id = 1")
         prompt_text = cursor.fetchone()[0]
@@ -543,13 +521,8 @@ async def upload_prompt_image_handler(message: Message, state: FSMContext):
         await message.answer("❌ Промт должен содержать обязательную переменную %NAME%.", reply_markup=BACK_TO_TASKS)
         return
 
-    with sqlite3.connect(DB_OPENAI_API_KEY_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE PromptImage SET prompt_text = ? WHERE id = 1",
-            (message.text, )
-        )
-        connection.commit()
+    await execute(DB_OPENAI_API_KEY_DIRECTORY, "UPDATE PromptImage SET prompt_text = ? WHERE id = 1", (message.text, ))
+    invalidate_settings()
 
     await message.answer("✅ Промт изображения успешно изменён.")
 
@@ -563,7 +536,7 @@ async def upload_prompt_image_handler(message: Message, state: FSMContext):
 async def get_timeout_cycle_callback_query(call: CallbackQuery, state: FSMContext):
     """Изменение задержки цикла"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT timeout_task_cycle FROM TasksSettings WHERE id = 1")
         timeout = cursor.fetchone()[0]
@@ -589,10 +562,10 @@ async def upload_timeout_cycle_handler(message: Message, state: FSMContext):
 
     timeout_in_seconds = int(new_timeout) * 60
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("UPDATE TasksSettings SET timeout_task_cycle = ? WHERE id = 1", (str(timeout_in_seconds),))
-        connection.commit()
+    await execute(DB_TASK_DIRECTORY, "UPDATE TasksSettings SET timeout_task_cycle = ? WHERE id = 1",
+                  (str(timeout_in_seconds),))
+
+    invalidate_tasks_settings()
 
     await message.answer(f"✅ Задержка цикла по умолчанию успешно обновлена на {new_timeout} мин.")
 
@@ -606,7 +579,7 @@ async def upload_timeout_cycle_handler(message: Message, state: FSMContext):
 async def get_timeout_publishing_callback_query(call: CallbackQuery, state: FSMContext):
     """Изменение задержки постинга"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT timeout_posting_articles FROM TasksSettings WHERE id = 1")
         timeout = cursor.fetchone()[0]
@@ -632,10 +605,10 @@ async def upload_timeout_publishing_handler(message: Message, state: FSMContext)
 
     timeout_in_seconds = int(new_timeout) * 60
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("UPDATE TasksSettings SET timeout_posting_articles = ? WHERE id = 1", (str(timeout_in_seconds),))
-        connection.commit()
+    await execute(DB_TASK_DIRECTORY, "UPDATE TasksSettings SET timeout_posting_articles = ? WHERE id = 1",
+                  (str(timeout_in_seconds),))
+
+    invalidate_tasks_settings()
 
     await message.answer(f"✅ Задержка постинга статей по умолчанию успешно обновлена на {new_timeout} мин.")
 
@@ -649,7 +622,7 @@ async def upload_timeout_publishing_handler(message: Message, state: FSMContext)
 async def get_count_key_callback_query(call: CallbackQuery, state: FSMContext):
     """Изменение количество загрузки ключевых фраз"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT count_key_words FROM TasksSettings WHERE id = 1")
         count = cursor.fetchone()[0]
@@ -673,10 +646,9 @@ async def upload_count_key_handler(message: Message, state: FSMContext):
         await message.answer("❌ Минимальное количество - 1. Попробуйте снова", reply_markup=BACK_TO_TASKS)
         return
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("UPDATE TasksSettings SET count_key_words = ? WHERE id = 1", (str(new_count),))
-        connection.commit()
+    await execute(DB_TASK_DIRECTORY, "UPDATE TasksSettings SET count_key_words = ? WHERE id = 1", (str(new_count),))
+
+    invalidate_tasks_settings()
 
     await message.answer(f"✅ Количество загружаемых фраз по умолчанию успешно обновлено на {new_count} шт.")
     keyboard = await tasks_list()
@@ -700,7 +672,7 @@ async def get_options_callback_query(call: CallbackQuery):
 async def get_options_main_callback_query(call: CallbackQuery, state: FSMContext):
     """Изменение настройки постинга для Основного режима"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT flag_posting_for_main FROM TasksSettings WHERE id = 1")
         flag = cursor.fetchone()[0]
@@ -715,7 +687,7 @@ async def get_options_main_callback_query(call: CallbackQuery, state: FSMContext
 async def get_options_db_callback_query(call: CallbackQuery, state: FSMContext):
     """Изменение настройки постинга БД"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT flag_posting_db FROM TasksSettings WHERE id = 1")
         flag = cursor.fetchone()[0]
@@ -739,14 +711,12 @@ async def upload_options_db_handler(message: Message, state: FSMContext):
         await message.answer("❌ Некорректный ввод. Попробуйте снова", reply_markup=BACK_TO_TASKS)
         return
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
+    if type_posting == 'db':
+        await execute(DB_TASK_DIRECTORY, "UPDATE TasksSettings SET flag_posting_db = ? WHERE id = 1", (new_flag,))
+    else:
+        await execute(DB_TASK_DIRECTORY, "UPDATE TasksSettings SET flag_posting_for_main = ? WHERE id = 1", (new_flag,))
 
-        if type_posting == 'db':
-            cursor.execute("UPDATE TasksSettings SET flag_posting_db = ? WHERE id = 1", (new_flag,))
-        else:
-            cursor.execute("UPDATE TasksSettings SET flag_posting_for_main = ? WHERE id = 1", (new_flag,))
-        connection.commit()
+    invalidate_tasks_settings()
 
     await message.answer(f"✅ Настройка постинга {'из базы данных' if type_posting == 'db' 
         else 'для Основного режима'} по умолчанию обновлена: <b>{'Публиковать сразу' if new_flag == 'True' 
@@ -765,7 +735,7 @@ async def publishing_db_callback_query(call: CallbackQuery):
 
     if 'Task' not in tasks_publishing_db or tasks_publishing_db['Task'].done():
 
-        with sqlite3.connect(DB_ARTICLES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+        with get_connection(DB_ARTICLES_DIRECTORY) as connection:
             cursor = connection.cursor()
             cursor.execute("SELECT COUNT(*) FROM Articles")
             articles_count = cursor.fetchone()[0]
@@ -790,7 +760,7 @@ async def publishing_db_callback_query(call: CallbackQuery):
                                      "<b>Примечание</b>: параметры публикации берутся с настроек по умолчанию",
                                      reply_markup=keyboard)
     else:
-        with sqlite3.connect(DB_ARTICLES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+        with get_connection(DB_ARTICLES_DIRECTORY) as connection:
             cursor = connection.cursor()
             cursor.execute("SELECT status FROM ArticlesStatus WHERE id = 1")
             status = cursor.fetchone()[0]
@@ -840,18 +810,21 @@ async def delete_general_articles_db_handler(message: Message, state: FSMContext
         await message.answer("❌ Не удалось распознать ID статей.", reply_markup=BACK_TO_TASKS)
         return
 
-    with sqlite3.connect(DB_ARTICLES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    def delete_articles(connection):
         cursor = connection.cursor()
 
         cursor.execute("SELECT article_image FROM Articles WHERE id IN ({})".format(
             ','.join('?' * len(article_ids))
         ), article_ids)
-        images_to_delete = [row[0] for row in cursor.fetchall()]
+        images = [row[0] for row in cursor.fetchall()]
 
         cursor.execute("DELETE FROM Articles WHERE id IN ({})".format(
             ','.join('?' * len(article_ids))
         ), article_ids)
-        connection.commit()
+
+        return images
+
+    images_to_delete = await run_write(DB_ARTICLES_DIRECTORY, delete_articles)
 
     for image_path in images_to_delete:
         if os.path.exists(image_path):
@@ -869,7 +842,7 @@ async def delete_general_articles_db_handler(message: Message, state: FSMContext
 async def download_all_articles_callback_query(call: CallbackQuery):
     """Выгрузка всех сгенерированных статей"""
 
-    with sqlite3.connect(DB_ARTICLES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_ARTICLES_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT * FROM Articles")
         articles_data = cursor.fetchall()
@@ -1024,7 +997,7 @@ async def start_publishing_db_handler(message: Message, state: FSMContext):
 async def posting_articles_server_callback_query(call: CallbackQuery, state: FSMContext):
     """Публикация статей с внешнего сервера"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT host, port, username, password FROM TasksSettings WHERE id = 1")
         host, port, username, password = cursor.fetchone()
@@ -1321,7 +1294,7 @@ async def server_publishing_with_type_handler(message: Message, state: FSMContex
 async def get_action_indexing_callback_query(call: CallbackQuery):
     """Ожидание настройки индексации"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT indexing FROM TasksSettings WHERE id = 1")
         indexing = cursor.fetchone()[0]
@@ -1337,7 +1310,7 @@ async def get_action_indexing_callback_query(call: CallbackQuery):
 
 @router_tasks_list.callback_query(lambda call: call.data == 'default-indexing-trigger', AdminFilter())
 async def indexing_trigger_callback_query(call: CallbackQuery):
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT indexing FROM TasksSettings WHERE id = 1")
         indexing_main = cursor.fetchone()[0]
@@ -1347,12 +1320,9 @@ async def indexing_trigger_callback_query(call: CallbackQuery):
     else:
         indexing = 'True'
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE TasksSettings SET indexing = ? WHERE id = 1",
-            (indexing, )
-        )
+    await execute(DB_TASK_DIRECTORY, "UPDATE TasksSettings SET indexing = ? WHERE id = 1", (indexing, ))
+
+    invalidate_tasks_settings()
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text=f'{'✅ Индексация вкл.' if indexing == 'True' else '❌ Индексация выкл.'}',
@@ -1382,13 +1352,13 @@ async def upload_indexing_param_handler(message: Message, state: FSMContext):
         await message.answer("❌ Пожалуйста, введите корректный способ индексации.", reply_markup=BACK_TO_TASKS)
         return
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE TasksSettings SET user_id = ?, api_key = ?, searchengine = ?, se_type = ? WHERE id = 1",
-            (user_id, api_key, searchengine, se_type)
-        )
-        connection.commit()
+    await execute(
+        DB_TASK_DIRECTORY,
+        "UPDATE TasksSettings SET user_id = ?, api_key = ?, searchengine = ?, se_type = ? WHERE id = 1",
+        (user_id, api_key, searchengine, se_type)
+    )
+
+    invalidate_tasks_settings()
 
     await message.answer("✅ Настройки индексации успешно обновлены.")
 
@@ -1402,7 +1372,7 @@ async def upload_indexing_param_handler(message: Message, state: FSMContext):
 async def get_indexing_callback_query(call: CallbackQuery, state: FSMContext):
     """Ожидание настройки индексации"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT api_key, user_id, searchengine, se_type FROM TasksSettings WHERE id = 1")
         api_key, user_id, searchengine, se_type = cursor.fetchone()
@@ -1430,7 +1400,7 @@ async def get_balance_indexing_callback_query(call: CallbackQuery):
         [InlineKeyboardButton(text='⬅️ Назад к заданиям', callback_data=f'back-to-tasks')]
     ])
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT api_key, user_id FROM TasksSettings WHERE id = 1")
         api_key, user_id = cursor.fetchone()
@@ -1479,7 +1449,7 @@ async def articles_editor_callback_query(call: CallbackQuery):
 async def start_articles_editor_callback_query(call: CallbackQuery, state: FSMContext):
     """Запуск редактора статей"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT currents_replace, new_replace FROM TasksSettings WHERE id = 1")
         currents_replace, new_replace = cursor.fetchone()
@@ -1575,7 +1545,7 @@ async def stop_articles_editor_callback_query(call: CallbackQuery):
 async def get_articles_param_callback_query(call: CallbackQuery, state: FSMContext):
     """Ожидание настройки индексации"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT currents_replace, new_replace FROM TasksSettings WHERE id = 1")
         currents_replace, new_replace = cursor.fetchone()
@@ -1597,12 +1567,9 @@ async def edit_param1_articles_editor_handler(message: Message, state: FSMContex
         await message.answer("❌ Пожалуйста, отправьте параметры с новой строки в сообщении.", reply_markup=BACK_TO_TASKS)
         return
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE TasksSettings SET currents_replace = ? WHERE id = 1",
-            (message.text,)
-        )
+    await execute(DB_TASK_DIRECTORY, "UPDATE TasksSettings SET currents_replace = ? WHERE id = 1", (message.text,))
+
+    invalidate_tasks_settings()
 
     await message.answer("Отправьте параметр (один), <b>на который</b> нужно заменить, в сообщении.", reply_markup=BACK_TO_TASKS)
     await state.set_state(ArticlesEditorParam.message2)
@@ -1614,12 +1581,9 @@ async def edit_param2_articles_editor_handler(message: Message, state: FSMContex
         await message.answer("❌ Пожалуйста, отправьте параметр в сообщении.", reply_markup=BACK_TO_TASKS)
         return
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE TasksSettings SET new_replace = ? WHERE id = 1",
-            (message.text.strip(),)
-        )
+    await execute(DB_TASK_DIRECTORY, "UPDATE TasksSettings SET new_replace = ? WHERE id = 1", (message.text.strip(),))
+
+    invalidate_tasks_settings()
 
     await message.answer("✅ Параметры замены успешно обновлены!")
     keyboard = await tasks_list()
@@ -1639,7 +1603,7 @@ async def panel_xlsx_urls_callback_query(call: CallbackQuery):
 
 @router_tasks_list.callback_query(lambda call: call.data == 'xlsx-urls-download', AdminFilter())
 async def download_urls_callback_query(call: CallbackQuery):
-    with sqlite3.connect(DB_XLSX_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_XLSX_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT keys, urls_accounts FROM Xlsx")
         rows = cursor.fetchall()
@@ -1712,14 +1676,14 @@ async def all_create_urls_handler(message: Message, state: FSMContext):
         bot = message.bot
         await bot.download(message.document.file_id, destination=file_path)
 
-        with sqlite3.connect(DB_XLSX_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            wb = load_workbook(file_path)
-            sheet = wb.active
+        wb = load_workbook(file_path)
+        sheet = wb.active
+        rows = list(sheet.iter_rows(min_row=2, values_only=True))
 
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                keys_id, keys = row
+        def save_keys(connection):
+            cursor = connection.cursor()
 
+            for keys_id, keys in rows:
                 cursor.execute("SELECT COUNT(*) FROM Xlsx WHERE id = ?", (keys_id,))
                 exists = cursor.fetchone()[0] > 0
 
@@ -1728,7 +1692,7 @@ async def all_create_urls_handler(message: Message, state: FSMContext):
                 else:
                     cursor.execute("INSERT INTO Xlsx (id, keys) VALUES (?, ?)", (keys_id, str(keys)))
 
-            connection.commit()
+        await run_write(DB_XLSX_DIRECTORY, save_keys)
 
     else:
         await message.answer("❌ Пожалуйста, отправьте xlsx-файл с названием шаблонов и их содержимым.", reply_markup=BACK_TO_TASKS)
@@ -1744,7 +1708,7 @@ async def all_create_urls_handler(message: Message, state: FSMContext):
 async def get_articles_links_count_callback_query(call: CallbackQuery, state: FSMContext):
     """Ожидание параметра количество ссылок"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT articles_links_count FROM TasksSettings WHERE id = 1")
         count = cursor.fetchone()[0]
@@ -1764,13 +1728,9 @@ async def upload_articles_links_count_handler(message: Message, state: FSMContex
         await message.answer("❌ Пожалуйста, отправьте число.", reply_markup=BACK_TO_TASKS)
         return
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE TasksSettings SET articles_links_count = ? WHERE id = 1",
-            (count, )
-        )
-        connection.commit()
+    await execute(DB_TASK_DIRECTORY, "UPDATE TasksSettings SET articles_links_count = ? WHERE id = 1", (count, ))
+
+    invalidate_tasks_settings()
     await message.answer("✅ Количество ссылок для Автоперелинковки успешно обновлено.")
 
     keyboard = await tasks_list()
@@ -1,5 +1,4 @@
 import os
-import sqlite3
 import uuid
 import zipfile
 import shutil
@@ -10,8 +9,12 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
 
-from bot.config import TIMEOUT_DELAY, DB_IMAGES_DIRECTORY
+from bot.config import DB_IMAGES_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.db_gateway import execute
 from bot.handlers.commands.admins_filter import AdminFilter
+from bot.handlers.commands.image_index import invalidate_image_index
+from bot.handlers.commands.templates import invalidate_templates
 from bot.handlers.routers.control_panel import BACK_TO_TASKS
 from bot.keyboards.keyboards import images_list
 
@@ -50,7 +53,7 @@ async def self_image_callback_query(call: CallbackQuery):
         [InlineKeyboardButton(text='⬅️ Назад к изображениям', callback_data=f'images-list')]
     ])
 
-    with sqlite3.connect(DB_IMAGES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_IMAGES_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT image_name FROM Images WHERE id = ?", (image_id,))
         image_name = cursor.fetchone()[0]
@@ -63,7 +66,7 @@ async def image_download_callback_query(call: CallbackQuery):
 
     ZIP_PATH = f'bot/assets/{uuid.uuid4()}.zip'
 
-    with sqlite3.connect(DB_IMAGES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_IMAGES_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT image_path FROM Images WHERE id = ?", (image_id,))
         image_files = []
@@ -87,7 +90,7 @@ async def image_download_callback_query(call: CallbackQuery):
 async def image_delete_callback_query(call: CallbackQuery):
     image_id = call.data[13:]
 
-    with sqlite3.connect(DB_IMAGES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_IMAGES_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT image_path FROM Images WHERE id = ?", (image_id,))
         folder_path = cursor.fetchone()[0]
@@ -95,8 +98,9 @@ async def image_delete_callback_query(call: CallbackQuery):
     if os.path.isdir(folder_path):
         shutil.rmtree(folder_path)
 
-    cursor.execute("DELETE FROM Images WHERE id = ?", (image_id,))
-    connection.commit()
+    await execute(DB_IMAGES_DIRECTORY, "DELETE FROM Images WHERE id = ?", (image_id,))
+    invalidate_templates('images')
+    invalidate_image_index()
 
     keyboard = await images_list()
     await call.message.edit_text("Выберите папку изображений или добавьте новую:", reply_markup=keyboard)
@@ -142,10 +146,10 @@ async def create_image_handler(message: Message, state: FSMContext):
 
     image_paths_str = '\n'.join(extracted_files)
 
-    with sqlite3.connect(DB_IMAGES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("INSERT INTO Images (image_name, image_path) VALUES (?, ?)", (image_name, image_paths_str))
-        connection.commit()
+    await execute(DB_IMAGES_DIRECTORY, "INSERT INTO Images (image_name, image_path) VALUES (?, ?)",
+                  (image_name, image_paths_str))
+    invalidate_templates('images')
+    invalidate_image_index()
 
     await message.answer("✅ Архив изображений успешно загружен!")
 
@@ -167,12 +171,9 @@ async def edit_image_name_handler(message: Message, state: FSMContext):
     image_data = await state.get_data()
     image_id = image_data.get('image_id')
 
-    with sqlite3.connect(DB_IMAGES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE Images SET image_name = ? WHERE id = ?", (message.text, image_id)
-        )
-        connection.commit()
+    await execute(DB_IMAGES_DIRECTORY, "UPDATE Images SET image_name = ? WHERE id = ?", (message.text, image_id))
+    invalidate_templates('images')
+    invalidate_image_index()
 
     keyboard = await images_list()
     await message.answer('✅ Название папки изображений успешно изменено!')
@@ -194,7 +195,7 @@ async def edit_image_source_handler(message: Message, state: FSMContext):
 
     document = message.document
 
-    with sqlite3.connect(DB_IMAGES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_IMAGES_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT image_path FROM Images WHERE id = ?", (image_id,))
         old_files = cursor.fetchone()[0].split("\n")
@@ -219,10 +220,9 @@ async def edit_image_source_handler(message: Message, state: FSMContext):
 
     new_image_paths = '\n'.join(new_files)
 
-    with sqlite3.connect(DB_IMAGES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("UPDATE Images SET image_path = ? WHERE id = ?", (new_image_paths, image_id))
-        connection.commit()
+    await execute(DB_IMAGES_DIRECTORY, "UPDATE Images SET image_path = ? WHERE id = ?", (new_image_paths, image_id))
+    invalidate_templates('images')
+    invalidate_image_index()
 
     keyboard = await images_list()
     await message.answer('✅ Содержимое папки изображений успешно изменено!')
@@ -234,7 +234,7 @@ async def edit_image_source_handler(message: Message, state: FSMContext):
 async def images_download_callback_query(call: CallbackQuery):
     ZIP_PATH = f'bot/assets/{uuid.uuid4()}.zip'
 
-    with sqlite3.connect(DB_IMAGES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_IMAGES_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT image_path FROM Images")
         image_files = []
@@ -1,5 +1,4 @@
 import os
-import sqlite3
 import uuid
 
 from html import escape
@@ -10,9 +9,12 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
 
-from bot.config import TIMEOUT_DELAY, DB_LINKS_DIRECTORY
+from bot.config import DB_LINKS_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.db_gateway import execute, run_write
 from bot.handlers.commands.admins_filter import AdminFilter
 from bot.handlers.commands.commands_manager import CommandsManager
+from bot.handlers.commands.templates import invalidate_templates
 from bot.handlers.routers.control_panel import BACK_TO_TASKS
 from bot.keyboards.keyboards import links_list
 
@@ -50,7 +52,7 @@ async def self_links_callback_query(call: CallbackQuery):
         [InlineKeyboardButton(text='⬅️ Назад к ссылкам', callback_data=f'links-list')]
     ])
 
-    with sqlite3.connect(DB_LINKS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_LINKS_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT link_name, link_source FROM Links WHERE id = ?", (link_id,))
         link_name, link_source = cursor.fetchone()
@@ -74,12 +76,8 @@ async def edit_link_name_handler(message: Message, state: FSMContext):
     link_data = await state.get_data()
     link_id = link_data.get('link_id')
 
-    with sqlite3.connect(DB_LINKS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE Links SET link_name = ? WHERE id = ?", (message.text, link_id)
-        )
-        connection.commit()
+    await execute(DB_LINKS_DIRECTORY, "UPDATE Links SET link_name = ? WHERE id = ?", (message.text, link_id))
+    invalidate_templates('links')
 
     keyboard = await links_list()
     await message.answer('✅ Название ссылки успешно изменено!')
@@ -117,12 +115,8 @@ async def edit_link_source_handler(message: Message, state: FSMContext):
         await message.answer("❌ Пожалуйста, отправьте текст или txt-файл с блоком ссылки.", reply_markup=BACK_TO_TASKS)
         return
 
-    with sqlite3.connect(DB_LINKS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE Links SET link_source = ? WHERE id = ?", (link_source, link_id)
-        )
-        connection.commit()
+    await execute(DB_LINKS_DIRECTORY, "UPDATE Links SET link_source = ? WHERE id = ?", (link_source, link_id))
+    invalidate_templates('links')
 
     keyboard = await links_list()
     await message.answer('✅ Содержимое ссылки успешно изменено!')
@@ -134,7 +128,7 @@ async def edit_link_source_handler(message: Message, state: FSMContext):
 async def link_download_callback_query(call: CallbackQuery):
     link_id = call.data[14:]
 
-    with sqlite3.connect(DB_LINKS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_LINKS_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT link_name, link_source FROM Links WHERE id = ?", (link_id,))
         link_name, link_source = cursor.fetchone()
@@ -176,13 +170,14 @@ async def all_create_link_name_handler(message: Message, state: FSMContext):
         bot = message.bot
         await bot.download(message.document.file_id, destination=file_path)
 
-        with sqlite3.connect(DB_LINKS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+        wb = load_workbook(file_path)
+        sheet = wb.active
+        rows = list(sheet.iter_rows(min_row=2, values_only=True))
+
+        def save_links(connection):
             cursor = connection.cursor()
-            wb = load_workbook(file_path)
-            sheet = wb.active
 
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                link_name, link_source = row
+            for link_name, link_source in rows:
                 if link_name and link_source:
                     cursor.execute("SELECT COUNT(*) FROM Links WHERE link_name = ?", (link_name,))
                     exists = cursor.fetchone()[0] > 0
@@ -193,7 +188,8 @@ async def all_create_link_name_handler(message: Message, state: FSMContext):
                         cursor.execute("INSERT INTO Links (link_name, link_source) VALUES (?, ?)",
                                        (link_name, link_source))
 
-            connection.commit()
+        await run_write(DB_LINKS_DIRECTORY, save_links)
+        invalidate_templates('links')
 
     else:
         await message.answer("❌ Пожалуйста, отправьте xlsx-файл с названием ссылок и их содержимым.", reply_markup=BACK_TO_TASKS)
@@ -250,7 +246,7 @@ async def create_link_handler(message: Message, state: FSMContext):
 @router_tasks_links.callback_query(lambda call: call.data.startswith('download-links'), AdminFilter())
 async def links_download_callback_query(call: CallbackQuery):
 
-    with sqlite3.connect(DB_LINKS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_LINKS_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT * FROM Links")
         file_path = f"bot/assets/xlsx/links_{uuid.uuid4()}.xlsx"
@@ -1,5 +1,4 @@
 import os
-import sqlite3
 import uuid
 
 from html import escape
@@ -10,9 +9,12 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton, FSInputFile
 
-from bot.config import TIMEOUT_DELAY, DB_PATTERNS_DIRECTORY
+from bot.config import DB_PATTERNS_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.db_gateway import execute, run_write
 from bot.handlers.commands.admins_filter import AdminFilter
 from bot.handlers.commands.commands_manager import CommandsManager
+from bot.handlers.commands.templates import invalidate_templates
 from bot.handlers.routers.control_panel import BACK_TO_TASKS
 from bot.keyboards.keyboards import patterns_list
 
@@ -50,7 +52,7 @@ async def self_pattern_callback_query(call: CallbackQuery):
         [InlineKeyboardButton(text='⬅️ Назад к шаблонам', callback_data=f'patterns-list')]
     ])
 
-    with sqlite3.connect(DB_PATTERNS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_PATTERNS_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT pattern FROM Patterns WHERE id = ?", (pattern_id,))
         pattern = cursor.fetchone()[0]
@@ -65,7 +67,7 @@ async def self_pattern_callback_query(call: CallbackQuery):
 async def pattern_download_callback_query(call: CallbackQuery):
     pattern_id = call.data[17:]
 
-    with sqlite3.connect(DB_PATTERNS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_PATTERNS_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT pattern FROM Patterns WHERE id = ?", (pattern_id,))
         pattern = cursor.fetchone()[0]
@@ -153,12 +155,8 @@ async def edit_pattern_name_handler(message: Message, state: FSMContext):
     pattern_data = await state.get_data()
     pattern_id = pattern_data.get('pattern_id')
 
-    with sqlite3.connect(DB_PATTERNS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE Patterns SET pattern_name = ? WHERE id = ?", (message.text, pattern_id)
-        )
-        connection.commit()
+    await execute(DB_PATTERNS_DIRECTORY, "UPDATE Patterns SET pattern_name = ? WHERE id = ?", (message.text, pattern_id))
+    invalidate_templates('patterns')
 
     keyboard = await patterns_list()
     await message.answer('✅ Название шаблона успешно изменено!')
@@ -202,12 +200,8 @@ async def edit_pattern_source_handler(message: Message, state: FSMContext):
         )
         return
 
-    with sqlite3.connect(DB_PATTERNS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE Patterns SET pattern = ? WHERE id = ?", (pattern_source, pattern_id)
-        )
-        connection.commit()
+    await execute(DB_PATTERNS_DIRECTORY, "UPDATE Patterns SET pattern = ? WHERE id = ?", (pattern_source, pattern_id))
+    invalidate_templates('patterns')
 
     keyboard = await patterns_list()
     await message.answer('✅ Содержимое шаблона успешно изменено!')
@@ -218,7 +212,7 @@ async def edit_pattern_source_handler(message: Message, state: FSMContext):
 @router_tasks_patterns.callback_query(lambda call: call.data.startswith('download-patterns'), AdminFilter())
 async def pattern_download_callback_query(call: CallbackQuery):
 
-    with sqlite3.connect(DB_PATTERNS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_PATTERNS_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT * FROM Patterns")
         file_path = f"bot/assets/xlsx/patterns_{uuid.uuid4()}.xlsx"
@@ -257,29 +251,40 @@ async def all_create_patterns_handler(message: Message, state: FSMContext):
         bot = message.bot
         await bot.download(message.document.file_id, destination=file_path)
 
-        with sqlite3.connect(DB_PATTERNS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+        rejected = []
+
+        wb = load_workbook(file_path)
+        sheet = wb.active
+        patterns = []
+
+        for row in sheet.iter_rows(min_row=2, values_only=True):
+            pattern_name, pattern = row
+            if pattern_name and pattern:
+                if "%NAME%" not in pattern or "%KEYS%" not in pattern:
+                    rejected.append(pattern_name)
+                else:
+                    patterns.append((pattern_name, pattern))
+
+        def save_patterns(connection):
             cursor = connection.cursor()
-            wb = load_workbook(file_path)
-            sheet = wb.active
-
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                pattern_name, pattern = row
-                if pattern_name and pattern:
-                    if "%NAME%" not in pattern or "%KEYS%" not in pattern:
-                        await message.answer(
-                            f"❌ Шаблон ({pattern_name}) не будет загружен/отредактирован, так как он должен содержать <b>%NAME%</b> и <b>%KEYS%</b>.", reply_markup=BACK_TO_TASKS
-                        )
-                    else:
-                        cursor.execute("SELECT COUNT(*) FROM Patterns WHERE pattern_name = ?", (pattern_name,))
-                        exists = cursor.fetchone()[0] > 0
-
-                        if exists:
-                            cursor.execute("UPDATE Patterns SET pattern = ? WHERE pattern_name = ?", (pattern, pattern_name))
-                        else:
-                            cursor.execute("INSERT INTO Patterns (pattern_name, pattern) VALUES (?, ?)",
-                                           (pattern_name, pattern))
-
-            connection.commit()
+
+            for pattern_name, pattern in patterns:
+                cursor.execute("SELECT COUNT(*) FROM Patterns WHERE pattern_name = ?", (pattern_name,))
+                exists = cursor.fetchone()[0] > 0
+
+                if exists:
+                    cursor.execute("UPDATE Patterns SET pattern = ? WHERE pattern_name = ?", (pattern, pattern_name))
+                else:
+                    cursor.execute("INSERT INTO Patterns (pattern_name, pattern) VALUES (?, ?)",
+                                   (pattern_name, pattern))
+
+        await run_write(DB_PATTERNS_DIRECTORY, save_patterns)
+        invalidate_templates('patterns')
+
+        for pattern_name in rejected:
+            await message.answer(
+                f"❌ Шаблон ({pattern_name}) не будет загружен/отредактирован, так как он должен содержать <b>%NAME%</b> и <b>%KEYS%</b>.", reply_markup=BACK_TO_TASKS
+            )
 
     else:
         await message.answer("❌ Пожалуйста, отправьте xlsx-файл с названием шаблонов и их содержимым.", reply_markup=BACK_TO_TASKS)
@@ -1,6 +1,6 @@
+import asyncio
 import os
 import re
-import sqlite3
 import openpyxl
 import uuid
 
@@ -9,9 +9,13 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import Message, CallbackQuery, FSInputFile, InlineKeyboardMarkup, InlineKeyboardButton
 
-from bot.config import DB_DIRECTORY, TIMEOUT_DELAY, DB_PATTERNS_DIRECTORY
+from bot.config import DB_DIRECTORY, DB_PATTERNS_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.db_gateway import execute, run_write
 from bot.handlers.commands.admins_filter import AdminFilter
+from bot.handlers.commands.api.openai_batch import batch_generate_articles
 from bot.handlers.commands.commands_manager import CommandsManager
+from bot.handlers.commands.xlsx_import import import_prompts_from_xlsx
 from bot.handlers.routers.control_panel import BACK_TO_TASKS
 from bot.keyboards.keyboards import task_prompts
 
@@ -19,6 +23,9 @@ from openpyxl import load_workbook
 
 router_tasks_prompts = Router(name=__name__)
 
+# Запущенные пакетные генерации: {имя задания: asyncio.Task}
+tasks_batch = {}
+
 class PromptsMessage(StatesGroup):
     upload_xlsx = State()
 
@@ -45,11 +52,10 @@ async def task_prompts_callback_query(call: CallbackQuery):
 @router_tasks_prompts.callback_query(lambda call: call.data.startswith('download-prompts-'), AdminFilter())
 async def download_prompts_callback_query(call: CallbackQuery):
     task_name = call.data[17:]
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
+    connection = get_connection(DB_DIRECTORY + task_name + '.db')
     cursor = connection.cursor()
     cursor.execute("SELECT id, prompt, prompt_theme, marks FROM Prompts")
     prompts_data = cursor.fetchall()
-    connection.close()
     wb = openpyxl.Workbook()
     ws = wb.active
     ws.title = f"Promts_{task_name}"
@@ -64,6 +70,31 @@ async def download_prompts_callback_query(call: CallbackQuery):
     await call.message.answer(text, reply_markup=keyboard)
 
 
+@router_tasks_prompts.callback_query(lambda call: call.data.startswith('batch-generation-'), AdminFilter())
+async def batch_generation_callback_query(call: CallbackQuery):
+    """Пакетная генерация текстов для неотработанных промтов задания"""
+
+    task_name = call.data[17:]
+
+    if task_name in tasks_batch and not tasks_batch[task_name].done():
+        await call.message.edit_text(f"Пакетная генерация уже запущена. (<b>{task_name}</b>)", reply_markup=BACK_TO_TASKS)
+        return
+
+    async def batch_generation():
+        flag, info = await batch_generate_articles(task_name)
+
+        if flag:
+            await call.message.answer(f"✅ Пакетная генерация завершена. {info} (<b>{task_name}</b>)")
+        else:
+            await call.message.answer(f"❌ Пакетная генерация не выполнена: {info} (<b>{task_name}</b>)")
+
+    tasks_batch[task_name] = asyncio.create_task(batch_generation())
+
+    await call.message.edit_text("Запущена пакетная генерация текстов для неотработанных промтов. "
+                                 "Результат будет отправлен после завершения пакетного задания OpenAI, "
+                                 f"это может занять до 24 часов. (<b>{task_name}</b>)", reply_markup=BACK_TO_TASKS)
+
+
 @router_tasks_prompts.callback_query(lambda call: call.data.startswith('upload-xlsx-'), AdminFilter())
 async def upload_xlsx_callback_query(call: CallbackQuery, state: FSMContext):
     task_name = call.data[12:]
@@ -81,7 +112,7 @@ async def upload_xlsx_handler(message: Message, state: FSMContext):
     prompt_data = await state.get_data()
     task_name = prompt_data.get('task_name')
 
-    with sqlite3.connect(DB_PATTERNS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_PATTERNS_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT COUNT(*) FROM Patterns")
         patterns_count = cursor.fetchone()[0]
@@ -101,13 +132,12 @@ async def upload_xlsx_handler(message: Message, state: FSMContext):
     bot = message.bot
     await bot.download(document.file_id, destination=file_path)
 
-    prompts, theme_count = await CommandsManager.generate_prompts_from_xlsx(task=task_name, file_path=file_path)
+    flag_import, prompts_count, theme_count, info = await import_prompts_from_xlsx(task=task_name, file_path=file_path)
 
-    flag_save_prompts = await CommandsManager.save_prompts_to_db(task=task_name, prompts=prompts)
-    flag_save_theme = await CommandsManager.save_theme_count(task=task_name, theme_count=theme_count)
+    flag_save_theme = flag_import and await CommandsManager.save_theme_count(task=task_name, theme_count=theme_count)
 
-    if prompts and flag_save_prompts and flag_save_theme:
-        await message.answer(f"✅ Промты успешно сгенерированы и сохранены. (<b>{task_name}</b>)")
+    if prompts_count and flag_save_theme:
+        await message.answer(f"✅ Промты успешно сгенерированы и сохранены. (<b>{task_name}</b>)\n\n{info}")
     else:
         await message.answer(f"❌ Произошла ошибка при генерации или сохранении промтов. "
                              f"Посмотрите лог-файл, чтобы узнать причину. (<b>{task_name}</b>)")
@@ -191,11 +221,10 @@ async def get_id_edit_theme_prompts_handler(message: Message, state: FSMContext)
 
     prompt_id = int(message.text.strip())
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
+    connection = get_connection(DB_DIRECTORY + task_name + '.db')
     cursor = connection.cursor()
     cursor.execute("SELECT id FROM Prompts WHERE id = ?", (prompt_id,))
     result = cursor.fetchone()
-    connection.close()
 
     if not result:
         await message.answer("❌ Промт с указанным ID не найден. Убедитесь, что ID указан верно.", reply_markup=BACK_TO_TASKS)
@@ -212,14 +241,11 @@ async def edit_theme_prompts_handler(message: Message, state: FSMContext):
     task_name = prompt_data['task_name']
     prompt_id = prompt_data['prompt_id']
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute(
+    await execute(
+        DB_DIRECTORY + task_name + '.db',
         "UPDATE Prompts SET prompt_theme = ? WHERE id = ?",
         (message.text, prompt_id)
     )
-    connection.commit()
-    connection.close()
 
     await message.answer("✅ Тема промта успешно обновлена!")
     text, keyboard = await task_prompts(task_name=task_name)
@@ -245,11 +271,10 @@ async def get_id_edit_prompts_handler(message: Message, state: FSMContext):
 
     prompt_id = int(message.text.strip())
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
+    connection = get_connection(DB_DIRECTORY + task_name + '.db')
     cursor = connection.cursor()
     cursor.execute("SELECT id FROM Prompts WHERE id = ?", (prompt_id,))
     result = cursor.fetchone()
-    connection.close()
 
     if not result:
         await message.answer("❌ Промт с указанным ID не найден. Убедитесь, что ID указан верно.", reply_markup=BACK_TO_TASKS)
@@ -278,14 +303,11 @@ async def edit_prompts_handler(message: Message, state: FSMContext):
         new_prompt_text = f.read()
     os.remove(file_path)
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute(
+    await execute(
+        DB_DIRECTORY + task_name + '.db',
         "UPDATE Prompts SET prompt = ? WHERE id = ?",
         (new_prompt_text, prompt_id)
     )
-    connection.commit()
-    connection.close()
 
     await message.answer("✅ Текст промта успешно обновлён!")
     text, keyboard = await task_prompts(task_name=task_name)
@@ -320,10 +342,9 @@ async def all_create_prompts_handler(message: Message, state: FSMContext):
         bot = message.bot
         await bot.download(message.document.file_id, destination=file_path)
 
-        connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-        cursor = connection.cursor()
         wb = load_workbook(file_path)
         sheet = wb.active
+        updates = []
 
         for row in sheet.iter_rows(min_row=2, values_only=True):
             prompt_id, prompt, prompt_theme = row
@@ -339,9 +360,13 @@ async def all_create_prompts_handler(message: Message, state: FSMContext):
                 if update_fields:
                     query = f"UPDATE Prompts SET {', '.join(update_fields)} WHERE id = ?"
                     values.append(prompt_id)
-                    cursor.execute(query, tuple(values))
-        connection.commit()
-        connection.close()
+                    updates.append((query, tuple(values)))
+
+        def save_prompts(connection):
+            for query, values in updates:
+                connection.execute(query, values)
+
+        await run_write(DB_DIRECTORY + task_name + '.db', save_prompts)
 
     else:
         await message.answer("❌ Пожалуйста, отправьте xlsx-файл с ID, содержанием промта и его темой.", reply_markup=BACK_TO_TASKS)
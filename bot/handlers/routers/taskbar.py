@@ -1,7 +1,6 @@
 import asyncio
 import os
 import re
-import sqlite3
 import uuid
 
 import aiogram.exceptions
@@ -10,14 +9,23 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, FSInputFile, Message
 
-from bot.config import DB_TASK_DIRECTORY, TIMEOUT_DELAY, DB_DIRECTORY
+from bot.config import DB_TASK_DIRECTORY, DB_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.db_gateway import execute, close_database
 from bot.handlers.commands.admins_filter import AdminFilter
+from bot.handlers.commands.checkpoints import load_checkpoints, remove_checkpoint
+from bot.handlers.commands.api.openai_api import invalidate_settings
 from bot.handlers.commands.posting_modes.extra_posting import additional_public_db, additional_public_prompts_skip
 from bot.handlers.commands.logging import log, get_task_logger
-from bot.handlers.commands.commands_manager import CommandsManager
-from bot.handlers.commands.posting_modes.main_posting import toggle_pause, remove_task_log
+from bot.handlers.commands.posting_modes.articles_editor import articles_editor_run
+from bot.handlers.commands.posting_modes.main_posting import toggle_pause, remove_task_log, run_task_script, is_delete
+from bot.handlers.commands.posting_modes.posting_from_db import publishing_db
+from bot.handlers.commands.posting_modes.server_posting import server_articles_publishing
 from bot.handlers.commands.task_manager import manager
-from bot.handlers.routers.control_panel import tasks
+from bot.handlers.commands.task_status import get_task_status, set_task_status, remove_task_status
+from bot.handlers.commands.tasks_settings import get_setting, get_settings, invalidate_tasks_settings
+from bot.handlers.routers.control_panel import tasks, tasks_publishing_db, tasks_publishing_server, \
+    tasks_articles_editor
 from bot.keyboards.keyboards import task_panel_keyboard, tasks_list, generate_pagination_keyboard, get_accounts_from_db
 
 router_tasks_panel = Router(name=__name__)
@@ -60,6 +68,36 @@ async def back_to_task(task_name):
     ])
     return keyboard
 
+async def resume_tasks():
+    """Возобновление процессов, не завершённых до остановки бота, по их контрольным точкам"""
+
+    # {функция процесса: (функция, словарь запущенных процессов, ключ в словаре — имя задания из аргументов)}
+    resumable = {
+        'run_task_script': (run_task_script, tasks, True),
+        'additional_public_db': (additional_public_db, tasks_db, True),
+        'additional_public_prompts_skip': (additional_public_prompts_skip, tasks_skips, True),
+        'publishing_db': (publishing_db, tasks_publishing_db, False),
+        'server_articles_publishing': (server_articles_publishing, tasks_publishing_server, False),
+        'articles_editor_run': (articles_editor_run, tasks_articles_editor, False),
+    }
+
+    for name, func_name, priority, accounts, args in load_checkpoints():
+        if func_name not in resumable:
+            await remove_checkpoint(name)
+            continue
+
+        func, running, by_task = resumable[func_name]
+
+        # Задание удалено, пока процесс не работал
+        if by_task and await is_delete(args[0]):
+            await remove_checkpoint(name)
+            continue
+
+        running[args[0] if by_task else 'Task'] = asyncio.create_task(
+            manager.add_task(priority, func, name, accounts, *args)
+        )
+        log.debug(f"Процесс '{name}' возобновлён после перезапуска бота")
+
 async def task_delete(task_name):
     try:
         log_message = f"{task_name} было удалено."
@@ -71,11 +109,8 @@ async def task_delete(task_name):
 async def get_data_task(task_name: str):
     """Получение статуса задания"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT status, task_type FROM Tasks WHERE task_name = ?", (task_name,))
-        status, task_type = cursor.fetchone()
-        connection.commit()
+    entry = get_task_status(task_name)
+    status, task_type = entry['status'], entry['task_type']
 
     action = InlineKeyboardButton(text='⏸️ Пауза', callback_data=f'pause-{task_name}') if status != 'Приостановлено' \
         else InlineKeyboardButton(text='▶️ Продолжить', callback_data=f'continue-{task_name}')
@@ -111,12 +146,7 @@ async def task_log_callback_query(call: CallbackQuery):
 
     try:
         status, task_type, action = await get_data_task(task_name)
-
-        with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute("SELECT last_status FROM Tasks WHERE task_name = ?", (task_name,))
-            last_status = cursor.fetchone()[0]
-            connection.commit()
+        last_status = get_task_status(task_name)['last_status']
 
         if (status != last_status) and (status != 'Приостановлено'):
 
@@ -125,13 +155,7 @@ async def task_log_callback_query(call: CallbackQuery):
                                     f"<b>Режим работы:</b> {task_type}\n\n"
                                     f"<b>Статус:</b> {status}", reply_markup=keyboard)
 
-            with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-                cursor = connection.cursor()
-                cursor.execute(
-                    "UPDATE Tasks SET last_status = ? WHERE task_name = ?",
-                    (status, task_name)
-                )
-                connection.commit()
+            set_task_status(task_name, last_status=status)
 
     except aiogram.exceptions.TelegramBadRequest:
         pass
@@ -181,10 +205,9 @@ async def task_delete_callback_query(call: CallbackQuery):
         del tasks_skips[task_name]
 
     try:
-        with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute("DELETE FROM Tasks WHERE task_name = ?", (task_name,))
-            connection.commit()
+        await execute(DB_TASK_DIRECTORY, "DELETE FROM Tasks WHERE task_name = ?", (task_name,))
+
+        remove_task_status(task_name)
 
         await call.message.edit_text(f"✅ <b>{task_name}</b> успешно удалено!")
 
@@ -200,6 +223,9 @@ async def task_delete_callback_query(call: CallbackQuery):
 
     try:
         await asyncio.sleep(10)
+        invalidate_settings(task_name)
+        invalidate_tasks_settings(task_name)
+        await close_database(DB_DIRECTORY + task_name + '.db')
         os.remove(DB_DIRECTORY + task_name + '.db')
     except Exception as e:
         pass
@@ -212,21 +238,10 @@ async def task_pause_callback_query(call: CallbackQuery):
 
     await toggle_pause(task_name)
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT status, task_type FROM Tasks WHERE task_name = ?", (task_name,))
-        status, task_type = cursor.fetchone()
-        connection.commit()
-
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE Tasks SET last_status = ? WHERE task_name = ?",
-            (status, task_name)
-        )
-        connection.commit()
+    entry = get_task_status(task_name)
+    task_type = entry['task_type']
 
-    await CommandsManager.update_task_status_db(task=task_name, status='Приостановлено')
+    set_task_status(task_name, 'Приостановлено', last_status=entry['status'], flush=True)
 
     action = InlineKeyboardButton(text='▶️ Продолжить', callback_data=f'continue-{task_name}')
 
@@ -241,25 +256,12 @@ async def task_continue_callback_query(call: CallbackQuery):
 
     task_name = call.data[9:]
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT last_status, task_type FROM Tasks WHERE task_name = ?", (task_name,))
-        last_status, task_type = cursor.fetchone()
-        connection.commit()
-
-    if not manager.tasks[task_name]['event'].is_set():
-        await call.message.answer("❌ Невозможно возобновить задание.\n\n"
-                                  "<b>Причина:</b> выполняется задача с более высоким приоритетом.")
-        action = InlineKeyboardButton(text='▶️ Продолжить', callback_data=f'continue-{task_name}')
-        keyboard = await task_panel_keyboard(task_name, task_type, action)
-        await call.message.answer(f"⚙️ Панель управления (<b>{task_name}</b>):\n\n"
-                                     f"<b>Режим работы:</b> {task_type}\n\n"
-                                     f"<b>Статус:</b> Приостановлено", reply_markup=keyboard)
-        return
+    entry = get_task_status(task_name)
+    last_status, task_type = entry['last_status'], entry['task_type']
 
     await toggle_pause(task_name)
 
-    await CommandsManager.update_task_status_db(task=task_name, status=last_status)
+    set_task_status(task_name, last_status, flush=True)
 
     action = InlineKeyboardButton(text='⏸️ Пауза', callback_data=f'pause-{task_name}')
 
@@ -290,13 +292,11 @@ async def count_posts_handler(message: Message, state: FSMContext):
             await message.answer("❌ Пожалуйста, введите корректное число.", reply_markup=await back_to_task(task_name))
             return
 
-        with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Tasks SET posts_count = ? WHERE task_name = ?",
-                (message.text, task_name)
-            )
-            connection.commit()
+        await execute(
+            DB_TASK_DIRECTORY,
+            "UPDATE Tasks SET posts_count = ? WHERE task_name = ?",
+            (message.text, task_name)
+        )
 
         await message.answer(f"Количество постов для аккаунтов обновлено. (<b>{task_name}</b>)")
         await task_panel_view(task_name=task_name, message=message, type_answer='answer')
@@ -328,13 +328,11 @@ async def delay_handler(message: Message, state: FSMContext):
             await message.answer("❌ Пожалуйста, введите корректное число.", reply_markup=await back_to_task(task_name))
             return
 
-        with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "UPDATE Tasks SET delay = ? WHERE task_name = ?",
-                (str(int(message.text)*60), task_name)
-            )
-            connection.commit()
+        await execute(
+            DB_TASK_DIRECTORY,
+            "UPDATE Tasks SET delay = ? WHERE task_name = ?",
+            (str(int(message.text)*60), task_name)
+        )
 
         await message.answer(f"✅ Задержка между постами обновлена. (<b>{task_name}</b>)")
         await task_panel_view(task_name=task_name, message=message, type_answer='answer')
@@ -580,11 +578,10 @@ async def get_api_models_callback_query(call: CallbackQuery):
         [InlineKeyboardButton(text="⬅️ Назад в панель", callback_data=f'self-task-{task_name}')]
     ])
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
+    connection = get_connection(DB_DIRECTORY + task_name + '.db')
     cursor = connection.cursor()
     cursor.execute("SELECT model_text, model_image FROM ModelAI WHERE id = 1")
     model_text, model_image = cursor.fetchone()
-    connection.close()
 
     await call.message.edit_text("Текущие модели:\n"
                                  f"Текст - {model_text if model_text != '-' else 'модель по умолчанию'}\n"
@@ -608,27 +605,27 @@ async def task_upload_model_handler(message: Message, state: FSMContext):
     model_type = model_data['model_type']
     task_name = model_data['task_name']
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-
     if model_type.startswith('task-text-model-'):
-        cursor.execute(
+        await execute(
+            DB_DIRECTORY + task_name + '.db',
             "UPDATE ModelAI SET model_text = ? WHERE id = 1",
             (message.text, )
         )
 
-        await message.answer(f"✅ Модель текста успешно изменена. (<b>{task_name}</b>)")
+        text = f"✅ Модель текста успешно изменена. (<b>{task_name}</b>)"
 
     else:
-        cursor.execute(
+        await execute(
+            DB_DIRECTORY + task_name + '.db',
             "UPDATE ModelAI SET model_image = ? WHERE id = 1",
             (message.text, )
         )
 
-        await message.answer(f"✅ Модель изображения по умолчанию успешно изменена. (<b>{task_name}</b>)")
+        text = f"✅ Модель изображения по умолчанию успешно изменена. (<b>{task_name}</b>)"
+
+    invalidate_settings(task_name)
 
-    connection.commit()
-    connection.close()
+    await message.answer(text)
 
     await task_panel_view(task_name=task_name, message=message, type_answer='answer')
     await state.set_state(None)
@@ -640,17 +637,7 @@ async def task_get_timeout_cycle_callback_query(call: CallbackQuery, state: FSMC
 
     task_name = call.data[19:]
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("SELECT timeout_task_cycle FROM TasksSettings WHERE id = 1")
-    timeout = cursor.fetchone()[0]
-    connection.close()
-
-    if timeout == '-':
-        with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute("SELECT timeout_task_cycle FROM TasksSettings WHERE id = 1")
-            timeout = cursor.fetchone()[0]
+    timeout = await get_setting('timeout_task_cycle', task_name)
 
     await call.message.edit_text(f"Текущая задержка цикла (<b>{task_name}</b>):\n"
                                  f"{int(int(timeout) / 60)} мин.\n\n"
@@ -676,11 +663,9 @@ async def task_upload_timeout_cycle_handler(message: Message, state: FSMContext)
 
     timeout_in_seconds = int(new_timeout) * 60
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("UPDATE TasksSettings SET timeout_task_cycle = ? WHERE id = 1", (str(timeout_in_seconds),))
-    connection.commit()
-    connection.close()
+    await execute(DB_DIRECTORY + task_name + '.db', "UPDATE TasksSettings SET timeout_task_cycle = ? WHERE id = 1",
+                  (str(timeout_in_seconds),))
+    invalidate_tasks_settings(task_name)
 
     await message.answer(f"✅ Задержка цикла успешно обновлена на {new_timeout} мин. (<b>{task_name}</b>)")
     await task_panel_view(task_name=task_name, message=message, type_answer='answer')
@@ -693,17 +678,7 @@ async def task_get_timeout_publishing_callback_query(call: CallbackQuery, state:
 
     task_name = call.data[24:]
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("SELECT timeout_posting_articles FROM TasksSettings WHERE id = 1")
-    timeout = cursor.fetchone()[0]
-    connection.close()
-
-    if timeout == '-':
-        with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute("SELECT timeout_posting_articles FROM TasksSettings WHERE id = 1")
-            timeout = cursor.fetchone()[0]
+    timeout = await get_setting('timeout_posting_articles', task_name)
 
     await call.message.edit_text(f"Текущая задержка публикации (<b>{task_name}</b>):\n"
                                  f"{int(int(timeout) / 60)} мин.\n\n"
@@ -729,11 +704,9 @@ async def task_upload_timeout_publishing_handler(message: Message, state: FSMCon
 
     timeout_in_seconds = int(new_timeout) * 60
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("UPDATE TasksSettings SET timeout_posting_articles = ? WHERE id = 1", (str(timeout_in_seconds),))
-    connection.commit()
-    connection.close()
+    await execute(DB_DIRECTORY + task_name + '.db', "UPDATE TasksSettings SET timeout_posting_articles = ? WHERE id = 1",
+                  (str(timeout_in_seconds),))
+    invalidate_tasks_settings(task_name)
 
     await message.answer(f"✅ Задержка постинга статей успешно обновлена на {new_timeout} мин. (<b>{task_name}</b>)")
     await task_panel_view(task_name=task_name, message=message, type_answer='answer')
@@ -746,17 +719,7 @@ async def task_get_count_key_callback_query(call: CallbackQuery, state: FSMConte
 
     task_name = call.data[17:]
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("SELECT count_key_words FROM TasksSettings WHERE id = 1")
-    count = cursor.fetchone()[0]
-    connection.close()
-
-    if count == '-':
-        with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute("SELECT count_key_words FROM TasksSettings WHERE id = 1")
-            count = cursor.fetchone()[0]
+    count = await get_setting('count_key_words', task_name)
 
     await call.message.edit_text(f"Текущее количество загрузки ключевых фраз (<b>{task_name}</b>):\n"
                                  f"{count} шт.\n\n"
@@ -780,11 +743,9 @@ async def task_upload_count_key_handler(message: Message, state: FSMContext):
         await message.answer("❌ Минимальное количество - 1. Попробуйте снова", reply_markup=await back_to_task(task_name))
         return
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("UPDATE TasksSettings SET count_key_words = ? WHERE id = 1", (str(new_count),))
-    connection.commit()
-    connection.close()
+    await execute(DB_DIRECTORY + task_name + '.db', "UPDATE TasksSettings SET count_key_words = ? WHERE id = 1",
+                  (str(new_count),))
+    invalidate_tasks_settings(task_name)
 
     await message.answer(f"✅ Количество загружаемых фраз успешно обновлено на {new_count} шт. (<b>{task_name}</b>)")
     await task_panel_view(task_name=task_name, message=message, type_answer='answer')
@@ -808,20 +769,10 @@ async def task_get_options_callback_query(call: CallbackQuery):
 async def task_get_options_db_callback_query(call: CallbackQuery, state: FSMContext):
     task_name = call.data[15:]
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("SELECT flag_posting_db FROM TasksSettings WHERE id = 1")
-    flag = cursor.fetchone()[0]
-    connection.close()
-
-    if flag == '-':
-        with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute("SELECT flag_posting_db FROM TasksSettings WHERE id = 1")
-            flag = cursor.fetchone()[0]
+    flag = await get_setting('flag_posting_db', task_name)
 
     await call.message.edit_text(f"(<b>{task_name}</b>) Текущая настройка публикации из базы данных (для генерации пропусков и публикации статей из бд):\n"
-                                 f"{'Публиковать сразу' if flag == 'True' else 'Добавлять в черновики'}\n\n"
+                                 f"{'Публиковать сразу' if flag else 'Добавлять в черновики'}\n\n"
                                  "Отправьте новую настройку в сообщении (True - публиковать сразу, "
                                  "False - добавлять в черновики).", reply_markup=await back_to_task(task_name))
 
@@ -832,20 +783,10 @@ async def task_get_options_db_callback_query(call: CallbackQuery, state: FSMCont
 async def task_get_options_main_callback_query(call: CallbackQuery, state: FSMContext):
     task_name = call.data[17:]
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("SELECT flag_posting_for_main FROM TasksSettings WHERE id = 1")
-    flag = cursor.fetchone()[0]
-    connection.close()
-
-    if flag == '-':
-        with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-            cursor = connection.cursor()
-            cursor.execute("SELECT flag_posting_for_main FROM TasksSettings WHERE id = 1")
-            flag = cursor.fetchone()[0]
+    flag = await get_setting('flag_posting_for_main', task_name)
 
     await call.message.edit_text(f"Текущая настройка публикации (<b>{task_name}</b>):\n"
-                                 f"{'Публиковать сразу' if flag == 'True' else 'Добавлять в черновики'}\n\n"
+                                 f"{'Публиковать сразу' if flag else 'Добавлять в черновики'}\n\n"
                                  "Отправьте новую настройку в сообщении (True - публиковать сразу, "
                                  "False - добавлять в черновики).", reply_markup=await back_to_task(task_name))
 
@@ -864,15 +805,13 @@ async def task_upload_options_db_handler(message: Message, state: FSMContext):
         await message.answer("❌ Некорректный ввод. Попробуйте снова", reply_markup=await back_to_task(task_name))
         return
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-
     if type_posting == 'db':
-        cursor.execute("UPDATE TasksSettings SET flag_posting_db = ? WHERE id = 1", (new_flag,))
+        await execute(DB_DIRECTORY + task_name + '.db', "UPDATE TasksSettings SET flag_posting_db = ? WHERE id = 1",
+                      (new_flag,))
     else:
-        cursor.execute("UPDATE TasksSettings SET flag_posting_for_main = ? WHERE id = 1", (new_flag,))
-    connection.commit()
-    connection.close()
+        await execute(DB_DIRECTORY + task_name + '.db', "UPDATE TasksSettings SET flag_posting_for_main = ? WHERE id = 1",
+                      (new_flag,))
+    invalidate_tasks_settings(task_name)
 
     await message.answer(
         f"✅ (<b>{task_name}</b>) Настройка постинга {'из базы данных' if type_posting == 'db' 
@@ -889,21 +828,10 @@ async def get_action_indexing_callback_query(call: CallbackQuery, state: FSMCont
 
     task_name = call.data[14:]
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("SELECT indexing FROM TasksSettings WHERE id = 1")
-    indexing = cursor.fetchone()[0]
-    connection.close()
-
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-
-        if indexing == '-':
-            cursor.execute("SELECT indexing FROM TasksSettings WHERE id = 1")
-            indexing = cursor.fetchone()[0]
+    indexing = await get_setting('indexing', task_name)
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text=f'{'✅ Индексация вкл.' if indexing == 'True' else '❌ Индексация выкл.'}', callback_data=f'indexing-trigger-{task_name}'),
+        [InlineKeyboardButton(text=f'{'✅ Индексация вкл.' if indexing else '❌ Индексация выкл.'}', callback_data=f'indexing-trigger-{task_name}'),
          InlineKeyboardButton(text='Параметры индексации', callback_data=f'task-param-indexing-{task_name}')],
         [InlineKeyboardButton(text="⬅️ Назад в панель", callback_data=f'self-task-{task_name}')]
     ])
@@ -914,35 +842,14 @@ async def get_action_indexing_callback_query(call: CallbackQuery, state: FSMCont
 async def task_indexing_trigger_callback_query(call: CallbackQuery, state: FSMContext):
     task_name = call.data[17:]
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("SELECT indexing FROM TasksSettings WHERE id = 1")
-    indexing_task = cursor.fetchone()[0]
-    connection.close()
-
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT indexing FROM TasksSettings WHERE id = 1")
-        indexing_main = cursor.fetchone()[0]
-
-    if indexing_task == '-':
-        if indexing_main == 'True':
-            indexing = 'False'
-        else:
-            indexing = 'True'
-    else:
-        if indexing_task == 'True':
-            indexing = 'False'
-        else:
-            indexing = 'True'
+    indexing = 'False' if await get_setting('indexing', task_name) else 'True'
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute(
+    await execute(
+        DB_DIRECTORY + task_name + '.db',
         "UPDATE TasksSettings SET indexing = ? WHERE id = 1",
         (indexing, )
     )
-    connection.close()
+    invalidate_tasks_settings(task_name)
 
     keyboard = InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text=f'{'✅ Индексация вкл.' if indexing == 'True' else '❌ Индексация выкл.'}',
@@ -960,26 +867,8 @@ async def get_task_indexing_callback_query(call: CallbackQuery, state: FSMContex
 
     task_name = call.data[20:]
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
-    cursor = connection.cursor()
-    cursor.execute("SELECT api_key, searchengine, se_type FROM TasksSettings WHERE id = 1")
-    api_key, searchengine, se_type = cursor.fetchone()
-    connection.close()
-
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-
-        if api_key == '-':
-            cursor.execute("SELECT api_key FROM TasksSettings WHERE id = 1")
-            api_key = cursor.fetchone()[0]
-
-        if searchengine == '-':
-            cursor.execute("SELECT searchengine FROM TasksSettings WHERE id = 1")
-            searchengine = cursor.fetchone()[0]
-
-        if se_type == '-':
-            cursor.execute("SELECT se_type FROM TasksSettings WHERE id = 1")
-            se_type = cursor.fetchone()[0]
+    settings = await get_settings(task_name)
+    api_key, searchengine, se_type = settings['api_key'], settings['searchengine'], settings['se_type']
 
     await call.message.edit_text(f"<b>Текущие параметры индексации (<b>{task_name}</b>)</b>:\n"
                                  f"API-ключ: {api_key}\n"
@@ -1018,13 +907,13 @@ async def upload_task_indexing_param_handler(message: Message, state: FSMContext
         await message.answer("❌ Пожалуйста, введите корректный способ индексации.", reply_markup=await back_to_task(task_name))
         return
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "UPDATE TasksSettings SET api_key = ?, searchengine = ?, se_type = ? WHERE id = 1",
-            (api_key, searchengine, se_type)
-        )
-        connection.commit()
+    await execute(
+        DB_TASK_DIRECTORY,
+        "UPDATE TasksSettings SET api_key = ?, searchengine = ?, se_type = ? WHERE id = 1",
+        (api_key, searchengine, se_type)
+    )
+
+    invalidate_tasks_settings()
 
     await message.answer(f"✅ Настройки индексации успешно обновлены (<b>{task_name}</b>)")
     await task_panel_view(task_name=task_name, message=message, type_answer='answer')
@@ -1,15 +1,17 @@
-import sqlite3
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
-from bot.config import DB_TASK_DIRECTORY, TIMEOUT_DELAY, DB_DIRECTORY, DB_MAIN_ACCOUNTS_DIRECTORY, \
+from bot.config import DB_TASK_DIRECTORY, DB_DIRECTORY, DB_MAIN_ACCOUNTS_DIRECTORY, \
     DB_MULTI_ACCOUNTS_DIRECTORY, DB_PATTERNS_DIRECTORY, DB_LINKS_DIRECTORY, DB_IMAGES_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.handlers.commands.api.openai_batch import PREGENERATED_STATUS
+from bot.handlers.commands.task_status import task_names
 
 
 async def get_count(db_path: str, table_name: str) -> int:
     """Подсчёт количества данных в таблице"""
 
-    with sqlite3.connect(db_path, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(db_path) as connection:
         cursor = connection.cursor()
         cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
         return cursor.fetchone()[0]
@@ -26,12 +28,7 @@ async def create_keyboard(buttons) -> InlineKeyboardMarkup:
 async def tasks_list() -> InlineKeyboardMarkup:
     """Список заданий"""
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT task_name FROM Tasks")
-        tasks = cursor.fetchall()
-
-    buttons = [[(task[0], f'self-task-{task[0]}')] for task in tasks]
+    buttons = [[(task_name, f'self-task-{task_name}')] for task_name in task_names()]
 
     buttons += [
         [('📝 Создать задание', 'task-create')],
@@ -53,7 +50,7 @@ async def tasks_list() -> InlineKeyboardMarkup:
 async def patterns_list() -> InlineKeyboardMarkup:
     """Список шаблонов"""
 
-    with sqlite3.connect(DB_PATTERNS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_PATTERNS_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT id, pattern_name, pattern FROM Patterns")
         patterns = cursor.fetchall()
@@ -81,7 +78,7 @@ async def patterns_list() -> InlineKeyboardMarkup:
 async def images_list() -> InlineKeyboardMarkup:
     """Список изображений"""
 
-    with sqlite3.connect(DB_IMAGES_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_IMAGES_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT id, image_name, image_path FROM Images")
         images = cursor.fetchall()
@@ -107,7 +104,7 @@ async def images_list() -> InlineKeyboardMarkup:
 async def links_list() -> InlineKeyboardMarkup:
     """Список ссылок"""
 
-    with sqlite3.connect(DB_LINKS_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_LINKS_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT link_name, id FROM Links")
         links = cursor.fetchall()
@@ -136,13 +133,12 @@ async def links_list() -> InlineKeyboardMarkup:
 async def task_prompts(task_name: str) -> tuple:
     """Промты задания"""
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
+    connection = get_connection(DB_DIRECTORY + task_name + '.db')
     cursor = connection.cursor()
     cursor.execute("SELECT COUNT(*) FROM Prompts")
     prompts_count = cursor.fetchone()[0]
-    connection.close()
 
-    with sqlite3.connect(DB_TASK_DIRECTORY, timeout=TIMEOUT_DELAY) as connection:
+    with get_connection(DB_TASK_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT priority_prompts, theme_count FROM Tasks WHERE task_name = ?", (task_name,))
         priority_prompts, theme_count = cursor.fetchone()
@@ -163,6 +159,7 @@ async def task_prompts(task_name: str) -> tuple:
             [InlineKeyboardButton(text="✏️ Редактировать", callback_data=f'prompts-edit-{task_name}')],
             [InlineKeyboardButton(text="📦 Массовое редактирование", callback_data=f'all-prompts-edit-{task_name}')],
             [InlineKeyboardButton(text="🗃 Выгрузка промтов", callback_data=f'download-prompts-{task_name}')],
+            [InlineKeyboardButton(text="🧠 Пакетная генерация", callback_data=f'batch-generation-{task_name}')],
             [InlineKeyboardButton(text="⬅️ Назад в панель", callback_data=f'self-task-{task_name}')]
         ])
     return text, buttons
@@ -170,11 +167,11 @@ async def task_prompts(task_name: str) -> tuple:
 async def task_articles(task_name: str) -> tuple:
     """Готовые статьи задания"""
 
-    connection = sqlite3.connect(DB_DIRECTORY + task_name + '.db', timeout=TIMEOUT_DELAY)
+    connection = get_connection(DB_DIRECTORY + task_name + '.db')
     cursor = connection.cursor()
-    cursor.execute("SELECT COUNT(*) FROM Articles")
+    # Тексты пакетной генерации ещё не опубликованы и готовыми статьями не считаются
+    cursor.execute("SELECT COUNT(*) FROM Articles WHERE status IS NOT ?", (PREGENERATED_STATUS,))
     articles_count = cursor.fetchone()[0]
-    connection.close()
 
     if articles_count == 0:
         text = f"Статей не обнаружено."
@@ -259,7 +256,7 @@ async def get_accounts(task_type: str) -> tuple:
 def get_accounts_from_db():
     """Получение списка основных аккаунтов"""
 
-    with sqlite3.connect(DB_MAIN_ACCOUNTS_DIRECTORY) as connection:
+    with get_connection(DB_MAIN_ACCOUNTS_DIRECTORY) as connection:
         cursor = connection.cursor()
         cursor.execute("SELECT id, account_url, account_login FROM Accounts")
 
@@ -1,6 +1,16 @@
 from bot.handlers.commands.logging import log
-from bot.databases.database_manager import DatabaseManager
+from bot.databases.migrations import migrate_databases
+from bot.databases.connection_pool import close_connections
+from bot.databases.db_gateway import shutdown_gateway
 from bot.app import dp, bot
+from bot.handlers.commands.api.http_session import close_sessions
+from bot.handlers.commands.api.openai_api import close_clients
+from bot.handlers.commands.api.token_manager import load_tokens, token_refresher
+from bot.handlers.commands.api.upload_cache import load_uploads
+from bot.handlers.commands.indexing_outbox import indexing_worker
+from bot.handlers.commands.notifications import flush_notifications
+from bot.handlers.commands.task_manager import manager
+from bot.handlers.commands.task_status import load_task_statuses, status_flusher, flush_task_statuses
 
 import asyncio
 
@@ -8,33 +18,58 @@ from bot.handlers.routers.accounts import router_tasks_account
 from bot.handlers.routers.articles import router_tasks_articles
 from bot.handlers.routers.images import router_tasks_images
 from bot.handlers.routers.control_panel import router_tasks_list
-from bot.handlers.routers.taskbar import router_tasks_panel
+from bot.handlers.routers.taskbar import router_tasks_panel, resume_tasks
 from bot.handlers.routers.patterns import router_tasks_patterns
-from bot.handlers.routers.prompts import router_tasks_prompts
+from bot.handlers.routers.prompts import router_tasks_prompts, tasks_batch
 from bot.handlers.routers.links import router_tasks_links
 
+# Фоновые задачи бота, запущенные при старте
+background_tasks = []
+
 
 async def notification():
     """Уведомление об успешном запуске бота"""
     log.debug('Запуск бота')
 
 async def on_startup():
-    """Оповещение о запущенном боте"""
+    """Оповещение о запущенном боте. Запуск фонового обновления токенов, записи статусов заданий,
+    отправки ссылок на индексацию и незавершённых процессов"""
     asyncio.create_task(notification())
 
+    for worker in (token_refresher(), status_flusher(), indexing_worker(), resume_tasks()):
+        background_tasks.append(asyncio.create_task(worker))
+
+async def cancel_tasks(tasks) -> None:
+    """Отмена задач с ожиданием их завершения"""
+
+    tasks = [task for task in tasks if not task.done()]
+
+    for task in tasks:
+        task.cancel()
+
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def on_shutdown():
+    """Остановка процессов (их контрольные точки сохраняются) и фоновых задач, запись статусов заданий,
+    отправка оставшихся уведомлений. Закрытие HTTP-сессий аккаунтов, клиентов OpenAI и соединений с базами данных
+    выполняется последним, когда ни один процесс уже не работает"""
+    await cancel_tasks(background_tasks)
+    await manager.stop_all()
+    await cancel_tasks(tasks_batch.values())
+    await flush_task_statuses()
+    await flush_notifications()
+    await close_sessions()
+    await close_clients()
+    shutdown_gateway()
+    close_connections()
+
 async def main() -> None:
     """Объявление роутеров. Запуск режима поллинга"""
-    db = DatabaseManager()
-
-    db.create_task_db()
-    db.create_patterns_db()
-    db.create_db_articles()
-    db.create_db_images()
-    db.create_links_db()
-    db.create_main_accounts_db()
-    db.create_multi_accounts_db()
-    db.create_api_key_db()
-    db.create_db_xlsx()
+    migrate_databases()
+
+    load_task_statuses()
+    load_tokens()
+    load_uploads()
 
     dp.include_routers(
         router_tasks_list,
@@ -48,6 +83,7 @@ async def main() -> None:
     )
 
     dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
 
     await dp.start_polling(bot, skip_updates=True)
 
@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+import pytest
+
+
+def pytest_configure(config):
+    # Пути к базам и логам в bot/config.py относительные: тесты работают в отдельном каталоге,
+    # чтобы не трогать базы и логи бота. Каталог выбирается до импорта модулей бота
+    workdir = tempfile.mkdtemp(prefix='bot-tests-')
+
+    os.makedirs(os.path.join(workdir, 'bot', 'databases', 'db', 'tasks'))
+    os.makedirs(os.path.join(workdir, 'bot', 'assets', 'logs'))
+    os.chdir(workdir)
+
+@pytest.fixture(scope='session', autouse=True)
+def databases():
+    # Как при запуске бота: общие базы создаются и обновляются до первого запроса к ним
+    from bot.databases.migrations import migrate_databases
+    migrate_databases()
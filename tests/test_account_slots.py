@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from bot.handlers.commands import account_slots as slots_module
+from bot.handlers.commands.account_slots import AccountSlots, account_lease, current_process
+
+
+async def queue_waiters(slots: AccountSlots, waiters: list) -> dict:
+    """Постановка процессов [(имя, приоритет)] в очередь занятого слота 'acc'"""
+
+    tasks = {name: asyncio.create_task(slots.acquire('acc', name, priority)) for name, priority in waiters}
+    await asyncio.sleep(0)
+
+    return tasks
+
+def test_free_slot_is_taken_immediately_and_removed_after_release():
+    async def scenario():
+        slots = AccountSlots()
+        await slots.acquire('acc', 'first', 0)
+        holder = slots.holder('acc')
+        slots.release('acc')
+        return holder, slots.holder('acc'), slots.slots
+
+    assert asyncio.run(scenario()) == ('first', None, {})
+
+def test_slot_goes_to_highest_priority_then_first_in_queue():
+    async def scenario():
+        slots = AccountSlots()
+        await slots.acquire('acc', 'owner', 0)
+        tasks = await queue_waiters(slots, [('low', 0), ('high', 5), ('high-later', 5)])
+
+        order = []
+
+        for _ in tasks:
+            slots.release('acc')
+            await asyncio.sleep(0)
+            order.append(slots.holder('acc'))
+
+        slots.release('acc')
+        await asyncio.gather(*tasks.values())
+
+        return order, slots.slots
+
+    assert asyncio.run(scenario()) == (['high', 'high-later', 'low'], {})
+
+def test_cancelled_waiter_is_skipped():
+    async def scenario():
+        slots = AccountSlots()
+        await slots.acquire('acc', 'owner', 0)
+        tasks = await queue_waiters(slots, [('cancelled', 5), ('next', 0)])
+
+        tasks['cancelled'].cancel()
+        await asyncio.sleep(0)
+
+        slots.release('acc')
+        await tasks['next']
+
+        return slots.holder('acc'), tasks['cancelled'].cancelled()
+
+    assert asyncio.run(scenario()) == ('next', True)
+
+def test_waiter_cancelled_after_grant_passes_slot_on():
+    async def scenario():
+        slots = AccountSlots()
+        await slots.acquire('acc', 'owner', 0)
+        tasks = await queue_waiters(slots, [('granted', 5), ('next', 0)])
+
+        # Слот передан, но задача отменена до того, как успела продолжить работу
+        slots.release('acc')
+        tasks['granted'].cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await tasks['granted']
+
+        await tasks['next']
+
+        return slots.holder('acc')
+
+    assert asyncio.run(scenario()) == 'next'
+
+def test_lease_uses_process_priority_and_releases_on_error(monkeypatch):
+    monkeypatch.setattr(slots_module, 'account_slots', AccountSlots())
+
+    async def scenario():
+        slots = slots_module.account_slots
+        order = []
+
+        async def publish(name, priority, fail=False):
+            current_process.set((name, priority))
+
+            async with account_lease('acc'):
+                order.append(slots.holder('acc'))
+                await asyncio.sleep(0.01)
+
+                if fail:
+                    raise RuntimeError('publishing failed')
+
+        first = asyncio.create_task(publish('failing', 0, fail=True))
+        await asyncio.sleep(0)
+        rest = [asyncio.create_task(publish(name, priority)) for name, priority in (('low', 1), ('high', 9))]
+
+        with pytest.raises(RuntimeError):
+            await first
+
+        await asyncio.gather(*rest)
+
+        return order, slots.slots
+
+    assert asyncio.run(scenario()) == (['failing', 'high', 'low'], {})
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from bot.config import DB_TASK_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.database_manager import DatabaseManager
+from bot.handlers.commands.account_slots import current_process
+from bot.handlers.commands.checkpoints import save_checkpoint, remove_checkpoint, load_checkpoints, load_progress, \
+    save_progress
+from bot.handlers.commands.task_manager import TaskManager
+
+
+async def publishing(event, task_name, chat_id):
+    await save_progress(published=[1, 2])
+
+@pytest.fixture(autouse=True)
+def checkpoints_table():
+    DatabaseManager.create_task_db()
+
+    with get_connection(DB_TASK_DIRECTORY) as connection:
+        connection.execute("DELETE FROM Checkpoints")
+
+def test_checkpoint_keeps_process_arguments():
+    asyncio.run(save_checkpoint('task', publishing, 2, {'vc-2', 'vc-1'}, ('task', 10)))
+
+    assert load_checkpoints() == [('task', 'publishing', 2, ['vc-1', 'vc-2'], ['task', 10])]
+
+def test_progress_is_merged_and_survives_restart():
+    async def scenario():
+        await save_checkpoint('task', publishing, 0, [], ('task', 10))
+        await save_progress('task', published=[1], paused=False)
+        await save_progress('task', published=[1, 2])
+
+        # Повторный запуск процесса после перезапуска бота не сбрасывает прогресс
+        await save_checkpoint('task', publishing, 0, [], ('task', 10))
+
+        return await load_progress('task')
+
+    assert asyncio.run(scenario()) == {'published': [1, 2], 'paused': False}
+
+def test_progress_of_unknown_process_is_empty_and_not_saved():
+    async def scenario():
+        await save_progress('missing', published=[1])
+        return await load_progress('missing')
+
+    assert asyncio.run(scenario()) == {}
+
+def test_progress_defaults_to_current_process():
+    async def scenario():
+        await save_checkpoint('task', publishing, 0, [], ())
+        current_process.set(('task', 0))
+        await save_progress(count=3)
+
+        return await load_progress()
+
+    assert asyncio.run(scenario()) == {'count': 3}
+
+def test_removed_checkpoint_is_not_resumed():
+    async def scenario():
+        await save_checkpoint('task', publishing, 0, [], ())
+        await remove_checkpoint('task')
+
+    asyncio.run(scenario())
+
+    assert load_checkpoints() == []
+
+def test_finished_process_removes_checkpoint():
+    asyncio.run(TaskManager().add_task(0, publishing, 'task', ['vc-1'], 'task', 10))
+
+    assert load_checkpoints() == []
+
+def test_process_interrupted_by_shutdown_is_resumed_with_progress():
+    manager = TaskManager()
+
+    async def interrupted(event, task_name, chat_id):
+        await save_progress(published=[1])
+        manager.stopping = True
+        raise asyncio.CancelledError
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(manager.add_task(3, interrupted, 'task', ['vc-1'], 'task', 10))
+
+    assert load_checkpoints() == [('task', 'interrupted', 3, ['vc-1'], ['task', 10])]
+    assert asyncio.run(load_progress('task')) == {'published': [1]}
+    assert manager.tasks == {} and manager.current_tasks == {}
+
+def test_stop_all_cancels_and_awaits_running_processes():
+    manager = TaskManager()
+    started = []
+
+    async def publishing_forever(event, task_name, chat_id):
+        started.append(task_name)
+
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            # Запись после отмены завершается до того, как остановка бота закроет потоки баз данных
+            await save_progress(published=[7])
+            raise
+
+    async def scenario():
+        processes = [asyncio.create_task(manager.add_task(1, publishing_forever, name, [f'vc-{name}'], name, 10))
+                     for name in ('first', 'second')]
+
+        while len(started) < 2:
+            await asyncio.sleep(0)
+
+        await manager.stop_all()
+
+        return [process.done() for process in processes], await load_progress('first')
+
+    done, progress = asyncio.run(scenario())
+
+    assert done == [True, True]
+    assert progress == {'published': [7]}
+    assert manager.tasks == {} and manager.current_tasks == {}
+    assert sorted(name for name, *_ in load_checkpoints()) == ['first', 'second']
@@ -0,0 +1,66 @@
+import os
+import threading
+
+import pytest
+
+from bot.databases import connection_pool
+from bot.databases.connection_pool import get_connection, close_connection
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'pool.db')
+
+def in_thread(func):
+    """Результат func, вызванной в отдельном потоке"""
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+
+    return result[0]
+
+def test_connection_is_reused_per_thread_and_path(db_path, tmp_path):
+    connection = get_connection(db_path)
+
+    # Разные записи одного пути дают одно соединение
+    assert get_connection(db_path) is connection
+    assert get_connection(os.path.join(str(tmp_path), '.', 'pool.db')) is connection
+
+    assert get_connection(str(tmp_path / 'other.db')) is not connection
+
+    other_thread = in_thread(lambda: get_connection(db_path))
+
+    assert other_thread is not connection
+    assert (threading.get_ident(), os.path.normpath(db_path)) in connection_pool.connections
+
+    close_connection(db_path)
+    close_connection(str(tmp_path / 'other.db'))
+
+def test_connection_settings(db_path):
+    connection = get_connection(db_path)
+
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert connection.execute("PRAGMA synchronous").fetchone()[0] == 1
+    assert connection.execute("PRAGMA cache_size").fetchone()[0] == -16000
+
+    close_connection(db_path)
+
+def test_close_connection_closes_only_current_thread(db_path):
+    connection = get_connection(db_path)
+    other_thread = in_thread(lambda: get_connection(db_path))
+
+    close_connection(db_path)
+
+    with pytest.raises(Exception, match='closed'):
+        connection.execute("SELECT 1")
+
+    # Соединение другого потока может выполнять запрос и остаётся открытым
+    assert other_thread.execute("SELECT 1").fetchone() == (1,)
+
+    # После закрытия открывается новое соединение
+    assert get_connection(db_path) is not connection
+
+    close_connection(db_path)
+    other_thread.close()
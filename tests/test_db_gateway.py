@@ -0,0 +1,117 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from bot.databases import db_gateway
+from bot.databases.connection_pool import get_connection
+from bot.databases import connection_pool
+from bot.databases.db_gateway import run_write, run_read, execute, executemany, fetchall, fetchone, get_metrics, \
+    close_database
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    db_path = str(tmp_path / 'gateway.db')
+
+    with get_connection(db_path) as connection:
+        connection.execute("CREATE TABLE Items (id INTEGER PRIMARY KEY, name TEXT)")
+
+    yield db_path
+
+    asyncio.run(close_database(db_path))
+
+def test_writes_run_on_single_writer_thread(db_path):
+    threads = []
+
+    def insert(connection, name):
+        threads.append(threading.current_thread().name)
+        connection.execute("INSERT INTO Items (name) VALUES (?)", (name,))
+
+    async def scenario():
+        await asyncio.gather(*(run_write(db_path, lambda connection, name=name: insert(connection, name))
+                               for name in 'abcdef'))
+        return await run_read(db_path, lambda connection: threading.current_thread().name)
+
+    read_thread = asyncio.run(scenario())
+
+    assert len(set(threads)) == 1
+    assert threads[0].startswith('db-write')
+    assert read_thread.startswith('db-read')
+
+    # Записи видны соединению цикла событий
+    assert get_connection(db_path).execute("SELECT COUNT(*) FROM Items").fetchone()[0] == 6
+
+def test_run_write_is_one_transaction(db_path):
+    def insert_and_fail(connection):
+        connection.execute("INSERT INTO Items (name) VALUES ('lost')")
+        raise ValueError('failure')
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await run_write(db_path, insert_and_fail)
+
+        await executemany(db_path, "INSERT INTO Items (name) VALUES (?)", [('a',), ('b',)])
+        row_id = await execute(db_path, "INSERT INTO Items (name) VALUES (?)", ('c',))
+
+        return row_id, await fetchone(db_path, "SELECT name FROM Items WHERE id = ?", (row_id,)), \
+            await fetchall(db_path, "SELECT name FROM Items ORDER BY id")
+
+    row_id, row, rows = asyncio.run(scenario())
+
+    assert row_id == 3
+    assert row == ('c',)
+    assert rows == [('a',), ('b',), ('c',)]
+
+def test_metrics_count_completed_and_failed_jobs(db_path, monkeypatch):
+    monkeypatch.setattr(db_gateway, 'metrics', {
+        kind: {'pending': 0, 'completed': 0, 'failed': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+        for kind in ('read', 'write')
+    })
+
+    async def scenario():
+        await execute(db_path, "INSERT INTO Items (name) VALUES ('a')")
+
+        with pytest.raises(Exception):
+            await execute(db_path, "INSERT INTO Missing (name) VALUES ('a')")
+
+        await fetchall(db_path, "SELECT * FROM Items")
+
+    asyncio.run(scenario())
+    metrics = get_metrics()
+
+    assert (metrics['write']['pending'], metrics['write']['completed'], metrics['write']['failed']) == (0, 1, 1)
+    assert (metrics['read']['completed'], metrics['read']['failed']) == (1, 0)
+    assert metrics['write']['wait_max'] >= metrics['write']['wait_avg'] >= 0
+
+def test_close_database_waits_for_running_statements(db_path):
+    reading = threading.Event()
+    release = threading.Event()
+
+    def slow_read(connection):
+        cursor = connection.execute("SELECT name FROM Items")
+        reading.set()
+        release.wait(5)
+        return cursor.fetchall()
+
+    async def scenario():
+        await execute(db_path, "INSERT INTO Items (name) VALUES ('a')")
+
+        read = asyncio.create_task(run_read(db_path, slow_read))
+        await asyncio.to_thread(reading.wait, 5)
+
+        closing = asyncio.create_task(close_database(db_path))
+        await asyncio.sleep(0.1)
+
+        # Соединение потока чтения не закрывается посреди запроса
+        assert not closing.done()
+
+        release.set()
+
+        return await read, await closing
+
+    assert asyncio.run(scenario()) == ([('a',)], None)
+
+    # Соединения всех потоков шлюза и цикла закрыты
+    assert not [key for key in connection_pool.connections if key[1] == os.path.normpath(db_path)]
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from bot.handlers.commands.api import editor_blocks
+from bot.handlers.commands.api.editor_blocks import compile_article, resolve_blocks, build_article
+from bot.handlers.commands.logging import log
+
+# Ожидаемые блоки получены кодом platform_publishing VcApi до выделения компилятора (html.parser):
+# статья должна публиковаться так же, как раньше
+
+COVER = {'data': {'base64preview': 'cover'}}
+POSTS = [('https://vc.ru/1', 'Первая'), ('https://vc.ru/2', 'Вторая')]
+
+
+def block(block_type: str, data: dict, anchor: str = '', hidden: bool = False) -> dict:
+    return {'type': block_type, 'data': data, 'cover': False, 'hidden': hidden, 'anchor': anchor}
+
+def text(html: str, anchor: str = '', hidden: bool = False) -> dict:
+    return block('text', {'text': html}, anchor, hidden)
+
+def header(content: str, style: str, anchor: str = '', hidden: bool = False) -> dict:
+    return block('header', {'text': content, 'style': style}, anchor, hidden)
+
+def items(list_items: list, list_type: str, anchor: str = '', hidden: bool = False) -> dict:
+    return block('list', {'items': list_items, 'type': list_type}, anchor, hidden)
+
+def media(image: dict, anchor: str = '', hidden: bool = False) -> dict:
+    return block('media', {'items': [{'title': '', 'image': image}]}, anchor, hidden)
+
+def quote(content: str, subline: str, anchor: str = '', hidden: bool = False) -> dict:
+    return block('quote', {'text': content, 'subline1': subline, 'subline2': '', 'type': '', 'text_size': '',
+                           'image': None}, anchor, hidden)
+
+def post_links() -> list:
+    return [text(f'<p>📌 <a href="{link}">{theme}</a></p>') for link, theme in POSTS]
+
+GOLDEN = {
+    'headers': (
+        '<h1>Заголовок</h1><p>Вступление</p><h2 anchor="one">Раздел</h2><h3 hidden="true">Подраздел</h3>'
+        '<h4>Мелкий</h4><h5 anchor="five" hidden="false">Ещё мельче</h5><p>Текст</p>',
+        'Заголовок',
+        [text('<p>Вступление</p>'), media(COVER), header('Раздел', 'h2', anchor='one'),
+         header('Подраздел', 'h3', hidden=True), header('Мелкий', 'h3'), header('Ещё мельче', 'h3', anchor='five'),
+         text('<p>Текст</p>')]
+    ),
+    'paragraphs': (
+        '<h1>Заголовок</h1><p anchor="intro" hidden="true">Текст с <strong>жирным</strong> и <em>курсивом</em></p>'
+        '<span>Строка</span><p>   </p><p>Конец <u>подчёркнуто</u></p>',
+        'Заголовок',
+        [text('<p>Текст с <b>жирным</b> и <i>курсивом</i></p>', anchor='intro', hidden=True), media(COVER),
+         text('<p>Строка</p>'), text('<p>Конец <i>подчёркнуто</i></p>')]
+    ),
+    'lists': (
+        '<h1>Заголовок</h1><p>Вступление</p><ul anchor="list"><li>Один <b>жирный</b></li><li>Два</li></ul>'
+        '<ol hidden="true"><li><a href="https://vc.ru">Ссылка</a></li></ol><p><ol><li>Вложенный</li></ol></p>'
+        '<ul><li></li></ul><ul>  </ul>',
+        'Заголовок',
+        [text('<p>Вступление</p>'), media(COVER), items(['Один <b>жирный</b>', 'Два'], 'UL', anchor='list'),
+         items(['<a href="https://vc.ru">Ссылка</a>'], 'OL', hidden=True), items(['Вложенный'], 'OL')]
+    ),
+    'list_inside_paragraph': (
+        '<h1>T</h1><p>Intro <ul><li>a</li></ul></p>',
+        'T',
+        [items(['a'], 'UL'), media(COVER)]
+    ),
+    'paragraph_inside_paragraph': (
+        '<h1>T</h1><p>a<p>b</p></p>',
+        'T',
+        [text('<p>a<p>b</p></p>'), media(COVER)]
+    ),
+    'quote': (
+        '<h1>Заголовок</h1><p>Вступление</p><div type="quote" anchor="q" hidden="true">'
+        '<p style="q-text">Цитата <b>важная</b></p>'
+        '<p style="podp-do-80">Иван Иванов, <i>генеральный директор компании</i>, '
+        'выступление на конференции по искусственному интеллекту</p></div>'
+        '<div type="quote"><p style="podp-do-80">Без текста</p></div>'
+        '<div type="quote"><p style="q-text">Короткая</p><p style="podp-do-80">Автор</p></div>',
+        'Заголовок',
+        [text('<p>Вступление</p>'), media(COVER),
+         quote('<p>Цитата <b>важная</b></p>',
+               'Иван Иванов, <i>генеральный директор компании</i>, выступление на конференции по искусс',
+               anchor='q', hidden=True),
+         quote('<p>Короткая</p>', 'Автор')]
+    ),
+    'delimiter': (
+        '<h1>Заголовок</h1><p>До</p><div class="block-delimiter" data="[object Object]"></div><p>После</p>',
+        'Заголовок',
+        [text('<p>До</p>'), media(COVER), block('delimiter', {'type': 'default'}), text('<p>После</p>')]
+    ),
+    'image': (
+        '<h1>Заголовок</h1><p>Вступление</p><div type="image" anchor="img" hidden="true">product</div>'
+        '<div type="image">missing</div><div type="image"></div><p>Конец</p>',
+        'Заголовок',
+        [text('<p>Вступление</p>'), media(COVER), media({'uuid': 'product.webp'}, anchor='img', hidden=True),
+         text('<p>Конец</p>')]
+    ),
+    'links': (
+        '<h1>Заголовок</h1><p>Вступление</p><h3>Читайте также</h3><div type="links"></div><p>Конец</p>',
+        'Заголовок',
+        [text('<p>Вступление</p>'), media(COVER), header('Читайте также', 'h3'), *post_links(), text('<p>Конец</p>')]
+    ),
+    'links_with_anchor': (
+        '<h1>Заголовок</h1><p>Вступление</p><h3>Читайте также</h3><div type="links" anchor="more"></div>',
+        'Заголовок',
+        [text('<p>Вступление</p>'), media(COVER), header('Читайте также', 'h3')]
+    ),
+    'links_without_posts_h4': (
+        '<h1>Заголовок</h1><p>Вступление</p><h4>Читайте также</h4><div type="links"></div><p>Конец</p>',
+        'Заголовок',
+        [text('<p>Вступление</p>'), media(COVER), text('<p>Конец</p>')]
+    ),
+    'links_without_posts_h2': (
+        '<h1>Заголовок</h1><p>Вступление</p><h2>Читайте также</h2><div type="links"></div><p>Конец</p>',
+        'Заголовок',
+        [text('<p>Вступление</p>'), media(COVER), header('Читайте также', 'h2'), text('<p>Конец</p>')]
+    ),
+    'fixed_tags': (
+        '<h1>Заголовок</h1><p>Вступление</p><b>Жирный</b><a href="https://dtf.ru">Ссылка</a>'
+        '<i>Курсив</i><strong>Сильный</strong>',
+        'Заголовок',
+        [text('<p>Вступление</p>'), media(COVER), text('<p><b>Жирный</b></p>'),
+         text('<p><a href="https://dtf.ru">Ссылка</a></p>'), text('<p><i>Курсив</i></p>'),
+         text('<p><b>Сильный</b></p>')]
+    ),
+    'second_h1': (
+        '<h1>Заголовок</h1><p>Вступление</p><h1>Второй <b>заголовок</b></h1><p>Конец</p>',
+        'Заголовок',
+        [text('<p>Вступление</p>'), media(COVER), 'Второйзаголовок', text('<p>Конец</p>')]
+    ),
+    'document': (
+        '<html><head><title>x</title><style>p {}</style></head><body><h1>Заголовок</h1>'
+        '<p>Вступление</p><script>alert(1)</script><p>Конец</p></body></html>',
+        'Заголовок',
+        [text('<p>Вступление</p>'), media(COVER), text('<p>Конец</p>')]
+    ),
+}
+
+
+class Platform:
+    """Объект площадки: ленты автора и загрузка изображений без запросов к площадке"""
+
+    def __init__(self, posts: list) -> None:
+        self.task_type = 'Основной'
+        self.posts_amount = 3
+        self.task_log = log
+        self.posts = posts
+
+    async def fetch_user_posts(self, posts_amount: int) -> list:
+        return self.posts
+
+    async def platform_images_upload(self, image_path: str) -> tuple:
+        return True, {'uuid': os.path.basename(image_path)}
+
+@pytest.fixture(autouse=True)
+def images(monkeypatch):
+    async def find_image(name):
+        return 'bot/assets/images/product.webp' if 'product.webp'.startswith(name) else None
+
+    monkeypatch.setattr(editor_blocks, 'find_image', find_image)
+
+def publish(html: str, posts: list = POSTS) -> tuple:
+    """Заголовок и блоки статьи в том виде, в каком они уходят в /editor"""
+
+    title, blocks = compile_article(html)
+
+    if title is None:
+        return None, blocks
+
+    blocks = asyncio.run(resolve_blocks(Platform(posts), blocks, 'vc.ru'))
+    article = json.loads(json.dumps(build_article(1, title, blocks, COVER, True), ensure_ascii=False))
+
+    return article['title'], article['entry']['blocks']
+
+@pytest.mark.parametrize('name', GOLDEN)
+def test_blocks_match_previous_publishing(name):
+    html, title, blocks = GOLDEN[name]
+
+    assert publish(html, [] if 'without_posts' in name else POSTS) == (title, blocks)
+
+def test_article_without_leading_h1_is_rejected():
+    assert compile_article('<h2>Без заголовка</h2><h1>Поздний</h1><p>Текст</p>') == (None, [])
+    assert compile_article('') == (None, [])
+
+def test_only_h3_header_is_dropped_before_missing_links():
+    # Раньше удалялся любой предыдущий блок, в разметке которого встречалось «h3»
+    html = '<h1>Заголовок</h1><p>Вступление</p><p>Сравнение моделей H3 и H4</p><div type="links"></div>'
+
+    assert publish(html, posts=[]) == ('Заголовок', [text('<p>Вступление</p>'), media(COVER),
+                                                     text('<p>Сравнение моделей H3 и H4</p>')])
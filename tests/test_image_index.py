@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from bot.config import DB_IMAGES_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.database_manager import DatabaseManager
+from bot.handlers.commands import image_index
+from bot.handlers.commands.image_index import find_image, invalidate_image_index, load_image_index
+
+
+@pytest.fixture
+def images(monkeypatch, tmp_path):
+    """Папка изображений в Images (файлы 'Apple iPhone.webp' и 'Samsung.png') и счётчик построений индекса"""
+
+    DatabaseManager.create_db_images()
+
+    paths = [tmp_path / 'Apple iPhone.webp', tmp_path / 'Samsung.png']
+
+    for path in paths:
+        path.write_bytes(b'')
+
+    with get_connection(DB_IMAGES_DIRECTORY) as connection:
+        connection.execute("DELETE FROM Images")
+        connection.execute("INSERT INTO Images (image_name, image_path) VALUES (?, ?)",
+                           ('phones', '\n'.join(map(str, paths + [tmp_path / 'deleted.png']))))
+
+    builds = []
+    build = image_index.build_image_index
+
+    def counting_build(connection):
+        builds.append(1)
+        return build(connection)
+
+    monkeypatch.setattr(image_index, 'build_image_index', counting_build)
+    monkeypatch.setattr(image_index, 'image_index', None)
+    monkeypatch.setattr(image_index, 'image_index_lock', asyncio.Lock())
+
+    return paths, builds
+
+def test_images_are_found_by_name_or_file_name_prefix(images):
+    (iphone, samsung), builds = images
+
+    async def scenario():
+        return [await find_image(name) for name in ('Apple iPhone', 'Apple', 'Samsung', 'Samsung.png', 'deleted', 'Nokia')]
+
+    assert asyncio.run(scenario()) == [str(iphone), str(iphone), str(samsung), str(samsung), None, None]
+    assert len(builds) == 1
+
+def test_empty_index_is_cached(images):
+    paths, builds = images
+
+    with get_connection(DB_IMAGES_DIRECTORY) as connection:
+        connection.execute("DELETE FROM Images")
+
+    async def scenario():
+        return await find_image('Apple'), await find_image('Samsung')
+
+    assert asyncio.run(scenario()) == (None, None)
+    assert len(builds) == 1
+
+def test_concurrent_lookups_build_index_once(images):
+    paths, builds = images
+
+    async def scenario():
+        return await asyncio.gather(*(find_image('Samsung') for _ in range(5)))
+
+    assert asyncio.run(scenario()) == [str(paths[1])] * 5
+    assert len(builds) == 1
+
+def test_index_built_before_invalidation_is_not_cached(images):
+    paths, builds = images
+
+    async def scenario():
+        loading = asyncio.create_task(load_image_index())
+        await asyncio.sleep(0)
+
+        # Папка изображений изменена, пока индекс строится
+        invalidate_image_index()
+        await loading
+
+        return image_index.image_index, await find_image('Samsung')
+
+    cached, found = asyncio.run(scenario())
+
+    assert cached is None
+    assert found == str(paths[1])
+    assert len(builds) == 2
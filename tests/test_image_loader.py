@@ -0,0 +1,60 @@
+import asyncio
+import os
+
+from bot.handlers.commands.api import image_loader
+from bot.handlers.commands.api.image_loader import download_image
+
+
+class Content:
+    def __init__(self, downloading: asyncio.Event) -> None:
+        self.downloading = downloading
+
+    async def iter_chunked(self, size):
+        yield b'first chunk'
+
+        self.downloading.set()
+        await asyncio.Event().wait()
+
+
+class Response:
+    def __init__(self, downloading: asyncio.Event) -> None:
+        self.content = Content(downloading)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class Session:
+    """Сессия, загрузка из которой зависает после первого блока"""
+
+    def __init__(self) -> None:
+        self.downloading = asyncio.Event()
+
+    def get(self, url, raise_for_status=False):
+        return Response(self.downloading)
+
+def test_cancelled_download_leaves_no_files(tmp_path, monkeypatch):
+    image_path = str(tmp_path / 'image.webp')
+
+    async def scenario():
+        session = Session()
+
+        async def get_session(session_key):
+            return session
+
+        monkeypatch.setattr(image_loader, 'get_session', get_session)
+
+        task = asyncio.create_task(download_image('https://images/1.png', image_path))
+        await session.downloading.wait()
+
+        assert os.path.exists(image_path + '.src.part')
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(scenario())
+
+    assert os.listdir(tmp_path) == []
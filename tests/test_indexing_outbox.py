@@ -0,0 +1,203 @@
+import asyncio
+import json
+import time
+
+import pytest
+import requests
+
+from bot.config import DB_INDEXING_DIRECTORY, INDEXING_REQUEST_TIMEOUT
+from bot.databases.connection_pool import get_connection
+from bot.databases.database_manager import DatabaseManager
+from bot.handlers.commands import indexing_outbox
+from bot.handlers.commands.api import link_indexing_api
+from bot.handlers.commands.api.link_indexing_api import LinkIndexing
+from bot.handlers.commands.indexing_outbox import enqueue_indexing, drain_outbox
+
+
+class Response:
+    def __init__(self, status_code: int, text: str = '') -> None:
+        self.status_code = status_code
+        self.text = text
+
+
+class FakeApi:
+    """Сервис индексации: ответы задаются списком (Response или исключение), запросы и уведомления записываются.
+    Без заданного ответа сервис подтверждает приём всех ссылок запроса"""
+
+    def __init__(self) -> None:
+        self.answers = []
+        self.requests = []
+        self.notified = []
+
+    def post(self, url, data, timeout=None):
+        links = data['links'].split('\n')
+        self.requests.append((data['searchengine'], links, timeout))
+        answer = self.answers.pop(0) if self.answers else Response(200, json.dumps({'links': links}))
+
+        if isinstance(answer, Exception):
+            raise answer
+
+        return answer
+
+@pytest.fixture
+def api(monkeypatch):
+    DatabaseManager.create_indexing_db()
+
+    with get_connection(DB_INDEXING_DIRECTORY) as connection:
+        connection.execute("DELETE FROM IndexingOutbox")
+
+    api = FakeApi()
+
+    monkeypatch.setattr(link_indexing_api.requests, 'post', api.post)
+    monkeypatch.setattr(indexing_outbox, 'notify', lambda chat_id, text, digest=None: api.notified.append(chat_id))
+
+    return api
+
+def enqueue(*links, searchengine='yandex+google'):
+    async def scenario():
+        indexing_obj = LinkIndexing(api_key='key', user_id='user', se_type='fast', task='-')
+
+        for link in links:
+            await enqueue_indexing(indexing_obj, searchengine, link, chat_id=1)
+
+    asyncio.run(scenario())
+
+def outbox() -> list:
+    return get_connection(DB_INDEXING_DIRECTORY).execute(
+        "SELECT searchengine, link, status, attempts, next_attempt, last_error FROM IndexingOutbox ORDER BY id"
+    ).fetchall()
+
+def test_links_are_sent_in_one_request_per_search_engine(api, monkeypatch):
+    monkeypatch.setattr(indexing_outbox, 'INDEXING_BATCH_SIZE', 100)
+    enqueue('https://vc.ru/1', 'https://vc.ru/2')
+
+    asyncio.run(drain_outbox())
+
+    assert sorted(api.requests) == [
+        ('google', ['https://vc.ru/1', 'https://vc.ru/2'], INDEXING_REQUEST_TIMEOUT),
+        ('yandex', ['https://vc.ru/1', 'https://vc.ru/2'], INDEXING_REQUEST_TIMEOUT),
+    ]
+    assert outbox() == []
+
+def test_batches_are_limited_in_size(api, monkeypatch):
+    monkeypatch.setattr(indexing_outbox, 'INDEXING_BATCH_SIZE', 2)
+    enqueue('https://vc.ru/1', 'https://vc.ru/2', 'https://vc.ru/3', searchengine='google')
+
+    asyncio.run(drain_outbox())
+
+    assert [links for searchengine, links, timeout in api.requests] == [['https://vc.ru/1', 'https://vc.ru/2'],
+                                                                        ['https://vc.ru/3']]
+
+def test_single_link_is_confirmed_by_successful_response(api):
+    enqueue('https://vc.ru/1', 'https://vc.ru/2', searchengine='google')
+    api.answers = [Response(201), Response(200, 'ok')]
+
+    asyncio.run(drain_outbox())
+
+    # По умолчанию в запросе одна ссылка
+    assert [links for searchengine, links, timeout in api.requests] == [['https://vc.ru/1'], ['https://vc.ru/2']]
+    assert outbox() == []
+
+def test_only_confirmed_links_are_removed_from_batch(api, monkeypatch):
+    monkeypatch.setattr(indexing_outbox, 'INDEXING_BATCH_SIZE', 3)
+    enqueue('https://vc.ru/1', 'https://vc.ru/2', 'https://vc.ru/3', searchengine='google')
+    api.answers = [Response(200, json.dumps({'links': ['https://vc.ru/2']}))]
+
+    asyncio.run(drain_outbox())
+
+    # Неподтверждённые ссылки остаются в очереди на повторную отправку
+    assert [(link, status, attempts) for searchengine, link, status, attempts, *rest in outbox()] == [
+        ('https://vc.ru/1', 'pending', 1), ('https://vc.ru/3', 'pending', 1)
+    ]
+
+    # Ответ без списка ссылок не подтверждает ни одну из них
+    with get_connection(DB_INDEXING_DIRECTORY) as connection:
+        connection.execute("UPDATE IndexingOutbox SET next_attempt = 0")
+
+    api.answers = [Response(200, 'ok')]
+    asyncio.run(drain_outbox())
+
+    assert [(link, attempts) for searchengine, link, status, attempts, *rest in outbox()] == [
+        ('https://vc.ru/1', 2), ('https://vc.ru/3', 2)
+    ]
+
+def test_failed_request_is_retried_with_backoff(api):
+    enqueue('https://vc.ru/1', searchengine='google')
+    api.answers = [Response(500, 'server error'), Response(500, 'server error')]
+
+    started = time.time()
+    asyncio.run(drain_outbox())
+
+    (searchengine, link, status, attempts, next_attempt, last_error), = outbox()
+
+    assert (status, attempts, last_error) == ('pending', 1, 'server error')
+    assert next_attempt - started >= indexing_outbox.INDEXING_RETRY_DELAY
+
+    # Время повторной попытки не наступило
+    asyncio.run(drain_outbox())
+    assert len(api.requests) == 1
+
+    with get_connection(DB_INDEXING_DIRECTORY) as connection:
+        connection.execute("UPDATE IndexingOutbox SET next_attempt = 0")
+
+    started = time.time()
+    asyncio.run(drain_outbox())
+
+    (searchengine, link, status, attempts, next_attempt, last_error), = outbox()
+
+    assert attempts == 2
+    assert next_attempt - started >= indexing_outbox.INDEXING_RETRY_DELAY * 2
+
+def test_timeout_is_a_failed_attempt(api):
+    enqueue('https://vc.ru/1', searchengine='google')
+    api.answers = [requests.ReadTimeout()]
+
+    asyncio.run(drain_outbox())
+
+    (searchengine, link, status, attempts, next_attempt, last_error), = outbox()
+
+    assert (status, attempts) == ('pending', 1)
+    assert str(INDEXING_REQUEST_TIMEOUT) in last_error
+    assert next_attempt > time.time()
+
+def test_link_fails_after_last_attempt_with_notification(api, monkeypatch):
+    monkeypatch.setattr(indexing_outbox, 'INDEXING_MAX_ATTEMPTS', 2)
+    enqueue('https://vc.ru/1', searchengine='google')
+
+    for _ in range(2):
+        api.answers = [Response(400, 'bad api key')]
+
+        with get_connection(DB_INDEXING_DIRECTORY) as connection:
+            connection.execute("UPDATE IndexingOutbox SET next_attempt = 0")
+
+        asyncio.run(drain_outbox())
+
+    (searchengine, link, status, attempts, next_attempt, last_error), = outbox()
+
+    assert (status, attempts, last_error) == ('failed', 2, 'bad api key')
+    assert api.notified == [1]
+
+    # Ссылка больше не отправляется
+    asyncio.run(drain_outbox())
+    assert len(api.requests) == 2
+
+def test_failed_links_are_pruned_after_retention(api, monkeypatch):
+    monkeypatch.setattr(indexing_outbox, 'INDEXING_MAX_ATTEMPTS', 1)
+    enqueue('https://vc.ru/1', 'https://vc.ru/2', searchengine='google')
+    api.answers = [Response(400, 'bad api key'), Response(400, 'bad api key')]
+
+    asyncio.run(drain_outbox())
+    enqueue('https://vc.ru/3', searchengine='google')
+
+    # Ссылка отказа хранится, пока не истёк срок хранения
+    asyncio.run(drain_outbox())
+    assert [(link, status) for searchengine, link, status, *rest in outbox()] == [('https://vc.ru/1', 'failed'),
+                                                                                   ('https://vc.ru/2', 'failed')]
+
+    with get_connection(DB_INDEXING_DIRECTORY) as connection:
+        connection.execute("UPDATE IndexingOutbox SET next_attempt = ? WHERE link = 'https://vc.ru/1'",
+                           (time.time() - indexing_outbox.INDEXING_FAILED_RETENTION - 1,))
+
+    asyncio.run(drain_outbox())
+
+    assert [link for searchengine, link, *rest in outbox()] == ['https://vc.ru/2']
@@ -0,0 +1,154 @@
+import asyncio
+import os
+import sqlite3
+
+import pytest
+
+from bot.config import DB_DIRECTORY, DB_ARTICLES_DIRECTORY, DB_LINKS_DIRECTORY
+from bot.databases import migrations
+from bot.databases.connection_pool import get_connection, close_connection
+from bot.databases.db_gateway import close_database, run_read
+from bot.databases.database_manager import DatabaseManager
+from bot.databases.migrations import TASK_MIGRATIONS, GLOBAL_MIGRATIONS, migrate_databases
+
+# Схема баз до появления миграций (user_version = 0)
+BASELINE_TASK_SCHEMA = (
+    "CREATE TABLE Prompts (id INTEGER PRIMARY KEY, prompt TEXT NOT NULL, prompt_theme TEXT NOT NULL, "
+    "marks TEXT, xlsx_id TEXT)",
+    "CREATE TABLE Articles (id INTEGER PRIMARY KEY, article_text TEXT NOT NULL, article_image TEXT NOT NULL, "
+    "marks TEXT, status TEXT, xlsx_id TEXT)",
+    "CREATE TABLE ModelAI (id INTEGER PRIMARY KEY, model_text TEXT, model_image TEXT)",
+    "INSERT INTO Articles (article_text, article_image, marks, status, xlsx_id) VALUES ('Текст', '-', '1', '-', '1')",
+)
+
+BASELINE_ARTICLES_SCHEMA = (
+    "CREATE TABLE Articles (id INTEGER PRIMARY KEY, article_text TEXT NOT NULL, article_image TEXT NOT NULL, "
+    "marks TEXT)",
+    "CREATE TABLE ArticlesStatus (id INTEGER PRIMARY KEY, status TEXT)",
+    "INSERT INTO ArticlesStatus (status) VALUES ('-')",
+    "INSERT INTO Articles (article_text, article_image, marks) VALUES ('Текст', '-', '1')",
+)
+
+TASK_INDEXES = {'idx_articles_prompt_status', 'idx_articles_marks', 'idx_work_items_queue', 'idx_work_items_account'}
+
+
+def reset(db_path: str, schema: tuple = ()) -> None:
+    """Удаление базы (и отметки о проверке схемы) и создание её заново со схемой schema"""
+
+    asyncio.run(close_database(db_path))
+    migrations.checked_databases.discard(os.path.normpath(db_path))
+
+    for path in (db_path, db_path + '-wal', db_path + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+
+    if schema:
+        with sqlite3.connect(db_path) as connection:
+            for statement in schema:
+                connection.execute(statement)
+        connection.close()
+
+def user_version(connection: sqlite3.Connection) -> int:
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+def columns(connection: sqlite3.Connection, table: str) -> list:
+    return [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+
+def objects(connection: sqlite3.Connection, object_type: str) -> set:
+    return {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = ?", (object_type,))}
+
+@pytest.fixture
+def task_path():
+    db_path = DB_DIRECTORY + 'migrations.db'
+    reset(db_path)
+
+    yield db_path
+
+    asyncio.run(close_database(db_path))
+
+def test_fresh_task_database_is_created_at_latest_version(task_path):
+    DatabaseManager.create_db_main('migrations')
+    connection = get_connection(task_path)
+
+    assert user_version(connection) == len(TASK_MIGRATIONS)
+    assert 'prompt_id' in columns(connection, 'Articles')
+    assert 'WorkItems' in objects(connection, 'table')
+    assert TASK_INDEXES <= objects(connection, 'index')
+
+def test_task_database_is_not_migrated_before_tables_exist(task_path):
+    # Соединение с новой базой открывается до create_db_main: миграции применяются после создания таблиц
+    connection = get_connection(task_path)
+
+    assert user_version(connection) == 0
+    assert objects(connection, 'table') == set()
+
+    DatabaseManager.create_db_multi('migrations')
+
+    assert user_version(connection) == len(TASK_MIGRATIONS)
+    assert 'prompt_id' in columns(connection, 'Articles')
+
+def test_database_is_not_migrated_on_open(task_path):
+    reset(task_path, BASELINE_TASK_SCHEMA)
+
+    # Соединение потока чтения шлюза только читает: схему обновляет migrate_databases при запуске
+    assert asyncio.run(run_read(task_path, user_version)) == 0
+    assert user_version(get_connection(task_path)) == 0
+
+def test_baseline_task_database_is_upgraded_at_startup(task_path):
+    reset(task_path, BASELINE_TASK_SCHEMA)
+
+    migrate_databases()
+    connection = get_connection(task_path)
+
+    assert user_version(connection) == len(TASK_MIGRATIONS)
+    assert columns(connection, 'Articles')[-1] == 'prompt_id'
+    assert 'WorkItems' in objects(connection, 'table')
+    assert TASK_INDEXES <= objects(connection, 'index')
+
+    # Существующие статьи сохраняются
+    assert connection.execute("SELECT article_text, marks, prompt_id FROM Articles").fetchall() == [('Текст', '1', None)]
+
+def test_partially_migrated_database_continues_from_its_version(task_path):
+    reset(task_path, BASELINE_TASK_SCHEMA + ("ALTER TABLE Articles ADD COLUMN prompt_id INTEGER",
+                                             "PRAGMA user_version = 1"))
+
+    migrate_databases()
+    connection = get_connection(task_path)
+
+    assert user_version(connection) == len(TASK_MIGRATIONS)
+    assert columns(connection, 'Articles').count('prompt_id') == 1
+    assert 'WorkItems' in objects(connection, 'table')
+
+def test_fresh_global_database_is_created_at_startup():
+    reset(DB_LINKS_DIRECTORY)
+
+    migrate_databases()
+    connection = get_connection(DB_LINKS_DIRECTORY)
+
+    assert user_version(connection) == len(GLOBAL_MIGRATIONS[DB_LINKS_DIRECTORY])
+    assert columns(connection, 'Links') == ['id', 'link_name', 'link_source']
+
+def test_baseline_global_database_gets_new_indexes():
+    reset(DB_ARTICLES_DIRECTORY, BASELINE_ARTICLES_SCHEMA)
+
+    migrate_databases()
+    connection = get_connection(DB_ARTICLES_DIRECTORY)
+
+    assert user_version(connection) == len(GLOBAL_MIGRATIONS[DB_ARTICLES_DIRECTORY]) == 2
+    assert 'idx_articles_marks' in objects(connection, 'index')
+    assert connection.execute("SELECT article_text, marks FROM Articles").fetchall() == [('Текст', '1')]
+    assert connection.execute("SELECT status FROM ArticlesStatus").fetchall() == [('-',)]
+
+def test_up_to_date_database_is_not_migrated_again(task_path, monkeypatch):
+    DatabaseManager.create_db_main('migrations')
+
+    migrations.checked_databases.discard(os.path.normpath(task_path))
+    close_connection(task_path)
+
+    applied = []
+    monkeypatch.setattr(migrations, 'apply_migrations', lambda *args: applied.append(args))
+
+    migrate_databases()
+
+    assert applied == []
+    assert os.path.normpath(task_path) in migrations.checked_databases
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from aiogram.exceptions import TelegramBadRequest
+
+from bot.handlers.commands import notifications
+from bot.handlers.commands.notifications import notify, digest_messages, flush_notifications
+
+
+class FakeBot:
+    """Бот, который записывает отправленные сообщения; ошибки отправки задаются списком"""
+
+    def __init__(self, errors: list = None) -> None:
+        self.sent = []
+        self.calls = 0
+        self.errors = errors or []
+
+    async def send_message(self, chat_id: int, text: str) -> None:
+        self.calls += 1
+
+        if self.errors:
+            raise self.errors.pop(0)
+
+        self.sent.append((chat_id, text))
+
+@pytest.fixture
+def fake_bot(monkeypatch):
+    fake_bot = FakeBot()
+
+    monkeypatch.setattr(notifications, 'bot', fake_bot)
+    monkeypatch.setattr(notifications, 'chat_queues', {})
+    monkeypatch.setattr(notifications, 'chat_workers', {})
+    monkeypatch.setattr(notifications, 'digests', {})
+    monkeypatch.setattr(notifications, 'NOTIFY_CHAT_INTERVAL', 0)
+    monkeypatch.setattr(notifications, 'NOTIFY_DIGEST_WINDOW', 0.01)
+
+    return fake_bot
+
+def test_digest_is_split_without_breaking_items(monkeypatch):
+    monkeypatch.setattr(notifications, 'NOTIFY_MESSAGE_LIMIT', 40)
+
+    messages = digest_messages('Сводка', ['a' * 15, 'b' * 15, 'c' * 15])
+
+    assert messages == [f'<b>Сводка:</b> 3\n\n{'a' * 15}',
+                        f'<b>Сводка:</b> 3\n\n{'b' * 15}',
+                        f'<b>Сводка:</b> 3\n\n{'c' * 15}']
+    assert all(len(message) <= 40 for message in messages)
+
+def test_messages_of_chat_are_sent_in_order(fake_bot):
+    async def scenario():
+        for number in range(3):
+            notify(1, f'message {number}')
+
+        notify(2, 'other chat')
+        await flush_notifications()
+
+    asyncio.run(scenario())
+
+    assert [text for chat_id, text in fake_bot.sent if chat_id == 1] == ['message 0', 'message 1', 'message 2']
+    assert (2, 'other chat') in fake_bot.sent
+
+def test_digest_notifications_are_combined_per_chat(fake_bot):
+    async def scenario():
+        notify(1, 'link 1', digest='indexing')
+        notify(1, 'link 2', digest='indexing')
+        notify(2, 'link 3', digest='indexing')
+
+        await asyncio.sleep(0.05)
+        await flush_notifications()
+
+    asyncio.run(scenario())
+
+    assert sorted(fake_bot.sent) == [(1, '<b>Ссылки не отправлены на индексацию:</b> 2\n\nlink 1\n\nlink 2'),
+                                     (2, 'link 3')]
+
+def test_pending_digest_is_sent_on_shutdown(fake_bot):
+    async def scenario():
+        notify(1, 'link 1', digest='indexing')
+        await flush_notifications()
+
+    asyncio.run(scenario())
+
+    assert fake_bot.sent == [(1, 'link 1')]
+
+def test_unrecoverable_error_is_not_retried(fake_bot):
+    fake_bot.errors.append(TelegramBadRequest(method=None, message='chat not found'))
+
+    async def scenario():
+        notify(1, 'message')
+        await flush_notifications()
+
+    asyncio.run(scenario())
+
+    assert (fake_bot.calls, fake_bot.sent) == (1, [])
@@ -0,0 +1,208 @@
+import asyncio
+
+from bot.config import DB_DIRECTORY, DB_OPENAI_API_KEY_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.database_manager import DatabaseManager
+from bot.handlers.commands import tasks_settings
+from bot.handlers.commands.api import openai_api
+from bot.handlers.commands.api.openai_api import send_prompt_to_chatgpt_article, get_client, close_clients, \
+    get_global_settings, get_task_settings, invalidate_settings
+
+
+class Generation:
+    """Запросы текста и изображения, завершение которых управляется из теста"""
+
+    def __init__(self, image_path: str) -> None:
+        self.image_path = image_path
+        self.started = []
+        self.text_started = asyncio.Event()
+        self.image_started = asyncio.Event()
+        self.text_result = asyncio.Event()
+        self.image_result = asyncio.Event()
+        self.text = ('<h1>Статья</h1>', '-')
+        self.image_cancelled = False
+
+    async def send_text(self, prompt, task_name):
+        self.started.append('text')
+        self.text_started.set()
+        await self.text_result.wait()
+        return self.text
+
+    async def send_image(self, prompt, task_name):
+        self.started.append('image')
+        self.image_started.set()
+
+        try:
+            await self.image_result.wait()
+        except asyncio.CancelledError:
+            self.image_cancelled = True
+            raise
+
+        with open(self.image_path, 'wb') as f:
+            f.write(b'webp')
+
+        return 'https://images/1.png', self.image_path
+
+def patch(monkeypatch, generation: Generation, concurrent: bool = True) -> None:
+    monkeypatch.setattr(openai_api, 'CONCURRENT_GENERATION', concurrent)
+    monkeypatch.setattr(openai_api, 'send_prompt_to_chatgpt_text', generation.send_text)
+    monkeypatch.setattr(openai_api, 'send_prompt_to_chatgpt_image', generation.send_image)
+    monkeypatch.setattr(openai_api, 'randint', lambda a, b: 0)
+
+def test_text_and_image_are_requested_together(tmp_path, monkeypatch):
+    async def scenario():
+        generation = Generation(str(tmp_path / 'image.webp'))
+        patch(monkeypatch, generation)
+
+        article = asyncio.create_task(send_prompt_to_chatgpt_article('Промт', 'Тема', 'task'))
+
+        # Оба запроса в работе, пока ни один из них не завершён
+        await asyncio.wait_for(asyncio.gather(generation.text_started.wait(), generation.image_started.wait()), 1)
+
+        generation.image_result.set()
+        generation.text_result.set()
+
+        return await article
+
+    assert asyncio.run(scenario()) == ('<h1>Статья</h1>', '-', 'https://images/1.png', str(tmp_path / 'image.webp'))
+
+def test_failed_text_cancels_image(tmp_path, monkeypatch):
+    async def scenario():
+        generation = Generation(str(tmp_path / 'image.webp'))
+        generation.text = (False, 'quota')
+        patch(monkeypatch, generation)
+
+        article = asyncio.create_task(send_prompt_to_chatgpt_article('Промт', 'Тема', 'task'))
+        await generation.image_started.wait()
+
+        generation.text_result.set()
+        result = await article
+
+        # Отмена доходит до запроса изображения на следующей итерации цикла
+        await asyncio.sleep(0)
+
+        return result, generation.image_cancelled
+
+    assert asyncio.run(scenario()) == ((False, 'quota', False, '-'), True)
+    assert list(tmp_path.iterdir()) == []
+
+def test_image_downloaded_before_failed_text_is_removed(tmp_path, monkeypatch):
+    async def scenario():
+        generation = Generation(str(tmp_path / 'image.webp'))
+        generation.text = (False, 'content_policy_violation')
+        patch(monkeypatch, generation)
+
+        generation.image_result.set()
+        article = asyncio.create_task(send_prompt_to_chatgpt_article('Промт', 'Тема', 'task'))
+
+        while not (tmp_path / 'image.webp').exists():
+            await asyncio.sleep(0)
+
+        generation.text_result.set()
+
+        return await article
+
+    assert asyncio.run(scenario()) == (False, 'content_policy_violation', False, '-')
+    assert list(tmp_path.iterdir()) == []
+
+def test_sequential_generation_waits_for_text(tmp_path, monkeypatch):
+    async def scenario():
+        generation = Generation(str(tmp_path / 'image.webp'))
+        patch(monkeypatch, generation, concurrent=False)
+
+        generation.text_result.set()
+        generation.image_result.set()
+
+        return await send_prompt_to_chatgpt_article('Промт', 'Тема', 'task'), generation.started
+
+    result, started = asyncio.run(scenario())
+
+    assert result[0] == '<h1>Статья</h1>' and result[2] == 'https://images/1.png'
+    assert started == ['text', 'image']
+
+def test_sequential_generation_skips_image_without_text(tmp_path, monkeypatch):
+    async def scenario():
+        generation = Generation(str(tmp_path / 'image.webp'))
+        generation.text = (False, 'quota')
+        patch(monkeypatch, generation, concurrent=False)
+
+        generation.text_result.set()
+
+        return await send_prompt_to_chatgpt_article('Промт', 'Тема', 'task'), generation.started
+
+    assert asyncio.run(scenario()) == ((False, 'quota', False, '-'), ['text'])
+
+def test_client_is_reused_per_api_key(monkeypatch):
+    monkeypatch.setattr(openai_api, 'clients', {})
+
+    async def scenario():
+        first = get_client('sk-first')
+        reused = get_client('sk-first')
+        second = get_client('sk-second')
+
+        await close_clients()
+
+        return first, reused, second
+
+    first, reused, second = asyncio.run(scenario())
+
+    assert first is reused
+    assert second is not first
+    assert first.api_key == 'sk-first' and first.max_retries == 0
+    assert openai_api.clients == {}
+
+def set_global_models(model_text: str, model_image: str) -> None:
+    with get_connection(DB_OPENAI_API_KEY_DIRECTORY) as connection:
+        connection.execute("UPDATE ApiKey SET api_key = 'sk-global' WHERE id = 1")
+        connection.execute("UPDATE ModelAI SET model_text = ?, model_image = ? WHERE id = 1", (model_text, model_image))
+
+def set_task_models(task_name: str, model_text: str, model_image: str) -> None:
+    with get_connection(DB_DIRECTORY + task_name + '.db') as connection:
+        connection.execute("UPDATE ModelAI SET model_text = ?, model_image = ? WHERE id = 1", (model_text, model_image))
+
+def models(task_name: str = None) -> tuple:
+    settings = asyncio.run(get_task_settings(task_name) if task_name else get_global_settings())
+    return settings['model_text'], settings['model_image']
+
+def test_task_settings_fall_back_to_global_and_are_cached(monkeypatch):
+    monkeypatch.setattr(tasks_settings, 'settings_cache', {})
+    task_name = 'openai-settings'
+    DatabaseManager.create_db_main(task_name)
+
+    set_global_models('gpt-4o', 'dall-e-3')
+    set_task_models(task_name, 'gpt-4o-mini', '-')
+
+    settings = asyncio.run(get_task_settings(task_name))
+
+    assert (settings['api_key'], settings['model_text'], settings['model_image']) == ('sk-global', 'gpt-4o-mini', 'dall-e-3')
+    assert '%NAME%' in settings['prompt_image']
+
+    # Без сброса кэша изменения в базе не читаются
+    set_task_models(task_name, 'o1', 'gpt-image-1')
+
+    assert models(task_name) == ('gpt-4o-mini', 'dall-e-3')
+
+    invalidate_settings(task_name)
+
+    assert models(task_name) == ('o1', 'gpt-image-1')
+
+    # Сброс общих настроек не затрагивает модели задания, а задания с моделью '-' получают новые модели по умолчанию
+    set_global_models('gpt-4.1', 'dall-e-2')
+    invalidate_settings()
+
+    assert models() == ('gpt-4.1', 'dall-e-2')
+    assert models(task_name) == ('o1', 'gpt-image-1')
+
+    set_task_models(task_name, '-', 'gpt-image-1')
+    invalidate_settings(task_name)
+
+    assert models(task_name) == ('gpt-4.1', 'gpt-image-1')
+
+def test_settings_share_the_tasks_settings_cache(monkeypatch):
+    monkeypatch.setattr(tasks_settings, 'settings_cache', {})
+    task_name = 'openai-settings'
+    DatabaseManager.create_db_main(task_name)
+
+    asyncio.run(get_task_settings(task_name))
+
+    assert set(tasks_settings.settings_cache) == {('ModelAI', None), ('ModelAI', task_name)}
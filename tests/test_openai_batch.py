@@ -0,0 +1,169 @@
+import asyncio
+import itertools
+import json
+
+import pytest
+
+from aiohttp import web
+
+from bot.config import DB_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.database_manager import DatabaseManager
+from bot.handlers.commands.api import openai_api, openai_batch
+from bot.handlers.commands.api.openai_batch import PREGENERATED_STATUS, build_batch_file, parse_batch_output, \
+    batch_generate_articles, claim_pregenerated_text
+from bot.keyboards.keyboards import task_articles
+
+task_numbers = itertools.count()
+
+ARTICLE = '<h1>Заголовок</h1>' + '<p>Текст статьи</p>' * 10
+
+
+def output_line(custom_id: str, status_code: int = 200, content: str = ARTICLE) -> str:
+    return json.dumps({
+        'custom_id': custom_id,
+        'response': {'status_code': status_code, 'body': {'choices': [{'message': {'content': content}}]}},
+        'error': None,
+    }, ensure_ascii=False)
+
+def test_batch_file_has_one_request_per_prompt():
+    lines = build_batch_file([(7, 'Промт 1', '1'), (12, 'Промт 2', None)], 'gpt-4o').decode('utf-8').split('\n')
+
+    assert [json.loads(line) for line in lines] == [
+        {'custom_id': 'prompt-7', 'method': 'POST', 'url': '/v1/chat/completions',
+         'body': {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'Промт 1'}]}},
+        {'custom_id': 'prompt-12', 'method': 'POST', 'url': '/v1/chat/completions',
+         'body': {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'Промт 2'}]}},
+    ]
+
+def test_output_is_mapped_back_to_prompt_ids():
+    output = '\n'.join([
+        output_line('prompt-12'),
+        '',
+        output_line('prompt-7', content=ARTICLE + ' второй'),
+    ])
+
+    assert parse_batch_output(output) == ({12: ARTICLE, 7: ARTICLE + ' второй'}, 0)
+
+def test_error_lines_are_counted():
+    output = '\n'.join([
+        output_line('prompt-1'),
+        # Ошибка запроса: ответа нет
+        json.dumps({'custom_id': 'prompt-2', 'response': None, 'error': {'code': 'invalid_request'}}),
+        # Ответ с кодом ошибки
+        output_line('prompt-3', status_code=429),
+        # Короткий ответ — отказ модели
+        output_line('prompt-4', content='Извините, не могу помочь.'),
+        # Неизвестный custom_id
+        output_line('article-5'),
+        json.dumps({'custom_id': 'prompt-6', 'response': {'status_code': 200, 'body': {'choices': []}}}),
+    ])
+
+    assert parse_batch_output(output) == ({1: ARTICLE}, 5)
+
+
+class BatchServer:
+    """Локальный mock-сервер Files и Batches API: задание завершается на втором опросе"""
+
+    def __init__(self) -> None:
+        self.requests = []
+        self.polls = 0
+        self.output = ''
+
+    def batch(self, status: str) -> web.Response:
+        return web.json_response({
+            'id': 'batch-1', 'object': 'batch', 'endpoint': '/v1/chat/completions', 'input_file_id': 'file-in',
+            'completion_window': '24h', 'status': status, 'created_at': 0,
+            'output_file_id': 'file-out' if status == 'completed' else None,
+            'request_counts': {'total': 3, 'completed': 3 if status == 'completed' else 1, 'failed': 0},
+        })
+
+    async def create_file(self, request):
+        data = await request.post()
+        self.requests.append(('files', data['purpose'], data['file'].file.read().decode('utf-8')))
+
+        return web.json_response({'id': 'file-in', 'object': 'file', 'bytes': 0, 'created_at': 0,
+                                  'filename': data['file'].filename, 'purpose': 'batch', 'status': 'processed'})
+
+    async def create_batch(self, request):
+        self.requests.append(('batches', await request.json()))
+        return self.batch('validating')
+
+    async def retrieve_batch(self, request):
+        self.polls += 1
+        return self.batch('completed' if self.polls >= 2 else 'in_progress')
+
+    async def file_content(self, request):
+        self.requests.append(('content', request.match_info['file_id']))
+        return web.Response(text=self.output)
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post('/v1/files', self.create_file)
+        app.router.add_post('/v1/batches', self.create_batch)
+        app.router.add_get('/v1/batches/{batch_id}', self.retrieve_batch)
+        app.router.add_get('/v1/files/{file_id}/content', self.file_content)
+
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+
+        return f'http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/v1'
+
+@pytest.fixture
+def task_name():
+    task_name = f'batch-{next(task_numbers)}'
+    DatabaseManager.create_db_main(task_name)
+
+    return task_name
+
+def test_batch_is_submitted_polled_and_stored(task_name, monkeypatch):
+    with get_connection(DB_DIRECTORY + task_name + '.db') as connection:
+        connection.executemany("INSERT INTO Prompts (prompt, prompt_theme, marks, xlsx_id) VALUES (?, '-', ?, ?)",
+                               [('Промт 1', None, '10'), ('Промт 2', 'vc-1', '11'), ('Промт 3', '', '12'),
+                                ('Промт 4', None, '13')])
+        connection.execute("INSERT INTO Articles (article_text, article_image, marks, status, xlsx_id) "
+                           "VALUES ('Опубликованная статья', '-', 'vc-1', 'Опубликована', '11')")
+
+    server = BatchServer()
+    server.output = '\n'.join([output_line('prompt-3'), output_line('prompt-1'), output_line('prompt-4', 500)])
+
+    monkeypatch.setattr(openai_api, 'clients', {})
+    monkeypatch.setattr(openai_batch, 'BATCH_POLL_INTERVAL', 0)
+
+    async def get_task_settings(name):
+        return {'api_key': 'key', 'model_text': 'gpt-4o'}
+
+    monkeypatch.setattr(openai_batch, 'get_task_settings', get_task_settings)
+
+    async def scenario():
+        monkeypatch.setattr(openai_api, 'OPENAI_BASE_URL', await server.start())
+
+        try:
+            return await batch_generate_articles(task_name), await claim_pregenerated_text(task_name, 1)
+        finally:
+            await server.runner.cleanup()
+
+    ready_before = asyncio.run(task_articles(task_name))[0]
+    (generated, info), claimed = asyncio.run(scenario())
+
+    assert generated
+    assert info.startswith('Сгенерировано текстов: 2 из 3, ошибок: 1.')
+
+    (files, purpose, batch_input), (batches, batch_request), content = server.requests
+
+    assert purpose == 'batch'
+    assert [json.loads(line)['custom_id'] for line in batch_input.split('\n')] == ['prompt-1', 'prompt-3', 'prompt-4']
+    assert batch_request == {'input_file_id': 'file-in', 'endpoint': '/v1/chat/completions', 'completion_window': '24h'}
+    assert content == ('content', 'file-out')
+    assert server.polls == 2
+
+    assert claimed == ARTICLE
+    assert get_connection(DB_DIRECTORY + task_name + '.db').execute(
+        "SELECT prompt_id, xlsx_id, status FROM Articles WHERE status = ?", (PREGENERATED_STATUS,)
+    ).fetchall() == [(3, '12', PREGENERATED_STATUS)]
+
+    # Непринятые тексты пакета не считаются готовыми статьями задания
+    assert ready_before == asyncio.run(task_articles(task_name))[0] == '<b>Количество готовых статей:</b> 1\n'
@@ -0,0 +1,201 @@
+import asyncio
+
+from types import SimpleNamespace
+
+import pytest
+
+from openai import RateLimitError
+
+from bot.handlers.commands.api import openai_scheduler
+from bot.handlers.commands.api.openai_scheduler import TokenBucket, KeyLimiter, openai_request, retry_delay
+
+
+class Clock:
+    """Часы планировщика: время меняется только вызовом advance"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class RawResponse:
+    def __init__(self, headers: dict = None, total_tokens: int = None) -> None:
+        self.headers = headers or {}
+        self.result = SimpleNamespace(usage=SimpleNamespace(total_tokens=total_tokens) if total_tokens else None)
+
+    def parse(self):
+        return self.result
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    clock = Clock()
+
+    monkeypatch.setattr(openai_scheduler, 'time', clock)
+    monkeypatch.setattr(openai_scheduler, 'limiters', {})
+
+    return clock
+
+def rate_limit_error(message: str, headers: dict = None) -> RateLimitError:
+    response = SimpleNamespace(request=None, status_code=429, headers=headers or {})
+    return RateLimitError(message, response=response, body=None)
+
+def test_bucket_refills_at_limit_per_minute(clock):
+    bucket = TokenBucket(60)
+    bucket.take(60)
+
+    assert bucket.delay(1) == 1
+    assert bucket.delay(30) == 30
+
+    clock.advance(10)
+
+    assert bucket.delay(1) == 0
+    assert bucket.delay(30) == 20
+
+    # Корзина не наполняется сверх лимита
+    clock.advance(600)
+    bucket.refill()
+
+    assert bucket.level == 60
+
+def test_request_larger_than_limit_waits_for_full_bucket_only(clock):
+    bucket = TokenBucket(100)
+    bucket.take(100)
+
+    assert bucket.delay(500) == 60
+
+def test_bucket_is_synced_with_response_headers(clock):
+    limiter = KeyLimiter()
+    limiter.update({'x-ratelimit-limit-requests': '60', 'x-ratelimit-remaining-requests': '5',
+                    'x-ratelimit-limit-tokens': '1000', 'x-ratelimit-remaining-tokens': 'unknown'})
+
+    assert (limiter.requests.limit, limiter.requests.level) == (60, 5)
+    assert (limiter.tokens.limit, limiter.tokens.level) == (1000, openai_scheduler.OPENAI_DEFAULT_TPM)
+
+    # Остаток из заголовков не увеличивает уровень корзины
+    clock.advance(1)
+    limiter.update({'x-ratelimit-remaining-requests': '50'})
+
+    assert (limiter.requests.limit, limiter.requests.level) == (60, 6)
+
+def test_tasks_are_served_round_robin():
+    granted = []
+
+    async def scenario():
+        limiter = KeyLimiter()
+
+        async def request(task_name, number):
+            await limiter.acquire(task_name, 1)
+            granted.append(f'{task_name}{number}')
+
+        waiters = [asyncio.create_task(request('a', number)) for number in range(3)]
+        waiters += [asyncio.create_task(request('b', number)) for number in range(2)]
+        waiters.append(asyncio.create_task(request('c', 0)))
+
+        await asyncio.gather(*waiters)
+
+    asyncio.run(scenario())
+
+    assert granted == ['a0', 'b0', 'c0', 'a1', 'b1', 'a2']
+
+def test_empty_bucket_delays_requests_until_refill(clock):
+    async def scenario():
+        limiter = KeyLimiter()
+        limiter.requests = TokenBucket(1)
+
+        await limiter.acquire('task', 1)
+        limiter.release()
+
+        waiter = asyncio.create_task(limiter.acquire('task', 1))
+
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        waiting = not waiter.done()
+
+        clock.advance(60)
+        limiter.wake()
+        await asyncio.wait_for(waiter, 1)
+
+        return waiting
+
+    assert asyncio.run(scenario())
+
+def test_pause_after_429_holds_all_tasks(clock):
+    async def scenario():
+        limiter = KeyLimiter()
+        limiter.pause(30)
+
+        waiter = asyncio.create_task(limiter.acquire('other', 1))
+
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        waiting = not waiter.done()
+
+        clock.advance(30)
+        limiter.wake()
+        await asyncio.wait_for(waiter, 1)
+
+        return waiting
+
+    assert asyncio.run(scenario())
+
+def test_retry_delay_prefers_retry_after_headers(monkeypatch):
+    monkeypatch.setattr(openai_scheduler, 'random', lambda: 0.5)
+
+    assert retry_delay(rate_limit_error('limit', {'retry-after-ms': '1500', 'retry-after': '7'}), 0) == 1.5
+    assert retry_delay(rate_limit_error('limit', {'retry-after': '7'}), 0) == 7
+    assert retry_delay(rate_limit_error('limit'), 3) == 8.5
+    assert retry_delay(rate_limit_error('limit'), 10) == 60.5
+
+def test_rate_limited_request_is_retried():
+    calls = []
+
+    async def request():
+        calls.append(len(calls))
+
+        if len(calls) == 1:
+            raise rate_limit_error('Rate limit reached', {'retry-after-ms': '0'})
+
+        return RawResponse({'x-ratelimit-limit-requests': '100'}, total_tokens=250)
+
+    result = asyncio.run(openai_request('key', 'task', 100, request))
+    limiter = openai_scheduler.limiters['key']
+
+    assert result.usage.total_tokens == 250
+    assert len(calls) == 2
+    assert limiter.in_flight == 0
+    assert limiter.requests.limit == 100
+    # Оценка 100 токенов на каждую попытку и поправка на фактические 250 токенов
+    assert limiter.tokens.level == openai_scheduler.OPENAI_DEFAULT_TPM - 100 - 250
+
+def test_quota_error_is_raised_without_retry():
+    calls = []
+
+    async def request():
+        calls.append(len(calls))
+        raise rate_limit_error('You exceeded your current quota')
+
+    with pytest.raises(RateLimitError, match='quota'):
+        asyncio.run(openai_request('key', 'task', 1, request))
+
+    assert len(calls) == 1
+    assert openai_scheduler.limiters['key'].in_flight == 0
+
+def test_rate_limit_error_is_raised_after_last_retry(monkeypatch):
+    monkeypatch.setattr(openai_scheduler, 'OPENAI_MAX_RETRIES', 2)
+    calls = []
+
+    async def request():
+        calls.append(len(calls))
+        raise rate_limit_error('Rate limit reached', {'retry-after-ms': '0'})
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(openai_request('key', 'task', 1, request))
+
+    assert len(calls) == 3
@@ -0,0 +1,158 @@
+import asyncio
+
+import pytest
+
+from bot.handlers.commands.posting_modes import pipeline
+from bot.handlers.commands.posting_modes.pipeline import AccountRateLimiter, run_pipeline, run_account_workers
+
+
+def test_generation_runs_ahead_of_publishing_within_prefetch():
+    events = []
+
+    async def generate(item):
+        events.append(('generate', item))
+        return item
+
+    async def publish(article):
+        events.append(('publish', article))
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run_pipeline(range(6), generate, publish, prefetch=2))
+
+    assert [item for kind, item in events if kind == 'publish'] == list(range(6))
+
+    lead = max(sum(kind == 'generate' for kind, _ in events[:index + 1]) -
+               sum(kind == 'publish' for kind, _ in events[:index + 1]) for index in range(len(events)))
+
+    # Очередь на prefetch статей и ещё одна, ожидающая места в очереди
+    assert 2 <= lead <= 2 + 1
+
+def test_articles_that_failed_to_generate_are_skipped():
+    published = []
+
+    async def generate(item):
+        return None if item % 2 else item
+
+    async def publish(article):
+        published.append(article)
+
+    asyncio.run(run_pipeline(range(5), generate, publish, prefetch=1))
+
+    assert published == [0, 2, 4]
+
+def test_generation_error_stops_pipeline_after_queued_articles():
+    published = []
+
+    async def generate(item):
+        if item == 2:
+            raise RuntimeError('generation failed')
+        return item
+
+    async def publish(article):
+        published.append(article)
+
+    with pytest.raises(RuntimeError, match='generation failed'):
+        asyncio.run(run_pipeline(range(5), generate, publish, prefetch=3))
+
+    assert published == [0, 1]
+
+def test_publishing_error_cancels_generation():
+    generated = []
+
+    async def generate(item):
+        generated.append(item)
+        return item
+
+    async def publish(article):
+        raise RuntimeError('publishing failed')
+
+    with pytest.raises(RuntimeError, match='publishing failed'):
+        asyncio.run(run_pipeline(range(100), generate, publish, prefetch=2))
+
+    assert len(generated) < 100
+
+def test_pipeline_accepts_async_iterator():
+    published = []
+
+    async def items():
+        for item in range(3):
+            await asyncio.sleep(0)
+            yield item
+
+    async def generate(item):
+        return item * 10
+
+    async def publish(article):
+        published.append(article)
+
+    asyncio.run(run_pipeline(items(), generate, publish, prefetch=1))
+
+    assert published == [0, 10, 20]
+
+def test_rate_limiter_delays_only_marked_account():
+    async def scenario():
+        limiter = AccountRateLimiter(interval=60)
+        limiter.mark(1)
+        return limiter.delay(1), limiter.delay(2)
+
+    delay_marked, delay_other = asyncio.run(scenario())
+
+    assert 59 < delay_marked <= 60
+    assert delay_other == 0
+
+def run_workers(monkeypatch, items, generate, publish, limiter, slots=2):
+    monkeypatch.setattr(pipeline, 'MAX_PARALLEL_ACCOUNTS', slots)
+    monkeypatch.setattr(pipeline, 'account_slots', None)
+
+    groups = {}
+
+    for item in items:
+        groups.setdefault(item[0], []).append(item)
+
+    asyncio.run(run_account_workers(groups, generate, publish, limiter))
+
+def test_account_workers_keep_order_per_account_within_slot_limit(monkeypatch):
+    active = 0
+    max_active = 0
+    published = {}
+
+    async def busy():
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+
+    async def generate(item):
+        await busy()
+        return item
+
+    async def publish(article):
+        await busy()
+        published.setdefault(article[0], []).append(article[1])
+
+    items = [(account, number) for number in range(3) for account in 'abcd']
+    run_workers(monkeypatch, items, generate, publish, AccountRateLimiter(0))
+
+    assert published == {account: [0, 1, 2] for account in 'abcd'}
+    assert max_active == 2
+
+def test_account_workers_wait_for_account_interval(monkeypatch):
+    limiter = AccountRateLimiter(0.05)
+    published = []
+
+    async def generate(item):
+        return item
+
+    async def publish(article):
+        published.append((article[0], asyncio.get_running_loop().time()))
+        limiter.mark(article[0])
+
+    run_workers(monkeypatch, [('a', 0), ('a', 1), ('b', 0)], generate, publish, limiter)
+
+    times = [moment for account, moment in published if account == 'a']
+    other = [moment for account, moment in published if account == 'b']
+
+    assert times[1] - times[0] >= 0.04
+    # Задержка одного аккаунта не задерживает другой
+    assert other[0] < times[1]
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from bot.config import DB_TASK_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.database_manager import DatabaseManager
+from bot.handlers.commands import task_status
+from bot.handlers.commands.task_status import get_task_status, set_task_status, flush_task_statuses, task_names
+
+
+@pytest.fixture(autouse=True)
+def tasks(monkeypatch):
+    """Задания task-1 и task-2 в tasks.db; реестр статусов пуст и ещё не загружен"""
+
+    DatabaseManager.create_task_db()
+
+    with get_connection(DB_TASK_DIRECTORY) as connection:
+        connection.execute("DELETE FROM Tasks")
+        connection.executemany(
+            "INSERT INTO Tasks (task_name, task_type, status) VALUES (?, 'Основной', 'Остановлено')",
+            [('task-1',), ('task-2',)]
+        )
+
+    monkeypatch.setattr(task_status, 'task_statuses', {})
+    monkeypatch.setattr(task_status, 'dirty_tasks', set())
+    monkeypatch.setattr(task_status, 'loaded', False)
+
+def stored_statuses() -> dict:
+    rows = get_connection(DB_TASK_DIRECTORY).execute("SELECT task_name, status, last_status FROM Tasks").fetchall()
+    return {task_name: (status, last_status) for task_name, status, last_status in rows}
+
+def test_statuses_are_read_once_and_written_in_batch():
+    assert task_names() == ['task-1', 'task-2']
+
+    set_task_status('task-1', 'Работает')
+    set_task_status('task-2', last_status='Статья опубликована')
+
+    # До записи изменения есть только в памяти
+    assert get_task_status('task-1')['status'] == 'Работает'
+    assert stored_statuses()['task-1'] == ('Остановлено', '-')
+
+    asyncio.run(flush_task_statuses())
+
+    assert stored_statuses() == {'task-1': ('Работает', '-'), 'task-2': ('Остановлено', 'Статья опубликована')}
+    assert task_status.dirty_tasks == set()
+
+def test_failed_write_marks_statuses_dirty_again(monkeypatch):
+    set_task_status('task-1', 'Работает')
+
+    failures = [RuntimeError('database is locked')]
+    write = task_status.executemany
+
+    async def flaky_write(*args):
+        if failures:
+            raise failures.pop()
+        return await write(*args)
+
+    monkeypatch.setattr(task_status, 'executemany', flaky_write)
+    asyncio.run(flush_task_statuses())
+
+    assert task_status.dirty_tasks == {'task-1'}
+    assert stored_statuses()['task-1'] == ('Остановлено', '-')
+
+    # Следующая запись сохраняет статус, не записанный из-за ошибки
+    asyncio.run(flush_task_statuses())
+
+    assert task_status.dirty_tasks == set()
+    assert stored_statuses()['task-1'] == ('Работает', '-')
+
+def test_status_change_with_flush_signals_writer():
+    task_status.flush_event.clear()
+
+    set_task_status('task-1', 'Пауза', flush=True)
+
+    assert task_status.flush_event.is_set()
+
+def test_unknown_task_is_ignored():
+    set_task_status('missing', 'Работает')
+
+    assert get_task_status('missing') is None
+    assert task_status.dirty_tasks == set()
@@ -0,0 +1,126 @@
+import asyncio
+import itertools
+import threading
+
+import pytest
+
+from bot.config import DB_DIRECTORY, DB_TASK_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.database_manager import DatabaseManager
+from bot.databases import db_gateway
+from bot.databases.db_gateway import execute
+from bot.handlers.commands import tasks_settings
+from bot.handlers.commands.tasks_settings import get_settings, get_setting, invalidate_tasks_settings, read_settings, \
+    DEFAULT_SETTINGS
+
+task_numbers = itertools.count()
+
+
+def update(db_path: str, values: dict) -> None:
+    """Запись настроек так же, как это делают обработчики панели: через поток записи"""
+
+    assignments = ', '.join(f'{name} = ?' for name in values)
+    asyncio.run(execute(db_path, f"UPDATE TasksSettings SET {assignments} WHERE id = 1", tuple(values.values())))
+
+@pytest.fixture(autouse=True)
+def global_settings(monkeypatch):
+    monkeypatch.setattr(tasks_settings, 'settings_cache', {})
+
+    connection = get_connection(DB_TASK_DIRECTORY)
+    cursor = connection.execute("SELECT * FROM TasksSettings WHERE id = 1")
+    row = dict(zip([column[0] for column in cursor.description], cursor.fetchone()))
+
+    update(DB_TASK_DIRECTORY, {name: '-' for name in DEFAULT_SETTINGS})
+
+    yield
+
+    update(DB_TASK_DIRECTORY, {name: value for name, value in row.items() if name != 'id'})
+
+@pytest.fixture
+def task_name():
+    task_name = f'settings-{next(task_numbers)}'
+    DatabaseManager.create_db_main(task_name)
+
+    return task_name
+
+def test_unset_settings_fall_back_to_defaults(task_name):
+    settings = asyncio.run(get_settings(task_name))
+
+    assert settings == asyncio.run(get_settings())
+    assert settings['timeout_task_cycle'] == 3600
+    assert settings['count_key_words'] == 15
+    assert settings['indexing'] is True
+    assert settings['searchengine'] == '-'
+
+def test_task_value_overrides_global_value(task_name):
+    update(DB_TASK_DIRECTORY, {'timeout_task_cycle': '600', 'count_key_words': '5', 'searchengine': 'google',
+                               'flag_posting_db': 'False'})
+    update(DB_DIRECTORY + task_name + '.db', {'timeout_task_cycle': '120', 'flag_posting_db': 'True'})
+
+    settings = asyncio.run(get_settings(task_name))
+
+    # Задание → общие настройки → значение по умолчанию
+    assert settings['timeout_task_cycle'] == 120
+    assert settings['flag_posting_db'] is True
+    assert settings['count_key_words'] == 5
+    assert settings['searchengine'] == 'google'
+    assert settings['timeout_posting_articles'] == 180
+
+    assert asyncio.run(get_setting('timeout_task_cycle')) == 600
+    assert asyncio.run(get_setting('flag_posting_db')) is False
+
+def test_write_is_visible_after_invalidation(task_name):
+    assert asyncio.run(get_setting('count_key_words', task_name)) == 15
+
+    update(DB_DIRECTORY + task_name + '.db', {'count_key_words': '30'})
+
+    # Кэш держит прочитанную строку до сброса
+    assert asyncio.run(get_setting('count_key_words', task_name)) == 15
+
+    invalidate_tasks_settings(task_name)
+
+    assert asyncio.run(get_setting('count_key_words', task_name)) == 30
+
+def test_global_write_reaches_tasks_after_global_invalidation(task_name):
+    assert asyncio.run(get_setting('indexing', task_name)) is True
+
+    update(DB_TASK_DIRECTORY, {'indexing': 'False'})
+
+    # Сброс кэша другого задания не затрагивает общие настройки
+    invalidate_tasks_settings('other-task')
+
+    assert asyncio.run(get_setting('indexing', task_name)) is True
+
+    invalidate_tasks_settings()
+
+    assert asyncio.run(get_setting('indexing', task_name)) is False
+
+def test_read_started_before_invalidation_is_not_cached(task_name, monkeypatch):
+    reads = []
+
+    async def run_read(db_path, read):
+        # Запись и сброс кэша происходят, пока строка читается в потоке шлюза
+        reads.append(db_path)
+        invalidate_tasks_settings(task_name)
+        return read(get_connection(db_path))
+
+    monkeypatch.setattr(tasks_settings, 'run_read', run_read)
+
+    asyncio.run(read_settings(task_name))
+
+    assert reads == [DB_DIRECTORY + task_name + '.db']
+    assert ('TasksSettings', task_name) not in tasks_settings.settings_cache
+
+def test_settings_are_read_off_the_event_loop(task_name, monkeypatch):
+    loop_thread = threading.get_ident()
+    threads = []
+
+    def get_connection_in_thread(db_path):
+        threads.append(threading.get_ident())
+        return get_connection(db_path)
+
+    monkeypatch.setattr(db_gateway, 'get_connection', get_connection_in_thread)
+
+    asyncio.run(get_settings(task_name))
+
+    assert len(threads) == 2 and loop_thread not in threads
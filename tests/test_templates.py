@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from bot.handlers.commands import templates
+from bot.handlers.commands.templates import compile_template, render_template, get_templates, invalidate_templates
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Загрузчики-заглушки: каждый возвращает номер своей загрузки"""
+
+    loads = {'patterns': 0, 'links': 0, 'images': 0}
+
+    def loader(kind):
+        async def load():
+            loads[kind] += 1
+            await asyncio.sleep(0)
+            return {'load': loads[kind]}
+
+        return load
+
+    monkeypatch.setattr(templates, 'LOADERS', {kind: loader(kind) for kind in loads})
+    monkeypatch.setattr(templates, 'templates_cache', {})
+    monkeypatch.setattr(templates, 'templates_versions', {})
+
+    return loads
+
+def test_template_placeholders_are_substituted():
+    template = compile_template('%NAME%: %KEYS%\n%LINKS%%IMAGES%')
+
+    assert render_template(template, {'%NAME%': 'тема', '%KEYS%': 'ключ'}) == 'тема: ключ\n'
+
+def test_templates_are_loaded_once_until_invalidated(loads):
+    async def scenario():
+        await get_templates()
+        await get_templates()
+        invalidate_templates('links')
+
+        return await get_templates()
+
+    assert asyncio.run(scenario()) == {'patterns': {'load': 1}, 'links': {'load': 2}, 'images': {'load': 1}}
+
+def test_result_loaded_before_invalidation_is_not_cached(loads):
+    async def scenario():
+        loading = asyncio.create_task(get_templates())
+        await asyncio.sleep(0)
+
+        # Шаблоны изменены, пока загрузка ещё идёт
+        invalidate_templates()
+        stale = await loading
+
+        return stale, await get_templates()
+
+    stale, fresh = asyncio.run(scenario())
+
+    assert stale['patterns'] == {'load': 1}
+    assert fresh['patterns'] == {'load': 2}
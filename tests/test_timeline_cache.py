@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from bot.handlers.commands.api import timeline_cache
+from bot.handlers.commands.api.timeline_cache import user_posts, remember_post
+
+PAGE_SIZE = 2
+
+
+class FakePlatform:
+    user_id = 7
+
+
+class FakeTimeline:
+    """Лента автора на площадке: статьи от новых к старым, страницы по PAGE_SIZE статей"""
+
+    def __init__(self, count: int) -> None:
+        self.posts = [(f'https://vc.ru/{number}', f'post {number}') for number in range(count, 0, -1)]
+        self.pages = []
+        self.error = None
+
+    def publish(self, number: int) -> None:
+        self.posts.insert(0, (f'https://vc.ru/{number}', f'post {number}'))
+
+    async def fetch_page(self, platform, site: str, cursor: tuple = None) -> tuple:
+        if self.error:
+            raise self.error
+
+        start = cursor[0] if cursor else 0
+        self.pages.append(start)
+
+        return self.posts[start:start + PAGE_SIZE], (start + PAGE_SIZE, None)
+
+@pytest.fixture
+def feed(monkeypatch):
+    feed = FakeTimeline(5)
+
+    monkeypatch.setattr(timeline_cache, 'fetch_page', feed.fetch_page)
+    monkeypatch.setattr(timeline_cache, 'timelines', {})
+    monkeypatch.setattr(timeline_cache, 'timeline_locks', {})
+    monkeypatch.setattr(timeline_cache, 'TIMELINE_PAGE_DELAY', 0)
+
+    return feed
+
+def urls(posts: list) -> list:
+    return [int(url.rsplit('/', 1)[1]) for url, title in posts]
+
+def test_timeline_is_read_only_as_far_as_needed_and_cached(feed):
+    async def scenario():
+        return await user_posts(FakePlatform(), 'vc.ru', 3), await user_posts(FakePlatform(), 'vc.ru', 3)
+
+    first, cached = asyncio.run(scenario())
+
+    assert urls(first) == urls(cached) == [5, 4, 3]
+    assert feed.pages == [0, 2]
+
+def test_short_timeline_is_read_to_the_end_once(feed):
+    async def scenario():
+        return await user_posts(FakePlatform(), 'vc.ru', 10), await user_posts(FakePlatform(), 'vc.ru', 10)
+
+    first, cached = asyncio.run(scenario())
+
+    assert urls(first) == urls(cached) == [5, 4, 3, 2, 1]
+    assert feed.pages == [0, 2, 4, 6]
+
+def test_expired_timeline_loads_only_new_posts(feed, monkeypatch):
+    async def scenario():
+        await user_posts(FakePlatform(), 'vc.ru', 3)
+
+        feed.publish(6)
+        feed.pages.clear()
+        monkeypatch.setattr(timeline_cache, 'TIMELINE_CACHE_TTL', -1)
+
+        return await user_posts(FakePlatform(), 'vc.ru', 3)
+
+    assert urls(asyncio.run(scenario())) == [6, 5, 4]
+    assert feed.pages == [0]
+
+def test_published_post_is_added_without_request(feed):
+    async def scenario():
+        await user_posts(FakePlatform(), 'vc.ru', 3)
+        remember_post('vc.ru', FakePlatform.user_id, 'https://vc.ru/6', 'post 6')
+        feed.pages.clear()
+
+        return await user_posts(FakePlatform(), 'vc.ru', 3)
+
+    assert urls(asyncio.run(scenario())) == [6, 5, 4]
+    assert feed.pages == []
+
+def test_request_error_is_reported(feed):
+    feed.error = RuntimeError('timeout')
+
+    assert asyncio.run(user_posts(FakePlatform(), 'vc.ru', 3)) is False
@@ -0,0 +1,149 @@
+import asyncio
+import base64
+import json
+import time
+
+import pytest
+
+from bot.config import DB_TOKENS_DIRECTORY, DB_MAIN_ACCOUNTS_DIRECTORY, DB_MULTI_ACCOUNTS_DIRECTORY, \
+    TOKEN_DEFAULT_TTL, TOKEN_REFRESH_MARGIN
+from bot.databases.connection_pool import get_connection
+from bot.databases.database_manager import DatabaseManager
+from bot.handlers.commands.api import token_manager
+from bot.handlers.commands.api.token_manager import token_expiry, is_fresh, load_tokens, remember_token, \
+    restore_token, refresh_token
+
+
+def jwt(payload: dict) -> str:
+    body = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+    return f'header.{body}.signature'
+
+
+class Platform:
+    """Объект площадки: обновление токена возвращает заданный токен"""
+
+    def __init__(self, email: str = 'user@mail', session_key: str = None, refreshed: str = None) -> None:
+        self.email = email
+        self.session_key = session_key or f'vc.ru-{email}'
+        self.accessToken = None
+        self.refreshToken = None
+        self.user_id = None
+        self.refreshed = refreshed
+        self.refresh_calls = 0
+
+    async def platform_refresh_token(self) -> tuple:
+        self.refresh_calls += 1
+
+        if self.refreshed is None:
+            return False, 'error'
+
+        self.accessToken, self.refreshToken = self.refreshed, 'new-refresh'
+        return True, self.accessToken
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    DatabaseManager.create_tokens_db()
+    DatabaseManager.create_main_accounts_db()
+    DatabaseManager.create_multi_accounts_db()
+
+    for db_path, table in ((DB_TOKENS_DIRECTORY, 'Tokens'), (DB_MAIN_ACCOUNTS_DIRECTORY, 'Accounts'),
+                           (DB_MULTI_ACCOUNTS_DIRECTORY, 'Accounts')):
+        with get_connection(db_path) as connection:
+            connection.execute(f"DELETE FROM {table}")
+
+    monkeypatch.setattr(token_manager, 'tokens', {})
+    monkeypatch.setattr(token_manager, 'platforms', {})
+    monkeypatch.setattr(token_manager, 'refresh_locks', {})
+
+def add_account(db_path: str, email: str, account_url: str) -> None:
+    with get_connection(db_path) as connection:
+        connection.execute(
+            "INSERT INTO Accounts (account_email, account_password, account_login, proxy_ip, proxy_port, "
+            "proxy_login, proxy_password, accessToken, account_url) VALUES (?, '-', '-', '-', '-', '-', '-', 'old', ?)",
+            (email, account_url)
+        )
+
+def account_tokens(db_path: str) -> list:
+    return get_connection(db_path).execute("SELECT account_url, accessToken FROM Accounts ORDER BY id").fetchall()
+
+def test_expiry_is_read_from_jwt_exp():
+    assert token_expiry(jwt({'exp': 1700000000})) == 1700000000
+
+@pytest.mark.parametrize('access_token', ['not-a-jwt', jwt({'sub': 'user'}), 'header.!!!.signature'])
+def test_expiry_falls_back_to_default_ttl(access_token):
+    started = time.time()
+
+    assert started + TOKEN_DEFAULT_TTL <= token_expiry(access_token) <= time.time() + TOKEN_DEFAULT_TTL
+
+def test_token_is_refreshed_within_margin_of_expiry():
+    now = time.time()
+
+    assert is_fresh({'expires_at': now + TOKEN_REFRESH_MARGIN + 60})
+    assert not is_fresh({'expires_at': now + TOKEN_REFRESH_MARGIN - 60})
+    assert not is_fresh({'expires_at': now - 60})
+
+def test_token_survives_restart(monkeypatch):
+    access_token = jwt({'exp': time.time() + TOKEN_REFRESH_MARGIN * 2})
+
+    platform = Platform()
+    platform.accessToken, platform.refreshToken, platform.user_id = access_token, 'refresh', 42
+
+    asyncio.run(remember_token(platform))
+
+    monkeypatch.setattr(token_manager, 'tokens', {})
+    load_tokens()
+
+    restored = Platform()
+
+    assert asyncio.run(restore_token(restored))
+    assert (restored.accessToken, restored.refreshToken, restored.user_id) == (access_token, 'refresh', 42)
+
+def test_expiring_token_is_not_refreshed_when_disabled(monkeypatch):
+    monkeypatch.setattr(token_manager, 'TOKEN_REFRESH_ENABLED', False)
+
+    platform = Platform(refreshed=jwt({'exp': time.time() + TOKEN_DEFAULT_TTL}))
+    platform.accessToken, platform.refreshToken, platform.user_id = jwt({'exp': time.time() + 60}), 'refresh', 42
+
+    asyncio.run(remember_token(platform))
+
+    # Истекающий токен не подставляется: бот авторизуется заново
+    assert not asyncio.run(restore_token(Platform(refreshed=platform.refreshed)))
+    assert not asyncio.run(refresh_token(platform, force=True))
+    assert platform.refresh_calls == 0
+
+def test_refreshed_token_is_written_to_account_rows(monkeypatch):
+    monkeypatch.setattr(token_manager, 'TOKEN_REFRESH_ENABLED', True)
+
+    add_account(DB_MAIN_ACCOUNTS_DIRECTORY, 'user@mail', 'https://vc.ru/u/1')
+    add_account(DB_MAIN_ACCOUNTS_DIRECTORY, 'user@mail', 'https://dtf.ru/u/1')
+    add_account(DB_MULTI_ACCOUNTS_DIRECTORY, 'user@mail', 'https://vc.ru/u/1')
+    add_account(DB_MULTI_ACCOUNTS_DIRECTORY, 'other@mail', 'https://vc.ru/u/2')
+
+    refreshed = jwt({'exp': time.time() + TOKEN_DEFAULT_TTL})
+
+    platform = Platform(refreshed=refreshed)
+    platform.accessToken, platform.refreshToken, platform.user_id = jwt({'exp': time.time() + 60}), 'refresh', 42
+
+    asyncio.run(remember_token(platform))
+
+    restored = Platform(refreshed=refreshed)
+
+    assert asyncio.run(restore_token(restored))
+    assert restored.accessToken == refreshed
+    assert account_tokens(DB_MAIN_ACCOUNTS_DIRECTORY) == [('https://vc.ru/u/1', refreshed), ('https://dtf.ru/u/1', 'old')]
+    assert account_tokens(DB_MULTI_ACCOUNTS_DIRECTORY) == [('https://vc.ru/u/1', refreshed), ('https://vc.ru/u/2', 'old')]
+
+    stored, = get_connection(DB_TOKENS_DIRECTORY).execute("SELECT access_token, refresh_token FROM Tokens").fetchall()
+    assert stored == (refreshed, 'new-refresh')
+
+def test_failed_refresh_forgets_token(monkeypatch):
+    monkeypatch.setattr(token_manager, 'TOKEN_REFRESH_ENABLED', True)
+
+    platform = Platform()
+    platform.accessToken, platform.refreshToken, platform.user_id = jwt({'exp': time.time() + 60}), 'refresh', 42
+
+    asyncio.run(remember_token(platform))
+
+    assert not asyncio.run(restore_token(Platform()))
+    assert token_manager.tokens == {}
+    assert get_connection(DB_TOKENS_DIRECTORY).execute("SELECT COUNT(*) FROM Tokens").fetchone() == (0,)
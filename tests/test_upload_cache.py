@@ -0,0 +1,77 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from bot.config import DB_UPLOADS_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.database_manager import DatabaseManager
+from bot.handlers.commands.api import upload_cache
+from bot.handlers.commands.api.upload_cache import load_uploads, file_digest, get_upload, remember_upload
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    DatabaseManager.create_uploads_db()
+
+    with get_connection(DB_UPLOADS_DIRECTORY) as connection:
+        connection.execute("DELETE FROM Uploads")
+
+    monkeypatch.setattr(upload_cache, 'uploads', {})
+    monkeypatch.setattr(upload_cache, 'file_hashes', {})
+
+def test_uploaded_image_is_reused_by_same_account_only():
+    image = {'type': 'image', 'data': {'uuid': '1'}}
+
+    asyncio.run(remember_upload('vc:user@mail', 'sha', image))
+
+    reused = get_upload('vc:user@mail', 'sha')
+    reused['data']['uuid'] = 'changed'
+
+    assert get_upload('vc:user@mail', 'sha') == image
+    assert get_upload('dtf:user@mail', 'sha') is None
+
+def test_uploads_are_restored_after_restart_until_expired(monkeypatch):
+    async def scenario():
+        await remember_upload('vc:user@mail', 'fresh', {'uuid': 'fresh'})
+        await remember_upload('vc:user@mail', 'old', {'uuid': 'old'})
+
+    asyncio.run(scenario())
+
+    with get_connection(DB_UPLOADS_DIRECTORY) as connection:
+        connection.execute("UPDATE Uploads SET uploaded_at = ? WHERE sha256 = 'old'",
+                           (time.time() - upload_cache.UPLOAD_CACHE_TTL - 1,))
+
+    monkeypatch.setattr(upload_cache, 'uploads', {})
+    load_uploads()
+
+    assert get_upload('vc:user@mail', 'fresh') == {'uuid': 'fresh'}
+    assert get_upload('vc:user@mail', 'old') is None
+
+def test_file_digest_is_recomputed_only_after_change(tmp_path, monkeypatch):
+    path = tmp_path / 'image.webp'
+    path.write_bytes(b'first')
+
+    hashed = []
+    hash_file = upload_cache.hash_file
+
+    def counting_hash(image_path):
+        hashed.append(image_path)
+        return hash_file(image_path)
+
+    monkeypatch.setattr(upload_cache, 'hash_file', counting_hash)
+
+    async def scenario():
+        first = await file_digest(str(path))
+        again = await file_digest(str(path))
+
+        path.write_bytes(b'second file')
+        os.utime(path, ns=(time.time_ns() + 10 ** 9, time.time_ns() + 10 ** 9))
+
+        return first, again, await file_digest(str(path))
+
+    first, again, changed = asyncio.run(scenario())
+
+    assert first == again != changed
+    assert len(hashed) == 2
@@ -0,0 +1,154 @@
+import asyncio
+import itertools
+
+import pytest
+
+from bot.config import DB_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.database_manager import DatabaseManager
+from bot.handlers.commands.posting_modes.work_queue import WORK_DONE, WORK_PENDING, WORK_RUNNING, WORK_SKIPPED, \
+    reset_work_items, sync_work_items, next_work_round, claim_work_item, complete_work_item, \
+    attach_work_article, retry_work_item, skip_account_work, count_work_items
+
+task_numbers = itertools.count()
+
+
+def make_account(account_id: int, site: str = 'vc') -> tuple:
+    """Строка Accounts: ID — первый столбец, ссылка на аккаунт — десятый"""
+
+    return (account_id, *['-'] * 8, f'https://{site}.ru/u/{account_id}')
+
+@pytest.fixture
+def task_db():
+    """База нового задания (таблица WorkItems создаётся миграцией) с промтами 1 и 2;
+    у промта 1 уже стоит отметка аккаунта 3"""
+
+    task = f'work_queue_{next(task_numbers)}'
+    DatabaseManager.create_db_main(task)
+    db_path = DB_DIRECTORY + task + '.db'
+
+    with get_connection(db_path) as connection:
+        connection.executemany(
+            "INSERT INTO Prompts (id, prompt, prompt_theme, marks) VALUES (?, ?, ?, ?)",
+            [(1, 'prompt 1', 'theme 1', 'vc-3'), (2, 'prompt 2', 'theme 2', None)]
+        )
+
+
+    return db_path
+
+def statuses(db_path: str) -> dict:
+    rows = get_connection(db_path).execute("SELECT prompt_id, account_id, status FROM WorkItems").fetchall()
+    return {(prompt_id, account_id): status for prompt_id, account_id, status in rows}
+
+def test_sync_seeds_pairs_once_and_respects_marks(task_db):
+    accounts = [make_account(1), make_account(3)]
+
+    async def scenario():
+        return (await sync_work_items(task_db, accounts, [], 0),
+                await sync_work_items(task_db, accounts, [], 0))
+
+    assert asyncio.run(scenario()) == (4, 0)
+    assert statuses(task_db) == {(1, 1): WORK_PENDING, (1, 3): WORK_DONE, (2, 1): WORK_PENDING, (2, 3): WORK_PENDING}
+
+def test_claim_takes_priority_prompts_first_and_marks_pairs_running(task_db):
+    async def scenario():
+        await sync_work_items(task_db, [make_account(1), make_account(2)], [2], 0)
+        round_no = await next_work_round(task_db)
+
+        return round_no, [await claim_work_item(task_db, round_no) for _ in range(3)]
+
+    round_no, claimed = asyncio.run(scenario())
+
+    assert round_no == 0
+    assert [item[1:3] for item in claimed[:2]] == [(2, 1), (1, 2)]
+    assert claimed[2] is None
+    assert statuses(task_db)[(2, 1)] == WORK_RUNNING
+
+    attempts = get_connection(task_db).execute("SELECT attempts FROM WorkItems WHERE id = ?", (claimed[0][0],))
+    assert attempts.fetchone()[0] == 1
+
+def test_claim_by_account_and_complete(task_db):
+    accounts = [make_account(1), make_account(2)]
+
+    async def scenario():
+        await sync_work_items(task_db, accounts, [], 0)
+        work_id, prompt_id, account_id, round_no, article_id = await claim_work_item(task_db, 0, account_id=2)
+        await complete_work_item(task_db, work_id, WORK_DONE, article_id=7)
+
+        return account_id, await count_work_items(task_db, [1, 2])
+
+    account_id, counts = asyncio.run(scenario())
+
+    assert account_id == 2
+    # (отработанные, все, опубликованные)
+    assert counts == (1, 4, 1)
+    assert get_connection(task_db).execute("SELECT article_id FROM WorkItems WHERE status = ?",
+                                           (WORK_DONE,)).fetchone()[0] == 7
+
+def test_retried_pair_waits_for_delay_in_new_round(task_db):
+    async def scenario():
+        await sync_work_items(task_db, [make_account(1)], [], 0)
+        first = await claim_work_item(task_db, 0)
+        await retry_work_item(task_db, first[0], 1, delay=3600)
+
+        delayed = await claim_work_item(task_db, 1)
+
+        second = await claim_work_item(task_db, 0)
+        await retry_work_item(task_db, second[0], 1, delay=0)
+
+        return first, delayed, await claim_work_item(task_db, 1)
+
+    first, delayed, ready = asyncio.run(scenario())
+
+    assert delayed is None
+    assert ready[1] != first[1] and ready[3] == 1
+
+def test_reset_returns_interrupted_and_skipped_pairs(task_db):
+    async def scenario():
+        await sync_work_items(task_db, [make_account(1), make_account(2)], [], 0)
+        await claim_work_item(task_db, 0, account_id=1)
+        skipped = await skip_account_work(task_db, 2)
+        await reset_work_items(task_db, [])
+
+        return skipped
+
+    assert asyncio.run(scenario()) == 2
+    assert set(statuses(task_db).values()) == {WORK_PENDING}
+
+def test_resume_keeps_skipped_pairs_and_generated_article(task_db):
+    async def scenario():
+        await sync_work_items(task_db, [make_account(1), make_account(2)], [], 0)
+        work_id = (await claim_work_item(task_db, 0, account_id=1))[0]
+        await attach_work_article(task_db, work_id, 5)
+        await skip_account_work(task_db, 2)
+
+        # Перезапуск бота: пара, прерванная во время публикации, берётся в работу со своей статьёй
+        await reset_work_items(task_db, [], reopen_skipped=False)
+
+        return work_id, await claim_work_item(task_db, 0, account_id=1)
+
+    work_id, resumed = asyncio.run(scenario())
+
+    assert resumed[0] == work_id and resumed[4] == 5
+    assert {status for pair, status in statuses(task_db).items() if pair[1] == 2} == {WORK_SKIPPED}
+
+def test_retry_drops_generated_article(task_db):
+    async def scenario():
+        await sync_work_items(task_db, [make_account(1)], [], 0)
+        work_id = (await claim_work_item(task_db, 0))[0]
+        await attach_work_article(task_db, work_id, 5)
+        await retry_work_item(task_db, work_id, 0, delay=0)
+
+        return [item for item in [await claim_work_item(task_db, 0) for _ in range(2)] if item[0] == work_id]
+
+    assert asyncio.run(scenario())[0][4] is None
+
+def test_accounts_removed_from_task_are_skipped(task_db):
+    async def scenario():
+        await sync_work_items(task_db, [make_account(1), make_account(2)], [], 0)
+        await sync_work_items(task_db, [make_account(1)], [], 0)
+
+    asyncio.run(scenario())
+
+    assert {pair: status for pair, status in statuses(task_db).items() if pair[1] == 2} == \
+        {(1, 2): WORK_SKIPPED, (2, 2): WORK_SKIPPED}
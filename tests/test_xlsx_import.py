@@ -0,0 +1,128 @@
+import asyncio
+import itertools
+
+import openpyxl
+import pytest
+
+from openpyxl.styles import PatternFill
+
+from bot.config import DB_DIRECTORY, DB_PATTERNS_DIRECTORY, DB_XLSX_DIRECTORY
+from bot.databases.connection_pool import get_connection
+from bot.databases.database_manager import DatabaseManager
+from bot.handlers.commands.templates import invalidate_templates
+from bot.handlers.commands.xlsx_import import read_themes, import_prompts_from_xlsx
+
+HEADER_FILL = PatternFill(start_color='FFFF00', end_color='FFFF00', fill_type='solid')
+
+task_numbers = itertools.count()
+
+
+def write_xlsx(path, rows: list) -> str:
+    """xlsx-файл импорта: строки (выделен ли ключ, ключ, шаблон, ссылки, опциональная тема, изображения)"""
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['Ключ', 'Шаблон', 'Ссылки', 'Тема', 'Изображения'])
+
+    for header, *values in rows:
+        sheet.append(values)
+
+        if header:
+            sheet.cell(row=sheet.max_row, column=1).fill = HEADER_FILL
+
+    workbook.save(path)
+
+    return str(path)
+
+def test_theme_keys_follow_baseline_rules(tmp_path):
+    path = write_xlsx(tmp_path / 'themes.xlsx', [
+        (False, 'до первой темы', None, None, None, None),
+        # Тема — ключ заголовка; он идёт первым ключом темы
+        (True, 'тема 1', 'p1', 'l1', None, 'i1'),
+        (False, 'ключ 1', None, None, None, None),
+        (False, '   ', None, None, None, None),
+        (False, 'ключ 2', None, None, None, None),
+        # Тема без дополнительных ключей
+        (True, 'тема 2', 'p2', None, None, None),
+        # Опциональная тема: в ключи попадает ключ заголовка, но не сама тема
+        (True, 'ключ заголовка', 'p3', None, 'опциональная тема', None),
+        (False, 'ключ 3', None, None, None, None),
+        # Ключ заголовка, уже совпадающий с темой, не дублируется
+        (True, 'тема 4', 'p4', None, None, None),
+        (False, 'тема 4', None, None, None, None),
+    ])
+
+    themes, theme_count = read_themes(path)
+
+    assert theme_count == 4
+    assert themes == [
+        ('тема 1', 'p1', 'l1', 'i1', ['тема 1', 'ключ 1', 'ключ 2']),
+        ('тема 2', 'p2', None, None, ['тема 2']),
+        ('опциональная тема', 'p3', None, None, ['ключ заголовка', 'ключ 3']),
+        ('тема 4', 'p4', None, None, ['тема 4']),
+    ]
+
+def test_file_without_themes(tmp_path):
+    path = write_xlsx(tmp_path / 'empty.xlsx', [(False, 'ключ', None, None, None, None)])
+
+    assert read_themes(path) == ([], 0)
+
+@pytest.fixture
+def task():
+    """Задание с пустой таблицей промтов; шаблон p1 и один ранее сохранённый набор ключей"""
+
+    task = f'xlsx_import_{next(task_numbers)}'
+
+    DatabaseManager.create_task_db()
+    DatabaseManager.create_patterns_db()
+    DatabaseManager.create_links_db()
+    DatabaseManager.create_db_images()
+    DatabaseManager.create_db_xlsx()
+    DatabaseManager.create_db_main(task)
+
+    with get_connection(DB_PATTERNS_DIRECTORY) as connection:
+        connection.execute("DELETE FROM Patterns")
+        connection.execute("INSERT INTO Patterns (pattern_name, pattern) VALUES ('p1', '%NAME%: %KEYS%')")
+
+    with get_connection(DB_XLSX_DIRECTORY) as connection:
+        connection.execute("DELETE FROM Xlsx")
+        connection.execute("INSERT INTO Xlsx (keys) VALUES ('тема 1\nключ 1')")
+
+    invalidate_templates()
+
+    return task
+
+def xlsx_keys() -> list:
+    return [keys for (keys,) in get_connection(DB_XLSX_DIRECTORY).execute("SELECT keys FROM Xlsx ORDER BY id")]
+
+def test_import_reuses_existing_key_sets(task, tmp_path):
+    path = write_xlsx(tmp_path / 'import.xlsx', [
+        (True, 'тема 1', 'p1', None, None, None),
+        (False, 'ключ 1', None, None, None, None),
+        (True, 'тема 2', 'p1', None, None, None),
+        (True, 'тема 3', 'нет шаблона', None, None, None),
+    ])
+
+    flag, prompts_count, theme_count, info = asyncio.run(import_prompts_from_xlsx(task, path))
+
+    assert (flag, prompts_count, theme_count) == (True, 2, 3)
+    assert xlsx_keys() == ['тема 1\nключ 1', 'тема 2', 'тема 3']
+    assert get_connection(DB_DIRECTORY + task + '.db').execute(
+        "SELECT prompt, prompt_theme, xlsx_id FROM Prompts ORDER BY id"
+    ).fetchall() == [('тема 1: тема 1\nключ 1', 'тема 1', '1'), ('тема 2: тема 2', 'тема 2', '2')]
+
+def test_failed_prompts_write_removes_new_key_sets(task, tmp_path):
+    path = write_xlsx(tmp_path / 'import.xlsx', [
+        (True, 'тема 1', 'p1', None, None, None),
+        (False, 'ключ 1', None, None, None, None),
+        (True, 'тема 2', 'p1', None, None, None),
+    ])
+
+    with get_connection(DB_DIRECTORY + task + '.db') as connection:
+        connection.execute("DROP TABLE Prompts")
+
+    flag, prompts_count, theme_count, info = asyncio.run(import_prompts_from_xlsx(task, path))
+
+    assert flag is False
+    # Набор ключей, сохранённый до импорта, остаётся
+    assert xlsx_keys() == ['тема 1\nключ 1']